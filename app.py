@@ -2,14 +2,11 @@
 牙周病学自适应学习系统 - 主应用
 """
 
+import os
+import importlib
+import importlib.util
 import streamlit as st
-import random
-from modules.case_library import render_case_library
-from modules.knowledge_graph import render_knowledge_graph
-from modules.ability_recommender import render_ability_recommender
-from modules.classroom_interaction import render_classroom_interaction
 from modules.auth import render_login_page, check_login, get_current_user, logout
-from modules.analytics import render_analytics_dashboard, render_module_analytics
 
 # 页面配置
 st.set_page_config(
@@ -19,674 +16,67 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# 高端现代化主题CSS
-st.markdown("""
-<style>
-    /* 导入Google字体 */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
-    
-    /* 全局字体 */
-    html, body, [class*="css"] {
-        font-family: 'Inter', -apple-system, BlinkMacSystemFont, sans-serif;
-    }
-    
-    /* 隐藏Streamlit加载时的半透明蒙版 */
-    div[data-testid="stAppViewBlockContainer"] > div:first-child > div:first-child {
-        background: transparent !important;
-    }
-    
-    /* 隐藏加载遮罩 */
-    .stApp > div:first-child > div:first-child > div > div[style*="opacity"] {
-        opacity: 1 !important;
-    }
-    
-    /* 禁用加载动画的半透明效果 */
-    [data-testid="stAppViewContainer"] > section > div {
-        opacity: 1 !important;
-        transition: none !important;
-    }
-    
-    /* 禁用所有过渡动画减少闪烁 */
-    *, *::before, *::after {
-        transition: none !important;
-        animation: none !important;
-        animation-duration: 0s !important;
-        animation-delay: 0s !important;
-    }
-    
-    /* 禁止边框闪烁 */
-    .stMetric, .stDataFrame, div[data-testid="stMetricValue"],
-    div[data-testid="stDataFrame"], .stPlotlyChart,
-    .element-container, div[class*="st"], 
-    div[data-testid*="st"] {
-        animation: none !important;
-        border: none !important;
-        outline: none !important;
-        transition: none !important;
-    }
-    
-    /* 强制禁用数据框和表格的所有动画 */
-    table, thead, tbody, tr, td, th {
-        animation: none !important;
-        transition: none !important;
-    }
-    
-    /* 禁止图表容器边框动画 */
-    .js-plotly-plot, .plotly, .plot-container {
-        animation: none !important;
-        transition: none !important;
-    }
-    
-    /* 禁用Streamlit内部组件的focus效果 */
-    *:focus, *:active, *:hover {
-        outline: none !important;
-        animation: none !important;
-        transition: none !important;
-    }
-    
-    /* 完全禁用滚动条相关的动画和闪烁 */
-    ::-webkit-scrollbar {
-        width: 8px;
-        height: 8px;
-    }
-    
-    ::-webkit-scrollbar-track {
-        background: #f1f1f1;
-        border-radius: 4px;
-    }
-    
-    ::-webkit-scrollbar-thumb {
-        background: #888;
-        border-radius: 4px;
-        transition: none !important;
-    }
-    
-    ::-webkit-scrollbar-thumb:hover {
-        background: #555;
-        transition: none !important;
-    }
-    
-    /* 禁用 DataFrame 的所有动画和过渡 */
-    [data-testid="stDataFrame"],
-    .stDataFrame,
-    div[data-testid="stDataFrame"] > div,
-    div[data-testid="stDataFrame"] * {
-        animation: none !important;
-        transition: none !important;
-        transform: none !important;
-        will-change: auto !important;
-    }
-    
-    /* 强制表格容器稳定渲染 */
-    [data-testid="stDataFrame"] > div > div {
-        backface-visibility: hidden !important;
-        -webkit-backface-visibility: hidden !important;
-        transform: translateZ(0) !important;
-        -webkit-transform: translateZ(0) !important;
-    }
-    
-    /* 禁用表格内部滚动时的重绘 */
-    .stDataFrame iframe,
-    [data-testid="stDataFrame"] iframe {
-        pointer-events: auto !important;
-        animation: none !important;
-        transition: none !important;
-    }
-    
-    /* 禁用 AG Grid 的动画（Streamlit dataframe 使用的库）*/
-    .ag-root-wrapper,
-    .ag-root,
-    .ag-body-viewport,
-    .ag-center-cols-viewport,
-    .ag-center-cols-container {
-        animation: none !important;
-        transition: none !important;
-        transform: none !important;
-    }
-    
-    /* 隐藏 DataFrame 的搜索框 */
-    [data-testid="stDataFrame"] input[type="text"],
-    [data-testid="stDataFrame"] input[placeholder*="search"],
-    [data-testid="stDataFrame"] input[placeholder*="Search"],
-    .ag-header-cell-filter-button,
-    .ag-floating-filter,
-    .ag-floating-filter-input,
-    .ag-text-field-input,
-    button[aria-label*="search"],
-    button[aria-label*="Search"],
-    div[class*="search"],
-    div[class*="Search"] {
-        display: none !important;
-        visibility: hidden !important;
-        opacity: 0 !important;
-        height: 0 !important;
-        width: 0 !important;
-        pointer-events: none !important;
-    }
-    
-    /* 隐藏Streamlit的状态指示器 */
-    .stStatusWidget,
-    div[data-testid="stStatusWidget"],
-    .stSpinner,
-    .stProgress {
-        display: none !important;
-    }
-    
-    /* 禁止容器透明度变化 */
-    .element-container,
-    .stMarkdown,
-    .stSelectbox,
-    .stTabs {
-        opacity: 1 !important;
-    }
-    
-    /* 浅色渐变背景 */
-    .stApp {
-        background: linear-gradient(135deg, #f5f7fa 0%, #e4e8f0 50%, #f0f2f5 100%);
-        min-height: 100vh;
-    }
-    
-    /* 隐藏默认侧边栏 */
-    [data-testid="stSidebar"] {
-        display: none !important;
-    }
-    
-    /* 玻璃态效果容器 */
-    .glass-container {
-        background: rgba(255, 255, 255, 0.9);
-        backdrop-filter: blur(20px);
-        border-radius: 20px;
-        border: 1px solid rgba(102, 126, 234, 0.2);
-        padding: 30px;
-        margin: 10px 0;
-        box-shadow: 0 8px 32px rgba(102, 126, 234, 0.15);
-    }
-    
-    /* 顶部导航栏 */
-    .top-nav {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        backdrop-filter: blur(20px);
-        border-radius: 16px;
-        border: none;
-        padding: 15px 30px;
-        margin-bottom: 30px;
-        display: flex;
-        align-items: center;
-        justify-content: space-between;
-        box-shadow: 0 4px 20px rgba(102, 126, 234, 0.3);
-    }
-    
-    /* Logo区域 */
-    .logo-section {
-        display: flex;
-        align-items: center;
-        gap: 15px;
-    }
-    
-    .logo-icon {
-        font-size: 40px;
-    }
-    
-    .logo-text {
-        font-size: 24px;
-        font-weight: 700;
-        color: #fff;
-        letter-spacing: -0.5px;
-    }
-    
-    .logo-subtitle {
-        font-size: 11px;
-        color: rgba(255,255,255,0.8);
-        letter-spacing: 2px;
-        text-transform: uppercase;
-    }
-    
-    /* 用户信息 */
-    .user-info {
-        display: flex;
-        align-items: center;
-        gap: 15px;
-        padding: 10px 20px;
-        background: rgba(255,255,255,0.2);
-        border-radius: 50px;
-        border: 1px solid rgba(255,255,255,0.3);
-    }
-    
-    .user-avatar {
-        width: 40px;
-        height: 40px;
-        border-radius: 50%;
-        background: rgba(255,255,255,0.3);
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        font-size: 18px;
-    }
-    
-    .user-name {
-        color: #fff;
-        font-weight: 500;
-    }
-    
-    .user-role {
-        color: rgba(255,255,255,0.8);
-        font-size: 12px;
-    }
-    
-    /* 功能卡片 */
-    .feature-card {
-        background: #fff;
-        backdrop-filter: blur(20px);
-        border-radius: 20px;
-        border: 1px solid rgba(102, 126, 234, 0.2);
-        padding: 30px;
-        text-align: center;
-        cursor: pointer;
-        transition: all 0.3s ease;
-        height: 280px;
-        display: flex;
-        flex-direction: column;
-        align-items: center;
-        justify-content: center;
-        box-shadow: 0 4px 20px rgba(102, 126, 234, 0.1);
-    }
-    
-    .feature-card:hover {
-        transform: translateY(-5px);
-        background: #fff;
-        border-color: rgba(102, 126, 234, 0.5);
-        box-shadow: 0 20px 40px rgba(102, 126, 234, 0.25);
-    }
-    
-    .feature-icon {
-        font-size: 60px;
-        margin-bottom: 20px;
-        display: block;
-    }
-    
-    .feature-title {
-        color: #2d3748;
-        font-size: 22px;
-        font-weight: 600;
-        margin-bottom: 12px;
-    }
-    
-    .feature-desc {
-        color: #718096;
-        font-size: 14px;
-        line-height: 1.6;
-    }
-    
-    /* 统计卡片 */
-    .stat-card {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        backdrop-filter: blur(20px);
-        border-radius: 16px;
-        border: none;
-        padding: 25px;
-        text-align: center;
-        box-shadow: 0 4px 20px rgba(102, 126, 234, 0.3);
-    }
-    
-    .stat-number {
-        font-size: 42px;
-        font-weight: 700;
-        color: #fff;
-    }
-    
-    .stat-label {
-        color: rgba(255,255,255,0.9);
-        font-size: 14px;
-        margin-top: 8px;
-    }
-    
-    /* 页面标题 */
-    .page-title {
-        font-size: 32px;
-        font-weight: 700;
-        color: #2d3748;
-        margin-bottom: 10px;
-        display: flex;
-        align-items: center;
-        gap: 15px;
-    }
-    
-    .page-subtitle {
-        color: #718096;
-        font-size: 16px;
-        margin-bottom: 30px;
-    }
-    
-    /* 渐变文字 */
-    .gradient-text {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-    }
-    
-    /* 导航按钮样式 */
-    .stButton>button {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white !important;
-        border: none;
-        border-radius: 12px;
-        padding: 10px 20px;
-        font-weight: 600;
-        transition: all 0.3s ease;
-        box-shadow: 0 4px 15px rgba(102, 126, 234, 0.4);
-        width: 100%;
-        font-size: 12px;
-        white-space: nowrap;
-    }
-    
-    .stButton>button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 8px 25px rgba(102, 126, 234, 0.5);
-    }
-    
-    /* 输入框样式 - 完全覆盖所有边框 */
-    .stTextInput>div>div>input, 
-    .stTextInput>div>div>input:focus,
-    .stTextInput>div>div>input:active,
-    .stTextInput>div>div>input:focus-visible,
-    .stTextArea>div>div>textarea,
-    .stTextArea>div>div>textarea:focus,
-    .stTextArea>div>div>textarea:active,
-    .stTextArea>div>div>textarea:focus-visible {
-        background: #fff !important;
-        border: 2px solid #667eea !important;
-        border-radius: 12px !important;
-        color: #2d3748 !important;
-        padding: 15px !important;
-        outline: none !important;
-        box-shadow: none !important;
-    }
-    
-    /* 未选中状态的边框 */
-    .stTextInput>div>div>input:not(:focus),
-    .stTextArea>div>div>textarea:not(:focus) {
-        border: 2px solid rgba(102, 126, 234, 0.3) !important;
-    }
-    
-    /* 移除所有可能的外层容器边框 */
-    .stTextInput>div,
-    .stTextInput>div>div,
-    .stTextArea>div,
-    .stTextArea>div>div {
-        border: none !important;
-        outline: none !important;
-        box-shadow: none !important;
-    }
-    
-    /* 选择框样式 */
-    .stSelectbox>div>div {
-        background: #fff;
-        border-radius: 12px;
-        border: 1px solid rgba(102, 126, 234, 0.3);
-    }
-    
-    /* Radio按钮样式 */
-    .stRadio>div {
-        background: rgba(255,255,255,0.8);
-        border-radius: 12px;
-        padding: 15px;
-    }
-    
-    .stRadio>div>div>label {
-        color: #2d3748 !important;
-    }
-    
-    /* 指标卡片 */
-    [data-testid="metric-container"] {
-        background: #fff;
-        backdrop-filter: blur(20px);
-        border-radius: 16px;
-        padding: 20px;
-        border: 1px solid rgba(102, 126, 234, 0.2);
-        box-shadow: 0 2px 10px rgba(102, 126, 234, 0.1);
-    }
-    
-    [data-testid="metric-container"] label {
-        color: #718096 !important;
-    }
-    
-    [data-testid="metric-container"] [data-testid="stMetricValue"] {
-        color: #2d3748 !important;
-    }
-    
-    /* 扩展器样式 */
-    .streamlit-expanderHeader {
-        background: rgba(102, 126, 234, 0.1);
-        border-radius: 12px;
-        color: #2d3748 !important;
-    }
-    
-    /* 分隔线 */
-    hr {
-        border-color: rgba(102, 126, 234, 0.2);
-    }
-    
-    /* 标签页样式 */
-    .stTabs [data-baseweb="tab-list"] {
-        background: rgba(102, 126, 234, 0.1);
-        border-radius: 12px;
-        padding: 5px;
-        gap: 5px;
-    }
-    
-    .stTabs [data-baseweb="tab"] {
-        background: transparent;
-        color: #718096;
-        border-radius: 8px;
-        padding: 10px 20px;
-    }
-    
-    .stTabs [aria-selected="true"] {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: #fff !important;
-    }
-    
-    /* 滚动条样式 */
-    ::-webkit-scrollbar {
-        width: 8px;
-        height: 8px;
-    }
-    
-    ::-webkit-scrollbar-track {
-        background: rgba(102, 126, 234, 0.1);
-        border-radius: 4px;
-    }
-    
-    ::-webkit-scrollbar-thumb {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        border-radius: 4px;
-    }
-    
-    /* 成功/警告/错误消息 */
-    .stSuccess {
-        background: rgba(46, 204, 113, 0.2) !important;
-        border: 1px solid rgba(46, 204, 113, 0.5) !important;
-        color: #2ecc71 !important;
-        border-radius: 12px;
-    }
-    
-    .stWarning {
-        background: rgba(241, 196, 15, 0.2) !important;
-        border: 1px solid rgba(241, 196, 15, 0.5) !important;
-        color: #f1c40f !important;
-        border-radius: 12px;
-    }
-    
-    .stError {
-        background: rgba(231, 76, 60, 0.2) !important;
-        border: 1px solid rgba(231, 76, 60, 0.5) !important;
-        color: #e74c3c !important;
-        border-radius: 12px;
-    }
-    
-    .stInfo {
-        background: rgba(102, 126, 234, 0.2) !important;
-        border: 1px solid rgba(102, 126, 234, 0.5) !important;
-        color: #a8c0ff !important;
-        border-radius: 12px;
-    }
-    
-    /* Markdown文字颜色 */
-    .stMarkdown p, .stMarkdown li {
-        color: #4a5568;
-    }
-    
-    .stMarkdown h1, .stMarkdown h2, .stMarkdown h3 {
-        color: #2d3748;
-    }
-    
-    /* 隐藏Streamlit默认页脚 */
-    footer {visibility: hidden;}
-    
-    /* 隐藏菜单按钮 */
-    #MainMenu {visibility: hidden;}
-    
-    /* 隐藏顶部装饰线 */
-    header[data-testid="stHeader"] {
-        background: transparent;
-    }
-    
-    /* 欢迎横幅 */
-    .welcome-banner {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        backdrop-filter: blur(20px);
-        border-radius: 20px;
-        border: none;
-        padding: 40px;
-        margin-bottom: 30px;
-        position: relative;
-        overflow: hidden;
-        box-shadow: 0 4px 20px rgba(102, 126, 234, 0.3);
-    }
-    
-    .welcome-banner::before {
-        content: '';
-        position: absolute;
-        top: -50%;
-        right: -50%;
-        width: 100%;
-        height: 100%;
-        background: radial-gradient(circle, rgba(255,255,255,0.15) 0%, transparent 60%);
-        pointer-events: none;
-    }
-    
-    .welcome-title {
-        font-size: 32px;
-        font-weight: 700;
-        color: #fff;
-        margin-bottom: 10px;
-    }
-    
-    .welcome-subtitle {
-        color: rgba(255,255,255,0.9);
-        font-size: 16px;
-    }
-    
-    /* 动画效果 */
-    @keyframes float {
-        0%, 100% { transform: translateY(0); }
-        50% { transform: translateY(-10px); }
-    }
-    
-    .floating {
-        animation: float 3s ease-in-out infinite;
-    }
-    
-    /* 发光效果 */
-    .glow {
-        box-shadow: 0 0 40px rgba(102, 126, 234, 0.3);
-    }
-    
-    /* 返回按钮 */
-    .back-btn {
-        background: rgba(102, 126, 234, 0.1);
-        border: 1px solid rgba(102, 126, 234, 0.3);
-        border-radius: 10px;
-        padding: 8px 20px;
-        color: #667eea;
-        cursor: pointer;
-        transition: all 0.3s ease;
-    }
-    
-    .back-btn:hover {
-        background: rgba(102, 126, 234, 0.2);
-    }
-    
-    /* 模块页面标题 */
-    .module-header {
-        background: #fff;
-        backdrop-filter: blur(20px);
-        border-radius: 16px;
-        border: 1px solid rgba(102, 126, 234, 0.2);
-        padding: 20px 30px;
-        margin-bottom: 25px;
-        display: flex;
-        align-items: center;
-        justify-content: space-between;
-        box-shadow: 0 2px 10px rgba(102, 126, 234, 0.1);
-    }
-    
-    .module-title {
-        font-size: 28px;
-        font-weight: 700;
-        color: #2d3748;
-        display: flex;
-        align-items: center;
-        gap: 15px;
-    }
-    
-    /* 底部信息 */
-    .footer-info {
-        text-align: center;
-        color: #718096;
-        font-size: 12px;
-        margin-top: 50px;
-        padding: 20px;
-    }
-    
-    /* Slider 样式 - 固定高度防止行距变化 */
-    .stSlider [data-baseweb="slider"] {
-        background: rgba(102, 126, 234, 0.2);
-    }
-    
-    .stSlider {
-        padding-top: 0 !important;
-        padding-bottom: 0 !important;
-    }
-    
-    .stSlider > div {
-        padding-top: 0 !important;
-    }
-    
-    .stSlider [data-testid="stTickBarMin"],
-    .stSlider [data-testid="stTickBarMax"] {
-        display: none !important;
-    }
-    
-    /* 能力选择区域固定行高 */
-    [data-testid="column"] {
-        min-height: auto !important;
-    }
-    
-    /* DataFrame 样式 */
-    .stDataFrame {
-        background: #fff;
-        border-radius: 12px;
-        overflow: hidden;
-        border: 1px solid rgba(102, 126, 234, 0.2);
-    }
-    
-    /* 进度条 */
-    .stProgress > div > div {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-    }
-</style>
-""", unsafe_allow_html=True)
+# 高端现代化主题CSS（static/theme.css）
+THEME_CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "theme.css")
+
+@st.cache_resource(show_spinner=False)
+def load_theme_css():
+    """读取主题CSS（进程内只读一次）"""
+    try:
+        with open(THEME_CSS_PATH, 'r', encoding='utf-8') as f:
+            return f.read()
+    except Exception as e:
+        print(f"[主题样式] 加载失败: {e}")
+        return ""
+
+def inject_theme():
+    """注入主题样式（CSS文本进程内缓存，每次重跑内联发送）
+
+    Streamlit的静态文件服务只把图片类型当作安全类型，.css会以text/plain
+    加nosniff返回，浏览器不会应用，所以不能用<link>引用static/theme.css。
+    """
+    st.markdown(f"<style>\n{load_theme_css()}</style>", unsafe_allow_html=True)
+
+inject_theme()
+
+# 页面注册表：页面key -> (模块路径, 渲染函数名)
+# 页面模块在首次访问时才导入，登录页和首页不加载openai、pandas、plotly等依赖
+PAGE_REGISTRY = {
+    'case_library': ('modules.case_library', 'render_case_library'),
+    'knowledge_graph': ('modules.knowledge_graph', 'render_knowledge_graph'),
+    'ability_recommender': ('modules.ability_recommender', 'render_ability_recommender'),
+    'classroom': ('modules.classroom_interaction', 'render_classroom_interaction'),
+}
+
+# 教师端按需导入的页面
+TEACHER_PAGE_REGISTRY = {
+    'cohort_analytics': ('modules.cohort_analytics', 'render_cohort_analytics'),
+}
+
+def load_page(page_key, registry=PAGE_REGISTRY):
+    """按需导入页面模块并返回渲染函数"""
+    module_path, func_name = registry[page_key]
+    module = importlib.import_module(module_path)
+    return getattr(module, func_name)
+
+def render_global_search():
+    """
+    全局搜索框（学生端导航栏下方）
+
+    输入框本身不依赖搜索索引：输入内容后才导入 modules.search_index（构建后缀数组）
+    并在后台预热协同推荐的热度，首页和登录后首屏不承担这些开销
+    """
+    has_pinyin = importlib.util.find_spec("pypinyin") is not None
+    query = st.text_input(
+        "全局搜索",
+        key="global_search",
+        placeholder="🔍 搜索知识点、章节、病例、能力" + ("（支持拼音首字母）" if has_pinyin else ""),
+        label_visibility="collapsed",
+    )
+    if not query.strip():
+        return
+    from modules.search_index import render_search_results
+    render_search_results(query)
 
 def main():
     # 检查登录状态
@@ -731,7 +121,7 @@ def main():
     
     # 导航按钮行
     if user['role'] == 'teacher':
-        nav_cols = st.columns([1, 1, 1, 1, 1, 1, 1, 1])
+        nav_cols = st.columns([1, 1, 1, 1, 1, 1, 1, 1, 1])
         with nav_cols[0]:
             if st.button("🏠 首页", key="nav_home_t", use_container_width=True):
                 st.session_state.current_page = 'home'
@@ -748,12 +138,15 @@ def main():
             if st.button("💬 互动数据", key="nav_int_t", use_container_width=True):
                 st.session_state.current_page = 'interaction_analytics'
         with nav_cols[5]:
+            if st.button("👥 班级对比", key="nav_cohort_t", use_container_width=True):
+                st.session_state.current_page = 'cohort_analytics'
+        with nav_cols[6]:
             if st.button("📊 数据管理", key="nav_data_t", use_container_width=True):
                 st.session_state.current_page = 'data_management'
-        with nav_cols[6]:
+        with nav_cols[7]:
             if st.button("⚙️ 系统设置", key="nav_settings_t", use_container_width=True):
                 st.session_state.current_page = 'system_settings'
-        with nav_cols[7]:
+        with nav_cols[8]:
             if st.button("🚪 退出登录", key="nav_logout_t", use_container_width=True):
                 logout()
                 st.rerun()
@@ -778,6 +171,9 @@ def main():
             if st.button("🚪 退出登录", key="nav_logout", use_container_width=True):
                 logout()
                 st.rerun()
+        
+        # 全局搜索（只渲染输入框，输入内容后才导入搜索索引）
+        render_global_search()
     
     st.markdown("<br>", unsafe_allow_html=True)
     
@@ -799,6 +195,8 @@ def main():
                 render_module_analytics("能力推荐")
             elif current == 'interaction_analytics':
                 render_module_analytics("课中互动")
+            elif current in TEACHER_PAGE_REGISTRY:
+                load_page(current, TEACHER_PAGE_REGISTRY)()
             elif current == 'data_management':
                 render_data_management()
             elif current == 'system_settings':
@@ -806,17 +204,9 @@ def main():
             else:
                 render_teacher_dashboard()
         else:
-            # 学生端
-            if current == 'home':
-                render_home_page(user)
-            elif current == 'case_library':
-                render_case_library()
-            elif current == 'knowledge_graph':
-                render_knowledge_graph()
-            elif current == 'ability_recommender':
-                render_ability_recommender()
-            elif current == 'classroom':
-                render_classroom_interaction()
+            # 学生端（页面模块按需导入）
+            if current in PAGE_REGISTRY:
+                load_page(current)()
             else:
                 render_home_page(user)
     except Exception as e:
@@ -831,7 +221,9 @@ def render_teacher_dashboard():
     import pandas as pd
     import plotly.express as px
     from modules.analytics import get_activity_summary, get_daily_activity_trend
-    from modules.auth import check_neo4j_available, get_all_students, get_all_modules_statistics, get_single_module_statistics, get_neo4j_driver, get_neo4j_driver
+    from modules.auth import get_all_students, get_all_modules_statistics, get_single_module_statistics
+    from modules.storage import get_storage, is_storage_available
+    from modules.archive import ensure_scheduler
     
     st.markdown("""
     <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
@@ -846,11 +238,15 @@ def render_teacher_dashboard():
     # 显示加载进度
     with st.spinner("正在加载数据..."):
         # 获取真实数据
-        has_neo4j = check_neo4j_available()
+        has_storage = is_storage_available()
+        
+        # 配置了保留天数时在后台定期归档旧活动
+        if has_storage:
+            ensure_scheduler()
         
         # 获取数据
         summary = get_activity_summary()
-        all_students = get_all_students() if has_neo4j else []
+        all_students = get_all_students() if has_storage else []
     
     # 计算统计数据
     total_students = summary.get('total_students', 0)
@@ -859,13 +255,13 @@ def render_teacher_dashboard():
     total_acts = summary.get('total_activities', 0)
     
     # 调试信息（可以在终端看到）
-    print(f"[教师端调试] Neo4j可用: {has_neo4j}")
+    print(f"[教师端调试] 存储后端({get_storage().name})可用: {has_storage}")
     print(f"[教师端调试] 学生总数: {total_students}, 今日活跃: {today_active}, 7日活跃: {active_7d}, 总活动: {total_acts}")
     
     # 显示详细调试信息在页面上
     with st.expander("🔍 调试信息（点击展开）", expanded=False):
         st.write("**数据库连接状态:**")
-        st.write(f"- Neo4j可用: {has_neo4j}")
+        st.write(f"- 存储后端({get_storage().name})可用: {has_storage}")
         
         # 显示 secrets 中所有可用的 keys
         from modules.auth import get_all_secret_keys
@@ -877,7 +273,7 @@ def render_teacher_dashboard():
         st.write(f"- 环境变量检查: NEO4J_USERNAME={'已设置' if st.secrets.get('NEO4J_USERNAME') else '未设置'}")
         st.write(f"- 环境变量检查: NEO4J_PASSWORD={'已设置' if st.secrets.get('NEO4J_PASSWORD') else '未设置'}")
         
-        if not has_neo4j:
+        if not has_storage:
             from modules.auth import get_neo4j_error
             error_msg = get_neo4j_error()
             st.error(f"**连接失败原因:** {error_msg}")
@@ -907,7 +303,7 @@ def render_teacher_dashboard():
         st.write(f"- 总学习记录: {total_acts}")
     
     # 只在真正无数据时提示（避免本地开发时误报）
-    if total_students == 0 and not has_neo4j:
+    if total_students == 0 and not has_storage:
         st.info("💡 提示：当前无学生数据。学生登录使用后即可在此查看学习统计。")
     
     # 核心数据指标 - 使用真实数据
@@ -919,7 +315,7 @@ def render_teacher_dashboard():
     with col3:
         st.metric("👨‍🎓 7日活跃学生", str(active_7d))
     with col4:
-        if has_neo4j:
+        if has_storage:
             completion_rate = int((active_7d / total_students * 100)) if total_students > 0 else 0
             st.metric("✅ 7日活跃率", f"{completion_rate}%")
         else:
@@ -937,7 +333,7 @@ def render_teacher_dashboard():
     
     # 一次性获取所有模块统计（性能优化）
     all_module_stats = {}
-    if has_neo4j:
+    if has_storage:
         from modules.auth import get_all_modules_statistics
         all_module_stats = get_all_modules_statistics()
         
@@ -948,7 +344,7 @@ def render_teacher_dashboard():
         
     for i, module in enumerate(modules):
         with module_cols[i]:
-            if has_neo4j and module in all_module_stats:
+            if has_storage and module in all_module_stats:
                 stats = all_module_stats[module]
                 visit_count = stats.get('total_visits', 0)
                 student_count = stats.get('unique_students', 0)
@@ -979,7 +375,7 @@ def render_teacher_dashboard():
     
     with chart_col1:
         st.markdown("### 📊 近7天学习趋势")
-        if has_neo4j:
+        if has_storage:
             trend_data = get_daily_activity_trend(7)
             if trend_data:
                 df = pd.DataFrame(trend_data)
@@ -994,7 +390,7 @@ def render_teacher_dashboard():
     
     with chart_col2:
         st.markdown("### 🥧 学生学习模块分布")
-        if has_neo4j:
+        if has_storage:
             # 统计每个模块的访问学生数
             module_data = []
             for module in modules:
@@ -1019,40 +415,42 @@ def render_teacher_dashboard():
     
     # 学生排行榜 - 使用真实数据
     st.markdown("### 🏆 学习排行榜 (Top 10)")
+    render_leaderboard(key="leaderboard_window")
+
+def render_leaderboard(module_name=None, key="leaderboard_window"):
+    """渲染学习排行榜（读取物化的Top-K，不扫描活动记录）"""
+    import pandas as pd
+    from modules.leaderboard import get_leaderboard, WINDOWS
     
-    if has_neo4j:
-        # 从数据库获取学生活动统计
-        try:
-            driver = get_neo4j_driver()
-            with driver.session() as session:
-                result = session.run("""
-                    MATCH (s:yzbx_Student)-[:PERFORMED]->(a:yzbx_Activity)
-                    RETURN s.student_id as student_id, 
-                           s.name as name,
-                           count(a) as activity_count,
-                           count(DISTINCT date(a.timestamp)) as active_days
-                    ORDER BY activity_count DESC
-                    LIMIT 10
-                """)
-                
-                leaderboard = []
-                for i, record in enumerate(result):
-                    leaderboard.append({
-                        "排名": "🥇" if i == 0 else ("🥈" if i == 1 else ("🥉" if i == 2 else str(i+1))),
-                        "学号": record['student_id'],
-                        "姓名": record['name'] if record['name'] else "未设置",
-                        "学习记录数": record['activity_count'],
-                        "活跃天数": record['active_days']
-                    })
-                
-                if leaderboard:
-                    st.dataframe(pd.DataFrame(leaderboard), use_container_width=True, hide_index=True)
-                else:
-                    st.info("暂无学生学习数据")
-        except Exception as e:
-            st.error(f"获取排行榜数据失败: {e}")
-    else:
+    window_names = {name: window for window, name in WINDOWS.items()}
+    selected = st.radio("排行周期", list(window_names.keys()),
+                        index=len(window_names) - 1, horizontal=True, key=key)
+    window = window_names[selected]
+    
+    try:
+        board = get_leaderboard(window, module_name)
+    except Exception as e:
+        st.error(f"获取排行榜数据失败: {e}")
+        return
+    
+    if board is None:
         st.info("需要连接数据库查看学生排行榜")
+        return
+    
+    leaderboard = []
+    for i, row in enumerate(board):
+        leaderboard.append({
+            "排名": "🥇" if i == 0 else ("🥈" if i == 1 else ("🥉" if i == 2 else str(i+1))),
+            "学号": row['student_id'],
+            "姓名": row['name'] if row['name'] else "未设置",
+            "学习记录数": row['activity_count'],
+            "活跃天数": row['active_days']
+        })
+    
+    if leaderboard:
+        st.dataframe(pd.DataFrame(leaderboard), use_container_width=True, hide_index=True)
+    else:
+        st.info(f"暂无{module_name or '学生'}学习数据")
 
 def render_home_page(user):
     """渲染首页"""
@@ -1177,7 +575,9 @@ def render_home_page(user):
 
 def render_module_analytics(module_name):
     """渲染教师端模块数据分析页面"""
-    from modules.auth import check_neo4j_available, get_all_students, get_student_activities, get_single_module_statistics, get_neo4j_driver
+    from modules.auth import get_all_students, get_student_activities, get_single_module_statistics
+    from modules.storage import get_storage, is_storage_available
+    from modules.diagnostics import render_diagnostic_panel
     import pandas as pd
     
     # 先显示标题
@@ -1193,29 +593,33 @@ def render_module_analytics(module_name):
     
     # 使用spinner显示加载状态
     with st.spinner("正在加载数据..."):
-        has_neo4j = check_neo4j_available()
-    
-    # 调试信息面板
-    with st.expander("🔧 调试信息（点击展开）", expanded=False):
-        st.markdown("**连接状态检查：**")
-        st.write(f"- Neo4j可用: `{has_neo4j}`")
+        has_storage = is_storage_available()
+    
+    # 调试信息面板（点击运行后才查询）
+    if has_storage:
+        def compute_debug_info():
+            from modules.analytics import get_activity_summary
+            return {
+                'summary': get_activity_summary(),
+                'student_count': len(get_all_students()),
+                'module_stats': get_single_module_statistics(module_name),
+            }
         
-        if has_neo4j:
-            try:
-                from modules.analytics import get_activity_summary
-                summary = get_activity_summary()
-                st.write(f"- 学生总数: `{summary.get('total_students', 0)}`")
-                st.write(f"- 活动总数: `{summary.get('total_activities', 0)}`")
-                
-                all_students_debug = get_all_students()
-                st.write(f"- get_all_students返回: `{len(all_students_debug)}` 条记录")
-                
-                stats = get_single_module_statistics(module_name)
-                st.write(f"- {module_name}统计: `{stats}`")
-            except Exception as e:
-                st.error(f"查询出错: {e}")
-        else:
-            st.warning("Neo4j不可用，无法获取数据")
+        def render_debug_info(info):
+            st.markdown("**连接状态检查：**")
+            st.write(f"- 存储后端({get_storage().name})可用: `{has_storage}`")
+            st.write(f"- 学生总数: `{info['summary'].get('total_students', 0)}`")
+            st.write(f"- 活动总数: `{info['summary'].get('total_activities', 0)}`")
+            st.write(f"- get_all_students返回: `{info['student_count']}` 条记录")
+            st.write(f"- {module_name}统计: `{info['module_stats']}`")
+        
+        render_diagnostic_panel("🔧 调试信息（点击展开）", f"module_debug_{module_name}",
+                                compute_debug_info, render_debug_info)
+    else:
+        with st.expander("🔧 调试信息（点击展开）", expanded=False):
+            st.markdown("**连接状态检查：**")
+            st.write(f"- 存储后端({get_storage().name})可用: `{has_storage}`")
+            st.warning("存储后端不可用，无法获取数据")
     
     # 选项卡：个人数据 / 整体数据
     tab1, tab2 = st.tabs(["👤 学生个人数据", "📈 整体统计数据"])
@@ -1224,7 +628,7 @@ def render_module_analytics(module_name):
         st.markdown("### 🔍 查询学生学习数据")
         
         # 获取真实学生列表
-        all_students = get_all_students() if has_neo4j else []
+        all_students = get_all_students() if has_storage else []
         if not all_students:
             st.info("💡 当前暂无学生数据。学生注册登录后，数据会自动显示在此处。")
             # 不要return，让tab2可以继续显示
@@ -1320,32 +724,7 @@ def render_module_analytics(module_name):
         
         # 显示活跃学生排行
         st.markdown(f"#### 🏆 {module_name}学习排行榜")
-        try:
-            driver = get_neo4j_driver()
-            with driver.session() as session:
-                result = session.run("""
-                    MATCH (s:yzbx_Student)-[:PERFORMED]->(a:yzbx_Activity)
-                    WHERE COALESCE(a.module_name, a.module) = $module_name
-                    RETURN s.student_id as student_id, 
-                           count(a) as activity_count
-                    ORDER BY activity_count DESC
-                    LIMIT 10
-                """, module_name=module_name)
-                
-                ranking = []
-                for i, record in enumerate(result):
-                    ranking.append({
-                        "排名": "🥇" if i == 0 else ("🥈" if i == 1 else ("🥉" if i == 2 else str(i+1))),
-                        "学号": record['student_id'],
-                        "学习记录数": record['activity_count']
-                    })
-                
-                if ranking:
-                    st.dataframe(pd.DataFrame(ranking), use_container_width=True, hide_index=True)
-                else:
-                    st.info(f"暂无{module_name}学习数据")
-        except Exception as e:
-            st.error(f"获取排行数据失败: {e}")
+        render_leaderboard(module_name, key=f"leaderboard_window_{module_name}")
         
         st.markdown("<br>", unsafe_allow_html=True)
         
@@ -1355,7 +734,7 @@ def render_module_analytics(module_name):
         
         # 近7天学习人数趋势
         st.markdown("##### 📈 近7天学习人数趋势")
-        if has_neo4j:
+        if has_storage:
             try:
                 from modules.analytics import get_daily_activity_trend
                 trend_data = get_daily_activity_trend(7)
@@ -1377,41 +756,15 @@ def render_module_analytics(module_name):
         
         # 学生排行榜
         st.markdown("##### 🏆 学习排行榜 (Top 10)")
-        if has_neo4j:
-            try:
-                driver = get_neo4j_driver()
-                with driver.session() as session:
-                    result = session.run("""
-                        MATCH (s:yzbx_Student)-[:PERFORMED]->(a:yzbx_Activity)
-                        WHERE COALESCE(a.module_name, a.module) = $module_name
-                        RETURN s.student_id as student_id, 
-                               count(a) as activity_count
-                        ORDER BY activity_count DESC
-                        LIMIT 10
-                    """, module_name=module_name)
-                    
-                    leaderboard = []
-                    for i, record in enumerate(result):
-                        leaderboard.append({
-                            "排名": "🥇" if i == 0 else ("🥈" if i == 1 else ("🥉" if i == 2 else str(i+1))),
-                            "学号": record['student_id'],
-                            "学习记录数": record['activity_count']
-                        })
-                    
-                    if leaderboard:
-                        st.dataframe(pd.DataFrame(leaderboard), use_container_width=True, hide_index=True)
-                    else:
-                        st.info(f"暂无{module_name}学习数据")
-            except Exception as e:
-                st.error(f"获取排行榜失败: {e}")
-        else:
-            st.info("需要连接数据库查看排行榜")
+        render_leaderboard(module_name, key=f"leaderboard_window_{module_name}_top10")
 
 def render_data_management():
     """渲染数据管理页面"""
     import pandas as pd
     import io
     from modules.auth import get_neo4j_driver, check_neo4j_available
+    from modules.diagnostics import render_diagnostic_panel
+    from modules.archive import read_archived_activities
     
     st.markdown("""
     <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
@@ -1429,6 +782,27 @@ def render_data_management():
         st.warning("⚠️ 数据库连接不可用，无法进行数据管理操作")
         return
     
+    # 批量删除和数据修复在后台分批执行，进程重启后继续未完成的任务
+    from modules.jobs import start_job, has_active_job, resume_interrupted_jobs, render_jobs_panel
+    resume_interrupted_jobs()
+    render_jobs_panel(key="data_jobs")
+    
+    def archived_export_rows(module=None):
+        """归档中的学习记录（导出时追加在主存储的记录之后，按模块导出时不含模块列）"""
+        rows = []
+        for activity in read_archived_activities(module=module):
+            row = {'学号': activity['student_id'], '姓名': activity['student_name']}
+            if module is None:
+                row['学习模块'] = activity['module']
+            row.update({
+                '活动类型': activity['activity_type'],
+                '内容名称': activity['content_name'],
+                '学习时间': activity['timestamp'],
+                '详情': activity['details'],
+            })
+            rows.append(row)
+        return rows
+    
     # 创建选项卡
     tab1, tab2, tab3, tab4 = st.tabs(["📥 数据导出", "👥 学生管理", "📝 活动记录管理", "🔧 数据修复"])
     
@@ -1497,6 +871,7 @@ def render_data_management():
                                 ORDER BY a.timestamp DESC
                             """)
                             data = [dict(record) for record in result]
+                        data += archived_export_rows()
                         
                         if data:
                             df = pd.DataFrame(data)
@@ -1522,38 +897,6 @@ def render_data_management():
         # 按模块导出
         st.markdown("#### 📂 按模块导出学习记录")
         
-        # 添加调试工具
-        with st.expander("🔧 调试工具：查看数据库中的模块名称", expanded=False):
-            try:
-                driver = get_neo4j_driver()
-                with driver.session() as session:
-                    # 查询所有不同的模块名称(兼容新旧字段)
-                    result = session.run("""
-                        MATCH (a:yzbx_Activity)
-                        RETURN DISTINCT COALESCE(a.module_name, a.module) as module_name, count(a) as count
-                        ORDER BY count DESC
-                    """)
-                    module_stats = [dict(record) for record in result]
-                
-                if module_stats:
-                    st.write("**数据库中实际存储的模块名称及记录数：**")
-                    for stat in module_stats:
-                        st.write(f"- `{stat['module_name']}`: {stat['count']}条记录")
-                    
-                    # 检查模块名称匹配情况
-                    st.write("**匹配检查：**")
-                    db_modules = [s['module_name'] for s in module_stats]
-                    expected_modules = ["病例库", "知识图谱", "能力推荐", "课中互动"]
-                    for expected in expected_modules:
-                        if expected in db_modules:
-                            st.success(f"✅ `{expected}` - 匹配成功")
-                        else:
-                            st.error(f"❌ `{expected}` - 未在数据库中找到")
-                else:
-                    st.warning("数据库中没有任何活动记录")
-            except Exception as e:
-                st.error(f"调试查询失败: {e}")
-        
         # 初始化 session_state（必须在使用之前）
         if 'selected_export_module' not in st.session_state:
             st.session_state.selected_export_module = None
@@ -1593,6 +936,7 @@ def render_data_management():
                             ORDER BY a.timestamp DESC
                         """, module=display_module)
                         data = [dict(record) for record in result]
+                        data += archived_export_rows(display_module)
                         
                         st.write(f"🔍 查询结果: {len(data)}条记录")
                     
@@ -1614,7 +958,7 @@ def render_data_management():
                         )
                     else:
                         st.warning(f"{display_module}暂无数据")
-                        st.info("💡 提示：展开上方的'调试工具'查看数据库中实际的模块名称")
+                        st.info("💡 提示：在'🔧 数据修复'页运行'模块名称'诊断，查看数据库中实际的模块名称")
                 except Exception as e:
                     st.error(f"导出失败: {e}")
     
@@ -1665,23 +1009,16 @@ def render_data_management():
                         try:
                             driver = get_neo4j_driver()
                             with driver.session() as session:
-                                # 先删除关联的活动记录
-                                session.run("""
-                                    MATCH (s:yzbx_Student {student_id: $student_id})-[r:PERFORMED]->(a:yzbx_Activity)
-                                    DELETE r, a
-                                """, student_id=student_id_to_delete)
-                                
-                                # 再删除学生节点
                                 result = session.run("""
                                     MATCH (s:yzbx_Student {student_id: $student_id})
-                                    DELETE s
-                                    RETURN count(s) as deleted_count
+                                    RETURN count(s) as count
                                 """, student_id=student_id_to_delete)
+                                exists = result.single()['count'] > 0
                                 
-                                deleted = result.single()['deleted_count']
-                                
-                            if deleted > 0:
-                                st.success(f"✅ 已删除学号 {student_id_to_delete} 及其所有学习记录")
+                            if exists:
+                                # 先分批删除活动记录，再删除学生节点（后台执行）
+                                start_job('delete_student', {'student_id': student_id_to_delete})
+                                st.success(f"✅ 已开始删除学号 {student_id_to_delete} 及其所有学习记录，进度见上方后台任务")
                                 st.session_state.confirm_delete = None
                                 st.rerun()
                             else:
@@ -1726,50 +1063,30 @@ def render_data_management():
             st.markdown("#### 🗑️ 清除数据")
             st.error("⚠️ 危险操作区域")
             
-            if st.button("🗑️ 清除所有学习记录", key="clear_all_activities", type="primary"):
+            if st.button("🗑️ 清除所有学习记录", key="clear_all_activities", type="primary",
+                         disabled=has_active_job('clear_activities')):
                 if st.session_state.get('confirm_clear_activities') != True:
                     st.session_state.confirm_clear_activities = True
-                    st.warning("⚠️ 将删除所有学习记录（不删除学生）！再次点击确认。")
+                    st.warning("⚠️ 将删除所有学习记录（含归档，不删除学生）！再次点击确认。")
                 else:
-                    try:
-                        driver = get_neo4j_driver()
-                        with driver.session() as session:
-                            result = session.run("""
-                                MATCH (a:yzbx_Activity)
-                                DETACH DELETE a
-                                RETURN count(a) as deleted_count
-                            """)
-                            deleted = result.single()['deleted_count']
-                        
-                        st.success(f"✅ 已清除 {deleted} 条学习记录")
-                        st.session_state.confirm_clear_activities = False
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"清除失败: {e}")
+                    start_job('clear_activities')
+                    st.session_state.confirm_clear_activities = False
+                    st.rerun()
             
             st.markdown("<br>", unsafe_allow_html=True)
             
-            if st.button("🗑️ 清除所有数据", key="clear_all_data", type="primary"):
+            if st.button("🗑️ 清除所有数据", key="clear_all_data", type="primary",
+                         disabled=has_active_job('clear_all')):
                 if st.session_state.get('confirm_clear_all') != True:
                     st.session_state.confirm_clear_all = True
                     st.error("⚠️ 将删除所有学生和学习记录！再次点击确认。")
                 else:
-                    try:
-                        driver = get_neo4j_driver()
-                        with driver.session() as session:
-                            result = session.run("""
-                                MATCH (n)
-                                WHERE n:yzbx_Student OR n:yzbx_Activity
-                                DETACH DELETE n
-                                RETURN count(n) as deleted_count
-                            """)
-                            deleted = result.single()['deleted_count']
-                        
-                        st.success(f"✅ 已清除 {deleted} 个节点")
-                        st.session_state.confirm_clear_all = False
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"清除失败: {e}")
+                    start_job('clear_all')
+                    st.session_state.confirm_clear_all = False
+                    st.rerun()
+        
+        st.markdown("---")
+        render_archive_section()
     
     # ===== 数据修复 =====
     with tab4:
@@ -1778,84 +1095,124 @@ def render_data_management():
         
         st.markdown("#### 问题诊断")
         
-        try:
+        def count_field_usage():
+            # 一次扫描统计新旧字段的使用情况
             driver = get_neo4j_driver()
             with driver.session() as session:
-                # 检查 module 字段（旧字段名）
-                result1 = session.run("""
-                    MATCH (a:yzbx_Activity)
-                    WHERE a.module IS NOT NULL
-                    RETURN count(a) as count
-                """)
-                old_field_count = result1.single()['count']
-                
-                # 检查 module_name 字段（新字段名）
-                result2 = session.run("""
-                    MATCH (a:yzbx_Activity)
-                    WHERE a.module_name IS NOT NULL
-                    RETURN count(a) as count
-                """)
-                new_field_count = result2.single()['count']
-                
-                # 检查 activity_type 字段
-                result3 = session.run("""
+                result = session.run("""
                     MATCH (a:yzbx_Activity)
-                    WHERE a.activity_type IS NOT NULL
-                    RETURN count(a) as count
+                    RETURN count(a.module) as old_field_count,
+                           count(a.module_name) as new_field_count,
+                           count(a.type) as old_type_count,
+                           count(a.activity_type) as activity_type_count
                 """)
-                activity_type_count = result3.single()['count']
+                return dict(result.single())
+        
+        def render_field_usage(counts):
+            st.write("**字段使用情况：**")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("使用旧字段 'module' 的记录", counts['old_field_count'])
+                st.metric("使用新字段 'module_name' 的记录", counts['new_field_count'])
+            with col2:
+                st.metric("使用旧字段 'type' 的记录", counts['old_type_count'])
+                st.metric("使用新字段 'activity_type' 的记录", counts['activity_type_count'])
+            
+            if counts['old_field_count'] > 0 or counts['old_type_count'] > 0:
+                st.error(f"⚠️ 发现 {counts['old_field_count']} 条使用旧字段名的记录，需要修复")
                 
-                # 检查 type 字段（旧字段名）
-                result4 = session.run("""
+                # 修复 module -> module_name、type -> activity_type（后台分批执行）
+                if st.button("🔧 修复历史数据字段名", key="fix_fields", type="primary",
+                             disabled=has_active_job('repair_fields')):
+                    start_job('repair_fields')
+                    st.rerun()
+            else:
+                st.success("✅ 所有数据字段名正确，无需修复")
+        
+        render_diagnostic_panel("🩺 字段使用情况", "field_usage", count_field_usage, render_field_usage,
+                                expanded=True)
+        
+        def count_module_names():
+            # 查询所有不同的模块名称(兼容新旧字段)
+            driver = get_neo4j_driver()
+            with driver.session() as session:
+                result = session.run("""
                     MATCH (a:yzbx_Activity)
-                    WHERE a.type IS NOT NULL
-                    RETURN count(a) as count
+                    RETURN DISTINCT COALESCE(a.module_name, a.module) as module_name, count(a) as count
+                    ORDER BY count DESC
                 """)
-                old_type_count = result4.single()['count']
-                
-                st.write("**字段使用情况：**")
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.metric("使用旧字段 'module' 的记录", old_field_count)
-                    st.metric("使用新字段 'module_name' 的记录", new_field_count)
-                with col2:
-                    st.metric("使用旧字段 'type' 的记录", old_type_count)
-                    st.metric("使用新字段 'activity_type' 的记录", activity_type_count)
-                
-                if old_field_count > 0 or old_type_count > 0:
-                    st.error(f"⚠️ 发现 {old_field_count} 条使用旧字段名的记录，需要修复")
-                    
-                    if st.button("🔧 修复历史数据字段名", key="fix_fields", type="primary"):
-                        with st.spinner("正在修复数据..."):
-                            try:
-                                # 修复 module -> module_name
-                                session.run("""
-                                    MATCH (a:yzbx_Activity)
-                                    WHERE a.module IS NOT NULL
-                                    SET a.module_name = a.module
-                                    REMOVE a.module
-                                """)
-                                
-                                # 修复 type -> activity_type
-                                session.run("""
-                                    MATCH (a:yzbx_Activity)
-                                    WHERE a.type IS NOT NULL
-                                    SET a.activity_type = a.type
-                                    REMOVE a.type
-                                """)
-                                
-                                st.success("✅ 字段名修复完成！")
-                                st.info("💡 页面将在3秒后刷新...")
-                                import time
-                                time.sleep(3)
-                                st.rerun()
-                            except Exception as e:
-                                st.error(f"修复失败: {e}")
+                return [dict(record) for record in result]
+        
+        def render_module_names(module_stats):
+            if not module_stats:
+                st.warning("数据库中没有任何活动记录")
+                return
+            st.write("**数据库中实际存储的模块名称及记录数：**")
+            for stat in module_stats:
+                st.write(f"- `{stat['module_name']}`: {stat['count']}条记录")
+            
+            # 检查模块名称匹配情况
+            st.write("**匹配检查：**")
+            db_modules = [s['module_name'] for s in module_stats]
+            expected_modules = ["病例库", "知识图谱", "能力推荐", "课中互动"]
+            for expected in expected_modules:
+                if expected in db_modules:
+                    st.success(f"✅ `{expected}` - 匹配成功")
                 else:
-                    st.success("✅ 所有数据字段名正确，无需修复")
-                    
-        except Exception as e:
-            st.error(f"诊断失败: {e}")
+                    st.error(f"❌ `{expected}` - 未在数据库中找到")
+        
+        render_diagnostic_panel("🔧 模块名称：查看数据库中的模块名称", "module_names",
+                                count_module_names, render_module_names)
+
+def render_archive_section():
+    """渲染活动归档区域（数据管理 - 活动记录管理）"""
+    import pandas as pd
+    from modules.archive import get_archive_status, start_archive
+    
+    st.markdown("#### 🗄️ 活动归档")
+    status = get_archive_status()
+    if not status['available']:
+        st.info("未安装 pyarrow，活动归档不可用")
+        return
+    
+    if status['running']:
+        from streamlit_autorefresh import st_autorefresh
+        st_autorefresh(interval=2000, key="archive_refresh")
+    
+    st.caption("早于保留天数的活动从数据库移入按月分区的压缩Parquet文件，"
+               "学习记录查询和导出会同时读取数据库和归档")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("归档活动数", status['rows'])
+    with col2:
+        st.metric("归档月份", len(status['months']))
+    with col3:
+        st.metric("磁盘占用", f"{status['bytes'] / 1024 / 1024:.1f} MB")
+    with col4:
+        st.metric("自动归档", f"{status['retention_days']}天前" if status['scheduled'] else "未启用")
+    
+    if status['running']:
+        st.info(f"🔄 正在归档... 已处理 {status['archived']} 条")
+    elif status['last_error']:
+        st.error(f"上次归档失败: {status['last_error']}")
+    elif status['last_run']:
+        st.caption(f"上次归档: {status['last_run']}")
+    
+    if status['months']:
+        df = pd.DataFrame(status['months'])
+        df['bytes'] = (df['bytes'] / 1024).round(1)
+        df.columns = ['月份', '活动数', '文件数', '大小(KB)']
+        st.dataframe(df, use_container_width=True, hide_index=True)
+    
+    retention_days = st.number_input(
+        "归档多少天之前的活动", min_value=1, max_value=3650,
+        value=status['retention_days'] or 180, step=30, key="archive_retention_days"
+    )
+    if st.button("🗄️ 立即归档", key="run_archive", disabled=status['running']):
+        start_archive(retention_days)
+        st.success("✅ 已开始归档")
+        st.rerun()
 
 def render_system_settings():
     """渲染系统设置页面（仅教师可用）"""
@@ -1954,6 +1311,35 @@ def render_system_settings():
             <div class="stat-label">🎯 核心能力</div>
         </div>
         """, unsafe_allow_html=True)
+    
+    # 病例缓存
+    from modules.case_library import get_case_cache_info, invalidate_case_cache
+    st.markdown("---")
+    st.markdown("### 🗂️ 病例缓存")
+    cache_info = get_case_cache_info()
+    st.caption(f"版本 {cache_info['version']} · 已缓存 {cache_info['size']}/{cache_info['max_size']} 个病例 · "
+               f"命中 {cache_info['hits']} 次 · 未命中 {cache_info['misses']} 次")
+    if st.button("🔄 刷新病例缓存", help="病例数据更新后点击，下次查看时重新从数据库读取"):
+        invalidate_case_cache()
+        st.success("✅ 病例缓存已刷新")
+    
+    # 分析副本
+    from modules.replica import get_replica_status, request_rebuild
+    st.markdown("---")
+    st.markdown("### 📦 分析副本")
+    replica = get_replica_status()
+    if not replica['enabled']:
+        st.caption("未启用（设置 ANALYTICS_REPLICA=true 后，教师端统计查询读取本地副本）")
+    elif not replica['ready']:
+        st.caption("首次同步中，统计查询暂时读取主数据库" +
+                   (f" · 最近错误：{replica['last_error']}" if replica['last_error'] else ""))
+    else:
+        st.caption(f"副本活动数 {replica['activity_count']} · 上次同步 {replica['lag_seconds']:.0f} 秒前 · "
+                   f"本次新增 {replica['last_imported']} 条" +
+                   (f" · 最近错误：{replica['last_error']}" if replica['last_error'] else ""))
+        if st.button("♻️ 重建分析副本", help="清空本地副本并从数据库重新同步"):
+            request_rebuild()
+            st.success("✅ 已开始重建，稍后刷新查看")
 
 # 确保 session_state 在程序开始时就被初始化
 def init_session_state():
@@ -36,10 +36,22 @@ def get_secret(key, default=None):
     # 最后使用默认值
     return default
 
+# 存储后端：neo4j（默认）或 sqlite（嵌入式数据库，用于本地开发、CI和离线课堂）
+STORAGE_BACKEND = get_secret("STORAGE_BACKEND", "neo4j")
+STORAGE_SQLITE_PATH = get_secret("STORAGE_SQLITE_PATH", "")  # 留空则使用 data/yzbx_local.db
+
+# 分析副本：按时间水位线把Neo4j中的新增数据同步到本地SQLite，教师端统计查询读取副本
+ANALYTICS_REPLICA = str(get_secret("ANALYTICS_REPLICA", "false")).lower() in ("1", "true", "yes")
+REPLICA_SQLITE_PATH = get_secret("REPLICA_SQLITE_PATH", "")  # 留空则使用 data/yzbx_replica.db
+REPLICA_SYNC_INTERVAL = float(get_secret("REPLICA_SYNC_INTERVAL", 5))  # 同步间隔（秒）
+REPLICA_SYNC_OVERLAP = float(get_secret("REPLICA_SYNC_OVERLAP", 60))  # 增量拉取回看窗口（秒），覆盖晚提交的写入
+
 # Neo4j配置 - 使用neo4j+ssc跳过SSL证书验证
 NEO4J_URI = get_secret("NEO4J_URI", "neo4j+ssc://7eb127cc.databases.neo4j.io")
 NEO4J_USERNAME = get_secret("NEO4J_USERNAME", "neo4j")
 NEO4J_PASSWORD = get_secret("NEO4J_PASSWORD", "wE7pV36hqNSo43mpbjTlfzE7n99NWcYABDFqUGvgSrk")
+NEO4J_PROBE_INTERVAL = float(get_secret("NEO4J_PROBE_INTERVAL", 30))  # 在线状态探测间隔（秒）
+NEO4J_PROBE_GRACE_SECONDS = float(get_secret("NEO4J_PROBE_GRACE_SECONDS", 1.5))  # 首次探测最长等待（秒）
 
 # Elasticsearch配置
 ELASTICSEARCH_CLOUD_ID = get_secret(
@@ -53,6 +65,56 @@ ELASTICSEARCH_PASSWORD = get_secret("ELASTICSEARCH_PASSWORD", "x5ZwEPmZewPZlnZIn
 DEEPSEEK_API_KEY = get_secret("DEEPSEEK_API_KEY", "sk-bdf96d7f1aa74a53a83ff167f7f2f5a9")
 DEEPSEEK_BASE_URL = "https://api.deepseek.com/v1"
 
+# 大模型调用预算（控制单次调用的成本和延迟）
+LLM_MODEL = "deepseek-chat"
+LLM_PROMPT_TOKEN_BUDGET = int(get_secret("LLM_PROMPT_TOKEN_BUDGET", 1200))  # 提示词token上限
+LLM_MAX_OUTPUT_TOKENS = int(get_secret("LLM_MAX_OUTPUT_TOKENS", 1000))  # 生成token上限
+LLM_TIMEOUT_SECONDS = float(get_secret("LLM_TIMEOUT_SECONDS", 30))  # 单次调用超时（秒）
+RAG_TOP_K = int(get_secret("RAG_TOP_K", 6))  # 学习路径推荐检索的参考资料片段数
+RAG_TOKEN_BUDGET = int(get_secret("RAG_TOKEN_BUDGET", 300))  # 参考资料占用的token上限
+
+# 病例详情缓存容量（LRU，按病例数计）
+CASE_CACHE_SIZE = int(get_secret("CASE_CACHE_SIZE", 32))
+
+# 统计查询缓存容量（按标签失效，数据未变化时一直有效）
+DATA_CACHE_MAX_ENTRIES = int(get_secret("DATA_CACHE_MAX_ENTRIES", 512))
+DATA_CACHE_TTL = float(get_secret("DATA_CACHE_TTL", 1800))  # 兜底过期时间（秒），覆盖其他进程写入的数据
+
+# 批量删除/数据修复任务：每个事务处理的行数、每块之间的间隔（秒，限速以减少对课堂写入的影响）
+JOB_BATCH_SIZE = int(get_secret("JOB_BATCH_SIZE", 1000))
+JOB_PAUSE_SECONDS = float(get_secret("JOB_PAUSE_SECONDS", 0.2))
+
+# 活动归档：早于保留天数的活动移出主存储，按月分区写入压缩Parquet文件（0表示不自动归档）
+ARCHIVE_RETENTION_DAYS = int(get_secret("ARCHIVE_RETENTION_DAYS", 0))
+ARCHIVE_DIR = get_secret("ARCHIVE_DIR", "")  # 留空则使用 data/archive
+ARCHIVE_INTERVAL_HOURS = float(get_secret("ARCHIVE_INTERVAL_HOURS", 24))  # 自动归档间隔（小时）
+
+# 流式统计：热门内容Top-K跟踪的内容数、HyperLogLog精度（误差约 1.04/√2^精度）、按日统计保留天数、保存间隔（秒）
+SKETCH_TOPK_CAPACITY = int(get_secret("SKETCH_TOPK_CAPACITY", 200))
+SKETCH_HLL_PRECISION = int(get_secret("SKETCH_HLL_PRECISION", 12))
+SKETCH_DAYS = int(get_secret("SKETCH_DAYS", 35))
+SKETCH_PERSIST_INTERVAL = float(get_secret("SKETCH_PERSIST_INTERVAL", 60))
+
+# 知识追踪：掌握概率达到此值视为已掌握、掌握矩阵保存间隔（秒）
+MASTERY_THRESHOLD = float(get_secret("MASTERY_THRESHOLD", 0.8))
+MASTERY_PERSIST_INTERVAL = float(get_secret("MASTERY_PERSIST_INTERVAL", 60))
+
+# 协同推荐：每个学生预计算的推荐数、相似度整体刷新间隔（秒）
+RECOMMENDER_TOP_N = int(get_secret("RECOMMENDER_TOP_N", 10))
+RECOMMENDER_REFRESH_SECONDS = float(get_secret("RECOMMENDER_REFRESH_SECONDS", 60))
+
+# 间隔复习：复习卡片保存间隔（秒）
+REVIEW_PERSIST_INTERVAL = float(get_secret("REVIEW_PERSIST_INTERVAL", 60))
+
+# 本地向量检索：TF-IDF经截断SVD降维后的向量维度
+VECTOR_INDEX_DIMENSIONS = int(get_secret("VECTOR_INDEX_DIMENSIONS", 128))
+
+# 知识图谱浏览：展开节点时每页加载的邻域节点数
+GRAPH_PAGE_SIZE = int(get_secret("GRAPH_PAGE_SIZE", 25))
+
+# 学期开始日期（YYYY-MM-DD，用于"本学期"排行；留空则按2月/9月自动推算）
+SEMESTER_START = get_secret("SEMESTER_START", "")
+
 # 应用配置
 APP_TITLE = "牙周病学自适应学习系统"
 APP_ICON = "🦷"
@@ -0,0 +1,64 @@
+"""
+测试共用的活动数据
+由全部活动构建的状态（知识追踪、间隔复习、协同推荐）以"逐条增量更新 == 批量重建"为准
+"""
+
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+# 与知识点相关的活动模板：(模块, 活动类型, 内容ID, 内容名称)
+ACTIVITY_TEMPLATES = [
+    ('病例库', '查看病例', 'case1', None),
+    ('病例库', '查看病例', 'case2', None),
+    ('病例库', '查看病例', 'case3', None),
+    ('病例库', '保存笔记', 'case1', None),
+    ('病例库', '保存笔记', 'case4', None),
+    ('知识图谱', '查看模块', 'M1', None),
+    ('知识图谱', '查看模块', 'M2', None),
+    ('课中互动', '提交回答', None, '牙龈结构与牙周膜组成'),
+    ('课中互动', '练习回答', None, '牙槽骨特征'),
+    ('课中互动', '练习回答', None, '龈沟液功能'),
+    ('病例库', '浏览列表', None, None),   # 与知识点无关
+]
+
+
+def make_activities(n=400, students=6, days=40, seed=7):
+    """随机活动（按时间顺序），格式与 archive.iter_all_activities 一致"""
+    rng = random.Random(seed)
+    start = datetime(2026, 3, 1, 8, tzinfo=timezone.utc)
+    offsets = sorted(rng.uniform(0, days * 86400) for _ in range(n))
+    activities = []
+    for i, offset in enumerate(offsets):
+        module, activity_type, content_id, content_name = rng.choice(ACTIVITY_TEMPLATES)
+        activities.append({
+            'id': f"A{i}",
+            'student_id': f"S{rng.randrange(students)}",
+            'module': module,
+            'activity_type': activity_type,
+            'content_id': content_id,
+            'content_name': content_name,
+            'details': None,
+            'timestamp': start + timedelta(seconds=offset),
+        })
+    return activities
+
+
+def as_payload(activity):
+    """活动记录转为 activity_logged 事件内容（与 auth.log_activity 发布的一致）"""
+    return {
+        'student_id': activity['student_id'],
+        'module_name': activity['module'],
+        'activity_type': activity['activity_type'],
+        'content_id': activity['content_id'],
+        'content_name': activity['content_name'],
+        'details': activity['details'],
+        'activity_id': activity['id'],
+        'timestamp': activity['timestamp'],
+    }
+
+
+@pytest.fixture
+def activities():
+    return make_activities()
@@ -0,0 +1,116 @@
+// 知识图谱组件（Streamlit 自定义组件，不依赖 streamlit-component-lib）
+//
+// Python 端每次渲染发送紧凑的JSON：节点和边为数组，样式去重后按下标引用，节点ID为整数，
+// 节点的悬停提示为名称加截断的简短说明（纯文本，换行由 vis-network 显示为分行）；
+// 这里只把新旧数据的差异应用到 vis.DataSet，网络对象、视角和已放置节点的坐标都保持不变。
+// 单击节点回传 select 事件，双击回传 expand 事件（seq 区分重复点击同一节点）。
+
+(function () {
+  "use strict";
+
+  var OPTIONS = {
+    physics: { enabled: false },
+    edges: {
+      smooth: false,
+      font: { size: 12, color: "#000000", strokeWidth: 0, align: "middle" },
+      color: { inherit: false },
+      arrows: { to: { enabled: true, scaleFactor: 0.6 } }
+    },
+    nodes: {
+      shape: "dot",
+      font: { size: 16, face: "Arial", strokeWidth: 3, strokeColor: "#ffffff", color: "#000000" },
+      borderWidth: 2,
+      borderWidthSelected: 4
+    },
+    interaction: {
+      hover: true,
+      tooltipDelay: 100,
+      navigationButtons: true,
+      keyboard: true,
+      hideEdgesOnDrag: true
+    }
+  };
+
+  var container = document.getElementById("graph");
+  var nodes = new vis.DataSet();
+  var edges = new vis.DataSet();
+  var network = null;
+  var frameHeight = 0;
+
+  function send(type, data) {
+    var message = { isStreamlitMessage: true, type: type };
+    for (var key in data) { message[key] = data[key]; }
+    window.parent.postMessage(message, "*");
+  }
+
+  function emit(event, nodeId) {
+    send("streamlit:setComponentValue", {
+      value: { event: event, node: nodeId, seq: Date.now() },
+      dataType: "json"
+    });
+  }
+
+  // 把完整的目标列表与当前 DataSet 比较：只更新变化的项，删除不再出现的项
+  function applyDiff(dataSet, items) {
+    var keep = {};
+    var changed = [];
+    items.forEach(function (item) {
+      keep[item.id] = true;
+      var current = dataSet.get(item.id);
+      if (!current || JSON.stringify(current) !== JSON.stringify(item)) {
+        changed.push(item);
+      }
+    });
+    var removed = dataSet.getIds().filter(function (id) { return !keep[id]; });
+    if (removed.length) { dataSet.remove(removed); }
+    if (changed.length) { dataSet.update(changed); }
+  }
+
+  function render(graph) {
+    var nodeStyles = graph.node_styles;
+    var edgeStyles = graph.edge_styles;
+    applyDiff(nodes, graph.nodes.map(function (row) {
+      // [ID, 标签, 样式下标, x, y, 悬停提示]
+      var style = nodeStyles[row[2]];
+      return { id: row[0], label: row[1], title: row[5] || row[1], x: row[3], y: row[4],
+               color: style[0], size: style[1] };
+    }));
+    applyDiff(edges, graph.edges.map(function (row) {
+      // [源ID, 目标ID, 样式下标, 标签]
+      var style = edgeStyles[row[2]];
+      var edge = { id: row[0] + "-" + row[1], from: row[0], to: row[1],
+                   color: style[0], width: style[1], dashes: style[2] };
+      if (row[3]) { edge.label = row[3]; }
+      return edge;
+    }));
+
+    if (graph.height !== frameHeight) {
+      frameHeight = graph.height;
+      container.style.height = frameHeight + "px";
+      send("streamlit:setFrameHeight", { height: frameHeight + 2 });
+    }
+    if (network === null) {
+      network = new vis.Network(container, { nodes: nodes, edges: edges }, OPTIONS);
+      network.on("click", function (params) {
+        if (params.nodes.length) { emit("select", params.nodes[0]); }
+      });
+      network.on("doubleClick", function (params) {
+        if (params.nodes.length) { emit("expand", params.nodes[0]); }
+      });
+      network.fit();
+    }
+    if (graph.selected !== null && nodes.get(graph.selected)) {
+      network.selectNodes([graph.selected]);
+    } else {
+      network.unselectAll();
+    }
+  }
+
+  window.addEventListener("message", function (event) {
+    if (event.data && event.data.type === "streamlit:render") {
+      render(event.data.args.graph);
+    }
+  });
+
+  send("streamlit:componentReady", { apiVersion: 1 });
+})();
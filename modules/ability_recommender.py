@@ -3,9 +3,14 @@
 基于能力自评，AI推荐学习路径
 """
 
+import time
 import streamlit as st
 from openai import OpenAI
 from config.settings import *
+from modules.content_repository import get_abilities, get_ability_knowledge_map
+from modules.mastery import ability_mastery
+from modules.vector_index import search as search_references
+from modules.prompt_builder import make_section, build_prompt, truncate_to_tokens, record_llm_call, format_llm_report
 
 def check_neo4j_available():
     """检查Neo4j是否可用"""
@@ -62,7 +67,7 @@ def get_all_abilities():
         return []
 
 def analyze_learning_path(selected_abilities, mastery_levels, abilities_info=None):
-    """分析学习路径并生成推荐"""
+    """分析学习路径并生成推荐，返回 (推荐内容, 调用统计)，AI不可用时调用统计为None"""
     required_knowledge = []
     
     # 尝试从Neo4j获取知识点数据
@@ -89,18 +94,7 @@ def analyze_learning_path(selected_abilities, mastery_levels, abilities_info=Non
     # 如果没有从数据库获取到数据，使用示例知识点
     if not required_knowledge:
         # 根据选择的能力生成相关知识点
-        ability_knowledge_map = {
-            "A1": [("牙龈解剖结构", "基础", 0.9), ("牙周膜组成", "基础", 0.8), ("牙槽骨特征", "基础", 0.7)],
-            "A2": [("牙周探诊技术", "基础", 0.9), ("探诊深度测量", "基础", 0.8), ("附着丧失评估", "中等", 0.7)],
-            "A3": [("牙菌斑识别方法", "基础", 0.9), ("菌斑染色技术", "基础", 0.8), ("生物膜特征", "中等", 0.7)],
-            "A4": [("牙周病分类标准", "中等", 0.9), ("临床检查要点", "基础", 0.8), ("影像学诊断", "中等", 0.8)],
-            "A5": [("牙周X线片判读", "中等", 0.9), ("骨吸收程度评估", "中等", 0.8), ("根分叉病变诊断", "高级", 0.7)],
-            "A6": [("龈上洁治原理", "基础", 0.9), ("器械使用方法", "中等", 0.9), ("操作规范", "基础", 0.8)],
-            "A7": [("龈下刮治技术", "中等", 0.9), ("根面平整术", "高级", 0.9), ("局部麻醉技术", "中等", 0.8)],
-            "A8": [("治疗计划制定原则", "高级", 0.9), ("牙周病分期分级", "中等", 0.8), ("预后评估", "高级", 0.8)],
-            "A9": [("口腔卫生指导方法", "基础", 0.9), ("刷牙技术培训", "基础", 0.8), ("辅助工具使用", "基础", 0.7)],
-            "A10": [("牙周维护治疗原则", "中等", 0.9), ("复查周期规划", "中等", 0.8), ("SPT标准流程", "中等", 0.8)],
-        }
+        ability_knowledge_map = get_ability_knowledge_map()
         
         for ability_id in selected_abilities:
             if ability_id in ability_knowledge_map:
@@ -124,9 +118,9 @@ def analyze_learning_path(selected_abilities, mastery_levels, abilities_info=Non
         mastery = mastery_levels.get(a_id, 0.5)
         ability_names.append(f"{name}(自评掌握度: {int(mastery*100)}%)")
     
-    # 构建知识点描述
-    knowledge_desc = []
-    for kp in required_knowledge[:15]:
+    # 构建知识点描述（按重要性从高到低保留，超出预算的低权重知识点被裁剪）
+    knowledge_items = []
+    for kp in required_knowledge:
         if isinstance(kp.get('required_by'), list):
             required_by_str = ', '.join(kp['required_by'])
         else:
@@ -134,9 +128,52 @@ def analyze_learning_path(selected_abilities, mastery_levels, abilities_info=Non
         weight = kp.get('max_weight', 0.5)
         if isinstance(weight, (int, float)):
             weight_str = f"{weight:.1f}"
+            priority = weight
         else:
             weight_str = str(weight)
-        knowledge_desc.append(f"- {kp['kp_name']} (难度: {kp.get('difficulty', '未知')}, 重要性: {weight_str}, 所需能力: {required_by_str})")
+            priority = 0
+        knowledge_items.append((
+            priority,
+            f"- {kp['kp_name']} (难度: {kp.get('difficulty', '未知')}, 重要性: {weight_str}, 所需能力: {required_by_str})"
+        ))
+    
+    # 检索与目标能力和知识点最相关的知识说明、病例片段，作为参考资料注入提示词
+    started = time.perf_counter()
+    query = " ".join([a['name'] for a in (abilities_info or []) if a['id'] in selected_abilities]
+                     + [kp['kp_name'] for kp in required_knowledge])
+    try:
+        references = search_references(query, k=RAG_TOP_K, kinds={'模块', '章节', '知识点', '病例'})
+    except Exception as e:
+        print(f"[能力推荐] 参考资料检索失败: {e}")
+        references = []
+    retrieval_ms = (time.perf_counter() - started) * 1000
+    reference_items = [(ref['score'], f"- 【{ref['title']}】{ref['text']}") for ref in references]
+    
+    sections = [
+        make_section("intro", f"""
+你是一位牙周病学教学专家。学生选择了以下目标能力：
+
+{', '.join(ability_names)}
+
+这些能力需要掌握以下知识点：
+"""),
+        make_section("knowledge", items=knowledge_items, item_max_tokens=60,
+                     empty_text="（系统将根据能力要求推荐学习内容）"),
+        make_section("references_title", "\n\n参考资料（教材知识点说明与病例摘录）：\n" if reference_items else ""),
+        make_section("references", items=reference_items, max_tokens=RAG_TOKEN_BUDGET, item_max_tokens=90),
+        make_section("task", """
+
+请为学生制定一个个性化的学习路径，包括：
+1. **学习优先级排序**：按照"基础→重要→高级"的顺序，列出应该优先学习的知识点（5-8个）
+2. **学习建议**：针对每个知识点，给出简短的学习建议
+3. **预计学习时间**：估算总学习时间
+4. **能力提升预期**：完成学习后，学生在选定能力上能达到什么水平
+
+请用简洁、友好的语言，给出实用的建议。
+"""),
+    ]
+    prompt, prompt_report = build_prompt(sections, LLM_PROMPT_TOKEN_BUDGET)
+    prompt_report['retrieval_ms'] = round(retrieval_ms, 2)
     
     # 使用DeepSeek AI生成推荐
     try:
@@ -145,7 +182,7 @@ def analyze_learning_path(selected_abilities, mastery_levels, abilities_info=Non
         # 创建不使用代理的httpx客户端，解决Streamlit Cloud部署问题
         http_client = httpx.Client(
             base_url=DEEPSEEK_BASE_URL,
-            timeout=60.0,
+            timeout=LLM_TIMEOUT_SECONDS,
             follow_redirects=True
         )
         
@@ -155,33 +192,19 @@ def analyze_learning_path(selected_abilities, mastery_levels, abilities_info=Non
             http_client=http_client
         )
         
-        prompt = f"""
-你是一位牙周病学教学专家。学生选择了以下目标能力：
-
-{', '.join(ability_names)}
-
-这些能力需要掌握以下知识点：
-{chr(10).join(knowledge_desc) if knowledge_desc else "（系统将根据能力要求推荐学习内容）"}
-
-请为学生制定一个个性化的学习路径，包括：
-1. **学习优先级排序**：按照"基础→重要→高级"的顺序，列出应该优先学习的知识点（5-8个）
-2. **学习建议**：针对每个知识点，给出简短的学习建议
-3. **预计学习时间**：估算总学习时间
-4. **能力提升预期**：完成学习后，学生在选定能力上能达到什么水平
-
-请用简洁、友好的语言，给出实用的建议。
-"""
-        
+        started_at = time.time()
         response = client.chat.completions.create(
-            model="deepseek-chat",
+            model=LLM_MODEL,
             messages=[{"role": "user", "content": prompt}],
+            max_tokens=LLM_MAX_OUTPUT_TOKENS,
             stream=False
         )
+        llm_report = record_llm_call(prompt_report, response, started_at, label="学习路径推荐")
         
         # 关闭httpx客户端
         http_client.close()
         
-        return response.choices[0].message.content
+        return response.choices[0].message.content, llm_report
     except Exception as e:
         import traceback
         error_trace = traceback.format_exc()
@@ -207,8 +230,15 @@ def analyze_learning_path(selected_abilities, mastery_levels, abilities_info=Non
 
 **学习建议**：建议结合教材、临床观摩和实践操作进行学习。
 
-⚠️ 注意：AI分析服务暂时不可用（{str(e)[:50]}），以上为系统预设推荐。
-"""
+⚠️ 注意：AI分析服务暂时不可用（{truncate_to_tokens(str(e), 30)}），以上为系统预设推荐。
+""", None
+
+def open_ability(ability_id):
+    """选中指定能力（按钮回调）；去掉复选框的旧状态，由 selected_abilities 决定勾选"""
+    selected = st.session_state.setdefault('selected_abilities', [])
+    if ability_id not in selected:
+        selected.append(ability_id)
+    st.session_state.pop(f"ability_{ability_id}", None)
 
 def render_ability_recommender():
     """渲染能力推荐页面"""
@@ -221,22 +251,8 @@ def render_ability_recommender():
     选择你想掌握的能力，系统将基于AI为你推荐个性化的学习路径。
     """)
     
-    # 获取所有能力
-    abilities = get_all_abilities()
-    
-    # 始终使用完整的10个能力列表（无论数据库有无数据）
-    abilities = [
-        {"id": "A1", "name": "牙周组织解剖识别", "category": "基础能力", "description": "能够识别和描述正常牙周组织的解剖结构，包括牙龈、牙周膜、牙槽骨和牙骨质"},
-        {"id": "A2", "name": "牙周探诊技术", "category": "基础能力", "description": "掌握正确的牙周探诊方法和技巧，能够准确测量探诊深度"},
-        {"id": "A3", "name": "牙菌斑识别", "category": "诊断能力", "description": "能够识别和评估牙菌斑的分布和程度，理解菌斑染色方法"},
-        {"id": "A4", "name": "牙周病诊断", "category": "诊断能力", "description": "能够根据临床表现做出正确的牙周病诊断，掌握2018年新分类"},
-        {"id": "A5", "name": "X线片解读", "category": "诊断能力", "description": "能够解读牙周病相关的X线影像，判断骨吸收类型和程度"},
-        {"id": "A6", "name": "洁治术操作", "category": "治疗能力", "description": "掌握龈上洁治术的操作技能，熟悉超声和手工器械使用"},
-        {"id": "A7", "name": "刮治术操作", "category": "治疗能力", "description": "掌握龈下刮治和根面平整术的操作要点"},
-        {"id": "A8", "name": "治疗计划制定", "category": "治疗能力", "description": "能够制定合理的牙周治疗计划，包括分期分级和预后评估"},
-        {"id": "A9", "name": "口腔卫生指导", "category": "预防能力", "description": "能够进行有效的口腔卫生宣教，指导患者正确刷牙和使用辅助工具"},
-        {"id": "A10", "name": "维护治疗管理", "category": "预防能力", "description": "掌握牙周维护治疗的原则和方法，制定个性化复查计划"},
-    ]
+    # 始终使用内容仓库中完整的10个能力列表（无需查询数据库）
+    abilities = get_abilities()
     
     # 按类别分组
     categories = {}
@@ -255,6 +271,10 @@ def render_ability_recommender():
     if 'mastery_levels' not in st.session_state:
         st.session_state.mastery_levels = {}
     
+    # 未自评的能力以学习活动估计的掌握度作为滑块初始值
+    student_id = get_current_student()
+    estimated_levels = ability_mastery(student_id) if student_id else {}
+    
     # 使用expander分类显示能力，减少页面复杂度
     for category, abs_list in categories.items():
         with st.expander(f"📂 {category}", expanded=True):
@@ -276,7 +296,9 @@ def render_ability_recommender():
                         level = st.slider(
                             "当前掌握度",
                             0.0, 1.0, 
-                            st.session_state.mastery_levels.get(ability['id'], 0.3), 
+                            st.session_state.mastery_levels.get(
+                                ability['id'], round(estimated_levels.get(ability['id'], 0.3), 1)
+                            ), 
                             0.1,
                             key=f"level_{ability['id']}",
                             label_visibility="collapsed"
@@ -414,7 +436,7 @@ def render_ability_recommender():
                 """, unsafe_allow_html=True)
                 
                 try:
-                    recommendation = analyze_learning_path(selected_abilities, mastery_levels, abilities)
+                    recommendation, llm_report = analyze_learning_path(selected_abilities, mastery_levels, abilities)
                     
                     # 步骤3完成
                     step3.markdown("""
@@ -446,7 +468,11 @@ def render_ability_recommender():
                     """, unsafe_allow_html=True)
                     
                     st.markdown(recommendation)
-                    
+
+                    # 显示本次调用的token用量
+                    if llm_report:
+                        st.caption(f"📏 {format_llm_report(llm_report)}")
+
                     # 记录AI推荐生成
                     log_ability_activity("生成AI推荐", details="成功生成学习路径推荐")
                     
@@ -7,94 +7,55 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from modules.auth import (
     get_all_students, get_student_activities, get_module_statistics,
-    delete_student_data, delete_all_activities, check_neo4j_available,
-    get_single_module_statistics, get_neo4j_driver
+    check_neo4j_available, get_single_module_statistics, get_neo4j_driver
 )
 from config.settings import *
+from modules.data_cache import tagged_cache, skip_cache, date_tag, today
+from modules.jobs import start_job, has_active_job, render_jobs_panel
+from modules.replica import get_analytics_storage
+from modules.sketches import popular_content
+from modules.content_repository import get_sample_students, get_sample_module_activities, get_sample_student_activities
 
-@st.cache_data(ttl=300, show_spinner=False)  # 缓存5分钟
+@tagged_cache(lambda args: {'students', 'activities'}, daily=True)
 def get_activity_summary():
     """获取活动概况"""
-    if not check_neo4j_available():
-        return {
-            'total_students': 0,
-            'total_activities': 0,
-            'today_activities': 0,
-            'active_students': 0
-        }
+    empty_summary = {
+        'total_students': 0,
+        'total_activities': 0,
+        'today_activities': 0,
+        'active_students': 0
+    }
+    storage = get_analytics_storage()
+    if not storage.is_available():
+        skip_cache()
+        return empty_summary
     
     try:
-        driver = get_neo4j_driver()
-        
-        with driver.session() as session:
-            # 总学生数
-            result = session.run("MATCH (s:yzbx_Student) RETURN count(s) as count")
-            total_students = result.single()['count']
-            
-            # 总活动数
-            result = session.run("MATCH (a:yzbx_Activity) RETURN count(a) as count")
-            total_activities = result.single()['count']
-            
-            # 今日活动数
-            result = session.run("""
-                MATCH (a:yzbx_Activity)
-                WHERE date(a.timestamp) = date()
-                RETURN count(a) as count
-            """)
-            today_activities = result.single()['count']
-            
-            # 活跃学生数（7天内）
-            result = session.run("""
-                MATCH (s:yzbx_Student)-[:PERFORMED]->(a:yzbx_Activity)
-                WHERE a.timestamp > datetime() - duration('P7D')
-                RETURN count(DISTINCT s) as count
-            """)
-            active_students = result.single()['count']
-        
-        return {
-            'total_students': total_students,
-            'total_activities': total_activities,
-            'today_activities': today_activities,
-            'active_students': active_students
-        }
+        return storage.activity_summary()
     except Exception:
-        return {
-            'total_students': 0,
-            'total_activities': 0,
-            'today_activities': 0,
-            'active_students': 0
-        }
+        skip_cache()
+        return empty_summary
+
+def trend_tags(args):
+    """每日趋势的缓存标签：窗口内每一天"""
+    end = date.fromisoformat(today())
+    return {date_tag(end - timedelta(days=i)) for i in range(int(args['days']) + 1)}
 
-@st.cache_data(ttl=300, show_spinner=False)  # 缓存5分钟
+@tagged_cache(trend_tags, daily=True)
 def get_daily_activity_trend(days=7):
     """获取每日活动趋势"""
-    if not check_neo4j_available():
+    storage = get_analytics_storage()
+    if not storage.is_available():
+        skip_cache()
         return []
     
     try:
-        driver = get_neo4j_driver()
-        
-        with driver.session() as session:
-            result = session.run("""
-                MATCH (a:yzbx_Activity)
-                WHERE a.timestamp > datetime() - duration('P' + $days + 'D')
-                RETURN date(a.timestamp) as date, count(*) as count
-                ORDER BY date
-            """, days=str(days))
-            
-            # 将Date对象转换为字符串
-            trend = []
-            for record in result:
-                trend.append({
-                    'date': str(record['date']) if record['date'] else None,
-                    'count': record['count']
-                })
-        
-        return trend
+        return storage.daily_trend(days)
     except Exception as e:
+        skip_cache()
         print(f"获取每日趋势失败: {e}")
         return []
 
@@ -120,37 +81,9 @@ def get_module_usage():
         return []
 
 def get_popular_content(module=None, limit=10):
-    """获取热门学习内容"""
-    if not check_neo4j_available():
-        return []
-    
+    """获取热门学习内容（读取流式统计的Top-K，view_count 最多高估 max_error）"""
     try:
-        driver = get_neo4j_driver()
-        
-        with driver.session() as session:
-            query = """
-                MATCH (a:yzbx_Activity)
-                WHERE a.content_name IS NOT NULL
-            """
-            params = {"limit": limit}
-            
-            if module:
-                query += " AND a.module = $module"
-                params["module"] = module
-            
-            query += """
-                RETURN a.module as module,
-                       a.content_name as content_name,
-                       count(*) as view_count,
-                       count(DISTINCT a.content_id) as unique_views
-                ORDER BY view_count DESC
-                LIMIT $limit
-            """
-            
-            result = session.run(query, **params)
-            content = [dict(record) for record in result]
-        
-        return content
+        return popular_content(module, limit) or []
     except Exception:
         return []
 
@@ -493,6 +426,9 @@ def render_data_management():
     
     st.warning("⚠️ 以下操作不可撤销，请谨慎操作！")
     
+    # 删除在后台任务中分批执行（与系统管理页相同）
+    render_jobs_panel(key="analytics_jobs")
+    
     # 删除特定学生数据
     st.markdown("### 删除学生数据")
     students = get_all_students()
@@ -501,20 +437,21 @@ def render_data_management():
         selected = st.selectbox("选择要删除的学生", list(student_options.keys()), key="delete_student")
         
         if st.button("🗑️ 删除该学生数据", type="secondary"):
-            student_id = student_options[selected]
-            delete_student_data(student_id)
-            st.success(f"已删除学生 {selected} 的所有数据")
+            start_job('delete_student', {'student_id': student_options[selected]})
+            st.success(f"✅ 已开始删除学生 {selected} 的所有数据，进度见上方后台任务")
             st.rerun()
     
     st.divider()
     
     # 清空所有活动记录
     st.markdown("### 清空活动记录")
-    if st.button("🗑️ 清空所有活动记录", type="secondary"):
-        confirm = st.checkbox("确认清空所有活动记录（不删除学生账号）")
-        if confirm:
-            delete_all_activities()
-            st.success("已清空所有活动记录")
+    if st.button("🗑️ 清空所有活动记录", type="secondary", disabled=has_active_job('clear_activities')):
+        if st.session_state.get('confirm_clear_activities') != True:
+            st.session_state.confirm_clear_activities = True
+            st.warning("⚠️ 将删除所有学习记录（含归档，不删除学生账号）！再次点击确认。")
+        else:
+            start_job('clear_activities')
+            st.session_state.confirm_clear_activities = False
             st.rerun()
     
     st.divider()
@@ -611,37 +548,8 @@ def render_module_overview(module_name):
         # 使用该模块特定的示例数据
         st.info(f"📊 {module_name}暂无实际学习数据，以下为示例展示")
         
-        # 根据模块名称生成不同的示例数据
-        example_data = {
-            "病例库": [
-                {"student_name": "张三", "activity_type": "查看病例", "timestamp": "2026-01-03 10:30", "content_name": "慢性牙周炎病例"},
-                {"student_name": "李四", "activity_type": "查看病例", "timestamp": "2026-01-03 11:15", "content_name": "侵袭性牙周炎病例"},
-                {"student_name": "王五", "activity_type": "保存笔记", "timestamp": "2026-01-03 14:20", "content_name": "牙周-牙髓联合病变"},
-                {"student_name": "张三", "activity_type": "查看病例", "timestamp": "2026-01-03 15:45", "content_name": "药物性牙龈增生"},
-                {"student_name": "赵六", "activity_type": "进入模块", "timestamp": "2026-01-03 16:00", "content_name": None},
-            ],
-            "知识图谱": [
-                {"student_name": "张三", "activity_type": "查看模块", "timestamp": "2026-01-03 09:20", "content_name": "M1-生物学基础"},
-                {"student_name": "李四", "activity_type": "查看模块", "timestamp": "2026-01-03 10:00", "content_name": "M2-病因与发病机制"},
-                {"student_name": "王五", "activity_type": "点击节点", "timestamp": "2026-01-03 11:30", "content_name": "牙周组织解剖"},
-                {"student_name": "赵六", "activity_type": "查看模块", "timestamp": "2026-01-03 14:00", "content_name": "M3-诊断与分类"},
-                {"student_name": "张三", "activity_type": "进入模块", "timestamp": "2026-01-03 16:30", "content_name": None},
-            ],
-            "能力推荐": [
-                {"student_name": "张三", "activity_type": "能力自评", "timestamp": "2026-01-03 10:00", "content_name": "牙周探诊技术"},
-                {"student_name": "李四", "activity_type": "能力自评", "timestamp": "2026-01-03 11:00", "content_name": "牙周病诊断"},
-                {"student_name": "王五", "activity_type": "生成AI推荐", "timestamp": "2026-01-03 13:00", "content_name": "学习路径"},
-                {"student_name": "赵六", "activity_type": "能力自评", "timestamp": "2026-01-03 15:00", "content_name": "洁治术操作"},
-                {"student_name": "张三", "activity_type": "进入模块", "timestamp": "2026-01-03 16:00", "content_name": None},
-            ],
-            "课中互动": [
-                {"student_name": "张三", "activity_type": "回答问题", "timestamp": "2026-01-03 08:30", "content_name": "牙周探诊深度正常值"},
-                {"student_name": "李四", "activity_type": "回答问题", "timestamp": "2026-01-03 08:35", "content_name": "牙周探诊深度正常值"},
-                {"student_name": "王五", "activity_type": "提交练习", "timestamp": "2026-01-03 09:00", "content_name": "探诊练习"},
-                {"student_name": "赵六", "activity_type": "回答问题", "timestamp": "2026-01-03 14:00", "content_name": "牙周病分类"},
-                {"student_name": "张三", "activity_type": "进入模块", "timestamp": "2026-01-03 08:00", "content_name": None},
-            ],
-        }
+        # 根据模块名称使用不同的示例数据
+        example_data = get_sample_module_activities()
         
         module_activities = example_data.get(module_name, example_data["病例库"])
     
@@ -700,11 +608,7 @@ def render_module_student_detail(module_name):
     
     if not students:
         # 使用示例学生
-        students = [
-            {"student_id": "2024001", "name": "张三", "login_count": 5},
-            {"student_id": "2024002", "name": "李四", "login_count": 3},
-            {"student_id": "2024003", "name": "王五", "login_count": 8},
-        ]
+        students = get_sample_students()
     
     # 学生选择
     student_options = {f"{s.get('student_id', '')} - {s.get('name', '')}": s for s in students}
@@ -718,29 +622,8 @@ def render_module_student_detail(module_name):
         student_module_activities = get_student_activities(student_id=student_id, module=module_name, limit=100)
         
         if not student_module_activities:
-            # 根据模块名称生成不同的示例数据
-            example_data = {
-                "病例库": [
-                    {"activity_type": "进入模块", "timestamp": "2026-01-03 09:00", "content_name": None, "details": "访问病例库"},
-                    {"activity_type": "查看病例", "timestamp": "2026-01-03 09:05", "content_name": "慢性牙周炎病例", "details": None},
-                    {"activity_type": "保存笔记", "timestamp": "2026-01-03 09:15", "content_name": "慢性牙周炎病例", "details": "笔记内容..."},
-                ],
-                "知识图谱": [
-                    {"activity_type": "进入模块", "timestamp": "2026-01-03 10:00", "content_name": None, "details": "访问知识图谱"},
-                    {"activity_type": "查看模块", "timestamp": "2026-01-03 10:05", "content_name": "M1-生物学基础", "details": None},
-                    {"activity_type": "点击节点", "timestamp": "2026-01-03 10:10", "content_name": "牙周组织解剖", "details": "查看详情"},
-                ],
-                "能力推荐": [
-                    {"activity_type": "进入模块", "timestamp": "2026-01-03 11:00", "content_name": None, "details": "访问能力推荐"},
-                    {"activity_type": "能力自评", "timestamp": "2026-01-03 11:05", "content_name": "牙周探诊技术", "details": "掌握度50%"},
-                    {"activity_type": "生成AI推荐", "timestamp": "2026-01-03 11:10", "content_name": "学习路径", "details": "成功生成"},
-                ],
-                "课中互动": [
-                    {"activity_type": "进入模块", "timestamp": "2026-01-03 08:00", "content_name": None, "details": "访问课中互动"},
-                    {"activity_type": "回答问题", "timestamp": "2026-01-03 08:30", "content_name": "牙周探诊深度", "details": "回答正确"},
-                    {"activity_type": "提交练习", "timestamp": "2026-01-03 08:45", "content_name": "探诊练习", "details": "完成练习"},
-                ],
-            }
+            # 根据模块名称使用不同的示例数据
+            example_data = get_sample_student_activities()
             student_module_activities = example_data.get(module_name, example_data["病例库"])
         
         # 学生数据卡片
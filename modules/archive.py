@@ -0,0 +1,670 @@
+"""
+活动归档模块
+早于保留天数的活动从主存储移出，按月分区写入压缩Parquet文件（冷数据），
+同时保存 学生×模块×日期×小时 汇总；活动查询和导出同时读取主存储和归档，
+按月份分区和文件内的行组统计跳过无关数据
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from modules.content_repository import DATA_DIR
+from modules.data_cache import publish, subscribe
+from modules.storage import get_storage
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+    pa = None
+
+try:
+    from config.settings import ARCHIVE_RETENTION_DAYS, ARCHIVE_DIR, ARCHIVE_INTERVAL_HOURS
+except (ImportError, AttributeError):
+    ARCHIVE_RETENTION_DAYS = 0
+    ARCHIVE_DIR = ""
+    ARCHIVE_INTERVAL_HOURS = 24
+
+ARCHIVE_ROOT = ARCHIVE_DIR or os.path.join(DATA_DIR, "archive")
+MANIFEST_PATH = os.path.join(ARCHIVE_ROOT, "manifest.json")
+
+# 每批从主存储读取并删除的活动数
+ARCHIVE_BATCH_SIZE = 5000
+# Parquet行组大小（文件按学号排序，按学号查询时可跳过其他行组）
+ROW_GROUP_SIZE = 10000
+
+if HAS_PYARROW:
+    ACTIVITY_SCHEMA = pa.schema([
+        ('id', pa.string()),
+        ('student_id', pa.string()),
+        ('student_name', pa.string()),
+        ('activity_type', pa.string()),
+        ('module', pa.string()),
+        ('content_id', pa.string()),
+        ('content_name', pa.string()),
+        ('details', pa.string()),
+        ('timestamp', pa.timestamp('us', tz='UTC')),
+    ])
+    ROLLUP_SCHEMA = pa.schema([
+        ('student_id', pa.string()),
+        ('student_name', pa.string()),
+        ('module', pa.string()),
+        ('day', pa.string()),
+        ('hour', pa.int8()),
+        ('count', pa.int64()),
+    ])
+
+_lock = threading.Lock()          # 保护清单和汇总缓存
+_run_lock = threading.Lock()      # 归档、删除、清空互斥执行
+_manifest = [None]
+_rollup_cache = {'version': None, 'rows': None}
+_scheduler = [None]
+_state = {
+    'running': False,
+    'archived': 0,        # 本次运行已归档的活动数
+    'last_error': None,
+}
+
+# ==================== 清单 ====================
+
+def _load_manifest():
+    """
+    读取归档清单 {'version', 'last_run', 'months': {月份: {'activities', 'rollup', 'rows', 'first', 'last'}}}
+
+    清单只在新文件写完后替换，读取时只使用清单中的文件（崩溃留下的半成品不会被读到）
+    """
+    with _lock:
+        if _manifest[0] is None:
+            try:
+                with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+                    _manifest[0] = json.load(f)
+            except FileNotFoundError:
+                _manifest[0] = {'version': 0, 'last_run': None, 'months': {}}
+        return json.loads(json.dumps(_manifest[0]))
+
+def _save_manifest(manifest):
+    """写入归档清单（先写临时文件再替换）"""
+    manifest['version'] += 1
+    os.makedirs(ARCHIVE_ROOT, exist_ok=True)
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+    with _lock:
+        _manifest[0] = manifest
+
+def _path(kind, month, name):
+    return os.path.join(ARCHIVE_ROOT, kind, f"month={month}", name)
+
+def _files(manifest, kind, months=None):
+    """清单中指定月份（默认全部）的文件路径"""
+    return [
+        _path(kind, month, name)
+        for month, entry in sorted(manifest['months'].items())
+        if months is None or month in months
+        for name in entry[kind]
+    ]
+
+# ==================== 写入 ====================
+
+def _part_name(keys):
+    """按内容确定文件名：同一批数据重复归档时覆盖同一文件，不产生重复行"""
+    return "part-" + hashlib.sha1("\n".join(keys).encode("utf-8")).hexdigest()[:16] + ".parquet"
+
+def _write_table(table, kind, month, name):
+    """写入Parquet文件（zstd压缩，先写临时文件再替换）"""
+    path = _path(kind, month, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    pq.write_table(table, tmp_path, compression='zstd', row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp_path, path)
+
+def _text(value):
+    return None if value is None else str(value)
+
+def _activity_table(activities):
+    """活动行转为Arrow表（按学号、时间排序）"""
+    activities = sorted(activities, key=lambda row: (row['student_id'] or '', row['timestamp']))
+    columns = {name: [_text(row.get(name)) for row in activities] for name in ACTIVITY_SCHEMA.names[:-1]}
+    columns['timestamp'] = [row['timestamp'].astimezone(timezone.utc) for row in activities]
+    return pa.table(columns, schema=ACTIVITY_SCHEMA)
+
+def _rollup_table(counts):
+    """{(学号, 姓名, 模块, 日期, 小时): 次数} 转为Arrow表"""
+    keys = sorted(counts, key=lambda key: tuple('' if v is None else str(v) for v in key))
+    return pa.table({
+        'student_id': [key[0] for key in keys],
+        'student_name': [key[1] for key in keys],
+        'module': [key[2] for key in keys],
+        'day': [key[3] for key in keys],
+        'hour': [key[4] for key in keys],
+        'count': [counts[key] for key in keys],
+    }, schema=ROLLUP_SCHEMA)
+
+def _rollup_counts(activities):
+    """按 学生×模块×日期×小时（UTC）汇总活动数"""
+    counts = Counter()
+    for row in activities:
+        ts = row['timestamp'].astimezone(timezone.utc)
+        counts[(row['student_id'], row.get('student_name'), row['module'], ts.date().isoformat(), ts.hour)] += 1
+    return counts
+
+def _archive_batch(storage, cutoff):
+    """归档一批活动：写入分区文件 → 更新清单 → 从主存储删除，返回归档的行数"""
+    activities = storage.activities_before(cutoff, ARCHIVE_BATCH_SIZE)
+    if not activities:
+        return 0
+
+    by_month = {}
+    for row in activities:
+        month = row['timestamp'].astimezone(timezone.utc).strftime("%Y-%m")
+        by_month.setdefault(month, []).append(row)
+
+    manifest = _load_manifest()
+    for month, rows in by_month.items():
+        name = _part_name([row['id'] for row in rows])
+        _write_table(_activity_table(rows), 'activities', month, name)
+        _write_table(_rollup_table(_rollup_counts(rows)), 'rollup', month, name)
+
+        entry = manifest['months'].setdefault(
+            month, {'activities': [], 'rollup': [], 'rows': 0, 'first': None, 'last': None})
+        if name not in entry['activities']:
+            entry['activities'].append(name)
+            entry['rollup'].append(name)
+            entry['rows'] += len(rows)
+        first = min(row['timestamp'] for row in rows).astimezone(timezone.utc).isoformat()
+        last = max(row['timestamp'] for row in rows).astimezone(timezone.utc).isoformat()
+        entry['first'] = min(entry['first'] or first, first)
+        entry['last'] = max(entry['last'] or last, last)
+    _save_manifest(manifest)
+
+    # 清单已包含本批文件后再删除；删除前崩溃时下次归档会重写同名文件
+    storage.delete_activities(activities)
+    return len(activities)
+
+def _rewrite_month(manifest, month, activities, rollup):
+    """用新表替换某月的全部文件（合并小文件、删除学生时使用），表为空时移除该月"""
+    entry = manifest['months'][month]
+    old_files = _files(manifest, 'activities', {month}) + _files(manifest, 'rollup', {month})
+
+    if activities.num_rows:
+        name = _part_name(entry['activities'] + [str(activities.num_rows)])
+        _write_table(activities, 'activities', month, name)
+        _write_table(rollup, 'rollup', month, name)
+        entry.update(activities=[name], rollup=[name], rows=activities.num_rows)
+    else:
+        del manifest['months'][month]
+    _save_manifest(manifest)
+
+    for path in old_files:
+        if os.path.basename(path) not in (entry['activities'] if activities.num_rows else ()):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+def _merge_rollup(table):
+    """汇总表按键合并计数"""
+    if not table.num_rows:
+        return table
+    merged = table.group_by(['student_id', 'student_name', 'module', 'day', 'hour']).aggregate([('count', 'sum')])
+    merged = merged.rename_columns(['count' if name == 'count_sum' else name for name in merged.column_names])
+    return merged.select(ROLLUP_SCHEMA.names).sort_by([('student_id', 'ascending'), ('day', 'ascending')])
+
+def _compact(manifest, months):
+    """合并每个月的多个小文件（按学号、时间排序，便于按学号跳过行组）"""
+    for month in months:
+        entry = manifest['months'].get(month)
+        if entry is None or len(entry['activities']) <= 1:
+            continue
+        activities = ds.dataset(_files(manifest, 'activities', {month}), schema=ACTIVITY_SCHEMA).to_table()
+        activities = activities.sort_by([('student_id', 'ascending'), ('timestamp', 'ascending')])
+        rollup = _merge_rollup(ds.dataset(_files(manifest, 'rollup', {month}), schema=ROLLUP_SCHEMA).to_table())
+        _rewrite_month(manifest, month, activities, rollup)
+
+def run_archive(retention_days=None):
+    """
+    归档早于保留天数的活动，返回归档的行数
+
+    已有归档任务在执行时返回None
+    """
+    if not HAS_PYARROW:
+        raise RuntimeError("未安装 pyarrow，无法归档")
+    retention_days = ARCHIVE_RETENTION_DAYS if retention_days is None else int(retention_days)
+    if retention_days <= 0:
+        raise ValueError("保留天数必须大于0")
+    if not _run_lock.acquire(blocking=False):
+        return None
+
+    storage = get_storage()
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    total = 0
+    with _lock:
+        _state.update(running=True, archived=0, last_error=None)
+    try:
+        while True:
+            count = _archive_batch(storage, cutoff)
+            total += count
+            with _lock:
+                _state['archived'] = total
+            if count < ARCHIVE_BATCH_SIZE:
+                break
+
+        _compact(_load_manifest(), list(_load_manifest()['months']))
+        manifest = _load_manifest()
+        manifest['last_run'] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        _save_manifest(manifest)
+        print(f"[活动归档] 归档 {total} 条 {cutoff.date()} 之前的活动")
+    except Exception as e:
+        with _lock:
+            _state['last_error'] = str(e)
+        print(f"[活动归档] 归档失败: {e}")
+        raise
+    finally:
+        with _lock:
+            _state['running'] = False
+        _run_lock.release()
+
+    if total:
+        publish('activities_archived', count=total)
+    return total
+
+# ==================== 读取 ====================
+
+def _months(manifest, start=None, end=None):
+    """与时间范围 [start, end) 重叠的月份（按时间倒序），按清单中的首末时间裁剪"""
+    months = []
+    for month, entry in manifest['months'].items():
+        if start is not None and entry['last'] and datetime.fromisoformat(entry['last']) < start:
+            continue
+        if end is not None and entry['first'] and datetime.fromisoformat(entry['first']) >= end:
+            continue
+        months.append(month)
+    return sorted(months, reverse=True)
+
+def _filter(student_id=None, module=None, start=None, end=None):
+    expression = None
+    for condition in (
+        ds.field('student_id') == student_id if student_id else None,
+        ds.field('module') == module if module else None,
+        ds.field('timestamp') >= pa.scalar(start, pa.timestamp('us', tz='UTC')) if start else None,
+        ds.field('timestamp') < pa.scalar(end, pa.timestamp('us', tz='UTC')) if end else None,
+    ):
+        if condition is not None:
+            expression = condition if expression is None else expression & condition
+    return expression
+
+def read_archived_activities(student_id=None, module=None, limit=None, start=None, end=None):
+    """
+    读取归档的活动（按时间倒序），字段与 Storage.list_activities 一致
+
+    从最新的月份开始读取，取够 limit 条后不再读取更早的月份
+    """
+    if not HAS_PYARROW:
+        return []
+    manifest = _load_manifest()
+    expression = _filter(student_id, module, start, end)
+
+    activities = []
+    for month in _months(manifest, start, end):
+        table = ds.dataset(_files(manifest, 'activities', {month}), schema=ACTIVITY_SCHEMA).to_table(filter=expression)
+        if not table.num_rows:
+            continue
+        table = table.sort_by([('timestamp', 'descending')])
+        if limit is not None:
+            table = table.slice(0, limit - len(activities))
+        for row in table.drop(['id']).to_pylist():
+            row['timestamp'] = row['timestamp'].isoformat()
+            activities.append(row)
+        if limit is not None and len(activities) >= limit:
+            break
+    return activities
+
+def activity_total(storage):
+    """
+    主存储与归档的活动总数（归档只移动活动，总数不变）
+
+    各模块持久化状态的水位线：启动时与保存的值比较，其后随 activity_logged 事件递增，
+    记录活动的请求不再查询数据库
+    """
+    manifest = _load_manifest()
+    return storage.activity_count() + sum(entry['rows'] for entry in manifest['months'].values())
+
+def iter_archived_activities():
+    """
+    逐个行组读取全部归档活动（按月份、文件先后），内存中同时只保留一个行组
+
+    归档批次按时间先后写入，合并后的文件按学号、时间排序，因此只保证同一学生的活动按时间顺序；
+    字段与 Storage.activities_since 一致（timestamp 为带时区的datetime）
+    """
+    if not HAS_PYARROW:
+        return
+    manifest = _load_manifest()
+    columns = [name for name in ACTIVITY_SCHEMA.names if name != 'student_name']
+    for month in sorted(manifest['months']):
+        for path in _files(manifest, 'activities', {month}):
+            with pq.ParquetFile(path) as parquet:
+                for batch in parquet.iter_batches(batch_size=ROW_GROUP_SIZE, columns=columns):
+                    yield from batch.to_pylist()
+
+def iter_all_activities(storage, page_size=5000):
+    """
+    遍历全部活动：先流式读取归档（更早的活动），再分页读取主存储；同一学生的活动按时间顺序
+
+    主存储按 activities_since 分页，页边界上同一时间的活动按ID去重
+    """
+    yield from iter_archived_activities()
+    since, seen = None, set()
+    while True:
+        page = storage.activities_since(since, limit=page_size)
+        fresh = [activity for activity in page if activity['id'] not in seen]
+        yield from fresh
+        if len(page) < page_size:
+            return
+        if not fresh:
+            # 同一时间的活动超过一页，扩大页面后重读
+            page_size *= 2
+            continue
+        since = page[-1]['timestamp']
+        seen = {activity['id'] for activity in page if activity['timestamp'] == since}
+
+# ==================== 由全部活动构建的状态 ====================
+
+# 重建时记录这段时间内的活动ID：重建期间到达的活动事件若已被重建读到则跳过，避免重复计入
+# （事件在活动提交后发布，活动时间早于发布时间的幅度不超过一个事务的时长）
+REBUILD_OVERLAP = timedelta(minutes=5)
+
+class RebuildableState:
+    """
+    由全部活动（主存储+归档）构建、随 activity_logged 事件增量更新、定期保存到本地文件的内存状态
+
+    各模块（知识追踪、协同推荐、间隔复习、流式统计）提供回调：
+    load(水位线) 读取保存的状态，水位线不一致时返回None；
+    rebuild(storage, since) 从数据库重建，返回 (状态, since 之后读到的活动ID集合)；
+    prepare(状态) 在锁外做换入前的计算；install(状态) 换入状态；
+    apply(事件内容) 计入一条新活动；save(水位线) 保存状态（失败时抛出异常）。
+    install、apply、save 在 lock 内调用。
+
+    水位线为状态已计入的活动总数：加载或重建前取一次，其后每条活动事件应用之后加一，
+    保存的状态从不声称包含它没有计入的活动；其他进程写入的活动使保存的值落后，下次启动时重建。
+    重建在锁外进行，记录活动的请求不等待；已有旧状态时读取继续使用旧状态，首次构建时其他读取等待
+    """
+
+    def __init__(self, name, lock, load, rebuild, install, apply, save, prepare=None, persist_interval=60):
+        self.name = name
+        self.lock = lock
+        self._load = load
+        self._rebuild = rebuild
+        self._prepare = prepare or (lambda state: state)
+        self._install = install
+        self._apply = apply
+        self._save = save
+        self.persist_interval = persist_interval
+        self._build_lock = threading.Lock()   # 同一时间只有一个线程重建
+        self._pending = []                    # 重建期间到达的活动事件
+        self.ready = False
+        self.dirty = False          # 有删除操作，下次读取前需要重建
+        self.rebuilding = False     # 正在锁外重建，新活动暂存到 _pending
+        self.changed = False        # 有未保存的更新
+        self.saved_at = 0.0
+        self.rebuild_seconds = None
+        self.watermark = None       # 已计入的活动总数（主存储+归档），未知时为None
+
+    def ensure_ready(self):
+        """首次读取或有删除操作后加载/重建，数据库不可用时返回False"""
+        with self.lock:
+            if self.ready and not self.dirty:
+                return True
+        with self._build_lock:
+            with self.lock:
+                if self.ready and not self.dirty:
+                    return True
+                reload = not self.dirty
+                self.rebuilding, self.dirty = True, False
+                self._pending.clear()
+            installed = False
+            try:
+                storage = get_storage()
+                if not storage.is_available():
+                    return False
+                # 在读取之前取水位线：期间写入的活动只会使水位线偏小（下次启动时重建），不会被当作已计入
+                watermark = activity_total(storage)
+                state = self._load(watermark) if reload else None
+                included = set()
+                if state is None:
+                    started = time.perf_counter()
+                    state, included = self._rebuild(storage, datetime.now(timezone.utc) - REBUILD_OVERLAP)
+                    self.rebuild_seconds = time.perf_counter() - started
+                    print(f"[{self.name}] 从数据库重建，耗时 {self.rebuild_seconds:.2f}s")
+                state = self._prepare(state)
+                with self.lock:
+                    self._install(state)
+                    self.ready, self.watermark = True, watermark
+                    skipped = 0
+                    for payload in self._pending:
+                        if payload.get('activity_id') in included:
+                            skipped += 1
+                            continue
+                        self._apply(payload)
+                        self.watermark += 1
+                    if self._pending:
+                        print(f"[{self.name}] 应用重建期间的 {len(self._pending) - skipped} 条新活动（跳过已包含的 {skipped} 条）")
+                    installed = True
+                    self.save()
+                return True
+            except Exception as e:
+                print(f"[{self.name}] 初始化失败: {e}")
+                return False
+            finally:
+                with self.lock:
+                    self.rebuilding = False
+                    self._pending.clear()
+                    if not installed and not reload:
+                        self.dirty = True
+
+    def on_activity(self, payload):
+        """activity_logged 事件：已就绪时计入并使水位线加一，重建期间暂存，尚未加载时忽略"""
+        with self.lock:
+            if self.rebuilding:
+                self._pending.append(payload)
+                return
+            if not self.ready:
+                return
+            self._apply(payload)
+            if self.watermark is not None:
+                self.watermark += 1
+            self.changed = True
+            if time.time() - self.saved_at > self.persist_interval:
+                self.save()
+
+    def on_student_deleted(self, remove=None):
+        """
+        删除学生：提供 remove 时就地移除（删除的活动数未知，水位线置为未知，下次启动时重建），
+        否则标记重建；重建期间总是标记重建（重建可能已读到该学生的活动）
+        """
+        with self.lock:
+            if remove is None or self.rebuilding:
+                self.dirty = True
+            elif self.ready:
+                remove()
+                self.changed, self.watermark = True, None
+
+    def mark_dirty(self):
+        """清空、修复等批量操作之后，下次读取前重建"""
+        with self.lock:
+            self.dirty = True
+
+    def save(self):
+        """保存状态和水位线（调用方持有锁，失败时只记录日志）"""
+        try:
+            self._save(self.watermark)
+            self.changed, self.saved_at = False, time.time()
+        except Exception as e:
+            print(f"[{self.name}] 保存失败: {e}")
+
+def _rollup_rows():
+    """全部归档汇总行（清单版本不变时使用缓存）"""
+    manifest = _load_manifest()
+    with _lock:
+        if _rollup_cache['version'] == manifest['version']:
+            return _rollup_cache['rows']
+    files = _files(manifest, 'rollup')
+    rows = ds.dataset(files, schema=ROLLUP_SCHEMA).to_table().to_pylist() if files else []
+    with _lock:
+        _rollup_cache.update(version=manifest['version'], rows=rows)
+    return rows
+
+def archived_cohort_rows():
+    """归档活动按 学生×模块×日期×小时 的汇总，格式与 Storage.cohort_rows 的活动行一致"""
+    if not HAS_PYARROW:
+        return []
+    return [(row['student_id'], row['module'], row['day'], row['hour'], row['count']) for row in _rollup_rows()]
+
+def archived_daily_rollup():
+    """归档活动按 学生×模块×日期 的汇总，格式与 Storage.activity_rollup 一致"""
+    if not HAS_PYARROW:
+        return []
+    counts = Counter()
+    names = {}
+    for row in _rollup_rows():
+        counts[(row['student_id'], row['module'], row['day'])] += row['count']
+        if row['student_name']:
+            names[row['student_id']] = row['student_name']
+    return [
+        {'student_id': student_id, 'name': names.get(student_id), 'module': module, 'day': day, 'count': count}
+        for (student_id, module, day), count in counts.items()
+    ]
+
+def archived_content_counts():
+    """归档活动中各模块每个学习内容的访问次数 [(模块, 内容名称, 次数)]"""
+    if not HAS_PYARROW:
+        return []
+    files = _files(_load_manifest(), 'activities')
+    if not files:
+        return []
+    table = ds.dataset(files, schema=ACTIVITY_SCHEMA).to_table(
+        columns=['module', 'content_name'], filter=ds.field('content_name').is_valid())
+    counts = table.group_by(['module', 'content_name']).aggregate([('content_name', 'count')])
+    return [(row['module'], row['content_name'], row['content_name_count']) for row in counts.to_pylist()]
+
+# ==================== 删除 ====================
+
+def delete_student(student_id):
+    """从归档中删除学生的全部活动（重写包含该学生的月份）"""
+    if not HAS_PYARROW:
+        return
+    with _run_lock:
+        manifest = _load_manifest()
+        for month in list(manifest['months']):
+            activities = ds.dataset(_files(manifest, 'activities', {month}), schema=ACTIVITY_SCHEMA).to_table()
+            keep = pc.invert(pc.equal(activities['student_id'], student_id))
+            if pc.all(keep).as_py() is not False:
+                continue
+            rollup = ds.dataset(_files(manifest, 'rollup', {month}), schema=ROLLUP_SCHEMA).to_table()
+            rollup = rollup.filter(pc.invert(pc.equal(rollup['student_id'], student_id)))
+            _rewrite_month(manifest, month, activities.filter(keep), _merge_rollup(rollup))
+
+def clear_archive():
+    """清空全部归档"""
+    with _run_lock:
+        manifest = _load_manifest()
+        paths = _files(manifest, 'activities') + _files(manifest, 'rollup')
+        manifest['months'] = {}
+        _save_manifest(manifest)
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+def _on_data_event(event, payload):
+    """数据事件订阅：删除学生或清除学习记录时同步删除归档"""
+    try:
+        if event == 'student_deleted':
+            delete_student(payload.get('student_id'))
+        elif event in ('activities_cleared', 'data_cleared'):
+            clear_archive()
+    except Exception as e:
+        print(f"[活动归档] 同步删除失败: {e}")
+
+subscribe(_on_data_event)
+
+# ==================== 自动归档 ====================
+
+def _run_quietly(retention_days=None):
+    """后台执行归档（错误已记录在状态中）"""
+    try:
+        if get_storage().is_available():
+            run_archive(retention_days)
+    except Exception:
+        pass
+    finally:
+        if not _run_lock.locked():
+            with _lock:
+                _state['running'] = False
+
+def start_archive(retention_days=None):
+    """在后台线程中执行一次归档（教师手动触发）"""
+    # 在脚本线程中先检查可用性（加载Neo4j配置），后台线程随后可直接连接
+    get_storage().is_available()
+    with _lock:
+        _state['running'] = True
+    threading.Thread(target=_run_quietly, args=(retention_days,), name="activity-archive-once", daemon=True).start()
+
+def _archive_loop():
+    """后台线程：每隔 ARCHIVE_INTERVAL_HOURS 小时归档一次"""
+    while True:
+        _run_quietly()
+        time.sleep(ARCHIVE_INTERVAL_HOURS * 3600)
+
+def ensure_scheduler():
+    """配置了保留天数时启动自动归档线程（只启动一次）"""
+    if ARCHIVE_RETENTION_DAYS <= 0 or not HAS_PYARROW:
+        return
+    # 在脚本线程中先检查可用性（加载Neo4j配置），后台线程随后可直接连接
+    if not get_storage().is_available():
+        return
+    with _lock:
+        if _scheduler[0] is not None:
+            return
+        _scheduler[0] = threading.Thread(target=_archive_loop, name="activity-archive", daemon=True)
+        _scheduler[0].start()
+
+def get_archive_status():
+    """获取归档状态：月份分区、行数、磁盘占用、最近一次运行"""
+    with _lock:
+        state = dict(_state)
+    status = {
+        'available': HAS_PYARROW,
+        'retention_days': ARCHIVE_RETENTION_DAYS,
+        'scheduled': _scheduler[0] is not None,
+        'months': [],
+        'rows': 0,
+        'bytes': 0,
+        'last_run': None,
+        **state,
+    }
+    if not HAS_PYARROW:
+        return status
+    manifest = _load_manifest()
+    status['last_run'] = manifest['last_run']
+    for month, entry in sorted(manifest['months'].items()):
+        size = 0
+        for path in _files(manifest, 'activities', {month}) + _files(manifest, 'rollup', {month}):
+            try:
+                size += os.path.getsize(path)
+            except OSError:
+                pass
+        status['months'].append({'month': month, 'rows': entry['rows'], 'files': len(entry['activities']), 'bytes': size})
+        status['rows'] += entry['rows']
+        status['bytes'] += size
+    return status
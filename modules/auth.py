@@ -5,6 +5,8 @@
 
 import streamlit as st
 from datetime import datetime
+from modules.data_cache import tagged_cache, skip_cache, publish, student_tag, module_tag, student_module_tag
+from modules.storage import get_storage
 
 # 可选导入Neo4j（仅本地开发需要）
 try:
@@ -142,164 +144,96 @@ def get_neo4j_driver():
         print(f"Neo4j连接创建失败: {e}")
         return None
 
-# 全局变量：标记Neo4j是否可用
-_neo4j_available = None
-_neo4j_error = None
-
 def check_neo4j_available():
-    """检查Neo4j是否可用"""
-    global _neo4j_available, _neo4j_error
-    
-    # 如果 Streamlit 还没准备好，返回 None（不缓存结果）
+    """检查Neo4j是否可用（读取后台探测结果，不阻塞页面渲染）"""
+    # 如果 Streamlit 还没准备好，返回 False（不触发探测）
     if not _is_streamlit_ready():
         return False
     
-    if _neo4j_available is not None:
-        return _neo4j_available
-    try:
-        driver = get_neo4j_driver()
-        if driver is None:
-            _neo4j_available = False
-            _neo4j_error = "无法创建Neo4j驱动：get_neo4j_driver()返回None"
-            print(f"[Neo4j检查失败] {_neo4j_error}")
-            return False
-            
-        with driver.session() as session:
-            result = session.run("RETURN 1")
-            result.single()
-        # 不关闭driver，保持连接池复用
-        _neo4j_available = True
-        _neo4j_error = None
-        print("[Neo4j检查成功] 连接正常")
-    except Exception as e:
-        _neo4j_available = False
-        _neo4j_error = str(e)
-        print(f"[Neo4j检查失败] {e}")
-    return _neo4j_available
+    # 在脚本线程中先加载配置，后台探测线程无法读取 st.secrets
+    _get_neo4j_config()
+    
+    from modules.content_repository import is_online
+    return is_online()
 
 def get_neo4j_error():
     """获取Neo4j连接错误信息"""
-    return _neo4j_error
+    from modules.content_repository import get_probe_error
+    return get_probe_error()
 
 def register_student(student_id, student_name):
     """注册或更新学生信息"""
+    storage = get_storage()
+    # 离线模式下跳过注册，避免登录时等待连接超时
+    if not storage.is_available():
+        return
+    
     try:
-        driver = get_neo4j_driver()
-        
-        with driver.session() as session:
-            session.run("""
-                MERGE (s:yzbx_Student {student_id: $student_id})
-                SET s.name = $name,
-                    s.last_login = datetime(),
-                    s.login_count = COALESCE(s.login_count, 0) + 1
-            """, student_id=student_id, name=student_name)
-        
-        # 不关闭driver，保持连接池复用
+        storage.register_student(student_id, student_name)
+        publish('student_registered', student_id=student_id, name=student_name)
     except Exception as e:
-        print(f"Neo4j连接失败，跳过学生注册: {e}")
+        print(f"数据库连接失败，跳过学生注册: {e}")
         pass
 
 def log_activity(student_id, activity_type, module_name, content_id=None, content_name=None, details=None):
     """记录学生学习活动"""
-    # 如果Neo4j不可用，直接跳过
-    if not check_neo4j_available():
+    storage = get_storage()
+    # 如果存储不可用，直接跳过
+    if not storage.is_available():
         return
     
     try:
-        driver = get_neo4j_driver()
+        activity_id, timestamp = storage.log_activity(student_id, activity_type, module_name, content_id, content_name, details)
         
-        with driver.session() as session:
-            session.run("""
-                MERGE (s:yzbx_Student {student_id: $student_id})
-                CREATE (a:yzbx_Activity {
-                    id: randomUUID(),
-                    activity_type: $activity_type,
-                    module_name: $module_name,
-                    content_id: $content_id,
-                    content_name: $content_name,
-                    details: $details,
-                    timestamp: datetime()
-                })
-                CREATE (s)-[:PERFORMED]->(a)
-            """, student_id=student_id, activity_type=activity_type, 
-                module_name=module_name, content_id=content_id,
-                content_name=content_name, details=details)
+        # 发布数据事件：失效相关缓存，增量更新排行榜（附带数据库中的活动ID和时间）
+        publish('activity_logged', student_id=student_id, module_name=module_name,
+                activity_type=activity_type, content_id=content_id, content_name=content_name, details=details,
+                activity_id=activity_id, timestamp=timestamp)
     except Exception as e:
         pass
 
-@st.cache_data(ttl=300, show_spinner=False)  # 缓存5分钟
+@tagged_cache(lambda args: {'students', 'activities'})
 def get_all_students():
     """获取所有学生列表"""
-    if not check_neo4j_available():
+    from modules.replica import get_analytics_storage
+    storage = get_analytics_storage()
+    if not storage.is_available():
+        skip_cache()
         return []
     
     try:
-        driver = get_neo4j_driver()
-        
-        with driver.session() as session:
-            result = session.run("""
-                MATCH (s:yzbx_Student)
-                OPTIONAL MATCH (s)-[:PERFORMED]->(a:yzbx_Activity)
-                WITH s, count(a) as activity_count
-                RETURN s.student_id as student_id, 
-                       activity_count
-                ORDER BY activity_count DESC
-            """)
-            
-            students = [dict(record) for record in result]
-        
-        return students
+        return storage.list_students()
     except:
+        skip_cache()
         return []
 
-@st.cache_data(ttl=300, show_spinner=False)  # 缓存5分钟
+def activity_list_tags(args):
+    """活动记录查询的缓存标签：按学生/模块筛选时只依赖对应学生/模块"""
+    student_id, module = args['student_id'], args['module']
+    if student_id and module:
+        return {student_module_tag(student_id, module)}
+    if student_id:
+        return {student_tag(student_id)}
+    if module:
+        return {module_tag(module)}
+    return {'activities'}
+
+@tagged_cache(activity_list_tags)
 def get_student_activities(student_id=None, module=None, limit=100):
-    """获取学生活动记录"""
-    if not check_neo4j_available():
+    """获取学生活动记录（主存储不足 limit 条时继续读取归档）"""
+    storage = get_storage()
+    if not storage.is_available():
+        skip_cache()
         return []
     
     try:
-        driver = get_neo4j_driver()
-        
-        with driver.session() as session:
-            query = """
-                MATCH (s:yzbx_Student)-[:PERFORMED]->(a:yzbx_Activity)
-                WHERE 1=1
-            """
-            params = {"limit": limit}
-            
-            if student_id:
-                query += " AND s.student_id = $student_id"
-                params["student_id"] = student_id
-            
-            if module:
-                query += " AND COALESCE(a.module_name, a.module) = $module"
-                params["module"] = module
-            
-            query += """
-                RETURN s.student_id as student_id,
-                       s.name as student_name,
-                       COALESCE(a.activity_type, a.type) as activity_type,
-                       COALESCE(a.module_name, a.module) as module,
-                       a.content_id as content_id,
-                       a.content_name as content_name,
-                       a.details as details,
-                       a.timestamp as timestamp
-                ORDER BY a.timestamp DESC
-                LIMIT $limit
-            """
-            
-            result = session.run(query, **params)
-            activities = []
-            for record in result:
-                activity = dict(record)
-                # 将timestamp转换为字符串，避免Date序列化问题
-                if 'timestamp' in activity and activity['timestamp']:
-                    activity['timestamp'] = str(activity['timestamp'])
-                activities.append(activity)
-        
+        activities = storage.list_activities(student_id, module, limit)
+        if len(activities) < limit:
+            from modules.archive import read_archived_activities
+            activities += read_archived_activities(student_id, module, limit - len(activities))
         return activities
     except Exception as e:
+        skip_cache()
         print(f"获取学生活动失败: {e}")
         return []
 
@@ -329,81 +263,54 @@ def get_module_statistics():
     except:
         return []
 
-@st.cache_data(ttl=300, show_spinner=False)  # 缓存5分钟
+@tagged_cache(lambda args: {'activities'})
 def get_all_modules_statistics():
-    """一次性获取所有模块的统计数据（性能优化）"""
-    if not check_neo4j_available():
-        return {}
-    
+    """一次性获取所有模块的统计数据（读取流式统计，学生数为HyperLogLog估计值）"""
     try:
-        driver = get_neo4j_driver()
+        from modules.sketches import all_module_reach
+        reach = all_module_reach()
+        if reach is None:
+            skip_cache()
+            return {}
         
-        with driver.session() as session:
-            result = session.run("""
-                MATCH (s:yzbx_Student)-[:PERFORMED]->(a:yzbx_Activity)
-                WITH COALESCE(a.module_name, a.module) as module, count(a) as total_visits, count(DISTINCT s) as unique_students
-                RETURN module, total_visits, unique_students
-            """)
-            
-            stats_dict = {}
-            for record in result:
-                module = record['module']
-                total_visits = record['total_visits']
-                unique_students = record['unique_students']
-                avg_visits = round(total_visits / unique_students, 1) if unique_students > 0 else 0
-                stats_dict[module] = {
-                    'module': module,
-                    'total_visits': total_visits,
-                    'unique_students': unique_students,
-                    'avg_visits_per_student': avg_visits
-                }
+        stats_dict = {}
+        for module, (total_visits, unique_students) in reach.items():
+            avg_visits = round(total_visits / unique_students, 1) if unique_students > 0 else 0
+            stats_dict[module] = {
+                'module': module,
+                'total_visits': total_visits,
+                'unique_students': unique_students,
+                'avg_visits_per_student': avg_visits
+            }
         
         return stats_dict
     except Exception as e:
+        skip_cache()
         print(f"获取所有模块统计失败: {e}")
         return {}
 
-@st.cache_data(ttl=300, show_spinner=False)  # 缓存5分钟
+@tagged_cache(lambda args: {module_tag(args['module_name'])}, daily=True)
 def get_single_module_statistics(module_name):
     """获取单个模块的详细统计"""
-    if not check_neo4j_available():
-        return {
-            'module': module_name,
-            'total_visits': 0,
-            'unique_students': 0,
-            'avg_visits_per_student': 0,
-            'recent_7d_visits': 0
-        }
-    
+    empty_stats = {
+        'module': module_name,
+        'total_visits': 0,
+        'unique_students': 0,
+        'avg_visits_per_student': 0,
+        'recent_7d_visits': 0
+    }
     try:
-        driver = get_neo4j_driver()
+        from modules.sketches import module_reach
+        reach = module_reach(module_name)
+        if reach is None:
+            skip_cache()
+            return empty_stats
         
-        with driver.session() as session:
-            # 总访问次数和学生数
-            result = session.run("""
-                MATCH (s:yzbx_Student)-[:PERFORMED]->(a:yzbx_Activity)
-                WHERE COALESCE(a.module_name, a.module) = $module
-                RETURN count(a) as total_activities,
-                       count(DISTINCT s) as unique_students
-            """, module=module_name)
-            
-            record = result.single()
-            total_activities = record['total_activities'] if record else 0
-            unique_students = record['unique_students'] if record else 0
-            
-            # 计算人均访问次数
-            avg_visits = round(total_activities / unique_students, 1) if unique_students > 0 else 0
-            
-            # 近7天访问
-            result = session.run("""
-                MATCH (a:yzbx_Activity)
-                WHERE COALESCE(a.module_name, a.module) = $module
-                  AND a.timestamp > datetime() - duration('P7D')
-                RETURN count(a) as recent_count
-            """, module=module_name)
-            
-            record = result.single()
-            recent_count = record['recent_count'] if record else 0
+        # 学生数为HyperLogLog估计值，近7天按日期统计
+        total_activities, unique_students, recent_count = reach
+        
+        # 计算人均访问次数
+        avg_visits = round(total_activities / unique_students, 1) if unique_students > 0 else 0
         
         return {
             'module': module_name,
@@ -413,50 +320,9 @@ def get_single_module_statistics(module_name):
             'recent_7d_visits': recent_count
         }
     except Exception as e:
+        skip_cache()
         print(f"获取模块统计失败 {module_name}: {e}")
-        return {
-            'module': module_name,
-            'total_visits': 0,
-            'unique_students': 0,
-            'avg_visits_per_student': 0,
-            'recent_7d_visits': 0
-        }
-
-def delete_student_data(student_id):
-    """删除学生及其所有活动数据"""
-    if not check_neo4j_available():
-        return
-    
-    try:
-        driver = get_neo4j_driver()
-        
-        with driver.session() as session:
-            # 删除活动记录
-            session.run("""
-                MATCH (s:yzbx_Student {student_id: $student_id})-[:PERFORMED]->(a:yzbx_Activity)
-                DETACH DELETE a
-            """, student_id=student_id)
-            
-            # 删除学生节点
-            session.run("""
-                MATCH (s:yzbx_Student {student_id: $student_id})
-                DETACH DELETE s
-            """, student_id=student_id)
-    except:
-        pass
-
-def delete_all_activities():
-    """删除所有活动记录"""
-    if not check_neo4j_available():
-        return
-    
-    try:
-        driver = get_neo4j_driver()
-        
-        with driver.session() as session:
-            session.run("MATCH (a:yzbx_Activity) DETACH DELETE a")
-    except:
-        pass
+        return empty_stats
 
 def render_login_page():
     """渲染登录页面"""
@@ -542,5 +408,5 @@ def logout():
         del st.session_state[key]
     
     # 重置Neo4j可用性检查
-    global _neo4j_available
-    _neo4j_available = None
+    from modules.content_repository import refresh_probe
+    refresh_probe()
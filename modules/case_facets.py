@@ -0,0 +1,175 @@
+"""
+病例分面筛选模块
+导入时为每个分面（难度、诊断类别、分期、分级、年龄段、性别、吸烟、全身疾病）的每个取值
+预先构建病例位图（Python整数，第 i 位表示第 i 个病例）；筛选条件变化时只做位与/位或，
+各取值的计数用 popcount 计算，病例再多也不需要在每次重跑时遍历病例
+"""
+
+import re
+
+from modules.case_store import get_all_cases
+from modules.case_similarity import stage_grade
+
+# 分面：键 -> 显示名称（按页面上的显示顺序）
+FACETS = {
+    'difficulty': '难度',
+    'category': '诊断类别',
+    'stage': '分期',
+    'grade': '分级',
+    'age_band': '年龄段',
+    'gender': '性别',
+    'smoking': '吸烟',
+    'systemic': '全身疾病',
+}
+
+# 诊断类别：按顺序匹配诊断中的关键词
+DIAGNOSIS_CATEGORIES = (
+    ('牙周-牙髓联合病变', ('牙髓',)),
+    ('牙周炎', ('牙周炎',)),
+    ('牙龈病', ('牙龈',)),
+)
+
+# 年龄段：(下限, 上限, 名称)，上限不含
+AGE_BANDS = (
+    (0, 30, '30岁以下'),
+    (30, 45, '30-44岁'),
+    (45, 60, '45-59岁'),
+    (60, None, '60岁及以上'),
+)
+
+# 既往史中识别的全身疾病（否认、排除的分句不计入）
+SYSTEMIC_DISEASES = ('糖尿病', '高血压', '冠心病', '血液系统疾病', '骨质疏松')
+
+STAGE_LABELS = {1: 'I期', 2: 'II期', 3: 'III期', 4: 'IV期'}
+
+# 取值的显示顺序（未列出的按首次出现的顺序排在后面）
+VALUE_ORDER = {
+    'difficulty': ('简单', '中等', '困难'),
+    'category': ('牙周炎', '牙龈病', '牙周-牙髓联合病变'),
+    'stage': tuple(STAGE_LABELS.values()),
+    'grade': ('A级', 'B级', 'C级'),
+    'age_band': tuple(name for _, _, name in AGE_BANDS),
+    'smoking': ('是', '否'),
+    'systemic': SYSTEMIC_DISEASES + ('无',),
+}
+
+# ==================== 病例属性 ====================
+
+def _history_section(case, name):
+    """病史中的某一节（如 既往史、个人史），没有时为空字符串"""
+    match = re.search(rf"【{name}】(.*?)(?=【|$)", case.get('medical_history', ''), re.S)
+    return match.group(1) if match else ""
+
+def _age_band(age):
+    if not isinstance(age, (int, float)):
+        return None
+    return next(name for low, high, name in AGE_BANDS if age >= low and (high is None or age < high))
+
+def _smoking(case, patient):
+    """吸烟情况：病例字段优先，否则从个人史判断"""
+    if isinstance(patient.get('smoking'), bool):
+        return '是' if patient['smoking'] else '否'
+    personal = _history_section(case, '个人史')
+    if re.search(r"不吸烟|否认吸烟", personal):
+        return '否'
+    if '吸烟' in personal:
+        return '是'
+    return None
+
+def _systemic(case, patient):
+    """全身疾病列表：病例字段优先，否则从既往史中未被否认的分句识别；没有时为 ['无']"""
+    text = patient.get('systemic_disease')
+    if text is None:
+        clauses = re.split(r"[。，,；;]", _history_section(case, '既往史'))
+        text = "，".join(clause for clause in clauses if not re.search(r"否认|排除|未见", clause))
+    return [disease for disease in SYSTEMIC_DISEASES if disease in text] or ['无']
+
+def case_attributes(case):
+    """病例在各分面的取值 {分面: [取值]}（取不到的分面为空列表）"""
+    patient = case.get('patient_info', {})
+    diagnosis = case.get('diagnosis', '')
+    stage, grade = stage_grade(diagnosis)
+    category = next((name for name, keywords in DIAGNOSIS_CATEGORIES if any(k in diagnosis for k in keywords)), None)
+    values = {
+        'difficulty': case.get('difficulty'),
+        'category': category,
+        'stage': STAGE_LABELS.get(stage),
+        'grade': f"{grade}级" if grade else None,
+        'age_band': _age_band(patient.get('age')),
+        'gender': patient.get('gender'),
+        'smoking': _smoking(case, patient),
+    }
+    attributes = {facet: [value] if value else [] for facet, value in values.items()}
+    attributes['systemic'] = _systemic(case, patient)
+    return attributes
+
+# ==================== 位图索引 ====================
+
+def build_facet_index(cases):
+    """构建位图索引 {分面: {取值: 位图}}（取值按 VALUE_ORDER 排序）"""
+    bitmaps = {facet: {} for facet in FACETS}
+    for i, case in enumerate(cases):
+        for facet, values in case_attributes(case).items():
+            for value in values:
+                bitmaps[facet][value] = bitmaps[facet].get(value, 0) | (1 << i)
+    for facet, by_value in bitmaps.items():
+        order = VALUE_ORDER.get(facet, ())
+        rank = {value: n for n, value in enumerate(order)}
+        bitmaps[facet] = dict(sorted(by_value.items(), key=lambda item: rank.get(item[0], len(order))))
+    return bitmaps
+
+# 病例存储在进程内不变，导入时构建一次
+CASES = get_all_cases()
+ALL_CASES = (1 << len(CASES)) - 1
+_bitmaps = build_facet_index(CASES)
+
+def _match(selections, skip=None):
+    """
+    符合筛选条件的病例位图：同一分面内的取值取并集，不同分面之间取交集
+
+    skip: 忽略该分面的条件（计算该分面各取值的计数时使用）
+    """
+    result = ALL_CASES
+    for facet, values in selections.items():
+        if facet == skip or not values:
+            continue
+        union = 0
+        for value in values:
+            union |= _bitmaps[facet].get(value, 0)
+        result &= union
+    return result
+
+def _positions(bitmap):
+    """位图中置位的病例下标（升序）"""
+    positions = []
+    while bitmap:
+        low = bitmap & -bitmap
+        positions.append(low.bit_length() - 1)
+        bitmap ^= low
+    return positions
+
+# ==================== 读取接口 ====================
+
+def facet_values():
+    """各分面的全部取值 {分面: [取值]}"""
+    return {facet: list(by_value) for facet, by_value in _bitmaps.items()}
+
+def filter_cases(selections):
+    """
+    按分面筛选病例，返回符合条件的病例记录列表（保持病例顺序）
+
+    selections: {分面: 选中的取值集合}，未选择的分面不限制
+    """
+    return [CASES[i] for i in _positions(_match(selections))]
+
+def facet_counts(selections):
+    """
+    各分面各取值在当前筛选条件下的病例数 {分面: {取值: 数量}}
+
+    某分面的计数忽略该分面自身的条件（同一分面内多选是并集，选中一个取值不会把其他取值计为0）
+    """
+    counts = {}
+    for facet, by_value in _bitmaps.items():
+        base = _match(selections, skip=facet)
+        counts[facet] = {value: (bitmap & base).bit_count() for value, bitmap in by_value.items()}
+    return counts
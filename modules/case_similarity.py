@@ -0,0 +1,213 @@
+"""
+相似病例模块
+按症状、诊断、分期分级、涉及知识点（Jaccard）和病例文本向量（余弦）计算 病例×病例 相似度矩阵，
+与每个病例的Top-K相似病例一起保存到本地文件；病例新增或修改时只重算变化病例所在的行列，
+病例页面直接按下标读取预计算的结果
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from modules.case_store import get_all_cases, get_case
+from modules.content_repository import DATA_DIR
+from modules.mastery import case_knowledge
+
+SIMILARITY_PATH = os.path.join(DATA_DIR, "case_similarity.npz")
+
+# 每个病例保存的相似病例数
+TOP_K = 5
+
+# 各部分的权重（合计为1）
+SIMILARITY_WEIGHTS = {
+    'symptoms': 0.3,
+    'diagnosis': 0.2,
+    'stage_grade': 0.1,
+    'knowledge': 0.2,
+    'text': 0.2,
+}
+
+# 文本向量的哈希维度（特征哈希不依赖全局词表，新增病例时已有向量不变）
+TEXT_DIMENSIONS = 4096
+TEXT_FIELDS = ('chief_complaint', 'present_illness', 'clinical_manifestation', 'diagnosis_analysis', 'key_points')
+
+STAGES = {'I': 1, 'II': 2, 'III': 3, 'IV': 4}
+
+# ==================== 特征 ====================
+
+def _bigrams(text):
+    text = re.sub(r"[\s（）()，,、：:；;。]+", "", text)
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+def _text(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (list, tuple)):
+        return "\n".join(_text(item) for item in value)
+    if hasattr(value, 'items'):
+        return "\n".join(_text(item) for item in value.values())
+    return str(value)
+
+def stage_grade(diagnosis):
+    """从诊断中解析分期和分级（"III期B级" 或 "Stage III, Grade B"），没有时为None"""
+    stage = re.search(r"Stage\s*(IV|I{1,3})\b|(IV|I{1,3})\s*期", diagnosis)
+    grade = re.search(r"([ABC])\s*级|Grade\s*([ABC])\b", diagnosis)
+    return (
+        STAGES[next(g for g in stage.groups() if g)] if stage else None,
+        next(g for g in grade.groups() if g) if grade else None,
+    )
+
+def _text_vector(case):
+    """病例文本的字符二元组哈希向量（L2归一化）"""
+    vector = np.zeros(TEXT_DIMENSIONS, dtype=np.float32)
+    text = "".join(_text(case.get(field, "")) for field in TEXT_FIELDS)
+    for gram in _bigrams(text):
+        vector[zlib.crc32(gram.encode("utf-8")) % TEXT_DIMENSIONS] += 1
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def case_features(case):
+    """病例的相似度特征"""
+    diagnosis = case.get('diagnosis', '')
+    return {
+        'symptoms': set().union(*(_bigrams(symptom) for symptom in case.get('symptoms', ()))),
+        'diagnosis': _bigrams(re.sub(r"（.*?）|\(.*?\)", "", diagnosis)),
+        'stage_grade': stage_grade(diagnosis),
+        'knowledge': set(case_knowledge(case)),
+        'text': _text_vector(case),
+    }
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b) if a | b else 0.0
+
+def _stage_similarity(a, b):
+    """分期相差每级扣1/3，分级相同再加分；任一病例没有分期分级时为0"""
+    (stage_a, grade_a), (stage_b, grade_b) = a, b
+    if stage_a is None or stage_b is None:
+        return 0.0
+    score = 1 - abs(stage_a - stage_b) / 3
+    if grade_a is not None and grade_b is not None:
+        score = (score + (grade_a == grade_b)) / 2
+    return score
+
+def pair_similarity(a, b):
+    """两个病例特征的加权相似度（0-1）"""
+    parts = {
+        'symptoms': _jaccard(a['symptoms'], b['symptoms']),
+        'diagnosis': _jaccard(a['diagnosis'], b['diagnosis']),
+        'stage_grade': _stage_similarity(a['stage_grade'], b['stage_grade']),
+        'knowledge': _jaccard(a['knowledge'], b['knowledge']),
+        'text': float(a['text'] @ b['text']),
+    }
+    return sum(SIMILARITY_WEIGHTS[name] * value for name, value in parts.items())
+
+def _signature(case):
+    return hashlib.sha1(json.dumps(case.to_dict(), ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+# ==================== 相似度矩阵 ====================
+
+_lock = threading.Lock()
+_index = {}   # {'ids', 'positions', 'matrix', 'top'}
+
+def _top_k(matrix):
+    """每行相似度最高的 TOP_K 个下标（排除自身）"""
+    scores = matrix.astype(np.float32)
+    np.fill_diagonal(scores, -np.inf)
+    k = min(TOP_K, max(len(scores) - 1, 0))
+    return np.argsort(-scores, axis=1, kind='stable')[:, :k].astype(np.int32)
+
+def _load():
+    try:
+        with np.load(SIMILARITY_PATH, allow_pickle=False) as data:
+            return data['ids'].tolist(), data['signatures'].tolist(), data['matrix'].astype(np.float32)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[相似病例] 读取失败: {e}")
+        return None
+
+def build_similarity(cases, previous=None):
+    """
+    计算相似度矩阵（float16）和Top-K下标
+
+    previous 为已保存的 (病例ID, 签名, 矩阵)：内容未变的病例之间直接复用，
+    只计算新增或修改过的病例所在的行列；
+    返回 (矩阵, Top-K, 病例ID列表, 签名列表, 重算的病例数)
+    """
+    ids = [case.id for case in cases]
+    signatures = [_signature(case) for case in cases]
+    n = len(cases)
+    matrix = np.eye(n, dtype=np.float32)
+
+    reused = {}
+    if previous is not None:
+        old_ids, old_signatures, old_matrix = previous
+        old_positions = {case_id: i for i, case_id in enumerate(old_ids)}
+        reused = {
+            i: old_positions[case_id] for i, case_id in enumerate(ids)
+            if case_id in old_positions and old_signatures[old_positions[case_id]] == signatures[i]
+        }
+        kept = np.array(sorted(reused), dtype=np.int64)
+        if len(kept):
+            old = np.array([reused[i] for i in kept], dtype=np.int64)
+            matrix[np.ix_(kept, kept)] = old_matrix[np.ix_(old, old)]
+
+    changed = [i for i in range(n) if i not in reused]
+    if changed:
+        features = [case_features(case) for case in cases]
+        for i in changed:
+            for j in range(n):
+                if i != j:
+                    matrix[i, j] = matrix[j, i] = pair_similarity(features[i], features[j])
+    return matrix.astype(np.float16), _top_k(matrix), ids, signatures, len(changed)
+
+def _save(ids, signatures, matrix, top):
+    try:
+        tmp_path = SIMILARITY_PATH + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(f, ids=np.array(ids, dtype=str), signatures=np.array(signatures, dtype=str),
+                                matrix=matrix, top=top)
+        os.replace(tmp_path, SIMILARITY_PATH)
+    except Exception as e:
+        print(f"[相似病例] 保存失败: {e}")
+
+def _ensure_index():
+    """首次使用时加载；病例有新增或修改时增量重算并保存"""
+    if _index:
+        return _index
+    cases = get_all_cases()
+    previous = _load()
+    started = time.perf_counter()
+    matrix, top, ids, signatures, changed = build_similarity(cases, previous)
+    if changed or previous is None or previous[0] != ids:
+        _save(ids, signatures, matrix, top)
+        print(f"[相似病例] 重算 {changed}/{len(ids)} 个病例，耗时 {(time.perf_counter() - started) * 1000:.1f}ms")
+    _index.update(ids=ids, positions={case_id: i for i, case_id in enumerate(ids)}, matrix=matrix, top=top)
+    return _index
+
+# ==================== 读取接口 ====================
+
+def similar_cases(case_id, k=TOP_K):
+    """与指定病例最相似的病例 [(病例记录, 相似度)]，按预计算的Top-K直接读取"""
+    with _lock:
+        index = _ensure_index()
+    position = index['positions'].get(case_id)
+    if position is None:
+        return []
+    row = index['matrix'][position]
+    return [(get_case(index['ids'][j]), float(row[j])) for j in index['top'][position][:k]]
+
+def case_similarity(case_a, case_b):
+    """两个病例的相似度（预计算矩阵中的值），病例不存在时返回None"""
+    with _lock:
+        index = _ensure_index()
+    a, b = index['positions'].get(case_a), index['positions'].get(case_b)
+    if a is None or b is None:
+        return None
+    return float(index['matrix'][a, b])
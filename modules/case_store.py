@@ -0,0 +1,96 @@
+"""
+病例存储模块
+将示例病例转换为不可变记录，每个进程只构建一次，并建立ID和标题索引；
+各页面直接共享同一份记录，重跑时无需复制病例数据
+"""
+
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from modules.content_repository import get_sample_cases
+
+def freeze(value):
+    """递归转换为不可变结构：dict -> mappingproxy，list -> tuple"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+@dataclass(frozen=True, eq=False)
+class CaseRecord:
+    """
+    不可变病例记录
+
+    常用字段作为属性；同时支持 case['key']、case.get()、'key' in case，
+    与原来的字典用法兼容
+    """
+    __slots__ = ('id', 'title', 'difficulty', 'diagnosis', 'fields')
+
+    id: str
+    title: str
+    difficulty: str
+    diagnosis: str
+    fields: MappingProxyType
+
+    @classmethod
+    def from_dict(cls, case):
+        fields = freeze(case)
+        return cls(
+            id=fields.get('id'),
+            title=fields.get('title', ''),
+            difficulty=fields.get('difficulty', ''),
+            diagnosis=fields.get('diagnosis', ''),
+            fields=fields,
+        )
+
+    def __getitem__(self, key):
+        return self.fields[key]
+
+    def __contains__(self, key):
+        return key in self.fields
+
+    def get(self, key, default=None):
+        return self.fields.get(key, default)
+
+    def keys(self):
+        return self.fields.keys()
+
+    def to_dict(self):
+        """转换为普通字典（需要修改或序列化时使用）"""
+        def thaw(value):
+            if isinstance(value, MappingProxyType):
+                return {key: thaw(item) for key, item in value.items()}
+            if isinstance(value, tuple):
+                return [thaw(item) for item in value]
+            return value
+        return thaw(self.fields)
+
+def _build_store(cases):
+    """构建病例记录元组和索引"""
+    records = tuple(CaseRecord.from_dict(case) for case in cases)
+    by_id = {}
+    by_title = {}
+    for record in records:
+        by_id.setdefault(record.id, record)
+        by_title.setdefault(record.title, record)
+    return records, MappingProxyType(by_id), MappingProxyType(by_title), tuple(by_title)
+
+# 导入时构建一次，进程内所有会话共享
+_records, _by_id, _by_title, _titles = _build_store(get_sample_cases())
+
+def get_all_cases():
+    """获取全部病例记录（不可变元组，调用方直接共享）"""
+    return _records
+
+def get_case(case_id):
+    """按ID获取病例记录，不存在时返回None"""
+    return _by_id.get(case_id)
+
+def find_case_by_title(title):
+    """按标题获取病例记录，不存在时返回None"""
+    return _by_title.get(title)
+
+def get_case_titles():
+    """获取全部病例标题（按病例顺序）"""
+    return _titles
@@ -3,21 +3,14 @@
 实时弹幕互动与AI总结
 """
 
+import time
 import streamlit as st
 from datetime import datetime
 from openai import OpenAI
 from streamlit_autorefresh import st_autorefresh
 from config.settings import *
-
-def check_neo4j_available():
-    """检查Neo4j是否可用"""
-    from modules.auth import check_neo4j_available as auth_check
-    return auth_check()
-
-def get_neo4j_driver():
-    """获取Neo4j连接（复用auth模块的缓存连接）"""
-    from modules.auth import get_neo4j_driver as auth_get_driver
-    return auth_get_driver()
+from modules.storage import get_storage
+from modules.prompt_builder import make_section, build_prompt, truncate_to_tokens, record_llm_call, format_llm_report
 
 def get_current_student():
     """获取当前学生信息"""
@@ -43,113 +36,73 @@ def log_interaction_activity(activity_type, content_id=None, content_name=None,
 
 def create_question(question_text):
     """教师创建问题"""
-    if not check_neo4j_available():
+    storage = get_storage()
+    if not storage.is_available():
         return None
     
     try:
-        driver = get_neo4j_driver()
-        
-        with driver.session() as session:
-            # 先关闭所有活跃问题
-            session.run("MATCH (q:yzbx_Question {status: 'active'}) SET q.status = 'closed'")
-            
-            # 创建新问题
-            result = session.run("""
-                CREATE (q:yzbx_Question {
-                    id: randomUUID(),
-                    text: $text,
-                    created_at: datetime(),
-                    status: 'active'
-                })
-                RETURN q.id as id
-            """, text=question_text)
-            
-            question_id = result.single()['id']
-        
-        return question_id
+        return storage.create_question(question_text)
     except Exception:
         return None
 
 def get_active_question():
     """获取当前活跃问题"""
-    if not check_neo4j_available():
+    storage = get_storage()
+    if not storage.is_available():
         return None
     
     try:
-        driver = get_neo4j_driver()
-        
-        with driver.session() as session:
-            result = session.run("""
-                MATCH (q:yzbx_Question {status: 'active'})
-                RETURN q.id as id, q.text as text, q.created_at as created_at
-                ORDER BY q.created_at DESC
-                LIMIT 1
-            """)
-            
-            record = result.single()
-            question = dict(record) if record else None
-        
-        return question
+        return storage.get_active_question()
     except Exception:
         return None
 
 def submit_reply(question_id, student_name, content):
     """学生提交回复"""
-    if not check_neo4j_available():
+    storage = get_storage()
+    if not storage.is_available():
         return
     
     try:
-        driver = get_neo4j_driver()
+        storage.submit_reply(question_id, student_name, content)
         
-        with driver.session() as session:
-            session.run("""
-                MATCH (q:yzbx_Question {id: $question_id})
-                MERGE (s:yzbx_Student {name: $student_name})
-                CREATE (s)-[:REPLIED {
-                    content: $content,
-                    timestamp: datetime(),
-                    length: size($content)
-                }]->(q)
-            """, question_id=question_id, student_name=student_name, content=content)
+        from modules.data_cache import publish
+        publish('reply_submitted', student_id=student_name, question_id=question_id)
     except Exception:
         pass
 
 def get_recent_replies(question_id, limit=20):
     """获取最新回复"""
-    if not check_neo4j_available():
+    storage = get_storage()
+    if not storage.is_available():
         return []
     
     try:
-        driver = get_neo4j_driver()
-        
-        with driver.session() as session:
-            result = session.run("""
-                MATCH (s:yzbx_Student)-[r:REPLIED]->(q:yzbx_Question {id: $question_id})
-                RETURN s.name as student_name, r.content as content, r.timestamp as timestamp
-                ORDER BY r.timestamp DESC
-                LIMIT $limit
-            """, question_id=question_id, limit=limit)
-            
-            replies = [dict(record) for record in result]
-        
-        return replies
+        return storage.list_replies(question_id, limit)
     except Exception:
         return []
 
 def summarize_replies_with_ai(question_text, replies):
-    """使用AI总结学生回复"""
+    """使用AI总结学生回复，返回 (总结内容, 调用统计)"""
     client = OpenAI(
         api_key=DEEPSEEK_API_KEY,
-        base_url=DEEPSEEK_BASE_URL
+        base_url=DEEPSEEK_BASE_URL,
+        timeout=LLM_TIMEOUT_SECONDS
     )
     
-    replies_text = '\n'.join([f"- {r['content']}" for r in replies])
+    # 回复按时间倒序排列，越新的回复优先级越高；单条回复过长时按token截断
+    reply_items = [
+        (len(replies) - i, f"- {r['content']}")
+        for i, r in enumerate(replies)
+    ]
     
-    prompt = f"""
-课堂问题：{question_text}
+    sections = [
+        make_section("question", f"""
+课堂问题：{truncate_to_tokens(question_text, 200)}
 
 学生回复（共{len(replies)}条）：
-{replies_text}
+"""),
+        make_section("replies", items=reply_items, item_max_tokens=80),
+        make_section("task", """
 
 请完成以下任务：
 1. **核心观点总结**：归纳学生回复中的主要观点（分点列出）
@@ -158,15 +111,20 @@ def summarize_replies_with_ai(question_text, replies):
 4. **补充说明**：针对学生的理解，给出教师应补充的要点
 
 请用简洁、专业的语言，帮助教师快速掌握学生的学习情况。
-"""
+"""),
+    ]
+    prompt, prompt_report = build_prompt(sections, LLM_PROMPT_TOKEN_BUDGET)
     
+    started_at = time.time()
     response = client.chat.completions.create(
-        model="deepseek-chat",
+        model=LLM_MODEL,
         messages=[{"role": "user", "content": prompt}],
+        max_tokens=LLM_MAX_OUTPUT_TOKENS,
         stream=False
     )
+    llm_report = record_llm_call(prompt_report, response, started_at, label="回复总结")
     
-    return response.choices[0].message.content
+    return response.choices[0].message.content, llm_report
 
 def render_classroom_interaction():
     """渲染课中互动页面"""
@@ -224,9 +182,10 @@ def render_classroom_interaction():
                 if st.button("🤖 AI总结回复"):
                     with st.spinner("AI正在分析..."):
                         try:
-                            summary = summarize_replies_with_ai(current_q['text'], replies)
+                            summary, llm_report = summarize_replies_with_ai(current_q['text'], replies)
                             st.markdown("### AI总结")
                             st.success(summary)
+                            st.caption(f"📏 {format_llm_report(llm_report)}")
                         except Exception as e:
                             st.error(f"AI总结失败: {str(e)}")
             else:
@@ -267,7 +226,7 @@ def render_classroom_interaction():
                     # 记录回答活动
                     log_interaction_activity("提交回答", content_id=current_q['id'], 
                                            content_name=current_q['text'][:30], 
-                                           details=f"回答内容: {answer[:50]}")
+                                           details=f"回答内容: {truncate_to_tokens(answer, 40)}")
                     st.success("✅ 回答已提交！")
                     st.rerun()
                 elif not student_name:
@@ -317,7 +276,7 @@ def render_classroom_interaction():
             if st.button("💾 保存练习"):
                 if practice_answer:
                     log_interaction_activity("练习回答", content_name=selected_practice[:30], 
-                                           details=f"练习内容: {practice_answer[:50]}")
+                                           details=f"练习内容: {truncate_to_tokens(practice_answer, 40)}")
                     st.success("✅ 练习已保存！")
                 else:
                     st.warning("请输入练习内容")
@@ -0,0 +1,357 @@
+"""
+班级对比分析模块
+一次查询计算全班学生的特征向量，支持百分位排名、Z分数和K-means分组
+"""
+
+import threading
+import time
+from datetime import date
+
+import numpy as np
+import streamlit as st
+
+from modules.data_cache import tagged_cache, skip_cache, today as utc_today
+from modules.replica import get_analytics_storage
+from modules.archive import archived_cohort_rows
+from modules.review import class_due_summary
+
+# 四个学习模块（特征向量中的模块占比按此顺序排列）
+COHORT_MODULES = ["病例库", "知识图谱", "能力推荐", "课中互动"]
+
+# 时段划分：(名称, 起始小时, 结束小时)
+TIME_BUCKETS = [
+    ("凌晨", 0, 6),
+    ("上午", 6, 12),
+    ("下午", 12, 18),
+    ("晚上", 18, 24),
+]
+
+# 用于综合投入度评分的特征（recency为负向指标）
+ENGAGEMENT_FEATURES = ["activity_count", "active_days", "reply_count", "days_since_active"]
+
+FEATURE_LABELS = {
+    "activity_count": "活动次数",
+    "active_days": "活跃天数",
+    "reply_count": "互动回复数",
+    "days_since_active": "距上次学习(天)",
+}
+for _m in COHORT_MODULES:
+    FEATURE_LABELS[f"module_{_m}"] = f"{_m}占比"
+for _name, _, _ in TIME_BUCKETS:
+    FEATURE_LABELS[f"time_{_name}"] = f"{_name}占比"
+
+# 分组结果按特征矩阵缓存：特征矩阵（由数据缓存按事件失效）变化后重新计算
+_cohort_lock = threading.Lock()
+_cohort_cache = {'features': None, 'groups': {}}
+
+def fetch_cohort_rows():
+    """一次查询取回全班按 学生×模块×日期×小时 预聚合的活动数（含归档汇总），以及每个学生的回复数"""
+    activity_rows, reply_rows = get_analytics_storage().cohort_rows()
+    return activity_rows + archived_cohort_rows(), reply_rows
+
+def build_feature_matrix(activity_rows, reply_rows, today=None):
+    """
+    由预聚合行构建特征矩阵（today 默认为UTC当天，与活动日期的UTC口径一致）
+
+    返回 {'student_ids': [...], 'feature_names': [...], 'X': ndarray(n_students, n_features)}
+    """
+    today = today or date.fromisoformat(utc_today())
+
+    student_ids = sorted({row[0] for row in activity_rows} | {row[0] for row in reply_rows})
+    index = {sid: i for i, sid in enumerate(student_ids)}
+    n = len(student_ids)
+
+    module_index = {m: j for j, m in enumerate(COHORT_MODULES)}
+    hour_to_bucket = np.zeros(24, dtype=np.int64)
+    for j, (_, start, end) in enumerate(TIME_BUCKETS):
+        hour_to_bucket[start:end] = j
+
+    counts = np.zeros(n)
+    module_counts = np.zeros((n, len(COHORT_MODULES)))
+    time_counts = np.zeros((n, len(TIME_BUCKETS)))
+    replies = np.zeros(n)
+    last_day = np.full(n, -1, dtype=np.int64)
+    active_days = np.zeros(n)
+
+    if activity_rows:
+        rows_student = np.array([index[r[0]] for r in activity_rows], dtype=np.int64)
+        rows_count = np.array([r[4] for r in activity_rows], dtype=float)
+        rows_module = np.array([module_index.get(r[1], -1) for r in activity_rows], dtype=np.int64)
+        rows_hour = np.array([r[3] if r[3] is not None else 0 for r in activity_rows], dtype=np.int64)
+        rows_day = np.array([date.fromisoformat(r[2]).toordinal() for r in activity_rows], dtype=np.int64)
+
+        np.add.at(counts, rows_student, rows_count)
+        known = rows_module >= 0
+        np.add.at(module_counts, (rows_student[known], rows_module[known]), rows_count[known])
+        np.add.at(time_counts, (rows_student, hour_to_bucket[rows_hour % 24]), rows_count)
+        np.maximum.at(last_day, rows_student, rows_day)
+
+        # 活跃天数：去重 (学生, 日期) 组合
+        pairs = np.unique(np.stack([rows_student, rows_day], axis=1), axis=0)
+        np.add.at(active_days, pairs[:, 0], 1)
+
+    for sid, count in reply_rows:
+        replies[index[sid]] += count
+
+    days_since = np.where(last_day >= 0, today.toordinal() - last_day, 365).astype(float)
+    safe_counts = np.where(counts > 0, counts, 1)
+
+    feature_names = ["activity_count", "active_days", "reply_count", "days_since_active"]
+    feature_names += [f"module_{m}" for m in COHORT_MODULES]
+    feature_names += [f"time_{name}" for name, _, _ in TIME_BUCKETS]
+    X = np.column_stack([
+        counts,
+        active_days,
+        replies,
+        days_since,
+        module_counts / safe_counts[:, None],
+        time_counts / safe_counts[:, None],
+    ]) if n else np.zeros((0, len(feature_names)))
+
+    return {'student_ids': student_ids, 'feature_names': feature_names, 'X': X}
+
+def percentile_ranks(X):
+    """按列计算百分位排名（0-100，并列取平均位次）"""
+    n = X.shape[0]
+    if n == 0:
+        return np.zeros_like(X)
+    ranks = np.empty_like(X, dtype=float)
+    for j in range(X.shape[1]):
+        column = X[:, j]
+        sorted_column = np.sort(column)
+        left = np.searchsorted(sorted_column, column, side='left')
+        right = np.searchsorted(sorted_column, column, side='right')
+        ranks[:, j] = (left + right) / 2.0 / n * 100
+    return ranks
+
+def z_scores(X):
+    """按列计算Z分数（标准差为0的列记为0）"""
+    if X.shape[0] == 0:
+        return np.zeros_like(X)
+    std = X.std(axis=0)
+    return np.where(std > 0, (X - X.mean(axis=0)) / np.where(std > 0, std, 1), 0.0)
+
+def kmeans(Z, k, n_iter=50, n_init=4, seed=42):
+    """K-means聚类（k-means++初始化，多次初始化取惯性最小的结果），返回 (labels, centers)"""
+    n = Z.shape[0]
+    k = max(1, min(k, n))
+    rng = np.random.default_rng(seed)
+    best = None
+
+    for _ in range(n_init):
+        # k-means++ 初始化
+        centers = [Z[rng.integers(n)]]
+        for _ in range(1, k):
+            dist = np.min(((Z[:, None, :] - np.array(centers)[None, :, :]) ** 2).sum(axis=2), axis=1)
+            total = dist.sum()
+            if total <= 0:
+                centers.append(Z[rng.integers(n)])
+            else:
+                centers.append(Z[rng.choice(n, p=dist / total)])
+        centers = np.array(centers)
+
+        for _ in range(n_iter):
+            dist = ((Z[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+            labels = dist.argmin(axis=1)
+            new_centers = np.array([
+                Z[labels == c].mean(axis=0) if np.any(labels == c) else centers[c]
+                for c in range(k)
+            ])
+            if np.allclose(new_centers, centers):
+                break
+            centers = new_centers
+
+        inertia = ((Z - centers[labels]) ** 2).sum()
+        if best is None or inertia < best[0]:
+            best = (inertia, labels, centers)
+
+    return best[1], best[2]
+
+@tagged_cache(lambda args: {'students', 'activities', 'replies'}, daily=True)
+def get_cohort_features():
+    """获取全班特征矩阵（写入活动、回复或删除数据时由数据事件失效，数据未变化时不重新查询）"""
+    storage = get_analytics_storage()
+    if not storage.is_available():
+        skip_cache()
+        return None
+
+    try:
+        activity_rows, reply_rows = fetch_cohort_rows()
+    except Exception as e:
+        skip_cache()
+        print(f"获取班级活动数据失败: {e}")
+        return None
+
+    return build_feature_matrix(activity_rows, reply_rows)
+
+def analyze_cohort(features, k=3):
+    """
+    计算百分位、Z分数、综合投入度和K-means分组
+
+    投入度 = 活动次数、活跃天数、回复数百分位与“距上次学习”反向百分位的平均值；
+    分组按组内平均投入度从高到低命名
+    """
+    X = features['X']
+    names = features['feature_names']
+
+    with _cohort_lock:
+        cached = _cohort_cache['groups'].get(k)
+        if cached is not None and _cohort_cache['features'] is features:
+            return cached
+
+    pct = percentile_ranks(X)
+    Z = z_scores(X)
+
+    columns = [names.index(f) for f in ENGAGEMENT_FEATURES]
+    engagement_pct = pct[:, columns].copy()
+    engagement_pct[:, ENGAGEMENT_FEATURES.index("days_since_active")] = \
+        100 - engagement_pct[:, ENGAGEMENT_FEATURES.index("days_since_active")]
+    engagement = engagement_pct.mean(axis=1) if len(X) else np.zeros(0)
+
+    # 聚类特征：投入度相关特征取对数后标准化，模块占比和时段分布直接使用
+    cluster_input = X.copy()
+    cluster_input[:, columns] = np.log1p(cluster_input[:, columns])
+    labels, _ = kmeans(z_scores(cluster_input), k) if len(X) else (np.zeros(0, dtype=int), None)
+
+    group_means = {c: engagement[labels == c].mean() for c in np.unique(labels)}
+    order = sorted(group_means, key=group_means.get, reverse=True)
+    group_names = _group_names(len(order))
+    label_names = {c: group_names[i] for i, c in enumerate(order)}
+
+    analysis = {
+        'percentiles': pct,
+        'z_scores': Z,
+        'engagement': engagement,
+        'labels': labels,
+        'group_names': [label_names[c] for c in labels],
+        'group_order': [label_names[c] for c in order],
+    }
+    with _cohort_lock:
+        if _cohort_cache['features'] is not features:
+            _cohort_cache['features'] = features
+            _cohort_cache['groups'] = {}
+        _cohort_cache['groups'][k] = analysis
+    return analysis
+
+def _group_names(k):
+    """按投入度从高到低的分组名称"""
+    if k == 1:
+        return ["全体"]
+    if k == 2:
+        return ["积极组", "需关注组"]
+    middle = [f"中间组{i}" for i in range(1, k - 1)] if k > 3 else ["一般组"]
+    return ["积极组"] + middle + ["需关注组"]
+
+def render_cohort_analytics():
+    """渲染班级对比分析页面"""
+    import pandas as pd
+    import plotly.express as px
+
+    st.title("👥 班级对比分析")
+    st.markdown("一次计算全班学生的学习特征，按百分位和分组快速找出需要关注的学生。")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        k = st.slider("分组数量（K-means）", min_value=2, max_value=6, value=3)
+    with col2:
+        threshold = st.slider("需关注阈值（投入度百分位低于）", min_value=5, max_value=50, value=25, step=5)
+
+    started_at = time.time()
+    features = get_cohort_features()
+    if features is None:
+        st.info("📊 数据库暂不可用，无法进行班级对比分析")
+        return
+    if not features['student_ids']:
+        st.info("📊 暂无学生学习数据")
+        return
+
+    analysis = analyze_cohort(features, k)
+    elapsed = time.time() - started_at
+
+    X = features['X']
+    names = features['feature_names']
+    df = pd.DataFrame(X, columns=[FEATURE_LABELS[f] for f in names])
+    df.insert(0, "学号", features['student_ids'])
+    df.insert(1, "分组", analysis['group_names'])
+    df.insert(2, "投入度百分位", analysis['engagement'].round(1))
+
+    behind = df[df["投入度百分位"] < threshold].sort_values("投入度百分位")
+
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("👥 学生数", len(df))
+    m2.metric("📊 人均活动", f"{X[:, names.index('activity_count')].mean():.1f}")
+    m3.metric("📅 人均活跃天数", f"{X[:, names.index('active_days')].mean():.1f}")
+    m4.metric("⚠️ 需关注", len(behind))
+
+    st.markdown("### ⚠️ 需关注学生")
+    if behind.empty:
+        st.success("没有低于阈值的学生")
+    else:
+        pct = analysis['percentiles']
+        detail = behind[["学号", "分组", "投入度百分位"]].copy()
+        for feature in ENGAGEMENT_FEATURES:
+            j = names.index(feature)
+            detail[f"{FEATURE_LABELS[feature]}"] = X[behind.index, j]
+            detail[f"{FEATURE_LABELS[feature]}百分位"] = pct[behind.index, j].round(0)
+        st.dataframe(detail, use_container_width=True, hide_index=True)
+
+    st.markdown("### 🧩 分组概况")
+    summary = df.groupby("分组").agg(
+        人数=("学号", "count"),
+        平均投入度=("投入度百分位", "mean"),
+        平均活动次数=(FEATURE_LABELS["activity_count"], "mean"),
+        平均活跃天数=(FEATURE_LABELS["active_days"], "mean"),
+        平均回复数=(FEATURE_LABELS["reply_count"], "mean"),
+    ).reindex(analysis['group_order']).round(1)
+    st.dataframe(summary, use_container_width=True)
+
+    fig = px.scatter(
+        df, x=FEATURE_LABELS["active_days"], y=FEATURE_LABELS["activity_count"],
+        color="分组", hover_data=["学号", "投入度百分位"],
+        title="活跃天数 vs 活动次数"
+    )
+    fig.update_layout(paper_bgcolor='rgba(0,0,0,0)')
+    st.plotly_chart(fig, use_container_width=True)
+
+    with st.expander("📋 全班特征与Z分数"):
+        z_df = pd.DataFrame(analysis['z_scores'].round(2), columns=[f"{FEATURE_LABELS[f]}(Z)" for f in names])
+        st.dataframe(pd.concat([df, z_df], axis=1), use_container_width=True, hide_index=True)
+
+    st.caption(f"⏱️ 计算耗时 {elapsed * 1000:.0f} ms（数据未变化时直接使用缓存）")
+
+    render_review_summary()
+
+def render_review_summary():
+    """全班复习到期情况（间隔复习安排）"""
+    import pandas as pd
+
+    st.markdown("### 📅 复习到期")
+    summary = class_due_summary()
+    if summary is None or not summary['students']:
+        st.info("暂无复习安排")
+        return
+
+    due_counts = summary['due_counts']
+    c1, c2, c3 = st.columns(3)
+    c1.metric("今日有复习的学生", int((due_counts > 0).sum()))
+    c2.metric("到期复习总数", int(due_counts.sum()))
+    c3.metric("最长逾期（天）", int(summary['overdue_days'].max()))
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**到期人数最多的内容**")
+        items = pd.DataFrame(
+            [{"内容": item['name'], "类型": "病例" if item['kind'] == 'case' else "知识点", "到期人数": count}
+             for item, count in summary['item_due'][:10]],
+            columns=["内容", "类型", "到期人数"],
+        )
+        st.dataframe(items, use_container_width=True, hide_index=True)
+    with col2:
+        st.markdown("**逾期最久的学生**")
+        students = pd.DataFrame({
+            "学号": summary['students'],
+            "到期数": due_counts,
+            "最长逾期(天)": summary['overdue_days'],
+        })
+        students = students[students["到期数"] > 0].sort_values(["最长逾期(天)", "到期数"], ascending=False).head(10)
+        st.dataframe(students, use_container_width=True, hide_index=True)
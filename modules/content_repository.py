@@ -0,0 +1,178 @@
+"""
+内容仓库模块
+统一管理课程结构、能力图谱、示例病例和示例活动等离线内容，
+并通过后台探测判断Neo4j在线/离线状态
+"""
+
+import json
+import os
+import threading
+import time
+
+try:
+    from config.settings import NEO4J_PROBE_INTERVAL, NEO4J_PROBE_GRACE_SECONDS
+except (ImportError, AttributeError):
+    NEO4J_PROBE_INTERVAL = 30
+    NEO4J_PROBE_GRACE_SECONDS = 1.5
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+def _load_json(filename, default):
+    """读取data目录下的JSON文件，读取失败时返回默认值"""
+    path = os.path.join(DATA_DIR, filename)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[内容仓库] 加载 {filename} 失败: {e}")
+        return default
+
+# ==================== 离线内容（导入时加载一次） ====================
+
+_curriculum = _load_json("curriculum.json", {})
+_abilities = _load_json("abilities.json", {})
+_sample_cases = _load_json("sample_cases.json", [])
+_sample_activities = _load_json("sample_activities.json", {})
+
+def get_curriculum_modules():
+    """获取课程模块结构 {模块ID: {name, description, chapters: {章节: [知识点]}}}"""
+    return _curriculum.get("modules", {})
+
+def get_chapter_descriptions():
+    """获取章节说明"""
+    return _curriculum.get("chapter_descriptions", {})
+
+def get_knowledge_details():
+    """获取知识点详细说明"""
+    return _curriculum.get("knowledge_details", {})
+
+def get_knowledge_points():
+    """
+    获取知识点目录 [{id, name, module_id, chapter}]
+
+    ID与Neo4j中 yzbx_Knowledge 的ID一致：KP_模块_C章节序号_知识点序号
+    """
+    return [
+        {'id': f"KP_{module_id}_C{chapter_no}_{kp_no}", 'name': name, 'module_id': module_id, 'chapter': chapter}
+        for module_id, module in get_curriculum_modules().items()
+        for chapter_no, (chapter, names) in enumerate(module['chapters'].items(), 1)
+        for kp_no, name in enumerate(names, 1)
+    ]
+
+def get_knowledge_links():
+    """获取知识点之间的关联 [(源知识点, 目标知识点, 关系)]"""
+    return [tuple(link) for link in _curriculum.get("knowledge_links", [])]
+
+def get_abilities():
+    """获取能力列表"""
+    return _abilities.get("abilities", [])
+
+def get_ability_knowledge_map():
+    """获取能力-知识点映射 {能力ID: [(知识点, 难度, 权重)]}"""
+    return {
+        ability_id: [tuple(item) for item in items]
+        for ability_id, items in _abilities.get("ability_knowledge_map", {}).items()
+    }
+
+def get_sample_cases():
+    """获取示例病例列表"""
+    return _sample_cases
+
+def get_sample_students():
+    """获取示例学生列表"""
+    return _sample_activities.get("students", [])
+
+def get_sample_module_activities():
+    """获取各模块的示例活动（教师端模块概览）"""
+    return _sample_activities.get("module_activities", {})
+
+def get_sample_student_activities():
+    """获取各模块的示例活动（单个学生详情）"""
+    return _sample_activities.get("student_activities", {})
+
+# ==================== 在线/离线探测 ====================
+
+_probe_lock = threading.Lock()
+_probe_done = threading.Event()
+_probe_thread = None
+_probe_state = {
+    'online': None,       # None表示尚未探测完成
+    'error': None,
+    'checked_at': 0.0,
+}
+
+def _run_probe():
+    """后台执行一次 RETURN 1 探测"""
+    online = False
+    error = None
+    try:
+        from modules.auth import get_neo4j_driver
+        driver = get_neo4j_driver()
+        if driver is None:
+            error = "无法创建Neo4j驱动：get_neo4j_driver()返回None"
+        else:
+            with driver.session() as session:
+                session.run("RETURN 1").single()
+            online = True
+    except Exception as e:
+        error = str(e)
+
+    global _probe_thread
+    with _probe_lock:
+        changed = _probe_state['online'] != online
+        _probe_state['online'] = online
+        _probe_state['error'] = error
+        _probe_state['checked_at'] = time.time()
+        _probe_thread = None
+    _probe_done.set()
+
+    if changed:
+        if online:
+            print("[Neo4j探测] 连接正常，使用在线模式")
+        else:
+            print(f"[Neo4j探测] 连接失败，使用离线模式: {error}")
+
+def _start_probe():
+    """启动后台探测线程（已有探测在运行时不重复启动）"""
+    global _probe_thread
+    with _probe_lock:
+        if _probe_thread is not None:
+            return
+        _probe_thread = threading.Thread(target=_run_probe, name="neo4j-probe", daemon=True)
+        _probe_thread.start()
+
+def is_online():
+    """
+    判断当前是否为在线模式（不阻塞页面渲染）
+
+    首次调用最多等待 NEO4J_PROBE_GRACE_SECONDS 秒，探测未完成则按离线处理；
+    之后直接返回缓存结果，结果过期时在后台重新探测。
+    """
+    with _probe_lock:
+        online = _probe_state['online']
+        expired = time.time() - _probe_state['checked_at'] > NEO4J_PROBE_INTERVAL
+
+    if online is None:
+        _start_probe()
+        _probe_done.wait(NEO4J_PROBE_GRACE_SECONDS)
+        with _probe_lock:
+            return bool(_probe_state['online'])
+
+    if expired:
+        _start_probe()
+    return online
+
+def get_probe_error():
+    """获取最近一次探测的错误信息"""
+    with _probe_lock:
+        if _probe_state['online'] is None:
+            return "Neo4j连接探测尚未完成"
+        return _probe_state['error']
+
+def refresh_probe():
+    """清除探测结果，下次调用 is_online() 时重新探测"""
+    with _probe_lock:
+        _probe_state['online'] = None
+        _probe_state['error'] = None
+        _probe_state['checked_at'] = 0.0
+    _probe_done.clear()
@@ -0,0 +1,223 @@
+"""
+数据缓存模块
+按标签（学生、模块、日期）缓存查询结果，写入操作发布数据事件，只失效受影响的缓存条目；
+数据未变化时缓存在 DATA_CACHE_TTL 内一直有效（兜底过期时间覆盖其他进程的写入，
+这些写入不经过本进程的事件总线）
+"""
+
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+try:
+    from config.settings import DATA_CACHE_MAX_ENTRIES, DATA_CACHE_TTL
+except (ImportError, AttributeError):
+    DATA_CACHE_MAX_ENTRIES = 512
+    DATA_CACHE_TTL = 1800
+
+_lock = threading.RLock()
+_entries = OrderedDict()   # key -> (value, tags, 过期时间)
+_tag_index = {}            # tag -> set(key)
+_subscribers = []
+_local = threading.local()
+_stats = {'hits': 0, 'misses': 0, 'invalidated': 0, 'expired': 0}
+# 失效序号：每次失效递增，并记录到被失效的标签（或前缀）上；
+# 查询开始后其标签被失效过时，结果不写回缓存（不相关标签的失效不影响）
+_sequence = [0]
+_tag_sequence = {}         # tag -> 最近一次失效的序号
+_prefix_sequence = {}      # 标签前缀（"module:" 等，"" 表示全部） -> 最近一次失效的序号
+_running = [0]             # 进行中的查询数，为0时清空上面两个表（之后开始的查询不会早于当前序号）
+
+def today():
+    """当前UTC日期字符串（与数据库中 date(a.timestamp) 一致）"""
+    return datetime.now(timezone.utc).date().isoformat()
+
+# ==================== 标签 ====================
+
+def student_tag(student_id):
+    return f"student:{student_id}"
+
+def module_tag(module_name):
+    return f"module:{module_name}"
+
+def student_module_tag(student_id, module_name):
+    return f"student:{student_id}|module:{module_name}"
+
+def date_tag(day):
+    return f"date:{day}"
+
+# ==================== 缓存读写 ====================
+
+def skip_cache():
+    """标记本次调用结果不写入缓存（数据库不可用或查询失败时调用）"""
+    _local.skip = True
+
+def _drop(key):
+    """删除缓存条目及其标签索引"""
+    _, tags, _ = _entries.pop(key)
+    for tag in tags:
+        keys = _tag_index.get(tag)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del _tag_index[tag]
+
+def _invalidated_since(tags, sequence):
+    """标签集合在失效序号 sequence 之后是否被失效过"""
+    if any(_tag_sequence.get(tag, 0) > sequence for tag in tags):
+        return True
+    return any(
+        value > sequence and any(tag.startswith(prefix) for tag in tags)
+        for prefix, value in _prefix_sequence.items()
+    )
+
+def _finish_query():
+    """查询结束：没有进行中的查询时清空失效序号表"""
+    with _lock:
+        _running[0] -= 1
+        if not _running[0]:
+            _tag_sequence.clear()
+            _prefix_sequence.clear()
+
+def tagged_cache(tags, daily=False):
+    """
+    按标签缓存函数结果
+
+    - tags：函数，接收绑定后的参数字典，返回该条目依赖的标签集合
+    - daily：结果与"今天"有关（如今日活动数、近7天趋势）时为True，日期变化后自动使用新条目
+
+    缓存结果在调用方之间共享，调用方不应修改返回值
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            key = (func.__module__, func.__qualname__, tuple(arguments.items()), today() if daily else None)
+
+            with _lock:
+                entry = _entries.get(key)
+                if entry is not None:
+                    if entry[2] > time.monotonic():
+                        _entries.move_to_end(key)
+                        _stats['hits'] += 1
+                        return entry[0]
+                    _drop(key)
+                    _stats['expired'] += 1
+                _stats['misses'] += 1
+                sequence = _sequence[0]
+                _running[0] += 1
+
+            try:
+                _local.skip = False
+                value = func(*args, **kwargs)
+                if _local.skip:
+                    return value
+
+                entry_tags = frozenset(tags(arguments))
+                with _lock:
+                    if _invalidated_since(entry_tags, sequence):
+                        return value
+                    if key in _entries:
+                        _drop(key)
+                    _entries[key] = (value, entry_tags, time.monotonic() + DATA_CACHE_TTL)
+                    for tag in entry_tags:
+                        _tag_index.setdefault(tag, set()).add(key)
+                    while len(_entries) > DATA_CACHE_MAX_ENTRIES:
+                        _drop(next(iter(_entries)))
+                return value
+            finally:
+                _finish_query()
+
+        return wrapper
+    return decorator
+
+def invalidate(tags):
+    """
+    失效带有任一标签的缓存条目
+
+    标签以 * 结尾时按前缀匹配，如 "module:*" 匹配所有模块，"*" 清空全部缓存
+    """
+    with _lock:
+        _sequence[0] += 1
+        keys = set()
+        for tag in tags:
+            if tag.endswith("*"):
+                prefix = tag[:-1]
+                _prefix_sequence[prefix] = _sequence[0]
+                for indexed_tag, indexed_keys in _tag_index.items():
+                    if indexed_tag.startswith(prefix):
+                        keys |= indexed_keys
+            else:
+                _tag_sequence[tag] = _sequence[0]
+                keys |= _tag_index.get(tag, set())
+        for key in keys:
+            if key in _entries:
+                _drop(key)
+        _stats['invalidated'] += len(keys)
+        return len(keys)
+
+def get_cache_info():
+    """获取缓存状态"""
+    with _lock:
+        return {
+            'entries': len(_entries),
+            'tags': len(_tag_index),
+            'max_entries': DATA_CACHE_MAX_ENTRIES,
+            'ttl': DATA_CACHE_TTL,
+            **_stats,
+        }
+
+# ==================== 数据事件 ====================
+
+def _event_tags(event, payload):
+    """数据事件影响的缓存标签"""
+    student_id = payload.get('student_id')
+    module_name = payload.get('module_name')
+
+    if event == 'activity_logged':
+        day = payload.get('day') or today()
+        return {
+            'activities',
+            student_tag(student_id),
+            module_tag(module_name),
+            student_module_tag(student_id, module_name),
+            date_tag(day),
+        }
+    if event == 'student_registered':
+        return {'students', student_tag(student_id)}
+    if event == 'reply_submitted':
+        return {'replies', student_tag(student_id)}
+    if event == 'student_deleted':
+        # 学生的活动可能分布在任意模块和日期
+        return {
+            'students', 'activities', 'replies',
+            student_tag(student_id), f"student:{student_id}|*",
+            "module:*", "date:*",
+        }
+    # activities_cleared、data_repaired 等批量操作影响全部数据
+    return {"*"}
+
+def subscribe(callback):
+    """订阅数据事件，callback(event, payload)"""
+    with _lock:
+        if callback not in _subscribers:
+            _subscribers.append(callback)
+
+def publish(event, **payload):
+    """发布数据事件：失效受影响的缓存条目并通知订阅者"""
+    invalidate(_event_tags(event, payload))
+
+    with _lock:
+        subscribers = list(_subscribers)
+    for callback in subscribers:
+        try:
+            callback(event, payload)
+        except Exception as e:
+            print(f"[数据事件] {event} 处理失败: {e}")
@@ -0,0 +1,78 @@
+"""
+诊断面板模块
+调试信息、数据诊断等面板只在教师点击"运行诊断"时才执行查询，
+结果按面板缓存并显示耗时；数据变化时缓存的结果标记为过期
+"""
+
+import threading
+import time
+from datetime import datetime
+
+import streamlit as st
+
+from modules.data_cache import subscribe
+
+_lock = threading.Lock()
+_results = {}   # 面板key -> {'value', 'error', 'elapsed_ms', 'computed_at', 'stale'}
+
+def _on_data_event(event, payload):
+    """数据事件订阅：已缓存的诊断结果标记为过期（不自动重新计算）"""
+    with _lock:
+        for result in _results.values():
+            result['stale'] = True
+
+subscribe(_on_data_event)
+
+def run_diagnostic(key, compute):
+    """执行诊断并缓存结果（异常作为结果的一部分保存，面板中显示）"""
+    started = time.perf_counter()
+    value, error = None, None
+    try:
+        value = compute()
+    except Exception as e:
+        error = str(e)
+    result = {
+        'value': value,
+        'error': error,
+        'elapsed_ms': (time.perf_counter() - started) * 1000,
+        'computed_at': datetime.now(),
+        'stale': False,
+    }
+    with _lock:
+        _results[key] = result
+    return result
+
+def get_diagnostic(key):
+    """获取已缓存的诊断结果，没有时返回None"""
+    with _lock:
+        result = _results.get(key)
+        return dict(result) if result is not None else None
+
+def clear_diagnostics():
+    """清除所有诊断结果"""
+    with _lock:
+        _results.clear()
+
+def render_diagnostic_panel(title, key, compute, render, expanded=False):
+    """
+    渲染按需计算的诊断面板
+
+    compute() 执行查询并返回结果，只在点击按钮时调用；
+    render(value) 显示结果，每次页面刷新都会调用（只使用缓存的结果）
+    """
+    with st.expander(title, expanded=expanded):
+        result = get_diagnostic(key)
+        if st.button("▶️ 运行诊断", key=f"diag_{key}"):
+            result = run_diagnostic(key, compute)
+
+        if result is None:
+            st.caption("诊断查询不会在页面加载时执行，点击上方按钮运行")
+            return
+
+        stale = "（数据已变化，可重新运行）" if result['stale'] else ""
+        st.caption(f"⏱️ 耗时 {result['elapsed_ms']:.1f} ms · "
+                   f"运行于 {result['computed_at'].strftime('%H:%M:%S')}{stale}")
+        if result['error'] is not None:
+            st.error(f"查询出错: {result['error']}")
+        else:
+            render(result['value'])
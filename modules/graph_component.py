@@ -0,0 +1,38 @@
+"""
+知识图谱前端组件
+lib/ 目录作为 Streamlit 自定义组件的静态资源（index.html、graph.js、vis-network），
+由浏览器缓存；组件在重跑之间保持挂载，每次只接收紧凑的JSON图数据并增量更新，
+节点的单击（选中）和双击（展开）事件回传给 Python
+"""
+
+import os
+
+import streamlit.components.v1 as components
+
+COMPONENT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lib")
+
+_component = components.declare_component("knowledge_graph", path=COMPONENT_DIR)
+
+class StyleTable:
+    """样式去重表：相同的样式只发送一次，节点和边按下标引用"""
+
+    def __init__(self):
+        self.styles = []
+        self._index = {}
+
+    def __call__(self, style):
+        index = self._index.get(style)
+        if index is None:
+            index = self._index[style] = len(self.styles)
+            self.styles.append(list(style))
+        return index
+
+def knowledge_graph_component(graph, key=None):
+    """
+    渲染知识图谱组件
+
+    graph: {'nodes': [[ID, 标签, 样式下标, x, y, 悬停提示]], 'edges': [[源ID, 目标ID, 样式下标, 标签]],
+            'node_styles': [[颜色, 大小]], 'edge_styles': [[颜色, 宽度, 虚线]], 'selected': ID或None, 'height': 像素}
+    返回最近一次节点事件 {'event': 'select'|'expand', 'node': ID, 'seq': 序号}，没有事件时为None
+    """
+    return _component(graph=graph, key=key, default=None)
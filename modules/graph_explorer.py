@@ -0,0 +1,290 @@
+"""
+知识图谱分层浏览模块
+初始只显示模块和章节（折叠的超级节点，标注所含知识点数），展开节点时按页获取其 k 跳邻域子图；
+节点坐标取自服务端缓存的整个课程图的力导向布局（见 graph_layout），已经放置过的节点保留坐标，
+图谱渲染时关闭物理引擎，节点再多也不需要浏览器重新迭代布局
+"""
+
+from collections import deque
+
+from modules.content_repository import get_curriculum_modules, get_chapter_descriptions, get_knowledge_details, get_knowledge_links
+from modules.graph_layout import cached_layout, layout_graph
+from modules.mastery import KNOWLEDGE
+
+try:
+    from config.settings import GRAPH_PAGE_SIZE
+except (ImportError, AttributeError):
+    GRAPH_PAGE_SIZE = 25
+
+# 展开邻域的最大跳数
+MAX_HOPS = 3
+
+NODE_LABELS = {'yzbx_Module': 'module', 'yzbx_Chapter': 'chapter', 'yzbx_Knowledge': 'knowledge'}
+
+def check_neo4j_available():
+    """检查Neo4j是否可用"""
+    from modules.auth import check_neo4j_available as auth_check
+    return auth_check()
+
+def get_neo4j_driver():
+    """获取Neo4j连接（复用auth模块的缓存连接）"""
+    from modules.auth import get_neo4j_driver as auth_get_driver
+    return auth_get_driver()
+
+# ==================== 课程图（离线） ====================
+
+def _build_curriculum_graph():
+    """
+    由课程内容构建与Neo4j中一致的图（节点ID相同）：
+    返回 (节点 {ID: 节点字典}, 邻接表 {ID: [(邻居ID, 边)]})，边为 (源ID, 目标ID, 关系)
+    """
+    modules = get_curriculum_modules()
+    chapter_descriptions = get_chapter_descriptions()
+    knowledge_details = get_knowledge_details()
+    nodes = {}
+    edges = []
+    chapter_ids = {}
+    for module_id, module in modules.items():
+        nodes[module_id] = {'id': module_id, 'kind': 'module', 'name': module['name'],
+                            'description': module.get('description', ''), 'size': len(module['chapters'])}
+        for chapter_no, (chapter, knowledge_points) in enumerate(module['chapters'].items(), start=1):
+            chapter_id = f"C{module_id[1:]}_{chapter_no}"
+            chapter_ids[(module_id, chapter)] = chapter_id
+            nodes[chapter_id] = {'id': chapter_id, 'kind': 'chapter', 'name': chapter,
+                                 'description': chapter_descriptions.get(chapter, ''), 'size': len(knowledge_points)}
+            edges.append((module_id, chapter_id, '包含'))
+    by_name = {}
+    for kp in KNOWLEDGE:
+        nodes[kp['id']] = {'id': kp['id'], 'kind': 'knowledge', 'name': kp['name'],
+                           'description': knowledge_details.get(kp['name'], ''), 'size': 0}
+        edges.append((chapter_ids[(kp['module_id'], kp['chapter'])], kp['id'], '涵盖'))
+        by_name.setdefault(kp['name'], kp['id'])
+    for source, target, relation in get_knowledge_links():
+        if source in by_name and target in by_name:
+            edges.append((by_name[source], by_name[target], relation))
+
+    adjacency = {node_id: [] for node_id in nodes}
+    for edge in edges:
+        adjacency[edge[0]].append((edge[1], edge))
+        adjacency[edge[1]].append((edge[0], edge))
+    return nodes, adjacency
+
+_nodes, _adjacency = _build_curriculum_graph()
+
+def curriculum_layout():
+    """整个课程图的布局 {节点ID: (x, y)}（按图版本缓存）"""
+    edges = {edge for neighbours in _adjacency.values() for _, edge in neighbours}
+    return cached_layout(_nodes, sorted(edges))
+
+def _local_overview():
+    return [node for node in _nodes.values() if node['kind'] != 'knowledge']
+
+def _local_neighbourhood(node_id, hops, offset, limit):
+    """广度优先的 k 跳邻域，按 (跳数, 发现顺序) 分页"""
+    if node_id not in _nodes:
+        return [], 0
+    distance = {node_id: 0}
+    order = []
+    queue = deque([node_id])
+    while queue:
+        current = queue.popleft()
+        if distance[current] == hops:
+            continue
+        for neighbour, _ in _adjacency[current]:
+            if neighbour not in distance:
+                distance[neighbour] = distance[current] + 1
+                order.append(neighbour)
+                queue.append(neighbour)
+    return [_nodes[n] for n in order[offset:offset + limit]], len(order)
+
+def _local_edges(ids):
+    ids = set(ids)
+    return {edge for node_id in ids for neighbour, edge in _adjacency.get(node_id, ()) if neighbour in ids}
+
+# ==================== Neo4j ====================
+
+def _node_from_record(node, size=0):
+    kind = next((NODE_LABELS[label] for label in node.labels if label in NODE_LABELS), 'knowledge')
+    return {'id': node['id'], 'kind': kind, 'name': node.get('name', node['id']),
+            'description': node.get('description', ''), 'size': size}
+
+def _neo4j_overview(session):
+    result = session.run("""
+        MATCH (m:yzbx_Module)
+        OPTIONAL MATCH (m)-[:CONTAINS]->(c:yzbx_Chapter)
+        OPTIONAL MATCH (c)-[:CONTAINS]->(k:yzbx_Knowledge)
+        RETURN m, c, count(k) AS knowledge
+        ORDER BY m.id, c.id
+    """)
+    nodes = {}
+    for record in result:
+        module = record['m']
+        if module['id'] not in nodes:
+            nodes[module['id']] = _node_from_record(module)
+        if record['c'] is not None:
+            nodes[module['id']]['size'] += 1
+            nodes[record['c']['id']] = _node_from_record(record['c'], record['knowledge'])
+    return list(nodes.values())
+
+def _neo4j_neighbourhood(session, node_id, hops, offset, limit):
+    # 变长关系的跳数不能参数化，hops 已限制为 1..MAX_HOPS 的整数
+    total = session.run(f"""
+        MATCH (n {{id: $node_id}})-[:CONTAINS|RELATES_TO|PREREQUISITE*1..{int(hops)}]-(m)
+        WHERE m.id <> $node_id AND any(label IN labels(m) WHERE label IN $labels)
+        RETURN count(DISTINCT m) AS total
+    """, node_id=node_id, labels=list(NODE_LABELS)).single()['total']
+    result = session.run(f"""
+        MATCH p = (n {{id: $node_id}})-[:CONTAINS|RELATES_TO|PREREQUISITE*1..{int(hops)}]-(m)
+        WHERE m.id <> $node_id AND any(label IN labels(m) WHERE label IN $labels)
+        WITH m, min(length(p)) AS distance
+        OPTIONAL MATCH (m)-[:CONTAINS]->(child)
+        RETURN m, count(child) AS size, distance
+        ORDER BY distance, m.id
+        SKIP $offset LIMIT $limit
+    """, node_id=node_id, labels=list(NODE_LABELS), offset=offset, limit=limit)
+    return [_node_from_record(record['m'], record['size']) for record in result], total
+
+def _neo4j_edges(session, ids):
+    result = session.run("""
+        MATCH (a)-[r:CONTAINS|RELATES_TO|PREREQUISITE]->(b)
+        WHERE a.id IN $ids AND b.id IN $ids
+        RETURN a.id AS source, b.id AS target, type(r) AS type, r.type AS relation, labels(b) AS labels
+    """, ids=list(ids))
+    edges = set()
+    for record in result:
+        if record['type'] == 'CONTAINS':
+            relation = '包含' if 'yzbx_Chapter' in record['labels'] else '涵盖'
+        elif record['type'] == 'PREREQUISITE':
+            relation = '前置'
+        else:
+            relation = record['relation'] or '关联'
+        edges.add((record['source'], record['target'], relation))
+    return edges
+
+def _run_neo4j(func, *args):
+    """在Neo4j会话中执行查询，数据库不可用或查询失败时返回None（调用方改用课程图）"""
+    if not check_neo4j_available():
+        return None
+    try:
+        with get_neo4j_driver().session() as session:
+            return func(session, *args)
+    except Exception as e:
+        print(f"[图谱浏览] Neo4j查询失败，使用课程图: {e}")
+        return None
+
+# ==================== 子图接口 ====================
+
+def get_overview():
+    """概览：全部模块和章节节点（章节的 size 为所含知识点数），以及它们之间的边"""
+    nodes = _run_neo4j(_neo4j_overview)
+    if nodes is None:
+        nodes = _local_overview()
+    return {'nodes': nodes, 'edges': get_edges(node['id'] for node in nodes)}
+
+def get_neighbourhood(node_id, hops=1, offset=0, limit=None):
+    """
+    节点 k 跳邻域的一页（按跳数排序）：{'nodes', 'total', 'has_more'}
+
+    limit 默认为 GRAPH_PAGE_SIZE；边不随页返回，由调用方对当前可见的全部节点调用 get_edges 获取
+    """
+    hops = max(1, min(int(hops), MAX_HOPS))
+    limit = limit or GRAPH_PAGE_SIZE
+    page = _run_neo4j(_neo4j_neighbourhood, node_id, hops, offset, limit)
+    nodes, total = page if page is not None else _local_neighbourhood(node_id, hops, offset, limit)
+    return {'nodes': nodes, 'total': total, 'has_more': offset + len(nodes) < total}
+
+def get_edges(ids):
+    """两端都在给定节点集合中的边 {(源ID, 目标ID, 关系)}"""
+    ids = set(ids)
+    edges = _run_neo4j(_neo4j_edges, ids)
+    return edges if edges is not None else _local_edges(ids)
+
+# ==================== 视图状态 ====================
+
+def new_view():
+    """
+    新的浏览视图（保存在会话状态中）
+
+    nodes: 当前可见节点；origin: 节点ID -> 把它加入视图的展开节点（概览节点为None）；
+    expanded: 展开节点ID -> {'hops', 'loaded', 'total'}；positions: 放置过的节点坐标，折叠后仍保留；
+    numbers: 节点ID -> 整数编号（前端组件使用的ID，同样折叠后仍保留）
+    """
+    overview = get_overview()
+    view = {'nodes': {}, 'edges': set(), 'origin': {}, 'expanded': {}, 'positions': {}, 'numbers': {}}
+    for node in overview['nodes']:
+        view['nodes'][node['id']] = node
+        view['origin'][node['id']] = None
+    view['edges'] = set(overview['edges'])
+    _place(view, view['nodes'])
+    return view
+
+def _place(view, node_ids):
+    """
+    放置新节点：课程图中的节点使用整体布局的坐标，其余节点以视图中已放置的节点为固定点增量布局；
+    已放置过的节点保持原坐标
+    """
+    layout = curriculum_layout()
+    missing = []
+    for node_id in node_ids:
+        if node_id in view['positions']:
+            continue
+        if node_id in layout:
+            view['positions'][node_id] = layout[node_id]
+        else:
+            missing.append(node_id)
+    if missing:
+        placed = {node_id: view['positions'][node_id] for node_id in view['nodes'] if node_id in view['positions']}
+        view['positions'].update(layout_graph(list(placed) + missing, view['edges'], placed))
+
+def expand(view, node_id, hops=1):
+    """展开节点：加载其 k 跳邻域的下一页（跳数变化时从第一页开始）"""
+    state = view['expanded'].get(node_id)
+    if state is None or state['hops'] != hops:
+        state = view['expanded'][node_id] = {'hops': hops, 'loaded': 0, 'total': 0}
+    page = get_neighbourhood(node_id, hops, offset=state['loaded'])
+    state['loaded'] += len(page['nodes'])
+    state['total'] = page['total']
+    added = []
+    for node in page['nodes']:
+        if node['id'] not in view['nodes']:
+            view['nodes'][node['id']] = node
+            view['origin'][node['id']] = node_id
+            added.append(node['id'])
+    view['edges'] = get_edges(view['nodes'])
+    _place(view, added)
+    return page
+
+def collapse(view, node_id):
+    """折叠节点：移除由它（及其后代展开）加入的节点，坐标保留以便再次展开时复用"""
+    removed = set()
+    pending = [node_id]
+    while pending:
+        current = pending.pop()
+        view['expanded'].pop(current, None)
+        for child, origin in list(view['origin'].items()):
+            if origin == current and child not in removed:
+                removed.add(child)
+                pending.append(child)
+    for child in removed:
+        view['nodes'].pop(child, None)
+        view['origin'].pop(child, None)
+    view['edges'] = {edge for edge in view['edges'] if edge[0] not in removed and edge[1] not in removed}
+
+def hidden_count(view, node_id):
+    """节点尚未显示的下级节点数（用于折叠节点的标签）"""
+    node = view['nodes'][node_id]
+    state = view['expanded'].get(node_id)
+    if state is not None:
+        return max(state['total'] - state['loaded'], 0)
+    return node['size']
+
+def node_number(view, node_id):
+    """节点的整数编号（同一视图内不变）"""
+    numbers = view['numbers']
+    if node_id not in numbers:
+        numbers[node_id] = len(numbers)
+    return numbers[node_id]
+
+def node_by_number(view, number):
+    """整数编号对应的可见节点ID，不存在时返回None"""
+    return next((node_id for node_id in view['nodes'] if view['numbers'].get(node_id) == number), None)
@@ -0,0 +1,211 @@
+"""
+知识图谱布局模块
+服务端的 Fruchterman–Reingold 力导向布局（NumPy 向量化）：斥力按 FR 网格变体只计算
+距离 2k 以内的节点对（按格分箱，代价与节点数近似成线性），吸引力沿边计算，另加指向中心的弱引力
+使不连通的部分不致飘散；增量布局时只计算可移动节点受到的力。
+随机初始位置使用固定种子，相同的图总是得到相同的坐标。
+
+整个课程图的布局按图版本（节点和边的摘要）缓存在内存和 data/graph_layout.npz 中；
+图版本变化时，保留下来的节点坐标不变，只对新增节点做增量布局。
+浏览视图中不在课程图里的节点（如只存在于 Neo4j 中的节点）同样以已放置节点为固定点增量放置
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from modules.content_repository import DATA_DIR
+
+LAYOUT_PATH = os.path.join(DATA_DIR, "graph_layout.npz")
+
+# 理想边长（与前端坐标同单位，像素）
+IDEAL_DISTANCE = 120.0
+# 完整布局和增量布局的迭代次数
+ITERATIONS = 300
+INCREMENTAL_ITERATIONS = 80
+# 向中心的引力系数
+GRAVITY = 0.02
+
+_cache = {'version': None, 'positions': None}
+_lock = threading.Lock()
+
+# ==================== 力导向布局 ====================
+
+def _repulsion(pos, rows, k):
+    """
+    rows 中各节点受到的 FR 斥力 k²/d（按网格分箱）
+
+    节点按边长 2k 分格，只与所在格及相邻 8 格中距离 2k 以内的节点计算，
+    节点对按格一次性展开成数组后向量化求和
+    """
+    cell = 2 * k
+    cells = np.floor(pos / cell).astype(np.int64)
+    cells -= cells.min(axis=0) - 1
+    width = cells[:, 1].max() + 2
+    keys = cells[:, 0] * width + cells[:, 1]
+    order = np.argsort(keys, kind='stable')
+    occupied, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+
+    sources, targets = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            wanted = keys[rows] + dx * width + dy
+            slot = np.minimum(np.searchsorted(occupied, wanted), len(occupied) - 1)
+            n = np.where(occupied[slot] == wanted, counts[slot], 0)
+            total = n.sum()
+            if not total:
+                continue
+            # 第 i 个节点与目标格中的 n[i] 个节点配对
+            offsets = np.arange(total) - np.repeat(np.cumsum(n) - n, n)
+            sources.append(np.repeat(rows, n))
+            targets.append(order[np.repeat(starts[slot], n) + offsets])
+    disp = np.zeros_like(pos)
+    if not sources:
+        return disp
+    source, target = np.concatenate(sources), np.concatenate(targets)
+    delta = pos[source] - pos[target]
+    dist2 = np.einsum('ij,ij->i', delta, delta)
+    near = (source != target) & (dist2 < cell * cell)
+    # (delta / d) * (k² / d) = delta * k² / d²
+    factor = np.where(near, k * k / np.maximum(dist2, 1e-4), 0.0)
+    for axis in (0, 1):
+        disp[:, axis] = np.bincount(source, weights=factor * delta[:, axis], minlength=len(pos))
+    return disp
+
+def force_layout(n, edges, initial=None, fixed=None, iterations=ITERATIONS, k=IDEAL_DISTANCE, seed=0):
+    """
+    力导向布局，返回 (n, 2) 坐标数组
+
+    edges: (m, 2) 节点下标数组；initial: (n, 2) 初始坐标，含 NaN 的行视为未放置；
+    fixed: (n,) 布尔数组，为 True 的节点保持初始坐标不动（增量布局）
+    未放置的节点从已放置邻居的重心出发（没有已放置邻居时随机放在中心附近），
+    温度从布局半径的十分之一线性降到零
+    """
+    rng = np.random.default_rng(seed)
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    pos = np.full((n, 2), np.nan) if initial is None else np.array(initial, dtype=float)
+    fixed = np.zeros(n, dtype=bool) if fixed is None else np.asarray(fixed, dtype=bool)
+    radius = k * np.sqrt(max(n, 1))
+
+    missing = np.isnan(pos).any(axis=1)
+    if missing.any():
+        placed = ~missing
+        # 每个未放置节点的已放置邻居坐标之和与个数
+        total = np.zeros((n, 2))
+        count = np.zeros(n)
+        for a, b in ((0, 1), (1, 0)):
+            mask = missing[edges[:, a]] & placed[edges[:, b]]
+            np.add.at(total, edges[mask, a], pos[edges[mask, b]])
+            np.add.at(count, edges[mask, a], 1)
+        centre = pos[placed].mean(axis=0) if placed.any() else np.zeros(2)
+        anchored = missing & (count > 0)
+        pos[anchored] = total[anchored] / count[anchored, None] + rng.normal(0, k / 4, (anchored.sum(), 2))
+        free = missing & (count == 0)
+        pos[free] = centre + rng.uniform(-radius / 2, radius / 2, (free.sum(), 2))
+
+    movable = ~fixed
+    if not movable.any() or n < 2:
+        return pos
+    rows = np.flatnonzero(movable)
+    source, target = edges[:, 0], edges[:, 1]
+    temperature = radius / 10
+    for step in range(iterations):
+        disp = _repulsion(pos, rows, k)
+        delta = pos[source] - pos[target]
+        dist = np.maximum(np.linalg.norm(delta, axis=1), 1e-2)
+        # FR 吸引力 d²/k，沿边方向
+        pull = delta * (dist / k)[:, None]
+        np.add.at(disp, source, -pull)
+        np.add.at(disp, target, pull)
+        disp -= GRAVITY * (pos - pos.mean(axis=0))
+        length = np.maximum(np.linalg.norm(disp, axis=1), 1e-9)
+        limit = temperature * (1 - step / iterations)
+        move = disp * (np.minimum(length, limit) / length)[:, None]
+        pos[movable] += move[movable]
+    return pos
+
+def layout_graph(node_ids, edges, previous=None, seed=0):
+    """
+    按节点ID布局：返回 {节点ID: (x, y)}
+
+    edges: [(源ID, 目标ID, ...)]；previous: 已有坐标 {节点ID: (x, y)}，
+    其中出现的节点固定不动，只放置其余节点（全部已放置时直接返回）
+    """
+    node_ids = list(node_ids)
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    pairs = [(index[edge[0]], index[edge[1]]) for edge in edges if edge[0] in index and edge[1] in index]
+    previous = previous or {}
+    initial = np.full((len(node_ids), 2), np.nan)
+    fixed = np.zeros(len(node_ids), dtype=bool)
+    for node_id, i in index.items():
+        if node_id in previous:
+            initial[i] = previous[node_id]
+            fixed[i] = True
+    if fixed.all():
+        return {node_id: tuple(previous[node_id]) for node_id in node_ids}
+    iterations = INCREMENTAL_ITERATIONS if fixed.any() else ITERATIONS
+    pos = force_layout(len(node_ids), pairs, initial, fixed, iterations=iterations, seed=seed)
+    return {node_id: (float(x), float(y)) for node_id, (x, y) in zip(node_ids, pos)}
+
+# ==================== 布局缓存 ====================
+
+def graph_version(node_ids, edges):
+    """图版本：节点ID和边的摘要"""
+    payload = json.dumps([sorted(node_ids), sorted([list(edge[:2]) for edge in edges])], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def _save(version, positions):
+    """保存布局（先写临时文件再替换）"""
+    try:
+        tmp_path = LAYOUT_PATH + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                version=np.array(version),
+                ids=np.array(list(positions), dtype=str),
+                positions=np.array(list(positions.values()), dtype=float).reshape(-1, 2),
+            )
+        os.replace(tmp_path, LAYOUT_PATH)
+    except Exception as e:
+        print(f"[图谱布局] 保存失败: {e}")
+
+def _load():
+    """读取保存的布局：(版本, {节点ID: (x, y)})，不存在或读取失败时返回 (None, {})"""
+    try:
+        with np.load(LAYOUT_PATH, allow_pickle=False) as data:
+            return str(data['version']), {
+                node_id: (float(x), float(y)) for node_id, (x, y) in zip(data['ids'].tolist(), data['positions'])
+            }
+    except FileNotFoundError:
+        return None, {}
+    except Exception as e:
+        print(f"[图谱布局] 读取失败: {e}")
+        return None, {}
+
+def cached_layout(node_ids, edges):
+    """
+    图的布局（按图版本缓存）：版本与内存或文件中的一致时直接返回，
+    否则以保存的布局中仍存在的节点为固定点，增量放置新增节点后保存
+    """
+    node_ids = list(node_ids)
+    edges = list(edges)
+    version = graph_version(node_ids, edges)
+    with _lock:
+        if _cache['version'] == version:
+            return _cache['positions']
+        saved_version, saved = _load()
+        if saved_version == version:
+            positions = saved
+        else:
+            started = time.time()
+            previous = {node_id: saved[node_id] for node_id in node_ids if node_id in saved}
+            positions = layout_graph(node_ids, edges, previous)
+            print(f"[图谱布局] {len(node_ids)} 个节点（新增 {len(node_ids) - len(previous)} 个），"
+                  f"耗时 {time.time() - started:.2f}s")
+            _save(version, positions)
+        _cache.update(version=version, positions=positions)
+        return positions
@@ -0,0 +1,295 @@
+"""
+后台批处理任务模块
+批量删除和数据修复按块执行（每块内使用 CALL { ... } IN TRANSACTIONS 分批提交），
+进度持久化到本地文件，进程重启后可继续执行；支持暂停、限速，并统计每秒处理行数
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import streamlit as st
+from streamlit_autorefresh import st_autorefresh
+
+from modules.content_repository import DATA_DIR
+from modules.data_cache import publish
+
+try:
+    from config.settings import JOB_BATCH_SIZE, JOB_PAUSE_SECONDS
+except (ImportError, AttributeError):
+    JOB_BATCH_SIZE = 1000
+    JOB_PAUSE_SECONDS = 0.2
+
+JOBS_STATE_PATH = os.path.join(DATA_DIR, "jobs_state.json")
+
+# 每块包含的事务批数（每块执行后保存进度、检查暂停）
+BATCHES_PER_CHUNK = 5
+
+# 任务类型：名称、执行阶段（匹配子句, 处理语句）、完成后发布的数据事件
+JOB_KINDS = {
+    'clear_activities': {
+        'label': "清除所有学习记录",
+        'phases': [("(a:yzbx_Activity)", "a", "DETACH DELETE a")],
+        'event': 'activities_cleared',
+    },
+    'clear_all': {
+        'label': "清除所有数据",
+        'phases': [("(a:yzbx_Activity)", "a", "DETACH DELETE a"),
+                   ("(a:yzbx_Student)", "a", "DETACH DELETE a")],
+        'event': 'data_cleared',
+    },
+    'delete_student': {
+        'label': "删除学生",
+        'phases': [("(:yzbx_Student {student_id: $student_id})-[:PERFORMED]->(a:yzbx_Activity)", "a", "DETACH DELETE a"),
+                   ("(a:yzbx_Student {student_id: $student_id})", "a", "DETACH DELETE a")],
+        'event': 'student_deleted',
+    },
+    'repair_fields': {
+        'label': "修复历史数据字段名",
+        'phases': [("(a:yzbx_Activity) WHERE a.module IS NOT NULL", "a", "SET a.module_name = a.module REMOVE a.module"),
+                   ("(a:yzbx_Activity) WHERE a.type IS NOT NULL", "a", "SET a.activity_type = a.type REMOVE a.type")],
+        'event': 'data_repaired',
+    },
+}
+
+_lock = threading.RLock()
+_jobs = {}       # 任务ID -> 任务状态（与文件同步）
+_threads = {}    # 任务ID -> 执行线程
+_loaded = [False]
+
+def get_neo4j_driver():
+    """获取Neo4j连接（复用auth模块的缓存连接）"""
+    from modules.auth import get_neo4j_driver as auth_get_driver
+    return auth_get_driver()
+
+# ==================== 进度持久化 ====================
+
+def _load():
+    """从文件加载任务状态（每个进程一次）"""
+    if _loaded[0]:
+        return
+    _loaded[0] = True
+    try:
+        with open(JOBS_STATE_PATH, "r", encoding="utf-8") as f:
+            _jobs.update(json.load(f))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"[批处理任务] 读取任务状态失败: {e}")
+
+def _save():
+    """写入任务状态（先写临时文件再替换，避免写到一半时崩溃损坏文件）"""
+    tmp_path = JOBS_STATE_PATH + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_jobs, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, JOBS_STATE_PATH)
+    except Exception as e:
+        print(f"[批处理任务] 保存任务状态失败: {e}")
+
+def _update(job_id, **fields):
+    with _lock:
+        _jobs[job_id].update(fields, updated_at=datetime.now().isoformat(timespec='seconds'))
+        _save()
+
+# ==================== 执行 ====================
+
+def _count(session, match, params):
+    """统计阶段待处理的行数（用于显示进度）"""
+    return session.run(f"MATCH {match} RETURN count(*) as count", **params).single()['count']
+
+def _run_chunk(session, match, var, action, params, batch_size):
+    """执行一块：最多 batch_size × BATCHES_PER_CHUNK 行，按 batch_size 分事务提交"""
+    query = (
+        f"MATCH {match} "
+        f"WITH {var} LIMIT $chunk_size "
+        f"CALL {{ WITH {var} {action} }} IN TRANSACTIONS OF {int(batch_size)} ROWS "
+        f"RETURN count(*) as count"
+    )
+    result = session.run(query, chunk_size=int(batch_size) * BATCHES_PER_CHUNK, **params)
+    return result.single()['count']
+
+def _execute(job_id):
+    """任务线程：逐块执行各阶段，每块后保存进度，状态不是 running 时停止"""
+    with _lock:
+        job = dict(_jobs[job_id])
+    phases = JOB_KINDS[job['kind']]['phases']
+
+    try:
+        driver = get_neo4j_driver()
+        with driver.session() as session:
+            for phase in range(job['phase'], len(phases)):
+                match, var, action = phases[phase]
+                if job['phase_total'] is None or phase != job['phase']:
+                    _update(job_id, phase=phase, phase_total=_count(session, match, job['params']), phase_done=0)
+
+                while True:
+                    with _lock:
+                        job = dict(_jobs[job_id])
+                    if job['status'] != 'running':
+                        return
+
+                    started = time.perf_counter()
+                    count = _run_chunk(session, match, var, action, job['params'], job['batch_size'])
+                    elapsed = time.perf_counter() - started
+                    _update(
+                        job_id,
+                        processed=job['processed'] + count,
+                        phase_done=job['phase_done'] + count,
+                        rows_per_second=round(count / elapsed, 1) if elapsed > 0 else None,
+                    )
+                    if count < job['batch_size'] * BATCHES_PER_CHUNK:
+                        break
+                    time.sleep(job['pause_seconds'])
+                with _lock:
+                    job = dict(_jobs[job_id])
+
+        _update(job_id, status='done', finished_at=datetime.now().isoformat(timespec='seconds'))
+        publish(JOB_KINDS[job['kind']]['event'], **job['params'])
+        print(f"[批处理任务] {JOB_KINDS[job['kind']]['label']} 完成，共处理 {job['processed']} 行")
+    except Exception as e:
+        _update(job_id, status='failed', error=str(e))
+        print(f"[批处理任务] {job_id} 执行失败: {e}")
+    finally:
+        with _lock:
+            _threads.pop(job_id, None)
+
+def _start_thread(job_id):
+    """启动任务线程（已在运行时不重复启动）"""
+    with _lock:
+        thread = _threads.get(job_id)
+        if thread is not None and thread.is_alive():
+            return
+        thread = threading.Thread(target=_execute, args=(job_id,), name=f"job-{job_id}", daemon=True)
+        _threads[job_id] = thread
+        thread.start()
+
+# ==================== 任务接口 ====================
+
+def start_job(kind, params=None, batch_size=None, pause_seconds=None):
+    """创建并启动后台任务，返回任务ID"""
+    with _lock:
+        _load()
+        job_id = uuid.uuid4().hex[:8]
+        _jobs[job_id] = {
+            'id': job_id,
+            'kind': kind,
+            'params': params or {},
+            'status': 'running',
+            'batch_size': int(batch_size or JOB_BATCH_SIZE),
+            'pause_seconds': float(JOB_PAUSE_SECONDS if pause_seconds is None else pause_seconds),
+            'phase': 0,
+            'phase_total': None,
+            'phase_done': 0,
+            'processed': 0,
+            'rows_per_second': None,
+            'error': None,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'updated_at': None,
+            'finished_at': None,
+        }
+        _save()
+    _start_thread(job_id)
+    return job_id
+
+def pause_job(job_id):
+    """暂停任务（当前块执行完后停止）"""
+    _update(job_id, status='paused')
+
+def resume_job(job_id, batch_size=None, pause_seconds=None):
+    """继续执行暂停、失败或中断的任务（可调整批大小和间隔）"""
+    fields = {'status': 'running', 'error': None}
+    if batch_size:
+        fields['batch_size'] = int(batch_size)
+    if pause_seconds is not None:
+        fields['pause_seconds'] = float(pause_seconds)
+    _update(job_id, **fields)
+    _start_thread(job_id)
+
+def cancel_job(job_id):
+    """取消任务（已处理的行不会恢复）"""
+    _update(job_id, status='cancelled', finished_at=datetime.now().isoformat(timespec='seconds'))
+
+def resume_interrupted_jobs():
+    """继续执行进程退出时仍在运行的任务（需在脚本线程中调用，以便加载数据库配置）"""
+    with _lock:
+        _load()
+        interrupted = [
+            job_id for job_id, job in _jobs.items()
+            if job['status'] == 'running' and job_id not in _threads
+        ]
+    for job_id in interrupted:
+        print(f"[批处理任务] 继续执行中断的任务 {job_id}")
+        _start_thread(job_id)
+
+def get_jobs(include_finished=True):
+    """获取任务列表（按创建时间倒序）"""
+    with _lock:
+        _load()
+        jobs = [dict(job) for job in _jobs.values()]
+    if not include_finished:
+        jobs = [job for job in jobs if job['status'] in ('running', 'paused', 'failed')]
+    return sorted(jobs, key=lambda job: job['created_at'], reverse=True)
+
+def has_active_job(kind=None):
+    """是否有未完成的任务（避免重复提交同类任务）"""
+    return any(
+        job['status'] in ('running', 'paused') and (kind is None or job['kind'] == kind)
+        for job in get_jobs(include_finished=False)
+    )
+
+# ==================== 页面 ====================
+
+def render_jobs_panel(key="jobs"):
+    """渲染后台任务进度面板（有运行中的任务时自动刷新）"""
+    jobs = get_jobs()[:5]
+    if not jobs:
+        return
+
+    if any(job['status'] == 'running' for job in jobs):
+        st_autorefresh(interval=2000, key=f"{key}_refresh")
+
+    st.markdown("#### ⏳ 后台任务")
+    status_labels = {
+        'running': "🔄 执行中", 'paused': "⏸️ 已暂停", 'done': "✅ 已完成",
+        'failed': "❌ 失败", 'cancelled': "🚫 已取消",
+    }
+    for job in jobs:
+        spec = JOB_KINDS[job['kind']]
+        phases = len(spec['phases'])
+        target = job['params'].get('student_id')
+        title = f"{spec['label']}" + (f"（{target}）" if target else "")
+
+        st.markdown(f"**{title}** · {status_labels.get(job['status'], job['status'])} · "
+                    f"阶段 {min(job['phase'] + 1, phases)}/{phases}")
+        total = job['phase_total'] or 0
+        progress = 1.0 if job['status'] == 'done' else (min(job['phase_done'] / total, 1.0) if total else 0.0)
+        st.progress(progress)
+        speed = f"{job['rows_per_second']:.0f} 行/秒" if job['rows_per_second'] else "-"
+        st.caption(f"已处理 {job['processed']} 行 · 速度 {speed} · 批大小 {job['batch_size']} · "
+                   f"间隔 {job['pause_seconds']} 秒 · 更新于 {job['updated_at'] or job['created_at']}")
+        if job['error']:
+            st.error(f"错误：{job['error']}")
+
+        if job['status'] in ('running', 'paused', 'failed'):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                if job['status'] == 'running':
+                    if st.button("⏸️ 暂停", key=f"{key}_pause_{job['id']}"):
+                        pause_job(job['id'])
+                        st.rerun()
+                elif st.button("▶️ 继续", key=f"{key}_resume_{job['id']}"):
+                    resume_job(job['id'])
+                    st.rerun()
+            with col2:
+                if st.button("🐢 降速", key=f"{key}_slow_{job['id']}", help="批大小减半、间隔加倍，降低对课堂写入的影响"):
+                    _update(job['id'], batch_size=max(100, job['batch_size'] // 2),
+                            pause_seconds=min(5.0, job['pause_seconds'] * 2 or 0.2))
+                    st.rerun()
+            with col3:
+                if st.button("🚫 取消", key=f"{key}_cancel_{job['id']}"):
+                    cancel_job(job['id'])
+                    st.rerun()
@@ -0,0 +1,223 @@
+"""
+知识点反向索引模块
+以整数下标在内存中维护 知识点 ↔ 病例、知识点 ↔ 能力、知识点 ↔ 学习过的学生 三组双向关系：
+病例和能力关系由课程内容一次构建（CSR数组），学生关系首次使用时从活动记录构建，
+之后随新活动增量更新；点击知识点或病例中的知识点时直接查表，不再逐次遍历图数据库
+"""
+
+import threading
+import time
+
+import numpy as np
+import streamlit as st
+
+from modules.case_store import get_all_cases
+from modules.content_repository import get_abilities, get_knowledge_details, get_knowledge_links
+from modules.data_cache import subscribe
+from modules.storage import get_storage
+from modules.archive import iter_all_activities
+from modules.mastery import KNOWLEDGE, KNOWLEDGE_INDEX, ability_knowledge, activity_knowledge, case_knowledge
+
+# ==================== 静态关系 ====================
+
+def _csr(pairs, n_rows):
+    """(行, 列) 对转为压缩行数组 (indptr, indices)，同一行的列按插入顺序"""
+    pairs = sorted(pairs, key=lambda pair: pair[0])
+    indptr = np.zeros(n_rows + 1, dtype=np.int32)
+    for row, _ in pairs:
+        indptr[row + 1] += 1
+    return np.cumsum(indptr, dtype=np.int32), np.array([col for _, col in pairs], dtype=np.int32)
+
+def _row(csr, row):
+    indptr, indices = csr
+    return indices[indptr[row]:indptr[row + 1]]
+
+CASES = tuple(get_all_cases())
+_case_index = {case.id: i for i, case in enumerate(CASES)}
+ABILITIES = tuple(get_abilities())
+_ability_index = {ability['id']: i for i, ability in enumerate(ABILITIES)}
+
+_case_pairs = [(i, KNOWLEDGE_INDEX[kp_id]) for i, case in enumerate(CASES) for kp_id in case_knowledge(case)]
+_ability_pairs = [
+    (_ability_index[ability_id], int(k)) for ability_id, indices in ability_knowledge().items()
+    if ability_id in _ability_index for k in indices
+]
+_case_to_knowledge = _csr(_case_pairs, len(CASES))
+_knowledge_to_case = _csr([(k, c) for c, k in _case_pairs], len(KNOWLEDGE))
+_ability_to_knowledge = _csr(_ability_pairs, len(ABILITIES))
+_knowledge_to_ability = _csr([(k, a) for a, k in _ability_pairs], len(KNOWLEDGE))
+
+# 知识点之间的关联：前置（指向该知识点）和后续（由该知识点指向）
+_by_name = {kp['name']: i for i, kp in enumerate(KNOWLEDGE)}
+_links = [(_by_name[s], _by_name[t], relation) for s, t, relation in get_knowledge_links() if s in _by_name and t in _by_name]
+
+# ==================== 学生关系（增量维护） ====================
+
+_lock = threading.RLock()
+_state = {'ready': False, 'dirty': False}
+_student_ids = []        # 学生下标 -> 学生ID
+_student_index = {}      # 学生ID -> 学生下标
+_knowledge_students = [dict() for _ in KNOWLEDGE]   # 知识点下标 -> {学生下标: 次数}
+_student_knowledge = {}  # 学生下标 -> {知识点下标: 次数}
+
+def _intern(student_id):
+    index = _student_index.get(student_id)
+    if index is None:
+        index = _student_index[student_id] = len(_student_ids)
+        _student_ids.append(student_id)
+    return index
+
+def _record(student_id, indices):
+    student = _intern(student_id)
+    row = _student_knowledge.setdefault(student, {})
+    for k in indices.tolist():
+        row[k] = row.get(k, 0) + 1
+        students = _knowledge_students[k]
+        students[student] = students.get(student, 0) + 1
+
+def _reset():
+    _student_ids.clear()
+    _student_index.clear()
+    _student_knowledge.clear()
+    for students in _knowledge_students:
+        students.clear()
+
+def _ensure_ready():
+    """首次使用或有删除操作后从全部活动（含归档）构建学生关系，数据库不可用时返回False"""
+    if _state['ready'] and not _state['dirty']:
+        return True
+    storage = get_storage()
+    if not storage.is_available():
+        return False
+    try:
+        started = time.perf_counter()
+        _reset()
+        for activity in iter_all_activities(storage):
+            evidence = activity_knowledge(activity.get('module'), activity.get('activity_type'),
+                                          activity.get('content_id'), activity.get('content_name'),
+                                          activity.get('details'))
+            if evidence is not None:
+                _record(activity['student_id'], evidence[0])
+        _state.update(ready=True, dirty=False)
+        print(f"[知识点索引] 构建 {len(_student_ids)} 名学生的学习关系，耗时 {time.perf_counter() - started:.2f}s")
+        return True
+    except Exception as e:
+        print(f"[知识点索引] 构建失败: {e}")
+        return False
+
+def _on_data_event(event, payload):
+    """数据事件订阅：新活动增量计入；删除学生直接移除；清空或修复后标记重建"""
+    with _lock:
+        if not _state['ready']:
+            return
+        if event == 'activity_logged':
+            evidence = activity_knowledge(payload.get('module_name'), payload.get('activity_type'),
+                                          payload.get('content_id'), payload.get('content_name'),
+                                          payload.get('details'))
+            if evidence is not None:
+                _record(payload.get('student_id'), evidence[0])
+        elif event == 'student_deleted':
+            student = _student_index.get(payload.get('student_id'))
+            if student is not None:
+                for k in _student_knowledge.pop(student, {}):
+                    _knowledge_students[k].pop(student, None)
+        elif event in ('activities_cleared', 'data_cleared', 'data_repaired'):
+            _state['dirty'] = True
+
+subscribe(_on_data_event)
+
+# ==================== 读取接口 ====================
+
+def resolve_knowledge(key):
+    """知识点ID或名称 -> 下标，不存在时返回None"""
+    if key in KNOWLEDGE_INDEX:
+        return KNOWLEDGE_INDEX[key]
+    return _by_name.get(key)
+
+def knowledge_cases(key):
+    """涉及该知识点的病例记录列表"""
+    k = resolve_knowledge(key)
+    return [] if k is None else [CASES[c] for c in _row(_knowledge_to_case, k)]
+
+def knowledge_abilities(key):
+    """需要该知识点的能力列表"""
+    k = resolve_knowledge(key)
+    return [] if k is None else [ABILITIES[a] for a in _row(_knowledge_to_ability, k)]
+
+def knowledge_students(key, limit=None):
+    """学习过该知识点的学生 [(学生ID, 相关活动次数)]，按次数降序；数据库不可用时返回None"""
+    k = resolve_knowledge(key)
+    if k is None:
+        return []
+    with _lock:
+        if not _ensure_ready():
+            return None
+        students = sorted(_knowledge_students[k].items(), key=lambda item: -item[1])
+        return [(_student_ids[s], count) for s, count in students[:limit]]
+
+def knowledge_links(key):
+    """知识点的前置和后续知识点 {'prerequisites': [(名称, 关系)], 'next': [(名称, 关系)]}"""
+    k = resolve_knowledge(key)
+    if k is None:
+        return {'prerequisites': [], 'next': []}
+    return {
+        'prerequisites': [(KNOWLEDGE[s]['name'], relation) for s, t, relation in _links if t == k],
+        'next': [(KNOWLEDGE[t]['name'], relation) for s, t, relation in _links if s == k],
+    }
+
+def case_knowledge_points(case_id):
+    """病例涉及的知识点列表（知识点字典，顺序与课程一致）"""
+    c = _case_index.get(case_id)
+    return [] if c is None else [KNOWLEDGE[k] for k in _row(_case_to_knowledge, c)]
+
+def ability_knowledge_points(ability_id):
+    """能力涉及的知识点列表"""
+    a = _ability_index.get(ability_id)
+    return [] if a is None else [KNOWLEDGE[k] for k in _row(_ability_to_knowledge, a)]
+
+def student_knowledge(student_id):
+    """学生学习过的知识点 [(知识点字典, 相关活动次数)]，数据库不可用时返回None"""
+    with _lock:
+        if not _ensure_ready():
+            return None
+        student = _student_index.get(student_id)
+        row = _student_knowledge.get(student, {}) if student is not None else {}
+        return [(KNOWLEDGE[k], count) for k, count in sorted(row.items())]
+
+# ==================== 页面组件 ====================
+
+def render_knowledge_detail(key, show_students=False, exclude_case=None):
+    """显示知识点的说明、前置/后续知识点、相关病例、能力（以及教师端的学习学生）"""
+    k = resolve_knowledge(key)
+    if k is None:
+        return
+    kp = KNOWLEDGE[k]
+    st.markdown(f"**📝 {kp['name']}**（{kp['chapter']}）")
+    detail = get_knowledge_details().get(kp['name'])
+    if detail:
+        st.caption(detail)
+
+    links = knowledge_links(k)
+    if links['prerequisites'] or links['next']:
+        parts = [f"⬅️ {name}（{relation}）" for name, relation in links['prerequisites']]
+        parts += [f"➡️ {name}（{relation}）" for name, relation in links['next']]
+        st.markdown(" · ".join(parts))
+
+    cases = [case for case in knowledge_cases(k) if case.id != exclude_case]
+    abilities = knowledge_abilities(k)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**📋 相关病例**")
+        st.markdown("\n".join(f"- {case.title}" for case in cases) if cases else "暂无")
+    with col2:
+        st.markdown("**🎯 相关能力**")
+        st.markdown("\n".join(f"- {ability['name']}" for ability in abilities) if abilities else "暂无")
+
+    if show_students:
+        students = knowledge_students(k)
+        if students is None:
+            st.caption("数据库暂不可用，无法显示学习过的学生")
+        else:
+            st.markdown(f"**👥 学习过的学生**（{len(students)}人）")
+            if students:
+                st.markdown("、".join(f"{student_id}（{count}次）" for student_id, count in students[:20]))
@@ -0,0 +1,263 @@
+"""
+学习排行榜模块
+在内存中物化每个学生的活动计数和活跃日期，记录活动时增量更新，
+按时间窗口（今日/本周/本学期/全部）和模块维护Top-K排行
+"""
+
+import heapq
+import threading
+from datetime import date, datetime, timedelta, timezone
+
+from modules.data_cache import subscribe
+from modules.storage import get_storage
+from modules.archive import archived_daily_rollup
+
+try:
+    from config.settings import SEMESTER_START
+except (ImportError, AttributeError):
+    SEMESTER_START = ""
+
+LEADERBOARD_SIZE = 10
+
+# 排行时间窗口
+WINDOWS = {
+    'today': "今日",
+    'week': "本周",
+    'semester': "本学期",
+    'all': "全部",
+}
+
+_lock = threading.RLock()
+_build_lock = threading.Lock()   # 同一时间只有一个线程执行初始化查询
+_state = {
+    'bootstrapped': False,
+    'loading': False,   # 正在锁外执行初始化查询，截止时间之后的新活动暂存到 _pending
+    'generation': 0,    # 删除学生或清空时加一，查询期间发生变化则丢弃查询结果
+    'cutoff': None,   # 初始化查询的截止时间，之前的活动已包含在初始化数据中
+    'days': {},       # 模块(None表示全部) -> {学号: {日期: 活动数}}
+    'names': {},      # 学号 -> 姓名
+    'boards': {},     # (窗口, 模块) -> 排行榜
+}
+_pending = []   # 初始化查询期间到达的新活动 [(学号, 模块, 活动时间)]
+
+def _utc_now():
+    """当前UTC时间（与数据库中 datetime() 的时区一致）"""
+    return datetime.now(timezone.utc)
+
+def window_start(window, today=None):
+    """计算时间窗口的起始日期（'all' 返回 date.min）"""
+    today = today or _utc_now().date()
+    if window == 'today':
+        return today
+    if window == 'week':
+        return today - timedelta(days=today.weekday())
+    if window == 'semester':
+        if SEMESTER_START:
+            return date.fromisoformat(SEMESTER_START)
+        # 秋季学期9月开始（次年1月仍属秋季学期），春季学期2月开始
+        if today.month >= 8:
+            return date(today.year, 9, 1)
+        if today.month == 1:
+            return date(today.year - 1, 9, 1)
+        return date(today.year, 2, 1)
+    return date.min
+
+def _scopes(module_name):
+    """活动计入的排行范围：全部模块 + 所属模块"""
+    return (None,) if module_name is None else (None, module_name)
+
+# ==================== 初始化 ====================
+
+def _bootstrap():
+    """
+    从数据库一次性加载按 学生×模块×日期 聚合的活动数，包括已归档的活动（每个进程只执行一次）
+
+    聚合查询在锁外执行，不阻塞记录活动的请求：查询期间到达、活动时间不早于截止时间的新活动暂存，
+    换入初始化数据后再计入；查询期间删除学生或清空时丢弃结果，下次读取时重新初始化
+    """
+    with _lock:
+        if _state['bootstrapped']:
+            return True
+    with _build_lock:
+        with _lock:
+            if _state['bootstrapped']:
+                return True
+            cutoff = _utc_now()
+            generation = _state['generation']
+            _state.update(loading=True, cutoff=cutoff)
+            _pending.clear()
+        try:
+            storage = get_storage()
+            if not storage.is_available():
+                return False
+            rows = storage.activity_rollup(cutoff) + archived_daily_rollup()
+
+            days = {None: {}}
+            names = {}
+            for row in rows:
+                day = date.fromisoformat(row['day'])
+                for module in _scopes(row['module']):
+                    student_days = days.setdefault(module, {}).setdefault(row['student_id'], {})
+                    student_days[day] = student_days.get(day, 0) + row['count']
+                if row['name']:
+                    names[row['student_id']] = row['name']
+
+            with _lock:
+                if _state['generation'] != generation:
+                    print("[排行榜] 初始化期间数据被删除，下次读取时重新初始化")
+                    return False
+                # 查询期间注册的学生姓名以事件为准
+                names.update(_state['names'])
+                _state['days'] = days
+                _state['names'] = names
+                _state['boards'] = {}
+                _state['bootstrapped'] = True
+                for student_id, module_name, when in _pending:
+                    _apply(student_id, module_name, when)
+            print(f"[排行榜] 初始化完成：{len(days[None])} 名学生")
+            return True
+        except Exception as e:
+            print(f"[排行榜] 初始化失败: {e}")
+            return False
+        finally:
+            with _lock:
+                _state['loading'] = False
+                _pending.clear()
+
+# ==================== 排行榜物化 ====================
+
+def _rank_key(board, student_id):
+    """排序键：活动数优先，其次活跃天数"""
+    return (board['counts'][student_id], board['active_days'][student_id], student_id)
+
+def _build_board(window, module, start):
+    """由内存中的日期计数构建排行榜（仅在窗口切换或数据删除时执行）"""
+    counts = {}
+    active_days = {}
+    for student_id, student_days in _state['days'].get(module, {}).items():
+        in_window = [n for day, n in student_days.items() if day >= start]
+        if in_window:
+            counts[student_id] = sum(in_window)
+            active_days[student_id] = len(in_window)
+
+    board = {'start': start, 'counts': counts, 'active_days': active_days, 'top': []}
+    board['top'] = heapq.nlargest(LEADERBOARD_SIZE, counts, key=lambda sid: _rank_key(board, sid))
+    return board
+
+def _get_board(window, module):
+    """获取排行榜，窗口起始日期变化时重建"""
+    start = window_start(window)
+    key = (window, module)
+    board = _state['boards'].get(key)
+    if board is None or board['start'] != start:
+        board = _build_board(window, module, start)
+        _state['boards'][key] = board
+    return board
+
+def _bump(board, student_id, new_day):
+    """学生活动数+1后更新排行榜的Top-K（计数只增不减，Top-K可增量维护）"""
+    board['counts'][student_id] = board['counts'].get(student_id, 0) + 1
+    board['active_days'][student_id] = board['active_days'].get(student_id, 0) + (1 if new_day else 0)
+
+    top = board['top']
+    if student_id not in top:
+        if len(top) < LEADERBOARD_SIZE:
+            top.append(student_id)
+        elif _rank_key(board, student_id) > _rank_key(board, top[-1]):
+            top[-1] = student_id
+        else:
+            return
+    top.sort(key=lambda sid: _rank_key(board, sid), reverse=True)
+
+# ==================== 写入接口 ====================
+
+def record_activity(student_id, module_name, when=None):
+    """
+    记录一次活动（在活动写入数据库后调用）
+
+    when 为数据库中的活动时间（activity_logged 事件携带）：初始化查询按活动时间截止，
+    改用事件到达时的当前时间比较，截止前写入、截止后才到达的活动会被重复计数
+    """
+    if not student_id:
+        return
+    when = (when or _utc_now()).astimezone(timezone.utc)
+
+    with _lock:
+        # 未初始化时无需处理，初始化时会从数据库读取；初始化截止时间之前的活动已被计入
+        if not (_state['bootstrapped'] or _state['loading']) or when < _state['cutoff']:
+            return
+        if not _state['bootstrapped']:
+            _pending.append((student_id, module_name, when))
+            return
+        _apply(student_id, module_name, when)
+
+def _apply(student_id, module_name, when):
+    """把一次活动计入日期计数和已物化的排行榜（调用方持有锁）"""
+    day = when.date()
+    for module in _scopes(module_name):
+        student_days = _state['days'].setdefault(module, {}).setdefault(student_id, {})
+        new_day = day not in student_days
+        student_days[day] = student_days.get(day, 0) + 1
+
+        for (window, board_module), board in _state['boards'].items():
+            if board_module == module and day >= board['start']:
+                _bump(board, student_id, new_day)
+
+def set_student_name(student_id, name):
+    """更新学生姓名"""
+    with _lock:
+        if name:
+            _state['names'][student_id] = name
+
+def remove_student(student_id):
+    """删除学生后从排行榜中移除"""
+    with _lock:
+        for module_days in _state['days'].values():
+            module_days.pop(student_id, None)
+        _state['names'].pop(student_id, None)
+        _state['boards'] = {}
+        _state['generation'] += 1
+
+def reset_leaderboard():
+    """清空排行榜（批量删除活动后调用，下次读取时重新初始化）"""
+    with _lock:
+        _state['bootstrapped'] = False
+        _state['generation'] += 1
+        _state['days'] = {}
+        _state['names'] = {}
+        _state['boards'] = {}
+
+def _on_data_event(event, payload):
+    """数据事件订阅：根据写入操作增量更新排行榜"""
+    if event == 'activity_logged':
+        record_activity(payload.get('student_id'), payload.get('module_name'), payload.get('timestamp'))
+    elif event == 'student_registered':
+        set_student_name(payload.get('student_id'), payload.get('name'))
+    elif event == 'student_deleted':
+        remove_student(payload.get('student_id'))
+    elif event in ('activities_cleared', 'data_cleared'):
+        reset_leaderboard()
+
+subscribe(_on_data_event)
+
+# ==================== 读取接口 ====================
+
+def get_leaderboard(window='all', module=None, k=LEADERBOARD_SIZE):
+    """
+    获取排行榜Top-K（读取物化结果，不扫描活动记录）
+
+    返回 [{'student_id', 'name', 'activity_count', 'active_days'}]，数据库不可用时返回None
+    """
+    if not _bootstrap():
+        return None
+    with _lock:
+        board = _get_board(window, module)
+        return [
+            {
+                'student_id': student_id,
+                'name': _state['names'].get(student_id),
+                'activity_count': board['counts'][student_id],
+                'active_days': board['active_days'][student_id],
+            }
+            for student_id in board['top'][:k]
+        ]
@@ -0,0 +1,384 @@
+"""
+知识追踪模块
+贝叶斯知识追踪（BKT）：为每个学生的每个知识点维护掌握概率，
+每条相关活动（查看病例、课堂回答、保存练习等）到达时只更新涉及的知识点；
+历史活动的批量重算按 (学生, 知识点) 分组后逐轮向量化计算；
+批量重算在锁外进行，不阻塞记录活动的请求
+"""
+
+import json
+import os
+import threading
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+from modules.case_store import get_all_cases
+from modules.content_repository import DATA_DIR, get_knowledge_points, get_knowledge_links, get_ability_knowledge_map
+from modules.data_cache import subscribe, today
+from modules.archive import RebuildableState, iter_all_activities
+
+try:
+    from config.settings import MASTERY_THRESHOLD, MASTERY_PERSIST_INTERVAL
+except (ImportError, AttributeError):
+    MASTERY_THRESHOLD = 0.8
+    MASTERY_PERSIST_INTERVAL = 60
+
+MASTERY_PATH = os.path.join(DATA_DIR, "mastery.npz")
+
+# BKT参数：初始掌握、学习转移、失误、猜测概率
+P_INIT = 0.1
+P_TRANSIT = 0.15
+P_SLIP = 0.1
+P_GUESS = 0.25
+
+# 活动证据：(模块, 活动类型) -> (是否为作答, 权重)
+# 作答按"答对"的观察更新后验（活动中没有对错信息，作答只作为较弱的正向证据）；
+# 浏览只计为一次学习机会，页面重跑和图谱点击会重复记录浏览，同一内容每天只计第一次（见 _first_view）
+ACTIVITY_EVIDENCE = {
+    ('病例库', '查看病例'): (False, 0.5),
+    ('病例库', '保存笔记'): (True, 0.6),
+    ('知识图谱', '查看模块'): (False, 0.1),
+    ('课中互动', '提交回答'): (True, 0.6),
+    ('课中互动', '练习回答'): (True, 0.6),
+}
+
+# ==================== 知识点索引 ====================
+
+def _build_index():
+    """
+    知识点目录（与Neo4j中 yzbx_Knowledge 的ID一致：KP_模块_C章节序号_知识点序号）
+
+    返回 (知识点列表, 名称->下标, 模块ID->下标数组, 病例ID->下标数组)
+    """
+    knowledge = get_knowledge_points()
+    by_module = {}
+    for i, kp in enumerate(knowledge):
+        by_module.setdefault(kp['module_id'], []).append(i)
+    by_module = {module_id: np.array(indices, dtype=np.int32) for module_id, indices in by_module.items()}
+    by_name = {kp['name']: i for i, kp in enumerate(knowledge)}
+
+    # 病例涉及的知识点：病例文本中出现的知识点名称
+    by_case = {}
+    for case in get_all_cases():
+        text = json.dumps(case.to_dict(), ensure_ascii=False)
+        by_case[case.id] = np.array([i for name, i in by_name.items() if name in text], dtype=np.int32)
+    return knowledge, by_name, by_module, by_case
+
+KNOWLEDGE, _by_name, _by_module, _by_case = _build_index()
+KNOWLEDGE_INDEX = {kp['id']: i for i, kp in enumerate(KNOWLEDGE)}
+_EMPTY = np.zeros(0, dtype=np.int32)
+
+# 前置知识点：关联图中指向该知识点的源知识点
+_prerequisites = {}
+for _source, _target, _ in get_knowledge_links():
+    if _source in _by_name and _target in _by_name:
+        _prerequisites.setdefault(_by_name[_target], []).append(_by_name[_source])
+
+def _match_names(text):
+    """文本中出现的知识点下标"""
+    if not text:
+        return _EMPTY
+    return np.array([i for name, i in _by_name.items() if name in text], dtype=np.int32)
+
+def case_knowledge(case):
+    """病例涉及的知识点ID列表（病例文本中出现的知识点名称）"""
+    indices = _by_case.get(case.id)
+    if indices is None:
+        indices = _match_names(json.dumps(case.to_dict(), ensure_ascii=False))
+    return [KNOWLEDGE[i]['id'] for i in indices]
+
+def activity_knowledge(module_name, activity_type, content_id=None, content_name=None, details=None):
+    """
+    活动涉及的知识点和证据类型
+
+    返回 (知识点下标数组, 是否为作答, 权重)，与知识点无关的活动返回None
+    """
+    evidence = ACTIVITY_EVIDENCE.get((module_name, activity_type))
+    if evidence is None:
+        return None
+    if module_name == '病例库':
+        indices = _by_case.get(content_id, _EMPTY)
+    elif module_name == '知识图谱':
+        indices = _by_module.get(content_id, _EMPTY)
+    else:
+        indices = _match_names(f"{content_name or ''} {details or ''}")
+    if not len(indices):
+        return None
+    return (indices,) + evidence
+
+def _day_number(value):
+    """时间（datetime 或 ISO 字符串）转为UTC日期序号"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.astimezone(timezone.utc).date().toordinal()
+
+def _first_view(viewed, student_id, module_name, content_id, day):
+    """
+    浏览是否为学生当天第一次查看该内容（重复浏览不再计为学习机会）
+
+    viewed: {(学生ID, 模块, 内容ID): 最近浏览的日期序号}，就地更新
+    """
+    key = (student_id, module_name, content_id)
+    if viewed.get(key) == day:
+        return False
+    viewed[key] = day
+    return True
+
+# ==================== BKT更新 ====================
+
+def bkt_step(p, answered, weight):
+    """
+    一次BKT更新（标量或数组）
+
+    作答时按答对的观察计算后验，再按权重与先验混合；之后加上学习转移
+    """
+    correct = p * (1 - P_SLIP)
+    posterior = correct / (correct + (1 - p) * P_GUESS)
+    p = np.where(answered, p + weight * (posterior - p), p)
+    return p + (1 - p) * P_TRANSIT * weight
+
+def recompute(events, n_students):
+    """
+    批量重算掌握概率（向量化）
+
+    events: (学生下标, 知识点下标, 是否作答, 权重) 四个数组，按时间顺序；
+    同一 (学生, 知识点) 的事件必须依次应用：按组内序号分轮，每轮一次向量运算更新所有组的第r个事件；
+    事件按 (组内序号, 组) 排序一次，每轮是连续的一段，总代价与事件数成线性
+    返回 ndarray(n_students, 知识点数)
+    """
+    n_knowledge = len(KNOWLEDGE)
+    matrix = np.full((n_students, n_knowledge), P_INIT, dtype=np.float32)
+    students, kps, answered, weights = events
+    if not len(students):
+        return matrix
+
+    pairs = students.astype(np.int64) * n_knowledge + kps
+    order = np.argsort(pairs, kind='stable')   # 稳定排序保持组内的时间顺序
+    pairs, answered, weights = pairs[order], answered[order], weights[order]
+
+    # 组内序号 = 位置 - 所在组的起始位置
+    starts = np.r_[0, np.flatnonzero(np.diff(pairs)) + 1]
+    sizes = np.diff(np.r_[starts, len(pairs)])
+    groups = np.repeat(np.arange(len(starts)), sizes)
+    ranks = np.arange(len(pairs)) - starts[groups]
+
+    by_round = np.argsort(ranks, kind='stable')
+    groups, answered, weights = groups[by_round], answered[by_round], weights[by_round]
+    bounds = np.r_[0, np.cumsum(np.bincount(ranks))]
+
+    values = np.full(len(starts), P_INIT, dtype=np.float64)   # 每组当前的掌握概率
+    for r in range(len(bounds) - 1):
+        current = slice(bounds[r], bounds[r + 1])
+        cells = groups[current]
+        values[cells] = bkt_step(values[cells], answered[current], weights[current])
+
+    matrix.reshape(-1)[pairs[starts]] = values
+    return matrix
+
+# ==================== 掌握状态 ====================
+
+_lock = threading.RLock()
+_mastery = {}   # 学生ID -> ndarray(float32, 知识点数)
+_viewed = {}    # (学生ID, 模块, 内容ID) -> 最近计入的浏览日期序号
+
+def _rebuild(storage, since):
+    """
+    从全部活动（含归档）批量重算所有学生的掌握概率
+
+    返回 ((掌握概率 {学生ID: 数组}, 浏览记录 {(学生ID, 模块, 内容ID): 日期序号}), since 之后读到的活动ID集合)
+    """
+    student_index = {}
+    viewed = {}
+    recent = set()
+    students, kps, answered, weights = [], [], [], []
+    for activity in iter_all_activities(storage):
+        if activity['timestamp'] >= since:
+            recent.add(activity['id'])
+        evidence = activity_knowledge(activity.get('module'), activity.get('activity_type'),
+                                      activity.get('content_id'), activity.get('content_name'),
+                                      activity.get('details'))
+        if evidence is None:
+            continue
+        indices, is_answer, weight = evidence
+        if not is_answer and not _first_view(viewed, activity['student_id'], activity.get('module'),
+                                             activity.get('content_id'), _day_number(activity['timestamp'])):
+            continue
+        student = student_index.setdefault(activity['student_id'], len(student_index))
+        students.append(np.full(len(indices), student, dtype=np.int32))
+        kps.append(indices)
+        answered.append(np.full(len(indices), is_answer))
+        weights.append(np.full(len(indices), weight))
+
+    events = tuple(np.concatenate(parts) if parts else np.zeros(0) for parts in (students, kps, answered, weights))
+    matrix = recompute(events, len(student_index))
+    print(f"[知识追踪] 批量重算 {len(student_index)} 名学生")
+    return ({student_id: matrix[i] for student_id, i in student_index.items()}, viewed), recent
+
+def _save(watermark):
+    """保存掌握矩阵和水位线（先写临时文件再替换，调用方持有锁）"""
+    student_ids = list(_mastery)
+    matrix = np.stack([_mastery[s] for s in student_ids]) if student_ids else np.zeros((0, len(KNOWLEDGE)), dtype=np.float32)
+    tmp_path = MASTERY_PATH + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(
+            f,
+            students=np.array(student_ids, dtype=str),
+            knowledge=np.array(list(KNOWLEDGE_INDEX), dtype=str),
+            matrix=matrix,
+            watermark=np.array(-1 if watermark is None else watermark),
+        )
+    os.replace(tmp_path, MASTERY_PATH)
+
+def _load(watermark):
+    """
+    读取保存的掌握矩阵，水位线和知识点目录与当前一致时返回 (掌握概率, 浏览记录)，否则返回None
+
+    文件中没有浏览记录，当天已计入的浏览最多再计一次
+    """
+    try:
+        with np.load(MASTERY_PATH, allow_pickle=False) as data:
+            if int(data['watermark']) != watermark:
+                return None
+            if data['knowledge'].tolist() != list(KNOWLEDGE_INDEX):
+                return None
+            return {student_id: row.copy() for student_id, row in zip(data['students'].tolist(), data['matrix'])}, {}
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[知识追踪] 读取失败: {e}")
+        return None
+
+def _apply_activity(payload):
+    """新活动只更新涉及的知识点（调用方持有锁）"""
+    evidence = activity_knowledge(payload.get('module_name'), payload.get('activity_type'),
+                                  payload.get('content_id'), payload.get('content_name'),
+                                  payload.get('details'))
+    if evidence is None:
+        return
+    indices, is_answer, weight = evidence
+    student_id = payload.get('student_id')
+    if not is_answer and not _first_view(_viewed, student_id, payload.get('module_name'),
+                                         payload.get('content_id'), date.fromisoformat(today()).toordinal()):
+        return
+    row = _mastery.setdefault(student_id, np.full(len(KNOWLEDGE), P_INIT, dtype=np.float32))
+    row[indices] = bkt_step(row[indices], is_answer, weight)
+
+def _install(state):
+    mastery, viewed = state
+    _mastery.clear()
+    _mastery.update(mastery)
+    _viewed.clear()
+    _viewed.update(viewed)
+
+def _remove_student(student_id):
+    _mastery.pop(student_id, None)
+    for key in [key for key in _viewed if key[0] == student_id]:
+        del _viewed[key]
+
+_store = RebuildableState("知识追踪", _lock, load=_load, rebuild=_rebuild, install=_install,
+                          apply=_apply_activity, save=_save, persist_interval=MASTERY_PERSIST_INTERVAL)
+
+def _ensure_ready():
+    """首次读取或有删除操作后加载/重算，数据库不可用时返回False"""
+    return _store.ensure_ready()
+
+def _on_data_event(event, payload):
+    """数据事件订阅：新活动只更新涉及的知识点；删除学生直接移除；清空或修复后标记重算"""
+    if event == 'activity_logged':
+        _store.on_activity(payload)
+    elif event == 'student_deleted':
+        _store.on_student_deleted(lambda: _remove_student(payload.get('student_id')))
+    elif event in ('activities_cleared', 'data_cleared', 'data_repaired'):
+        _store.mark_dirty()
+
+subscribe(_on_data_event)
+
+# ==================== 读取接口 ====================
+
+# 能力涉及的知识点：能力图谱中的知识点名称与课程知识点按字符二元组相似度匹配
+def _bigrams(text):
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+def _similar_knowledge(name, threshold=0.4):
+    """与名称最相似的课程知识点下标，相似度（Dice系数）低于阈值时返回None"""
+    grams = _bigrams(name)
+    best, best_score = None, threshold
+    for kp_name, i in _by_name.items():
+        other = _bigrams(kp_name)
+        score = 2 * len(grams & other) / (len(grams) + len(other)) if grams and other else 0
+        if score >= best_score:
+            best, best_score = i, score
+    return best
+
+_ability_knowledge = {}
+for _ability_id, _items in get_ability_knowledge_map().items():
+    _matched = [(_similar_knowledge(name), weight) for name, _, weight in _items]
+    _matched = [(i, weight) for i, weight in _matched if i is not None]
+    if _matched:
+        _ability_knowledge[_ability_id] = (np.array([i for i, _ in _matched]), np.array([w for _, w in _matched]))
+
+def ability_knowledge():
+    """各能力涉及的知识点下标 {能力ID: 下标数组}（顺序与 KNOWLEDGE 一致）"""
+    return {ability_id: indices for ability_id, (indices, _) in _ability_knowledge.items()}
+
+# 前置关系矩阵：_prerequisite_matrix[i, j] 表示 j 是 i 的前置知识点
+_prerequisite_matrix = np.zeros((len(KNOWLEDGE), len(KNOWLEDGE)), dtype=bool)
+for _target, _sources in _prerequisites.items():
+    _prerequisite_matrix[_target, _sources] = True
+
+def get_mastery(student_id):
+    """
+    学生各知识点的掌握概率 ndarray（顺序与 KNOWLEDGE 一致）
+
+    没有相关活动的学生返回初始概率；数据库不可用时返回None
+    """
+    if not _ensure_ready():
+        return None
+    with _lock:
+        row = _mastery.get(student_id)
+        return row.copy() if row is not None else np.full(len(KNOWLEDGE), P_INIT, dtype=np.float32)
+
+def knowledge_mastery(student_id):
+    """学生各知识点的掌握概率 {知识点名称: 概率}，数据库不可用时返回None"""
+    mastery = get_mastery(student_id)
+    if mastery is None:
+        return None
+    return {kp['name']: float(p) for kp, p in zip(KNOWLEDGE, mastery)}
+
+def recommend_knowledge(student_id, limit=3):
+    """
+    推荐接下来学习的知识点 [{'id', 'name', 'module_id', 'chapter', 'mastery'}]
+
+    候选为尚未掌握、且前置知识点均已掌握的知识点，按掌握概率从低到高排序
+    """
+    mastery = get_mastery(student_id)
+    if mastery is None:
+        return []
+    mastered = mastery >= MASTERY_THRESHOLD
+    ready = ~mastered & ~(_prerequisite_matrix & ~mastered).any(axis=1)
+    candidates = np.flatnonzero(ready)
+    candidates = candidates[np.argsort(mastery[candidates], kind='stable')][:limit]
+    return [dict(KNOWLEDGE[i], mastery=float(mastery[i])) for i in candidates]
+
+def ability_mastery(student_id):
+    """学生各能力的估计掌握度 {能力ID: 0-1}（相关知识点掌握概率的加权平均），没有匹配知识点的能力不返回"""
+    mastery = get_mastery(student_id)
+    if mastery is None:
+        return {}
+    return {
+        ability_id: float(np.average(mastery[indices], weights=weights))
+        for ability_id, (indices, weights) in _ability_knowledge.items()
+    }
+
+def get_mastery_status():
+    """获取知识追踪状态（学生数、重算耗时、保存时间）"""
+    with _lock:
+        return {
+            'ready': _store.ready,
+            'students': len(_mastery),
+            'knowledge': len(KNOWLEDGE),
+            'rebuild_seconds': _store.rebuild_seconds,
+            'saved_at': datetime.fromtimestamp(_store.saved_at) if _store.saved_at else None,
+            'unsaved': _store.changed,
+        }
@@ -0,0 +1,171 @@
+"""
+提示词构建模块
+按token预算拼装大模型提示词，并记录每次调用的token用量
+"""
+
+import time
+
+try:
+    from config.settings import LLM_PROMPT_TOKEN_BUDGET
+except (ImportError, AttributeError):
+    LLM_PROMPT_TOKEN_BUDGET = 1200
+
+def _is_cjk(ch):
+    """判断字符是否为中日韩文字或全角标点"""
+    code = ord(ch)
+    return (
+        0x4E00 <= code <= 0x9FFF or    # 常用汉字
+        0x3400 <= code <= 0x4DBF or    # 扩展A
+        0x3000 <= code <= 0x303F or    # 中文标点
+        0xFF00 <= code <= 0xFFEF       # 全角字符
+    )
+
+def estimate_tokens(text):
+    """
+    本地估算文本的token数（不调用API）
+    参考DeepSeek官方换算：1个中文字符≈0.6 token，1个英文字符≈0.3 token
+    """
+    if not text:
+        return 0
+    total = 0.0
+    for ch in str(text):
+        if _is_cjk(ch):
+            total += 0.6
+        elif ch.isspace():
+            total += 0.1
+        elif ord(ch) < 128:
+            total += 0.3
+        else:
+            # emoji等其他符号通常单独占1个以上token
+            total += 1.0
+    return int(total + 0.999)
+
+def truncate_to_tokens(text, max_tokens, suffix="…"):
+    """按token预算截断文本（替代按字符数的硬截断）"""
+    text = str(text or "")
+    if max_tokens is None or estimate_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+
+    # 二分查找能放进预算的最长前缀
+    budget = max_tokens - estimate_tokens(suffix)
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(text[:mid]) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo] + suffix
+
+def make_section(name, text="", items=None, max_tokens=None, item_max_tokens=None,
+                 empty_text="", separator="\n"):
+    """
+    创建提示词片段
+
+    - text：固定文本（如任务说明），始终保留
+    - items：可裁剪条目列表，每项为 (priority, text)，按priority从高到低保留
+    - max_tokens：该片段的token预算（None表示只受总预算限制）
+    - item_max_tokens：单个条目的token上限，超出部分截断
+    """
+    return {
+        'name': name,
+        'text': text,
+        'items': list(items) if items is not None else None,
+        'max_tokens': max_tokens,
+        'item_max_tokens': item_max_tokens,
+        'empty_text': empty_text,
+        'separator': separator,
+    }
+
+def build_prompt(sections, total_budget=None):
+    """
+    按预算拼装提示词
+
+    固定文本片段优先占用预算，剩余预算按片段顺序分配给条目片段；
+    条目按priority降序保留，放不下的低优先级条目被丢弃。
+    返回 (prompt, report)
+    """
+    if total_budget is None:
+        total_budget = LLM_PROMPT_TOKEN_BUDGET
+
+    # 先计算固定文本占用
+    fixed_tokens = sum(estimate_tokens(s['text']) for s in sections if s['items'] is None)
+    remaining = max(total_budget - fixed_tokens, 0)
+
+    rendered = []
+    section_reports = {}
+    truncated = False
+
+    for section in sections:
+        if section['items'] is None:
+            rendered.append(section['text'])
+            section_reports[section['name']] = {
+                'tokens': estimate_tokens(section['text']),
+                'items_kept': None,
+                'items_total': None,
+            }
+            continue
+
+        budget = remaining if section['max_tokens'] is None else min(section['max_tokens'], remaining)
+        ordered = sorted(section['items'], key=lambda item: item[0], reverse=True)
+        separator_tokens = estimate_tokens(section['separator'])
+
+        kept = []
+        used = 0
+        for _, item_text in ordered:
+            item_text = truncate_to_tokens(item_text, section['item_max_tokens'])
+            cost = estimate_tokens(item_text) + (separator_tokens if kept else 0)
+            if used + cost > budget:
+                truncated = True
+                continue
+            kept.append(item_text)
+            used += cost
+
+        text = section['separator'].join(kept) if kept else section['empty_text']
+        if not kept:
+            used = estimate_tokens(text)
+        remaining = max(remaining - used, 0)
+        rendered.append(text)
+        section_reports[section['name']] = {
+            'tokens': used,
+            'items_kept': len(kept),
+            'items_total': len(ordered),
+        }
+
+    prompt = "".join(rendered)
+    report = {
+        'prompt_tokens_est': estimate_tokens(prompt),
+        'budget': total_budget,
+        'truncated': truncated,
+        'sections': section_reports,
+    }
+    return prompt, report
+
+def record_llm_call(report, response=None, started_at=None, label="LLM"):
+    """记录一次大模型调用的token用量和耗时，返回统计信息（由调用方随结果返回给页面展示）"""
+    report = dict(report)
+
+    usage = getattr(response, 'usage', None) if response is not None else None
+    if usage is not None:
+        report['prompt_tokens'] = getattr(usage, 'prompt_tokens', None)
+        report['completion_tokens'] = getattr(usage, 'completion_tokens', None)
+    if started_at is not None:
+        report['latency'] = round(time.time() - started_at, 2)
+    report['label'] = label
+
+    return report
+
+def format_llm_report(report):
+    """格式化调用统计，用于页面展示"""
+    if not report:
+        return ""
+    parts = [f"提示词 {report.get('prompt_tokens') or report['prompt_tokens_est']} tokens"]
+    if report.get('completion_tokens') is not None:
+        parts.append(f"生成 {report['completion_tokens']} tokens")
+    if report.get('latency') is not None:
+        parts.append(f"耗时 {report['latency']}s")
+    if report.get('truncated'):
+        parts.append("部分内容因预算被裁剪")
+    return " · ".join(parts)
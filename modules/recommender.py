@@ -0,0 +1,281 @@
+"""
+协同过滤推荐模块
+由活动记录构建 学生×内容（病例、知识点）隐式反馈矩阵，按物品-物品余弦相似度
+为每个学生预计算推荐列表（"相似同学还学习了"），读取时只查内存索引，不调用大模型；
+新活动增量更新共现矩阵和该学生的推荐，相似度定期整体刷新；
+全量重建在锁外进行，不阻塞记录活动的请求
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from modules.case_store import get_all_cases
+from modules.content_repository import DATA_DIR
+from modules.data_cache import subscribe
+from modules.archive import RebuildableState, iter_all_activities
+from modules.mastery import KNOWLEDGE, activity_knowledge
+
+try:
+    from config.settings import RECOMMENDER_TOP_N, RECOMMENDER_REFRESH_SECONDS
+except (ImportError, AttributeError):
+    RECOMMENDER_TOP_N = 10
+    RECOMMENDER_REFRESH_SECONDS = 60
+
+RECOMMENDER_PATH = os.path.join(DATA_DIR, "recommender.npz")
+
+# ==================== 内容目录 ====================
+
+# 推荐的内容：全部病例 + 全部知识点（知识点顺序与 mastery.KNOWLEDGE 一致）
+ITEMS = (
+    [{'kind': 'case', 'id': case.id, 'name': case.title} for case in get_all_cases()]
+    + [{'kind': 'knowledge', 'id': kp['id'], 'name': kp['name']} for kp in KNOWLEDGE]
+)
+_case_index = {item['id']: i for i, item in enumerate(ITEMS) if item['kind'] == 'case'}
+_knowledge_offset = len(_case_index)
+_kinds = np.array([item['kind'] for item in ITEMS])
+
+def activity_items(module_name, activity_type, content_id=None, content_name=None, details=None):
+    """活动涉及的内容下标数组：查看的病例，以及活动关联的知识点"""
+    items = []
+    if module_name == '病例库' and content_id in _case_index:
+        items.append(_case_index[content_id])
+    evidence = activity_knowledge(module_name, activity_type, content_id, content_name, details)
+    if evidence is not None:
+        items.extend((evidence[0] + _knowledge_offset).tolist())
+    return np.array(items, dtype=np.int32)
+
+# ==================== 推荐状态 ====================
+
+_lock = threading.RLock()
+_state = {
+    'warming': False,      # 后台预热线程运行中
+    'refreshed_at': 0.0,
+    'stale': False,        # 共现矩阵有更新，相似度待刷新
+}
+_counts = {}          # 学生ID -> 各内容的交互次数 ndarray(float32)
+_gram = np.zeros((len(ITEMS), len(ITEMS)))            # 共现矩阵 XᵀX（X = log(1 + 交互次数)）
+_similarity = np.zeros((len(ITEMS), len(ITEMS)))      # 物品-物品余弦相似度（对角线为0）
+_top = {}             # 学生ID -> 推荐内容下标（按得分降序，已排除学过的内容）
+_totals = np.zeros(len(ITEMS))                        # 各内容的总交互次数（全部学生）
+
+def _rebuild(storage, since):
+    """从全部活动（含归档）重建交互次数：返回 (交互次数, since 之后读到的活动ID集合)"""
+    counts = {}
+    recent = set()
+    for activity in iter_all_activities(storage):
+        if activity['timestamp'] >= since:
+            recent.add(activity['id'])
+        items = activity_items(activity.get('module'), activity.get('activity_type'),
+                               activity.get('content_id'), activity.get('content_name'),
+                               activity.get('details'))
+        if len(items):
+            row = counts.setdefault(activity['student_id'], np.zeros(len(ITEMS), dtype=np.float32))
+            np.add.at(row, items, 1)
+    return counts, recent
+
+def _matrix(counts, student_ids):
+    if not student_ids:
+        return np.zeros((0, len(ITEMS)))
+    return np.log1p(np.stack([counts[s] for s in student_ids]).astype(np.float64))
+
+def _top_items(scores, seen):
+    """按得分取推荐内容下标（排除学过的和得分为0的），scores 和 seen 为二维数组"""
+    scores = np.where(seen | (scores <= 0), -np.inf, scores)
+    order = np.argsort(-scores, axis=1, kind='stable')[:, :RECOMMENDER_TOP_N]
+    return [row[np.isfinite(np.take(score, row))] for row, score in zip(order, scores)]
+
+def _cosine(gram):
+    """由共现矩阵计算余弦相似度（对角线为0）"""
+    norms = np.sqrt(np.diag(gram))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        similarity = gram / np.outer(norms, norms)
+    similarity[~np.isfinite(similarity)] = 0
+    np.fill_diagonal(similarity, 0)
+    return similarity
+
+def _recommendations(counts, similarity):
+    """所有学生的推荐 {学生ID: 内容下标}（矩阵运算一次完成）"""
+    student_ids = list(counts)
+    matrix = _matrix(counts, student_ids)
+    return dict(zip(student_ids, _top_items(matrix @ similarity, matrix > 0)))
+
+def _refresh():
+    """由共现矩阵重新计算相似度和所有学生的推荐"""
+    _similarity[:] = _cosine(_gram)
+    _top.clear()
+    _top.update(_recommendations(_counts, _similarity))
+    _state.update(stale=False, refreshed_at=time.time())
+
+def _update_student(student_id, items):
+    """学生新的交互：增量更新共现矩阵（秩1修正）和该学生的推荐"""
+    row = _counts.setdefault(student_id, np.zeros(len(ITEMS), dtype=np.float32))
+    before = np.log1p(row.astype(np.float64))
+    np.add.at(row, items, 1)
+    np.add.at(_totals, items, 1)
+    after = np.log1p(row.astype(np.float64))
+    delta = after - before
+    _gram[:] += np.outer(before, delta) + np.outer(delta, before) + np.outer(delta, delta)
+    _top[student_id] = _top_items((after @ _similarity)[None, :], (after > 0)[None, :])[0]
+    _state['stale'] = True
+
+def _save(watermark):
+    """保存交互次数矩阵和水位线（先写临时文件再替换，调用方持有锁）"""
+    student_ids = list(_counts)
+    tmp_path = RECOMMENDER_PATH + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(
+            f,
+            students=np.array(student_ids, dtype=str),
+            items=np.array([item['id'] for item in ITEMS], dtype=str),
+            counts=np.stack([_counts[s] for s in student_ids]) if student_ids else np.zeros((0, len(ITEMS)), dtype=np.float32),
+            watermark=np.array(-1 if watermark is None else watermark),
+        )
+    os.replace(tmp_path, RECOMMENDER_PATH)
+
+def _load(watermark):
+    """读取保存的交互次数，水位线和内容目录与当前一致时返回，否则返回None"""
+    try:
+        with np.load(RECOMMENDER_PATH, allow_pickle=False) as data:
+            if int(data['watermark']) != watermark:
+                return None
+            if data['items'].tolist() != [item['id'] for item in ITEMS]:
+                return None
+            return {student_id: row.copy() for student_id, row in zip(data['students'].tolist(), data['counts'])}
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[协同推荐] 读取失败: {e}")
+        return None
+
+def _build(counts):
+    """由交互次数计算共现矩阵、总次数、相似度和推荐（不访问全局状态，可在锁外执行）"""
+    matrix = _matrix(counts, list(counts))
+    gram = matrix.T @ matrix
+    totals = np.sum(list(counts.values()), axis=0) if counts else np.zeros(len(ITEMS))
+    similarity = _cosine(gram)
+    return gram, totals, similarity, _recommendations(counts, similarity)
+
+def _prepare(counts):
+    """在锁外计算共现矩阵和推荐，返回待换入的完整状态"""
+    return (counts, *_build(counts))
+
+def _install(state):
+    """换入重建或读取的状态（调用方持有锁）"""
+    counts, gram, totals, similarity, top = state
+    _counts.clear()
+    _counts.update(counts)
+    _gram[:] = gram
+    _totals[:] = totals
+    _similarity[:] = similarity
+    _top.clear()
+    _top.update(top)
+    _state.update(stale=False, refreshed_at=time.time())
+
+def _apply(payload):
+    """新活动增量更新共现矩阵和该学生的推荐（调用方持有锁）"""
+    items = activity_items(payload.get('module_name'), payload.get('activity_type'),
+                           payload.get('content_id'), payload.get('content_name'),
+                           payload.get('details'))
+    if len(items):
+        _update_student(payload.get('student_id'), items)
+
+_store = RebuildableState("协同推荐", _lock, load=_load, rebuild=_rebuild, prepare=_prepare, install=_install,
+                          apply=_apply, save=_save, persist_interval=RECOMMENDER_REFRESH_SECONDS)
+
+def _ensure_ready():
+    """首次读取或有删除操作后加载/重建；相似度过期超过刷新间隔时整体刷新。数据库不可用时返回False"""
+    if not _store.ensure_ready():
+        return False
+    with _lock:
+        if _state['stale'] and time.time() - _state['refreshed_at'] > RECOMMENDER_REFRESH_SECONDS:
+            _refresh()
+    return True
+
+def _on_data_event(event, payload):
+    """数据事件订阅：新活动增量更新；删除或清空后标记重建"""
+    if event == 'activity_logged':
+        _store.on_activity(payload)
+    elif event in ('student_deleted', 'activities_cleared', 'data_cleared', 'data_repaired'):
+        _store.mark_dirty()
+
+subscribe(_on_data_event)
+
+def warm_up():
+    """在后台线程中加载/重建推荐状态（已就绪、正在重建或预热中时不重复启动）"""
+    with _lock:
+        if (_store.ready and not _store.dirty) or _store.rebuilding or _state['warming']:
+            return
+        _state['warming'] = True
+
+    def run():
+        try:
+            _ensure_ready()
+        finally:
+            with _lock:
+                _state['warming'] = False
+
+    threading.Thread(target=run, name="recommender-warm-up", daemon=True).start()
+
+# ==================== 读取接口 ====================
+
+def recommend_for_student(student_id, kind=None, limit=5):
+    """
+    "相似同学还学习了"的内容 [{'kind', 'id', 'name', 'score'}]
+
+    kind 为 'case' 或 'knowledge' 时只返回该类内容；没有交互记录的学生返回空列表
+    """
+    if not _ensure_ready():
+        return []
+    with _lock:
+        top = _top.get(student_id)
+        if top is None or not len(top):
+            return []
+        if kind is not None:
+            top = top[_kinds[top] == kind]
+        top = top[:limit]
+        scores = np.log1p(_counts[student_id].astype(np.float64)) @ _similarity[:, top]
+    return [dict(ITEMS[i], score=float(score)) for i, score in zip(top, scores)]
+
+def similar_items(item_id, limit=5):
+    """与指定内容最相似的内容 [{'kind', 'id', 'name', 'score'}]"""
+    if not _ensure_ready():
+        return []
+    with _lock:
+        index = next((i for i, item in enumerate(ITEMS) if item['id'] == item_id), None)
+        if index is None:
+            return []
+        similarity = _similarity[index]
+        order = [i for i in np.argsort(-similarity, kind='stable')[:limit] if similarity[i] > 0]
+        return [dict(ITEMS[i], score=float(similarity[i])) for i in order]
+
+def item_popularity(wait=True):
+    """
+    各内容的总交互次数（与 ITEMS 顺序一致的数组），数据库不可用时返回None
+
+    wait 为False时不在当前线程加载/重建：尚未就绪时在后台预热并返回None，需要重建时返回重建前的结果
+    """
+    if wait:
+        if not _ensure_ready():
+            return None
+    else:
+        warm_up()
+    with _lock:
+        if not _store.ready:
+            return None
+        return _totals.copy()
+
+def get_recommender_status():
+    """获取协同推荐状态（学生数、内容数、相似度刷新时间）"""
+    with _lock:
+        return {
+            'ready': _store.ready,
+            'students': len(_counts),
+            'items': len(ITEMS),
+            'refreshed_at': datetime.fromtimestamp(_state['refreshed_at']) if _state['refreshed_at'] else None,
+            'saved_at': datetime.fromtimestamp(_store.saved_at) if _store.saved_at else None,
+            'unsaved': _store.changed,
+        }
@@ -0,0 +1,219 @@
+"""
+分析副本模块
+按时间水位线把Neo4j中新增的学生、活动和课堂回复增量同步到本地SQLite副本，
+教师端统计查询读取副本，不与课堂实时写入争用图数据库
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+from modules.content_repository import DATA_DIR, is_online
+from modules.data_cache import subscribe, invalidate, student_tag, module_tag, student_module_tag, date_tag
+from modules.storage import get_storage, STORAGE_BACKEND
+from modules.storage_sqlite import SQLiteStorage
+
+try:
+    from config.settings import ANALYTICS_REPLICA, REPLICA_SQLITE_PATH, REPLICA_SYNC_INTERVAL, REPLICA_SYNC_OVERLAP
+except (ImportError, AttributeError):
+    ANALYTICS_REPLICA = False
+    REPLICA_SQLITE_PATH = ""
+    REPLICA_SYNC_INTERVAL = 5
+    REPLICA_SYNC_OVERLAP = 60
+
+# 每次从源库拉取的最大行数（首次同步时分批导入）
+REPLICA_BATCH_SIZE = 5000
+
+# 需要整体重建副本的数据事件（归档不在其中：源库已删除归档的活动，重建会丢失这些历史）
+REBUILD_EVENTS = ('activities_cleared', 'data_cleared', 'data_repaired')
+
+_lock = threading.Lock()
+_sync_lock = threading.Lock()   # 同一时间只执行一次同步
+_wake = threading.Event()
+_replica = [None]
+_thread = [None]
+_state = {
+    'ready': False,        # 首次同步完成后才从副本读取
+    'rebuild': False,      # 源库批量删除后需要重建副本
+    'synced_at': None,
+    'last_imported': 0,
+    'last_error': None,
+}
+
+def is_enabled():
+    """是否启用分析副本（主存储为SQLite时无需副本）"""
+    return bool(ANALYTICS_REPLICA) and STORAGE_BACKEND == "neo4j"
+
+def get_replica():
+    """获取副本存储（SQLite）"""
+    with _lock:
+        if _replica[0] is None:
+            _replica[0] = SQLiteStorage(REPLICA_SQLITE_PATH or os.path.join(DATA_DIR, "yzbx_replica.db"))
+        return _replica[0]
+
+# ==================== 同步 ====================
+
+def _changed_tags(students, activities, replies):
+    """新导入数据影响的缓存标签"""
+    tags = set()
+    if students:
+        tags.add('students')
+    if activities:
+        tags.add('activities')
+    if replies:
+        tags.add('replies')
+    for row in students:
+        tags.add(student_tag(row['student_id']))
+    for row in activities:
+        day = row['timestamp'].astimezone(timezone.utc).date().isoformat()
+        tags.update({
+            student_tag(row['student_id']),
+            module_tag(row['module']),
+            student_module_tag(row['student_id'], row['module']),
+            date_tag(day),
+        })
+    for row in replies:
+        tags.add(student_tag(row['student_name']))
+    return tags
+
+def _pull(fetch, since, replica, key):
+    """
+    按水位线分批拉取并导入，返回新写入的行
+
+    时间戳在写入事务开始时生成，提交较晚的记录可能带着比水位线更早的时间，
+    因此从水位线往前回看 REPLICA_SYNC_OVERLAP 秒重新读取；重复的行由 import_changes 按ID去重
+    """
+    if since is not None:
+        since -= timedelta(seconds=REPLICA_SYNC_OVERLAP)
+    imported = []
+    while True:
+        batch = fetch(since, REPLICA_BATCH_SIZE)
+        imported.extend(replica.import_changes(**{key: batch}))
+        if len(batch) < REPLICA_BATCH_SIZE:
+            return imported
+        last = batch[-1]['timestamp']
+        if since is not None and last <= since:
+            # 同一时刻的记录超过一批，剩余部分留到下次同步
+            print(f"[分析副本] {key} 在 {last} 的记录超过 {REPLICA_BATCH_SIZE} 条")
+            return imported
+        since = last
+
+def sync_once():
+    """执行一次增量同步，返回新写入副本的活动数"""
+    with _sync_lock:
+        source = get_storage("neo4j")
+        replica = get_replica()
+
+        with _lock:
+            rebuild = _state['rebuild']
+            _state['rebuild'] = False
+        if rebuild:
+            replica.clear()
+            invalidate({"*"})
+
+        marks = replica.sync_watermarks()
+        # 水位线边界上的学生每次都会重新拉取，只有新写入或有变化的学生才失效缓存
+        students = replica.import_changes(students=source.students_since(marks['students']))
+        activities = _pull(source.activities_since, marks['activities'], replica, 'activities')
+        replies = _pull(source.replies_since, marks['replies'], replica, 'replies')
+
+        tags = _changed_tags(students, activities, replies)
+        if tags:
+            invalidate(tags)
+
+        with _lock:
+            _state['ready'] = True
+            _state['synced_at'] = datetime.now(timezone.utc)
+            _state['last_imported'] = len(activities)
+            _state['last_error'] = None
+        return len(activities)
+
+def _sync_loop():
+    """后台同步线程：每隔 REPLICA_SYNC_INTERVAL 秒同步一次，有删除操作时立即同步"""
+    while True:
+        if is_online():
+            try:
+                sync_once()
+            except Exception as e:
+                with _lock:
+                    _state['last_error'] = str(e)
+                print(f"[分析副本] 同步失败: {e}")
+        _wake.wait(REPLICA_SYNC_INTERVAL)
+        _wake.clear()
+
+def _ensure_started():
+    """启动后台同步线程（只启动一次）"""
+    with _lock:
+        if _thread[0] is not None:
+            return
+        _thread[0] = threading.Thread(target=_sync_loop, name="analytics-replica", daemon=True)
+        _thread[0].start()
+
+def request_rebuild():
+    """清空副本并从源库重新同步"""
+    with _lock:
+        _state['rebuild'] = True
+    _wake.set()
+
+def _on_data_event(event, payload):
+    """
+    数据事件订阅：删除操作需同步到副本（新增数据由水位线同步）
+
+    只有清空、修复后才整体重建，其他事件（包括归档）不影响副本
+    """
+    if _thread[0] is None:
+        return
+    if event == 'student_deleted':
+        try:
+            get_replica().delete_student(payload.get('student_id'))
+            # 事件发布时已失效的缓存可能在副本删除前被重新写入
+            invalidate({"*"})
+        except Exception as e:
+            print(f"[分析副本] 删除学生失败: {e}")
+    elif event in REBUILD_EVENTS:
+        request_rebuild()
+
+subscribe(_on_data_event)
+
+# ==================== 读取接口 ====================
+
+def get_analytics_storage():
+    """
+    获取统计查询使用的存储
+
+    启用副本且首次同步完成后返回副本，否则返回主存储
+    """
+    if not is_enabled():
+        return get_storage()
+
+    # 在脚本线程中先检查可用性（加载Neo4j配置），后台线程随后可直接连接
+    primary = get_storage()
+    primary.is_available()
+    _ensure_started()
+
+    with _lock:
+        ready = _state['ready']
+    return get_replica() if ready else primary
+
+def get_replica_status():
+    """获取副本同步状态"""
+    with _lock:
+        state = dict(_state)
+    status = {
+        'enabled': is_enabled(),
+        'running': _thread[0] is not None,
+        'ready': state['ready'],
+        'synced_at': state['synced_at'],
+        'lag_seconds': None,
+        'last_imported': state['last_imported'],
+        'last_error': state['last_error'],
+        'activity_count': None,
+    }
+    if state['synced_at'] is not None:
+        status['lag_seconds'] = (datetime.now(timezone.utc) - state['synced_at']).total_seconds()
+    if status['enabled'] and state['ready']:
+        try:
+            status['activity_count'] = get_replica().activity_watermark()[0]
+        except Exception:
+            pass
+    return status
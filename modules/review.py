@@ -0,0 +1,322 @@
+"""
+间隔复习模块
+按 SM-2 算法为每个学生的病例和知识点安排复习日期：保存学习笔记、课堂作答视为一次复习，
+到期后再次学习则间隔按易度因子拉长。每个学生维护按到期日排序的小顶堆，
+"今天复习什么"只需 O(log n)；教师端全班到期情况一次向量化计算；
+批量重算在锁外进行，不阻塞记录活动的请求
+"""
+
+import heapq
+import os
+import threading
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+from modules.content_repository import DATA_DIR
+from modules.data_cache import subscribe, today
+from modules.archive import RebuildableState, iter_all_activities
+from modules.recommender import ITEMS, activity_items
+
+try:
+    from config.settings import REVIEW_PERSIST_INTERVAL
+except (ImportError, AttributeError):
+    REVIEW_PERSIST_INTERVAL = 60
+
+REVIEW_PATH = os.path.join(DATA_DIR, "review.npz")
+
+# 活动对应的复习质量（SM-2 的 0-5 分）：活动中没有对错信息，主动回忆（写笔记、作答）记4分（易度不变）；
+# 被动浏览不算复习：记3分每次会使易度下降0.14，反复查看的病例反而复习得越来越频繁
+REVIEW_QUALITY = {
+    ('病例库', '保存笔记'): 4,
+    ('课中互动', '提交回答'): 4,
+    ('课中互动', '练习回答'): 4,
+}
+
+INITIAL_EASE = 2.5
+MIN_EASE = 1.3
+
+# 每个内容的复习卡片：复习次数、易度因子、间隔（天）、到期日（UTC日期序号，0 表示尚未学习）
+CARD_DTYPE = np.dtype([('reps', np.int16), ('ease', np.float32), ('interval', np.float32), ('due', np.int32)])
+
+def _new_cards():
+    cards = np.zeros(len(ITEMS), dtype=CARD_DTYPE)
+    cards['ease'] = INITIAL_EASE
+    return cards
+
+def _day_number(value):
+    """时间（datetime 或 ISO 字符串）转为UTC日期序号"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.astimezone(timezone.utc).date().toordinal()
+
+def _today():
+    return date.fromisoformat(today()).toordinal()
+
+# ==================== SM-2 ====================
+
+def sm2_step(reps, ease, interval, quality):
+    """
+    一次 SM-2 复习（标量或数组）
+
+    返回新的 (复习次数, 易度因子, 间隔)；质量低于3视为遗忘，从1天间隔重新开始
+    """
+    remembered = np.asarray(quality) >= 3
+    interval = np.where(~remembered | (reps == 0), 1.0,
+                        np.where(reps == 1, 6.0, np.round(interval * ease)))
+    reps = np.where(remembered, reps + 1, 0)
+    ease = np.maximum(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return reps, ease, interval
+
+def review_cards(cards, items, quality, day):
+    """
+    对学生卡片中的若干内容记录一次复习，只有新内容或已到期的内容才推进间隔
+    （到期前的重复浏览不改变安排）；返回实际更新的内容下标
+    """
+    items = items[(cards['due'][items] == 0) | (cards['due'][items] <= day)]
+    if len(items):
+        reps, ease, interval = sm2_step(cards['reps'][items], cards['ease'][items], cards['interval'][items], quality)
+        cards['reps'][items] = reps
+        cards['ease'][items] = ease
+        cards['interval'][items] = interval
+        cards['due'][items] = day + interval.astype(np.int32)
+    return items
+
+def replay(events, n_students):
+    """
+    按历史活动批量计算所有学生的卡片（向量化）
+
+    events: (学生下标, 内容下标, 质量, 日期序号) 四个数组，按时间顺序；
+    同一 (学生, 内容) 的复习按组内序号分轮，每轮一次向量运算处理所有组的第r次复习；
+    事件按 (组内序号, 组) 排序一次，每轮是连续的一段，总代价与事件数成线性
+    返回 ndarray(n_students, 内容数)，dtype 为 CARD_DTYPE
+    """
+    n_items = len(ITEMS)
+    cards = np.zeros((n_students, n_items), dtype=CARD_DTYPE)
+    cards['ease'] = INITIAL_EASE
+    students, items, quality, days = events
+    if not len(students):
+        return cards
+
+    pairs = students.astype(np.int64) * n_items + items
+    order = np.argsort(pairs, kind='stable')   # 稳定排序保持组内的时间顺序
+    pairs, quality, days = pairs[order], quality[order], days[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(pairs)) + 1]
+    sizes = np.diff(np.r_[starts, len(pairs)])
+    groups = np.repeat(np.arange(len(starts)), sizes)
+    ranks = np.arange(len(pairs)) - starts[groups]
+
+    by_round = np.argsort(ranks, kind='stable')
+    pairs, quality, days = pairs[by_round], quality[by_round], days[by_round]
+    bounds = np.r_[0, np.cumsum(np.bincount(ranks))]
+
+    flat = cards.reshape(-1)
+    for r in range(len(bounds) - 1):
+        cells, score, day = (a[bounds[r]:bounds[r + 1]] for a in (pairs, quality, days))
+        due = flat['due'][cells]
+        ready = (due == 0) | (due <= day)   # 到期前的重复学习不推进
+        cells, score, day = cells[ready], score[ready], day[ready]
+        reps, ease, interval = sm2_step(flat['reps'][cells], flat['ease'][cells], flat['interval'][cells], score)
+        flat['reps'][cells] = reps
+        flat['ease'][cells] = ease
+        flat['interval'][cells] = interval
+        flat['due'][cells] = day + interval.astype(np.int32)
+    return cards
+
+# ==================== 复习状态 ====================
+
+_lock = threading.RLock()
+_cards = {}    # 学生ID -> ndarray(内容数, CARD_DTYPE)
+_queues = {}   # 学生ID -> [(到期日, 内容下标)] 小顶堆（惰性删除：与卡片当前到期日不一致的条目作废）
+
+def _build_queue(cards):
+    queue = [(int(due), int(i)) for i, due in enumerate(cards['due']) if due]
+    heapq.heapify(queue)
+    return queue
+
+def _push(student_id, items):
+    """卡片更新后把新的到期日压入堆，作废条目过多时重建"""
+    cards = _cards[student_id]
+    queue = _queues.setdefault(student_id, [])
+    for i in items:
+        heapq.heappush(queue, (int(cards['due'][i]), int(i)))
+    if len(queue) > 4 * len(ITEMS):
+        _queues[student_id] = _build_queue(cards)
+
+def _rebuild(storage, since):
+    """从全部活动（含归档）重算所有学生的卡片：返回 (卡片 {学生ID: 数组}, since 之后读到的活动ID集合)"""
+    student_index = {}
+    recent = set()
+    students, items, quality, days = [], [], [], []
+    for activity in iter_all_activities(storage):
+        if activity['timestamp'] >= since:
+            recent.add(activity['id'])
+        score = REVIEW_QUALITY.get((activity.get('module'), activity.get('activity_type')))
+        if score is None:
+            continue
+        indices = activity_items(activity.get('module'), activity.get('activity_type'),
+                                 activity.get('content_id'), activity.get('content_name'),
+                                 activity.get('details'))
+        if not len(indices):
+            continue
+        student = student_index.setdefault(activity['student_id'], len(student_index))
+        students.append(np.full(len(indices), student, dtype=np.int32))
+        items.append(indices)
+        quality.append(np.full(len(indices), score, dtype=np.float32))
+        days.append(np.full(len(indices), _day_number(activity['timestamp']), dtype=np.int32))
+
+    events = tuple(np.concatenate(parts) if parts else np.zeros(0, dtype=np.int32) for parts in (students, items, quality, days))
+    cards = replay(events, len(student_index))
+    return {student_id: cards[i] for student_id, i in student_index.items()}, recent
+
+def _rules():
+    """复习质量规则的文本形式，随卡片保存：规则变化后保存的卡片作废"""
+    return [f"{module}/{activity_type}/{score}" for (module, activity_type), score in sorted(REVIEW_QUALITY.items())]
+
+def _save(watermark):
+    """保存全部卡片和水位线（先写临时文件再替换，调用方持有锁）"""
+    student_ids = list(_cards)
+    tmp_path = REVIEW_PATH + ".tmp"
+    cards = np.stack([_cards[s] for s in student_ids]) if student_ids else np.zeros((0, len(ITEMS)), dtype=CARD_DTYPE)
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(
+            f,
+            students=np.array(student_ids, dtype=str),
+            items=np.array([item['id'] for item in ITEMS], dtype=str),
+            **{field: cards[field] for field in CARD_DTYPE.names},
+            rules=np.array(_rules(), dtype=str),
+            watermark=np.array(-1 if watermark is None else watermark),
+        )
+    os.replace(tmp_path, REVIEW_PATH)
+
+def _load(watermark):
+    """读取保存的卡片，水位线、内容目录和复习质量规则与当前一致时返回，否则返回None"""
+    try:
+        with np.load(REVIEW_PATH, allow_pickle=False) as data:
+            if int(data['watermark']) != watermark:
+                return None
+            if data['items'].tolist() != [item['id'] for item in ITEMS]:
+                return None
+            if 'rules' not in data or data['rules'].tolist() != _rules():
+                return None
+            cards = np.zeros(data['due'].shape, dtype=CARD_DTYPE)
+            for field in CARD_DTYPE.names:
+                cards[field] = data[field]
+            return {student_id: row.copy() for student_id, row in zip(data['students'].tolist(), cards)}
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[间隔复习] 读取失败: {e}")
+        return None
+
+def _prepare(cards):
+    """在锁外为每个学生建堆，返回待换入的 (卡片, 堆)"""
+    return cards, {student_id: _build_queue(row) for student_id, row in cards.items()}
+
+def _install(state):
+    """换入重算或读取的卡片和堆（调用方持有锁）"""
+    cards, queues = state
+    _cards.clear()
+    _cards.update(cards)
+    _queues.clear()
+    _queues.update(queues)
+
+def _apply_activity(payload):
+    """学习活动即一次复习，只更新涉及的卡片（调用方持有锁）"""
+    key = (payload.get('module_name'), payload.get('activity_type'))
+    if key not in REVIEW_QUALITY:
+        return
+    items = activity_items(*key, payload.get('content_id'), payload.get('content_name'), payload.get('details'))
+    if not len(items):
+        return
+    student_id = payload.get('student_id')
+    cards = _cards.setdefault(student_id, _new_cards())
+    updated = review_cards(cards, items, REVIEW_QUALITY[key], _today())
+    if not len(updated):
+        return
+    _push(student_id, updated)
+
+def _remove_student(student_id):
+    _cards.pop(student_id, None)
+    _queues.pop(student_id, None)
+
+_store = RebuildableState("间隔复习", _lock, load=_load, rebuild=_rebuild, prepare=_prepare, install=_install,
+                          apply=_apply_activity, save=_save, persist_interval=REVIEW_PERSIST_INTERVAL)
+
+def _ensure_ready():
+    """首次读取或有删除操作后加载/重算，数据库不可用时返回False"""
+    return _store.ensure_ready()
+
+def _on_data_event(event, payload):
+    """数据事件订阅：学习活动更新涉及的卡片；删除学生直接移除；清空或修复后标记重算"""
+    if event == 'activity_logged':
+        _store.on_activity(payload)
+    elif event == 'student_deleted':
+        _store.on_student_deleted(lambda: _remove_student(payload.get('student_id')))
+    elif event in ('activities_cleared', 'data_cleared', 'data_repaired'):
+        _store.mark_dirty()
+
+subscribe(_on_data_event)
+
+# ==================== 读取接口 ====================
+
+def due_reviews(student_id, limit=10, day=None):
+    """
+    学生今天（或指定日期序号）需要复习的内容 [{'kind', 'id', 'name', 'due', 'overdue_days', 'reps'}]
+
+    按到期日从早到晚；从堆顶取出 limit 个有效条目后放回，复杂度 O(limit·log n)
+    """
+    day = _today() if day is None else day
+    if not _ensure_ready():
+        return []
+    with _lock:
+        cards = _cards.get(student_id)
+        queue = _queues.get(student_id)
+        if cards is None or not queue:
+            return []
+        taken = []
+        while queue and len(taken) < limit and queue[0][0] <= day:
+            due, i = heapq.heappop(queue)
+            if cards['due'][i] == due and (due, i) not in taken:
+                taken.append((due, i))
+        for entry in taken:
+            heapq.heappush(queue, entry)
+        return [
+            dict(ITEMS[i], due=date.fromordinal(due).isoformat(), overdue_days=day - due, reps=int(cards['reps'][i]))
+            for due, i in taken
+        ]
+
+def next_review(student_id):
+    """学生最近一次复习的到期日（ISO日期），没有安排时返回None"""
+    if not _ensure_ready():
+        return None
+    with _lock:
+        cards = _cards.get(student_id)
+        queue = _queues.get(student_id)
+        while queue and cards['due'][queue[0][1]] != queue[0][0]:
+            heapq.heappop(queue)   # 清理作废的堆顶
+        return date.fromordinal(queue[0][0]).isoformat() if queue else None
+
+def class_due_summary(day=None):
+    """
+    全班复习到期情况（一次向量化计算）
+
+    返回 {'students': [学号], 'due_counts': 每个学生到期数, 'overdue_days': 每个学生最长逾期天数,
+          'item_due': [(内容, 到期学生数)]（按到期人数降序）}，数据库不可用时返回None
+    """
+    day = _today() if day is None else day
+    if not _ensure_ready():
+        return None
+    with _lock:
+        student_ids = list(_cards)
+        due = np.stack([_cards[s]['due'] for s in student_ids]) if student_ids else np.zeros((0, len(ITEMS)), dtype=np.int32)
+    is_due = (due > 0) & (due <= day)
+    overdue = np.where(is_due, day - due, 0)
+    item_counts = is_due.sum(axis=0)
+    order = np.argsort(-item_counts, kind='stable')
+    return {
+        'students': student_ids,
+        'due_counts': is_due.sum(axis=1),
+        'overdue_days': overdue.max(axis=1) if len(student_ids) else np.zeros(0, dtype=np.int64),
+        'item_due': [(ITEMS[i], int(item_counts[i])) for i in order if item_counts[i]],
+    }
@@ -0,0 +1,207 @@
+"""
+全局搜索模块
+把知识点、章节、病例和能力的名称（及拼音首字母，安装 pypinyin 时）的全部后缀排序成一个后缀数组，
+查询时二分查找即可同时完成前缀和中间匹配；索引在导入时构建一次，
+结果按 精确 > 前缀 > 包含 排序，同级按活动记录中的学习次数（热度）排序
+"""
+
+import bisect
+import importlib
+import re
+import time
+
+import numpy as np
+import streamlit as st
+
+from modules.case_store import get_all_cases
+from modules.content_repository import get_abilities, get_curriculum_modules
+from modules.mastery import KNOWLEDGE, ability_knowledge
+
+# 可选导入pypinyin（离线拼音首字母，未安装时只按汉字匹配）
+try:
+    from pypinyin import lazy_pinyin, Style
+    HAS_PYPINYIN = True
+except ImportError:
+    HAS_PYPINYIN = False
+    lazy_pinyin = None
+    Style = None
+
+# 结果类型：类型 -> (图标, 名称)
+KINDS = {
+    'knowledge': ('🧠', '知识点'),
+    'chapter': ('📖', '章节'),
+    'case': ('📋', '病例'),
+    'ability': ('🎯', '能力'),
+}
+
+# 匹配等级（越小越靠前）
+EXACT, PREFIX, INFIX, SECONDARY = 0, 1, 2, 3
+
+# ==================== 索引 ====================
+
+def normalize(text):
+    """小写并去掉空白"""
+    return re.sub(r"\s+", "", str(text)).lower()
+
+def pinyin_initials(text):
+    """拼音首字母（未安装 pypinyin 时为空字符串）"""
+    if not HAS_PYPINYIN:
+        return ""
+    return normalize("".join(lazy_pinyin(text, style=Style.FIRST_LETTER)))
+
+def collect_entries():
+    """
+    全部搜索条目 [{'kind', 'id', 'name', 'detail', 'target', 'items', 'aliases'}]
+
+    target: 打开条目时传给页面的参数；items: 用于计算热度的推荐内容ID（病例ID、知识点ID）；
+    aliases: 只参与包含匹配的次要文本（如病例诊断）
+    """
+    modules = get_curriculum_modules()
+    entries = [
+        {
+            'kind': 'knowledge', 'id': kp['id'], 'name': kp['name'],
+            'detail': f"{modules.get(kp['module_id'], {}).get('name', kp['module_id'])} · {kp['chapter']}",
+            'target': (kp['module_id'], kp['name']), 'items': (kp['id'],), 'aliases': (),
+        }
+        for kp in KNOWLEDGE
+    ]
+    for module_id, module in modules.items():
+        for chapter in module['chapters']:
+            entries.append({
+                'kind': 'chapter', 'id': f"{module_id}:{chapter}", 'name': chapter, 'detail': module['name'],
+                'target': (module_id,), 'aliases': (),
+                'items': tuple(kp['id'] for kp in KNOWLEDGE if kp['module_id'] == module_id and kp['chapter'] == chapter),
+            })
+    for case in get_all_cases():
+        entries.append({
+            'kind': 'case', 'id': case.id, 'name': case.title, 'detail': case.diagnosis,
+            'target': (case.title,), 'items': (case.id,), 'aliases': (case.diagnosis,),
+        })
+    ability_points = ability_knowledge()
+    for ability in get_abilities():
+        entries.append({
+            'kind': 'ability', 'id': ability['id'], 'name': ability['name'], 'detail': ability.get('category', ''),
+            'target': (ability['id'],), 'aliases': (),
+            'items': tuple(KNOWLEDGE[k]['id'] for k in ability_points.get(ability['id'], ())),
+        })
+    return entries
+
+def build_search_index(entries):
+    """
+    构建后缀数组：返回 (后缀列表, [(条目下标, 是否从开头匹配, 键长度, 是否次要文本)])
+
+    名称和拼音首字母的每个后缀都是一项；查询串 q 在某个键中出现，当且仅当它是该键某个后缀的前缀，
+    排序后这些后缀连续排列，二分定位起点后顺序读取即可
+    """
+    suffixes = []
+    for i, entry in enumerate(entries):
+        keys = [(normalize(entry['name']), False)]
+        initials = pinyin_initials(entry['name'])
+        if initials:
+            keys.append((initials, False))
+        keys += [(normalize(alias), True) for alias in entry['aliases']]
+        for key, secondary in keys:
+            for offset in range(len(key)):
+                suffixes.append((key[offset:], i, offset == 0, len(key), secondary))
+    suffixes.sort(key=lambda item: item[0])
+    return [item[0] for item in suffixes], [item[1:] for item in suffixes]
+
+# 课程内容在进程内不变，导入时构建一次
+ENTRIES = collect_entries()
+_suffixes, _postings = build_search_index(ENTRIES)
+_item_positions = None   # 条目 -> 推荐内容下标数组（首次计算热度时生成）
+
+def _popularity(indices):
+    """
+    条目的热度（相关内容在活动记录中的交互次数）
+
+    不等待协同推荐加载：推荐状态尚未就绪（后台预热中）或数据库不可用时全为0
+    """
+    global _item_positions
+    from modules.recommender import ITEMS, item_popularity
+    if _item_positions is None:
+        positions = {item['id']: n for n, item in enumerate(ITEMS)}
+        _item_positions = [
+            np.array([positions[item] for item in entry['items'] if item in positions], dtype=np.int64)
+            for entry in ENTRIES
+        ]
+    totals = item_popularity(wait=False)
+    if totals is None:
+        return [0.0] * len(indices)
+    # 章节、能力按所含知识点的平均次数计，与单个知识点、病例可比
+    return [float(totals[_item_positions[i]].mean()) if len(_item_positions[i]) else 0.0 for i in indices]
+
+# ==================== 查询 ====================
+
+def search(query, limit=8, kinds=None):
+    """
+    搜索条目，返回 [条目字典 + {'match', 'popularity'}]
+
+    kinds: 只返回这些类型的条目（如 {'knowledge', 'case'}）
+    """
+    q = normalize(query)
+    if not q:
+        return []
+    best = {}
+    start = bisect.bisect_left(_suffixes, q)
+    for position in range(start, len(_suffixes)):
+        if not _suffixes[position].startswith(q):
+            break
+        i, from_start, key_length, secondary = _postings[position]
+        if secondary:
+            match = SECONDARY
+        elif from_start:
+            match = EXACT if key_length == len(q) else PREFIX
+        else:
+            match = INFIX
+        if match < best.get(i, SECONDARY + 1):
+            best[i] = match
+    if kinds is not None:
+        best = {i: match for i, match in best.items() if ENTRIES[i]['kind'] in kinds}
+    if not best:
+        return []
+    indices = list(best)
+    popularity = dict(zip(indices, _popularity(indices)))
+    indices.sort(key=lambda i: (best[i], -popularity[i], len(ENTRIES[i]['name'])))
+    return [dict(ENTRIES[i], match=best[i], popularity=popularity[i]) for i in indices[:limit]]
+
+def get_search_status():
+    """获取搜索索引状态（条目数、后缀数、是否支持拼音）"""
+    counts = {kind: 0 for kind in KINDS}
+    for entry in ENTRIES:
+        counts[entry['kind']] += 1
+    return {'entries': len(ENTRIES), 'suffixes': len(_suffixes), 'pinyin': HAS_PYPINYIN, 'kinds': counts}
+
+# ==================== 页面组件 ====================
+
+# 打开条目：类型 -> (页面key, 模块路径, 回调函数名)，页面模块在点击时才导入
+RESULT_TARGETS = {
+    'knowledge': ('knowledge_graph', 'modules.knowledge_graph', 'open_knowledge_point'),
+    'chapter': ('knowledge_graph', 'modules.knowledge_graph', 'open_knowledge_point'),
+    'case': ('case_library', 'modules.case_library', 'open_case'),
+    'ability': ('ability_recommender', 'modules.ability_recommender', 'open_ability'),
+}
+
+def _open_result(kind, target):
+    """打开搜索结果（按钮回调）：切换页面并设置该页面的选择状态，清空搜索框"""
+    page, module_path, func_name = RESULT_TARGETS[kind]
+    getattr(importlib.import_module(module_path), func_name)(*target)
+    st.session_state.current_page = page
+    st.session_state.global_search = ""
+
+def render_search_results(query):
+    """全局搜索结果（搜索框在 app.py 中渲染，query 非空时调用；首次查询时在后台预热热度）"""
+    started = time.perf_counter()
+    results = search(query)
+    elapsed = (time.perf_counter() - started) * 1000
+    if not results:
+        st.caption(f"没有找到与“{query}”相关的内容")
+        return
+    cols = st.columns(4)
+    for n, result in enumerate(results):
+        icon, kind_name = KINDS[result['kind']]
+        with cols[n % 4]:
+            st.button(f"{icon} {result['name']}", key=f"search_{result['kind']}_{result['id']}",
+                      help=f"{kind_name} · {result['detail']}", on_click=_open_result,
+                      args=(result['kind'], result['target']), use_container_width=True)
+    st.caption(f"找到 {len(results)} 项，用时 {elapsed:.1f}ms")
@@ -0,0 +1,399 @@
+"""
+流式统计模块
+在活动写入时增量更新概率数据结构，热门内容和访问人数统计不再扫描活动记录：
+- Space-Saving：各模块访问最多的内容（病例、知识图谱、能力）Top-K
+- Count-Min：任意内容访问次数的估计值
+- HyperLogLog：各模块、各日期的访问学生数
+数据结构可合并、可序列化，定期保存到本地文件；启动时水位线不一致则从数据库重建，
+重建在锁外进行，不阻塞记录活动的请求
+"""
+
+import base64
+import hashlib
+import json
+import math
+import os
+import threading
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+from modules.content_repository import DATA_DIR
+from modules.data_cache import subscribe, today
+from modules.archive import RebuildableState, archived_cohort_rows, archived_content_counts
+
+try:
+    from config.settings import SKETCH_TOPK_CAPACITY, SKETCH_HLL_PRECISION, SKETCH_DAYS, SKETCH_PERSIST_INTERVAL
+except (ImportError, AttributeError):
+    SKETCH_TOPK_CAPACITY = 200
+    SKETCH_HLL_PRECISION = 12
+    SKETCH_DAYS = 35
+    SKETCH_PERSIST_INTERVAL = 60
+
+SKETCHES_PATH = os.path.join(DATA_DIR, "sketches.json")
+
+# 按日期的HyperLogLog精度（天数多，使用较小的寄存器数组）
+DAILY_HLL_PRECISION = 10
+
+# 重建后按批读取近期活动ID（汇总行没有活动ID）
+RECENT_BATCH_SIZE = 5000
+
+def _hash64(value):
+    """64位哈希（跨进程稳定，持久化后仍可继续合并）"""
+    return int.from_bytes(hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "big")
+
+def _encode(array):
+    return base64.b64encode(array.tobytes()).decode("ascii")
+
+def _decode(text, dtype, shape):
+    return np.frombuffer(base64.b64decode(text), dtype=dtype).reshape(shape).copy()
+
+# ==================== 数据结构 ====================
+
+class HyperLogLog:
+    """HyperLogLog 基数估计（标准误差约 1.04/√m，m = 2^precision）"""
+
+    def __init__(self, precision=SKETCH_HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.registers = registers if registers is not None else np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, value):
+        x = _hash64(value)
+        index = x >> (64 - self.precision)
+        rest = x & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """合并另一个同精度的HyperLogLog（取寄存器最大值）"""
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # 小基数时使用线性计数
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def error(self):
+        """相对标准误差"""
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def to_dict(self):
+        return {'precision': self.precision, 'registers': _encode(self.registers)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['precision'], _decode(data['registers'], np.uint8, (1 << data['precision'],)))
+
+class CountMinSketch:
+    """Count-Min 频次估计（只会高估，误差不超过 总次数×e/width 的概率为 1-e^-depth）"""
+
+    def __init__(self, width=2048, depth=4, table=None, total=0):
+        self.width = width
+        self.depth = depth
+        self.table = table if table is not None else np.zeros((depth, width), dtype=np.int64)
+        self.total = total
+
+    def _columns(self, value):
+        x = _hash64(value)
+        h1, h2 = x & 0xFFFFFFFF, (x >> 32) | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, value, count=1):
+        self.table[np.arange(self.depth), self._columns(value)] += count
+        self.total += count
+
+    def estimate(self, value):
+        return int(self.table[np.arange(self.depth), self._columns(value)].min())
+
+    def merge(self, other):
+        self.table += other.table
+        self.total += other.total
+        return self
+
+    def to_dict(self):
+        return {'width': self.width, 'depth': self.depth, 'total': self.total, 'table': _encode(self.table)}
+
+    @classmethod
+    def from_dict(cls, data):
+        table = _decode(data['table'], np.int64, (data['depth'], data['width']))
+        return cls(data['width'], data['depth'], table, data['total'])
+
+class SpaceSaving:
+    """
+    Space-Saving Top-K：最多跟踪 capacity 个内容
+
+    每个内容的计数最多高估 error（被替换出的最小计数），
+    真实次数超过 总次数/capacity 的内容一定在列表中
+    """
+
+    def __init__(self, capacity=SKETCH_TOPK_CAPACITY, counters=None):
+        self.capacity = capacity
+        self.counters = counters if counters is not None else {}   # 内容 -> [计数, 误差]
+
+    def add(self, item, count=1):
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += count
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = [count, 0]
+        else:
+            # 替换计数最小的内容，新内容继承其计数作为误差上界
+            victim = min(self.counters, key=lambda key: self.counters[key][0])
+            floor = self.counters.pop(victim)[0]
+            self.counters[item] = [floor + count, floor]
+
+    def top(self, k):
+        """[(内容, 计数, 误差)]，按计数降序"""
+        ranked = sorted(self.counters.items(), key=lambda kv: (-kv[1][0], kv[0]))[:k]
+        return [(item, count, error) for item, (count, error) in ranked]
+
+    def merge(self, other):
+        """合并两个Space-Saving：未被对方跟踪的内容按对方最小计数补齐误差，再保留前 capacity 个"""
+        own_floor = min((c[0] for c in self.counters.values()), default=0) if len(self.counters) >= self.capacity else 0
+        other_floor = min((c[0] for c in other.counters.values()), default=0) if len(other.counters) >= other.capacity else 0
+        merged = {}
+        for item in set(self.counters) | set(other.counters):
+            a = self.counters.get(item, [own_floor, own_floor])
+            b = other.counters.get(item, [other_floor, other_floor])
+            merged[item] = [a[0] + b[0], a[1] + b[1]]
+        self.counters = dict(sorted(merged.items(), key=lambda kv: -kv[1][0])[:self.capacity])
+        return self
+
+    def to_dict(self):
+        return {'capacity': self.capacity, 'counters': self.counters}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['capacity'], {item: list(counter) for item, counter in data['counters'].items()})
+
+# ==================== 统计状态 ====================
+
+_lock = threading.RLock()
+_sketches = {}
+
+def _empty():
+    """
+    空的统计结构：
+    topk / cms 按模块（None 表示全部模块）统计内容访问，
+    reach 按模块统计访问学生，daily_reach / daily_visits 按 (模块, 日期) 统计
+    """
+    return {'topk': {}, 'cms': {}, 'visits': {}, 'reach': {}, 'daily_reach': {}, 'daily_visits': {}}
+
+def _scopes(module_name):
+    return (None,) if module_name is None else (None, module_name)
+
+def _record(sketches, student_id, module_name, content_name, day, count=1):
+    """把 count 次活动计入统计结构"""
+    recent = day >= (date.fromisoformat(today()) - timedelta(days=SKETCH_DAYS)).isoformat()
+    for scope in _scopes(module_name):
+        sketches['visits'][scope] = sketches['visits'].get(scope, 0) + count
+        if student_id is not None:
+            sketches['reach'].setdefault(scope, HyperLogLog()).add(student_id)
+        if recent:
+            key = (scope, day)
+            sketches['daily_visits'][key] = sketches['daily_visits'].get(key, 0) + count
+            if student_id is not None:
+                sketches['daily_reach'].setdefault(key, HyperLogLog(DAILY_HLL_PRECISION)).add(student_id)
+        if content_name:
+            sketches['topk'].setdefault(scope, SpaceSaving()).add(content_name, count)
+            sketches['cms'].setdefault(scope, CountMinSketch()).add(content_name, count)
+
+def _prune(sketches):
+    """丢弃超过 SKETCH_DAYS 天的按日统计"""
+    cutoff = (date.fromisoformat(today()) - timedelta(days=SKETCH_DAYS)).isoformat()
+    for name in ('daily_reach', 'daily_visits'):
+        for key in [key for key in sketches[name] if key[1] < cutoff]:
+            del sketches[name][key]
+
+def _recent_ids(storage, since):
+    """since 之后（含）主存储中的全部活动ID（分批读取）"""
+    ids = set()
+    while True:
+        batch = storage.activities_since(since, RECENT_BATCH_SIZE)
+        ids.update(activity['id'] for activity in batch)
+        if len(batch) < RECENT_BATCH_SIZE or batch[-1]['timestamp'] <= since:
+            return ids
+        since = batch[-1]['timestamp']
+
+def _rebuild(storage, since):
+    """
+    从数据库（含归档）重建统计结构：按 学生×模块×日期 汇总行和内容计数各扫描一次
+
+    返回 (统计结构, since 之后已计入的活动ID集合)。汇总行没有活动ID，汇总之后再读取一次近期活动ID；
+    汇总查询执行期间提交的活动会被当作已计入而少计一次，水位线不增加，下次启动时重建
+    """
+    sketches = _empty()
+    activity_rows, _ = storage.cohort_rows()
+    for student_id, module_name, day, _, count in activity_rows + archived_cohort_rows():
+        _record(sketches, student_id, module_name, None, day, count)
+    for module_name, content_name, count in storage.content_counts() + archived_content_counts():
+        for scope in _scopes(module_name):
+            sketches['topk'].setdefault(scope, SpaceSaving()).add(content_name, count)
+            sketches['cms'].setdefault(scope, CountMinSketch()).add(content_name, count)
+    return sketches, _recent_ids(storage, since)
+
+# ==================== 持久化 ====================
+
+def _key(scope, day=None):
+    """字典键转为JSON字符串（模块可能为None）"""
+    return json.dumps([scope, day], ensure_ascii=False) if day is not None else json.dumps(scope, ensure_ascii=False)
+
+def _serialize(sketches, watermark):
+    return {
+        'watermark': watermark,
+        'saved_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'topk': {_key(k): v.to_dict() for k, v in sketches['topk'].items()},
+        'cms': {_key(k): v.to_dict() for k, v in sketches['cms'].items()},
+        'visits': {_key(k): v for k, v in sketches['visits'].items()},
+        'reach': {_key(k): v.to_dict() for k, v in sketches['reach'].items()},
+        'daily_reach': {_key(*k): v.to_dict() for k, v in sketches['daily_reach'].items()},
+        'daily_visits': {_key(*k): v for k, v in sketches['daily_visits'].items()},
+    }
+
+def _deserialize(data):
+    scope = json.loads
+    pair = lambda text: tuple(json.loads(text))
+    return {
+        'topk': {scope(k): SpaceSaving.from_dict(v) for k, v in data['topk'].items()},
+        'cms': {scope(k): CountMinSketch.from_dict(v) for k, v in data['cms'].items()},
+        'visits': {scope(k): v for k, v in data['visits'].items()},
+        'reach': {scope(k): HyperLogLog.from_dict(v) for k, v in data['reach'].items()},
+        'daily_reach': {pair(k): HyperLogLog.from_dict(v) for k, v in data['daily_reach'].items()},
+        'daily_visits': {pair(k): v for k, v in data['daily_visits'].items()},
+    }
+
+def _save(watermark):
+    """保存统计结构和水位线（先写临时文件再替换，调用方持有锁）"""
+    tmp_path = SKETCHES_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(_serialize(_sketches, watermark), f, ensure_ascii=False)
+    os.replace(tmp_path, SKETCHES_PATH)
+
+def _load(watermark):
+    """读取保存的统计结构，水位线与数据库一致时返回，否则返回None"""
+    try:
+        with open(SKETCHES_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[流式统计] 读取失败: {e}")
+        return None
+    if data.get('watermark') != watermark:
+        return None
+    return _deserialize(data)
+
+def _prepare(sketches):
+    _prune(sketches)
+    return sketches
+
+def _install(sketches):
+    _sketches.clear()
+    _sketches.update(sketches)
+
+def _apply(payload):
+    _record(_sketches, payload.get('student_id'), payload.get('module_name'), payload.get('content_name'), today())
+
+_store = RebuildableState("流式统计", _lock, load=_load, rebuild=_rebuild, prepare=_prepare, install=_install,
+                          apply=_apply, save=_save, persist_interval=SKETCH_PERSIST_INTERVAL)
+
+def _ensure_ready():
+    """首次读取或有删除操作后加载/重建统计结构，数据库不可用时返回False"""
+    return _store.ensure_ready()
+
+def _on_data_event(event, payload):
+    """数据事件订阅：新活动增量计入；删除操作后标记重建（概率结构无法减去已删除的数据）"""
+    if event == 'activity_logged':
+        _store.on_activity(payload)
+    elif event in ('student_deleted', 'activities_cleared', 'data_cleared', 'data_repaired'):
+        _store.mark_dirty()
+
+subscribe(_on_data_event)
+
+# ==================== 读取接口 ====================
+
+def popular_content(module=None, limit=10):
+    """
+    访问最多的内容 [{'module', 'content_name', 'view_count', 'max_error'}]
+
+    view_count 最多高估 max_error；数据库不可用时返回None
+    """
+    if not _ensure_ready():
+        return None
+    with _lock:
+        topk = _sketches['topk'].get(module)
+        top = topk.top(limit) if topk else []
+    return [
+        {'module': module or '全部', 'content_name': item, 'view_count': count, 'max_error': error}
+        for item, count, error in top
+    ]
+
+def content_views(content_name, module=None):
+    """单个内容访问次数的估计值（Count-Min，只会高估）"""
+    if not _ensure_ready():
+        return None
+    with _lock:
+        cms = _sketches['cms'].get(module)
+        return cms.estimate(content_name) if cms else 0
+
+def module_reach(module=None):
+    """
+    模块访问统计 (总访问次数, 访问学生数估计值, 近7天访问次数)
+
+    数据库不可用时返回None
+    """
+    if not _ensure_ready():
+        return None
+    with _lock:
+        visits = _sketches['visits'].get(module, 0)
+        reach = _sketches['reach'].get(module)
+        end = date.fromisoformat(today())
+        recent = sum(
+            _sketches['daily_visits'].get((module, (end - timedelta(days=i)).isoformat()), 0)
+            for i in range(7)
+        )
+        return visits, reach.count() if reach else 0, recent
+
+def all_module_reach():
+    """各模块 {模块: (总访问次数, 访问学生数估计值)}"""
+    if not _ensure_ready():
+        return None
+    with _lock:
+        return {
+            module: (visits, _sketches['reach'][module].count() if module in _sketches['reach'] else 0)
+            for module, visits in _sketches['visits'].items()
+            if module is not None
+        }
+
+def daily_reach(days=7, module=None):
+    """近N天的访问学生数估计值（合并每天的HyperLogLog，同一学生多天访问只计一次）"""
+    if not _ensure_ready():
+        return None
+    with _lock:
+        end = date.fromisoformat(today())
+        merged = HyperLogLog(DAILY_HLL_PRECISION)
+        for i in range(min(days, SKETCH_DAYS)):
+            sketch = _sketches['daily_reach'].get((module, (end - timedelta(days=i)).isoformat()))
+            if sketch is not None:
+                merged.merge(sketch)
+        return merged.count()
+
+def get_sketch_status():
+    """获取流式统计状态（误差参数、保存时间）"""
+    with _lock:
+        return {
+            'ready': _store.ready,
+            'modules': len(_sketches.get('visits', {})),
+            'daily_sketches': len(_sketches.get('daily_reach', {})),
+            'reach_error': HyperLogLog().error(),
+            'topk_capacity': SKETCH_TOPK_CAPACITY,
+            'saved_at': datetime.fromtimestamp(_store.saved_at) if _store.saved_at else None,
+            'unsaved': _store.changed,
+        }
@@ -0,0 +1,160 @@
+"""
+存储后端模块
+定义学生、活动、课堂问答、病例和课程数据的存储接口，
+按 config.settings.STORAGE_BACKEND 选择 Neo4j 或嵌入式 SQLite 实现
+"""
+
+import importlib
+import threading
+
+from modules.content_repository import get_curriculum_modules
+
+try:
+    from config.settings import STORAGE_BACKEND
+except (ImportError, AttributeError):
+    STORAGE_BACKEND = "neo4j"
+
+# 后端名称 -> (模块, 类名)，按需导入
+STORAGE_BACKENDS = {
+    'neo4j': ("modules.storage_neo4j", "Neo4jStorage"),
+    'sqlite': ("modules.storage_sqlite", "SQLiteStorage"),
+}
+
+class Storage:
+    """
+    存储接口
+
+    读取方法在查询失败时抛出异常，由调用方决定降级方式（返回空数据、不写缓存等）；
+    时间均为UTC，日期为 YYYY-MM-DD 字符串
+    """
+    name = ""
+
+    def is_available(self):
+        """后端是否可用（不可用时调用方使用离线数据）"""
+        raise NotImplementedError
+
+    # ==================== 学生 ====================
+
+    def register_student(self, student_id, name):
+        """注册或更新学生（记录登录时间和次数）"""
+        raise NotImplementedError
+
+    def list_students(self):
+        """学生列表 [{'student_id', 'activity_count'}]，按活动数降序"""
+        raise NotImplementedError
+
+    def delete_student(self, student_id):
+        """删除学生及其全部活动"""
+        raise NotImplementedError
+
+    # ==================== 活动 ====================
+
+    def log_activity(self, student_id, activity_type, module_name, content_id=None, content_name=None, details=None, when=None):
+        """记录一条学习活动（when 为活动时间，默认当前时间），返回 (活动ID, 活动时间)"""
+        raise NotImplementedError
+
+    def list_activities(self, student_id=None, module=None, limit=100):
+        """活动记录（按时间倒序），timestamp 为字符串"""
+        raise NotImplementedError
+
+    def delete_all_activities(self):
+        """删除全部活动"""
+        raise NotImplementedError
+
+    def activities_since(self, since, limit=5000):
+        """按时间升序读取 since 之后（含）的活动，since 为None时从头读取；timestamp 为带时区的datetime"""
+        raise NotImplementedError
+
+    def activities_before(self, cutoff, limit=5000):
+        """cutoff之前最早的活动（按时间升序，归档使用），timestamp 为带时区的datetime"""
+        raise NotImplementedError
+
+    def delete_activities(self, activities):
+        """删除 activities_before 返回的活动（归档写入后调用）"""
+        raise NotImplementedError
+
+    def module_statistics(self):
+        """各模块统计 {模块: (总访问次数, 学生数)}"""
+        raise NotImplementedError
+
+    def single_module_statistics(self, module_name):
+        """单个模块统计 (总访问次数, 学生数, 近7天访问次数)"""
+        raise NotImplementedError
+
+    def activity_summary(self):
+        """活动概况 {'total_students', 'total_activities', 'today_activities', 'active_students'}"""
+        raise NotImplementedError
+
+    def daily_trend(self, days=7):
+        """近N天每日活动数 [{'date', 'count'}]，按日期升序"""
+        raise NotImplementedError
+
+    def activity_rollup(self, cutoff):
+        """cutoff之前的活动按 学生×模块×日期 聚合 [{'student_id', 'name', 'module', 'day', 'count'}]"""
+        raise NotImplementedError
+
+    def content_counts(self):
+        """各模块每个学习内容的访问次数 [(模块, 内容名称, 次数)]"""
+        raise NotImplementedError
+
+    def activity_watermark(self):
+        """活动水位线 (活动数, 最新活动时间, 回复数)，数据变化时随之变化"""
+        raise NotImplementedError
+
+    def activity_count(self):
+        """活动总数（只计数、不读取活动属性）"""
+        raise NotImplementedError
+
+    def cohort_rows(self):
+        """按 学生×模块×日期×小时 聚合的活动数，以及每个学生的回复数"""
+        raise NotImplementedError
+
+    # ==================== 课堂问答 ====================
+
+    def create_question(self, text):
+        """关闭当前活跃问题并创建新问题，返回问题ID"""
+        raise NotImplementedError
+
+    def get_active_question(self):
+        """当前活跃问题 {'id', 'text', 'created_at'}，没有时返回None"""
+        raise NotImplementedError
+
+    def submit_reply(self, question_id, student_name, content):
+        """提交回复"""
+        raise NotImplementedError
+
+    def list_replies(self, question_id, limit=20):
+        """最新回复 [{'student_name', 'content', 'timestamp'}]"""
+        raise NotImplementedError
+
+    # ==================== 病例与课程 ====================
+
+    def get_case_detail(self, case_id):
+        """病例详情及关联知识点（knowledge_points），病例不存在时返回None"""
+        raise NotImplementedError
+
+    def get_curriculum_modules(self):
+        """课程模块结构（两种后端共用内容仓库中的课程数据）"""
+        return get_curriculum_modules()
+
+_storage_lock = threading.Lock()
+_storage_instances = {}
+
+def get_storage(backend=None):
+    """获取存储后端实例（每个后端每个进程只创建一次）"""
+    backend = backend or STORAGE_BACKEND
+    if backend not in STORAGE_BACKENDS:
+        print(f"[存储] 未知的存储后端 {backend}，使用 neo4j")
+        backend = "neo4j"
+
+    with _storage_lock:
+        storage = _storage_instances.get(backend)
+        if storage is None:
+            module_name, class_name = STORAGE_BACKENDS[backend]
+            storage = getattr(importlib.import_module(module_name), class_name)()
+            _storage_instances[backend] = storage
+        return storage
+
+def is_storage_available():
+    """当前存储后端是否可用"""
+    return get_storage().is_available()
@@ -0,0 +1,410 @@
+"""
+Neo4j存储后端
+学生、活动和课堂问答存储在图数据库中（yzbx_ 前缀标签）
+"""
+
+from modules.storage import Storage
+
+try:
+    from config.settings import JOB_BATCH_SIZE
+except (ImportError, AttributeError):
+    JOB_BATCH_SIZE = 1000
+
+def check_neo4j_available():
+    """检查Neo4j是否可用"""
+    from modules.auth import check_neo4j_available as auth_check
+    return auth_check()
+
+def get_neo4j_driver():
+    """获取Neo4j连接（复用auth模块的缓存连接）"""
+    from modules.auth import get_neo4j_driver as auth_get_driver
+    return auth_get_driver()
+
+class Neo4jStorage(Storage):
+    """Neo4j存储后端"""
+    name = "neo4j"
+
+    def is_available(self):
+        return check_neo4j_available()
+
+    def _run(self, query, **params):
+        """执行查询并返回全部记录"""
+        with get_neo4j_driver().session() as session:
+            return list(session.run(query, **params))
+
+    # ==================== 学生 ====================
+
+    def register_student(self, student_id, name):
+        self._run("""
+            MERGE (s:yzbx_Student {student_id: $student_id})
+            ON CREATE SET s.created_at = datetime()
+            SET s.name = $name,
+                s.last_login = datetime(),
+                s.login_count = COALESCE(s.login_count, 0) + 1
+        """, student_id=student_id, name=name)
+
+    def list_students(self):
+        records = self._run("""
+            MATCH (s:yzbx_Student)
+            OPTIONAL MATCH (s)-[:PERFORMED]->(a:yzbx_Activity)
+            WITH s, count(a) as activity_count
+            RETURN s.student_id as student_id,
+                   activity_count
+            ORDER BY activity_count DESC
+        """)
+        return [dict(record) for record in records]
+
+    def delete_student(self, student_id):
+        with get_neo4j_driver().session() as session:
+            # 删除活动记录（分批提交，避免单个大事务）
+            session.run(f"""
+                MATCH (s:yzbx_Student {{student_id: $student_id}})-[:PERFORMED]->(a:yzbx_Activity)
+                CALL {{ WITH a DETACH DELETE a }} IN TRANSACTIONS OF {JOB_BATCH_SIZE} ROWS
+            """, student_id=student_id)
+
+            # 删除学生节点
+            session.run("""
+                MATCH (s:yzbx_Student {student_id: $student_id})
+                DETACH DELETE s
+            """, student_id=student_id)
+
+    # ==================== 活动 ====================
+
+    def log_activity(self, student_id, activity_type, module_name, content_id=None, content_name=None, details=None, when=None):
+        record = self._run("""
+            MERGE (s:yzbx_Student {student_id: $student_id})
+            ON CREATE SET s.created_at = datetime()
+            CREATE (a:yzbx_Activity {
+                id: randomUUID(),
+                activity_type: $activity_type,
+                module_name: $module_name,
+                content_id: $content_id,
+                content_name: $content_name,
+                details: $details,
+                timestamp: COALESCE($when, datetime())
+            })
+            CREATE (s)-[:PERFORMED]->(a)
+            RETURN a.id as id, a.timestamp as timestamp
+        """, student_id=student_id, activity_type=activity_type,
+            module_name=module_name, content_id=content_id,
+            content_name=content_name, details=details, when=when)[0]
+        return record['id'], record['timestamp'].to_native()
+
+    def list_activities(self, student_id=None, module=None, limit=100):
+        query = """
+            MATCH (s:yzbx_Student)-[:PERFORMED]->(a:yzbx_Activity)
+            WHERE 1=1
+        """
+        params = {"limit": limit}
+
+        if student_id:
+            query += " AND s.student_id = $student_id"
+            params["student_id"] = student_id
+
+        if module:
+            query += " AND COALESCE(a.module_name, a.module) = $module"
+            params["module"] = module
+
+        query += """
+            RETURN s.student_id as student_id,
+                   s.name as student_name,
+                   COALESCE(a.activity_type, a.type) as activity_type,
+                   COALESCE(a.module_name, a.module) as module,
+                   a.content_id as content_id,
+                   a.content_name as content_name,
+                   a.details as details,
+                   a.timestamp as timestamp
+            ORDER BY a.timestamp DESC
+            LIMIT $limit
+        """
+
+        activities = []
+        for record in self._run(query, **params):
+            activity = dict(record)
+            # 将timestamp转换为字符串，避免Date序列化问题
+            if activity['timestamp']:
+                activity['timestamp'] = str(activity['timestamp'])
+            activities.append(activity)
+        return activities
+
+    def delete_all_activities(self):
+        self._run(f"""
+            MATCH (a:yzbx_Activity)
+            CALL {{ WITH a DETACH DELETE a }} IN TRANSACTIONS OF {JOB_BATCH_SIZE} ROWS
+        """)
+
+    def activities_before(self, cutoff, limit=5000):
+        records = self._run("""
+            MATCH (s:yzbx_Student)-[:PERFORMED]->(a:yzbx_Activity)
+            WHERE a.timestamp IS NOT NULL AND a.timestamp < $cutoff
+            RETURN COALESCE(a.id, elementId(a)) as id,
+                   elementId(a) as element_id,
+                   s.student_id as student_id,
+                   s.name as student_name,
+                   COALESCE(a.activity_type, a.type) as activity_type,
+                   COALESCE(a.module_name, a.module) as module,
+                   a.content_id as content_id,
+                   a.content_name as content_name,
+                   a.details as details,
+                   a.timestamp as timestamp
+            ORDER BY a.timestamp, id
+            LIMIT $limit
+        """, cutoff=cutoff, limit=limit)
+        return [dict(record, timestamp=record['timestamp'].to_native()) for record in records]
+
+    def delete_activities(self, activities):
+        # 按elementId定位节点，不扫描活动标签
+        self._run("""
+            MATCH (a:yzbx_Activity)
+            WHERE elementId(a) IN $element_ids
+            DETACH DELETE a
+        """, element_ids=[activity['element_id'] for activity in activities])
+
+    def module_statistics(self):
+        records = self._run("""
+            MATCH (s:yzbx_Student)-[:PERFORMED]->(a:yzbx_Activity)
+            WITH COALESCE(a.module_name, a.module) as module, count(a) as total_visits, count(DISTINCT s) as unique_students
+            RETURN module, total_visits, unique_students
+        """)
+        return {record['module']: (record['total_visits'], record['unique_students']) for record in records}
+
+    def single_module_statistics(self, module_name):
+        with get_neo4j_driver().session() as session:
+            # 总访问次数和学生数
+            record = session.run("""
+                MATCH (s:yzbx_Student)-[:PERFORMED]->(a:yzbx_Activity)
+                WHERE COALESCE(a.module_name, a.module) = $module
+                RETURN count(a) as total_activities,
+                       count(DISTINCT s) as unique_students
+            """, module=module_name).single()
+            total_activities = record['total_activities'] if record else 0
+            unique_students = record['unique_students'] if record else 0
+
+            # 近7天访问
+            record = session.run("""
+                MATCH (a:yzbx_Activity)
+                WHERE COALESCE(a.module_name, a.module) = $module
+                  AND a.timestamp > datetime() - duration('P7D')
+                RETURN count(a) as recent_count
+            """, module=module_name).single()
+            recent_count = record['recent_count'] if record else 0
+
+        return total_activities, unique_students, recent_count
+
+    def activity_summary(self):
+        with get_neo4j_driver().session() as session:
+            # 总学生数
+            total_students = session.run("MATCH (s:yzbx_Student) RETURN count(s) as count").single()['count']
+
+            # 总活动数
+            total_activities = session.run("MATCH (a:yzbx_Activity) RETURN count(a) as count").single()['count']
+
+            # 今日活动数
+            today_activities = session.run("""
+                MATCH (a:yzbx_Activity)
+                WHERE date(a.timestamp) = date()
+                RETURN count(a) as count
+            """).single()['count']
+
+            # 活跃学生数（7天内）
+            active_students = session.run("""
+                MATCH (s:yzbx_Student)-[:PERFORMED]->(a:yzbx_Activity)
+                WHERE a.timestamp > datetime() - duration('P7D')
+                RETURN count(DISTINCT s) as count
+            """).single()['count']
+
+        return {
+            'total_students': total_students,
+            'total_activities': total_activities,
+            'today_activities': today_activities,
+            'active_students': active_students
+        }
+
+    def daily_trend(self, days=7):
+        records = self._run("""
+            MATCH (a:yzbx_Activity)
+            WHERE a.timestamp > datetime() - duration('P' + $days + 'D')
+            RETURN date(a.timestamp) as date, count(*) as count
+            ORDER BY date
+        """, days=str(days))
+
+        # 将Date对象转换为字符串
+        return [
+            {'date': str(record['date']) if record['date'] else None, 'count': record['count']}
+            for record in records
+        ]
+
+    def activity_rollup(self, cutoff):
+        records = self._run("""
+            MATCH (s:yzbx_Student)-[:PERFORMED]->(a:yzbx_Activity)
+            WHERE s.student_id IS NOT NULL AND a.timestamp IS NOT NULL
+              AND a.timestamp < $cutoff
+            RETURN s.student_id as student_id,
+                   s.name as name,
+                   COALESCE(a.module_name, a.module) as module,
+                   toString(date(a.timestamp)) as day,
+                   count(*) as count
+        """, cutoff=cutoff)
+        return [dict(record) for record in records]
+
+    def content_counts(self):
+        records = self._run("""
+            MATCH (a:yzbx_Activity)
+            WHERE a.content_name IS NOT NULL
+            RETURN COALESCE(a.module_name, a.module) as module, a.content_name as content_name, count(*) as count
+        """)
+        return [(record['module'], record['content_name'], record['count']) for record in records]
+
+    def activity_watermark(self):
+        record = self._run("""
+            MATCH (a:yzbx_Activity)
+            WITH count(a) as activity_count, max(a.timestamp) as last_activity
+            OPTIONAL MATCH ()-[r:REPLIED]->()
+            RETURN activity_count, toString(last_activity) as last_activity, count(r) as reply_count
+        """)[0]
+        return (record['activity_count'], record['last_activity'], record['reply_count'])
+
+    def activity_count(self):
+        """单个标签的计数由计数存储直接给出，不扫描节点"""
+        return self._run("MATCH (a:yzbx_Activity) RETURN count(a) as count")[0]['count']
+
+    def cohort_rows(self):
+        with get_neo4j_driver().session() as session:
+            result = session.run("""
+                MATCH (s:yzbx_Student)-[:PERFORMED]->(a:yzbx_Activity)
+                WHERE s.student_id IS NOT NULL AND a.timestamp IS NOT NULL
+                RETURN s.student_id as student_id,
+                       COALESCE(a.module_name, a.module) as module,
+                       toString(date(a.timestamp)) as day,
+                       a.timestamp.hour as hour,
+                       count(*) as count
+            """)
+            activity_rows = [(r['student_id'], r['module'], r['day'], r['hour'], r['count']) for r in result]
+
+            # 课中互动回复按学生姓名关联（登录时学号与姓名相同）
+            result = session.run("""
+                MATCH (s:yzbx_Student)-[r:REPLIED]->(:yzbx_Question)
+                RETURN COALESCE(s.student_id, s.name) as student_id, count(r) as count
+            """)
+            reply_rows = [(r['student_id'], r['count']) for r in result]
+
+        return activity_rows, reply_rows
+
+    # ==================== 课堂问答 ====================
+
+    def create_question(self, text):
+        with get_neo4j_driver().session() as session:
+            # 先关闭所有活跃问题
+            session.run("MATCH (q:yzbx_Question {status: 'active'}) SET q.status = 'closed'")
+
+            # 创建新问题
+            result = session.run("""
+                CREATE (q:yzbx_Question {
+                    id: randomUUID(),
+                    text: $text,
+                    created_at: datetime(),
+                    status: 'active'
+                })
+                RETURN q.id as id
+            """, text=text)
+            return result.single()['id']
+
+    def get_active_question(self):
+        records = self._run("""
+            MATCH (q:yzbx_Question {status: 'active'})
+            RETURN q.id as id, q.text as text, q.created_at as created_at
+            ORDER BY q.created_at DESC
+            LIMIT 1
+        """)
+        return dict(records[0]) if records else None
+
+    def submit_reply(self, question_id, student_name, content):
+        self._run("""
+            MATCH (q:yzbx_Question {id: $question_id})
+            MERGE (s:yzbx_Student {name: $student_name})
+            CREATE (s)-[:REPLIED {
+                content: $content,
+                timestamp: datetime(),
+                length: size($content)
+            }]->(q)
+        """, question_id=question_id, student_name=student_name, content=content)
+
+    def list_replies(self, question_id, limit=20):
+        records = self._run("""
+            MATCH (s:yzbx_Student)-[r:REPLIED]->(q:yzbx_Question {id: $question_id})
+            RETURN s.name as student_name, r.content as content, r.timestamp as timestamp
+            ORDER BY r.timestamp DESC
+            LIMIT $limit
+        """, question_id=question_id, limit=limit)
+        return [dict(record) for record in records]
+
+    # ==================== 病例与课程 ====================
+
+    def get_case_detail(self, case_id):
+        records = self._run("""
+            MATCH (c:yzbx_Case {id: $case_id})
+            OPTIONAL MATCH (c)-[:RELATES_TO]->(k:yzbx_Knowledge)
+            RETURN c, collect(k {.id, .name}) as knowledge_points
+        """, case_id=case_id)
+        if not records:
+            return None
+        case_data = dict(records[0]['c'])
+        case_data['knowledge_points'] = list(records[0]['knowledge_points'])
+        return case_data
+
+    # ==================== 变更捕获（分析副本） ====================
+
+    def activities_since(self, since, limit=5000):
+        """按时间顺序读取 since 之后（含）的活动，since 为None时从头读取"""
+        records = self._run("""
+            MATCH (s:yzbx_Student)-[:PERFORMED]->(a:yzbx_Activity)
+            WHERE s.student_id IS NOT NULL AND a.timestamp IS NOT NULL
+              AND ($since IS NULL OR a.timestamp >= $since)
+            RETURN COALESCE(a.id, elementId(a)) as id,
+                   s.student_id as student_id,
+                   COALESCE(a.activity_type, a.type) as activity_type,
+                   COALESCE(a.module_name, a.module) as module,
+                   a.content_id as content_id,
+                   a.content_name as content_name,
+                   a.details as details,
+                   a.timestamp as timestamp
+            ORDER BY a.timestamp
+            LIMIT $limit
+        """, since=since, limit=limit)
+        return [dict(record, timestamp=record['timestamp'].to_native()) for record in records]
+
+    def replies_since(self, since, limit=5000):
+        """按时间顺序读取 since 之后（含）的课堂回复"""
+        records = self._run("""
+            MATCH (s:yzbx_Student)-[r:REPLIED]->(q:yzbx_Question)
+            WHERE r.timestamp IS NOT NULL
+              AND ($since IS NULL OR r.timestamp >= $since)
+            RETURN elementId(r) as id,
+                   q.id as question_id,
+                   COALESCE(s.student_id, s.name) as student_name,
+                   r.content as content,
+                   r.timestamp as timestamp
+            ORDER BY r.timestamp
+            LIMIT $limit
+        """, since=since, limit=limit)
+        return [dict(record, timestamp=record['timestamp'].to_native()) for record in records]
+
+    def students_since(self, since):
+        """
+        读取 since 之后（含）登录过或新建的学生
+
+        只记录过活动、从未登录的学生没有 last_login，按创建时间判断
+        """
+        records = self._run("""
+            MATCH (s:yzbx_Student)
+            WHERE s.student_id IS NOT NULL
+              AND ($since IS NULL OR COALESCE(s.last_login, s.created_at) >= $since)
+            RETURN s.student_id as student_id,
+                   s.name as name,
+                   s.last_login as last_login,
+                   s.login_count as login_count
+        """, since=since)
+        return [
+            dict(record, last_login=record['last_login'].to_native() if record['last_login'] else None)
+            for record in records
+        ]
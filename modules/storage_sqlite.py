@@ -0,0 +1,511 @@
+"""
+SQLite存储后端
+嵌入式数据库，适用于本地开发、CI和无法连接Neo4j的离线课堂；
+活动表按 学生/模块/时间 建索引，另维护按 学生×模块×日期×小时 的汇总表，
+统计查询直接在汇总表上分组聚合，不扫描明细
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from modules.storage import Storage
+from modules.content_repository import DATA_DIR, get_sample_cases, get_knowledge_points
+
+try:
+    from config.settings import STORAGE_SQLITE_PATH
+except (ImportError, AttributeError):
+    STORAGE_SQLITE_PATH = ""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    student_id TEXT PRIMARY KEY,
+    name TEXT,
+    last_login TEXT,
+    login_count INTEGER NOT NULL DEFAULT 0,
+    activity_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_students_activity_count ON students (activity_count);
+
+CREATE TABLE IF NOT EXISTS activities (
+    id TEXT PRIMARY KEY,
+    student_id TEXT NOT NULL,
+    activity_type TEXT,
+    module_name TEXT,
+    content_id TEXT,
+    content_name TEXT,
+    details TEXT,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_activities_student ON activities (student_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_activities_module ON activities (module_name, timestamp);
+CREATE INDEX IF NOT EXISTS idx_activities_timestamp ON activities (timestamp);
+
+-- 活动汇总表：每次写入活动时同步累加，统计查询只读此表
+CREATE TABLE IF NOT EXISTS activity_rollup (
+    student_id TEXT NOT NULL,
+    module_name TEXT NOT NULL DEFAULT '',
+    day TEXT NOT NULL,
+    hour INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (module_name, day, student_id, hour)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_rollup_day ON activity_rollup (day, student_id);
+CREATE INDEX IF NOT EXISTS idx_rollup_student ON activity_rollup (student_id, module_name);
+
+CREATE TABLE IF NOT EXISTS questions (
+    id TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_questions_status ON questions (status, created_at);
+
+CREATE TABLE IF NOT EXISTS replies (
+    id TEXT PRIMARY KEY,
+    question_id TEXT NOT NULL,
+    student_name TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_replies_question ON replies (question_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_replies_timestamp ON replies (timestamp);
+
+CREATE TABLE IF NOT EXISTS cases (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS case_knowledge (
+    case_id TEXT NOT NULL,
+    knowledge_id TEXT NOT NULL,
+    name TEXT,
+    PRIMARY KEY (case_id, knowledge_id)
+) WITHOUT ROWID;
+"""
+
+def _utc_now():
+    """当前UTC时间"""
+    return datetime.now(timezone.utc)
+
+def _iso(value):
+    """时间转为ISO字符串（UTC，字符串顺序即时间顺序）"""
+    return value.astimezone(timezone.utc).isoformat(timespec='microseconds')
+
+def _parse(value):
+    """ISO字符串转为datetime（课堂问答页面按 strftime 显示时间）"""
+    return datetime.fromisoformat(value) if value else None
+
+def _case_knowledge_rows(cases):
+    """
+    病例-知识点关联 [(病例ID, 知识点ID, 名称)]
+
+    与Neo4j的 RELATES_TO 一致：使用病例的 related_knowledge；病例未标注时
+    取病例文本中出现的知识点名称（与掌握度模块的病例知识点相同）
+    """
+    knowledge = get_knowledge_points()
+    names = {kp['id']: kp['name'] for kp in knowledge}
+    rows = []
+    for case in cases:
+        related = case.get('related_knowledge')
+        if related is None:
+            text = json.dumps(case, ensure_ascii=False)
+            related = [kp['id'] for kp in knowledge if kp['name'] in text]
+        rows.extend((case['id'], kp_id, names[kp_id]) for kp_id in related if kp_id in names)
+    return rows
+
+class SQLiteStorage(Storage):
+    """SQLite存储后端（单连接 + 锁，WAL模式）"""
+    name = "sqlite"
+
+    def __init__(self, path=None):
+        self.path = path or STORAGE_SQLITE_PATH or os.path.join(DATA_DIR, "yzbx_local.db")
+        self._lock = threading.RLock()
+        self._conn = None
+        self._error = None
+
+    def _connect(self):
+        """打开数据库（首次打开时建表并导入示例病例及其关联知识点）"""
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            conn.executemany(
+                "INSERT OR IGNORE INTO cases (id, data) VALUES (?, ?)",
+                [(case['id'], json.dumps(case, ensure_ascii=False)) for case in get_sample_cases()]
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO case_knowledge (case_id, knowledge_id, name) VALUES (?, ?, ?)",
+                _case_knowledge_rows(get_sample_cases())
+            )
+            self._conn = conn
+        return self._conn
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    def _write(self, statements):
+        """在一个事务中执行多条写入 [(sql, params)]"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    conn.execute(sql, params)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def is_available(self):
+        if self._error is not None:
+            return False
+        try:
+            with self._lock:
+                self._connect()
+            return True
+        except Exception as e:
+            self._error = str(e)
+            print(f"[SQLite存储] 打开数据库失败: {e}")
+            return False
+
+    # ==================== 学生 ====================
+
+    def register_student(self, student_id, name):
+        self._write([("""
+            INSERT INTO students (student_id, name, last_login, login_count) VALUES (?, ?, ?, 1)
+            ON CONFLICT (student_id) DO UPDATE SET
+                name = excluded.name,
+                last_login = excluded.last_login,
+                login_count = login_count + 1
+        """, (student_id, name, _iso(_utc_now())))])
+
+    def list_students(self):
+        rows = self._query("SELECT student_id, activity_count FROM students ORDER BY activity_count DESC")
+        return [dict(row) for row in rows]
+
+    def delete_student(self, student_id):
+        self._write([
+            ("DELETE FROM activities WHERE student_id = ?", (student_id,)),
+            ("DELETE FROM activity_rollup WHERE student_id = ?", (student_id,)),
+            ("DELETE FROM students WHERE student_id = ?", (student_id,)),
+        ])
+
+    # ==================== 活动 ====================
+
+    @staticmethod
+    def _activity_counters(student_id, module_name, timestamp, delta=1):
+        """写入（delta=1）或删除（delta=-1）一条活动时同步更新的计数（学生活动数、汇总表）"""
+        return [
+            ("""
+                INSERT INTO students (student_id, activity_count) VALUES (?, ?)
+                ON CONFLICT (student_id) DO UPDATE SET activity_count = activity_count + excluded.activity_count
+            """, (student_id, delta)),
+            ("""
+                INSERT INTO activity_rollup (student_id, module_name, day, hour, count) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (module_name, day, student_id, hour) DO UPDATE SET count = count + excluded.count
+            """, (student_id, module_name or '', timestamp[:10], int(timestamp[11:13]), delta)),
+        ]
+
+    def log_activity(self, student_id, activity_type, module_name, content_id=None, content_name=None, details=None, when=None):
+        when = when or _utc_now()
+        timestamp = _iso(when)
+        activity_id = str(uuid.uuid4())
+        self._write([
+            ("""
+                INSERT INTO activities (id, student_id, activity_type, module_name, content_id, content_name, details, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (activity_id, student_id, activity_type, module_name,
+                  content_id, content_name, details, timestamp)),
+        ] + self._activity_counters(student_id, module_name, timestamp))
+        return activity_id, _parse(timestamp)
+
+    def list_activities(self, student_id=None, module=None, limit=100):
+        sql = """
+            SELECT a.student_id, s.name as student_name, a.activity_type, a.module_name as module,
+                   a.content_id, a.content_name, a.details, a.timestamp
+            FROM activities a
+            LEFT JOIN students s ON s.student_id = a.student_id
+            WHERE 1=1
+        """
+        params = []
+        if student_id:
+            sql += " AND a.student_id = ?"
+            params.append(student_id)
+        if module:
+            sql += " AND a.module_name = ?"
+            params.append(module)
+        sql += " ORDER BY a.timestamp DESC LIMIT ?"
+        params.append(limit)
+        return [dict(row) for row in self._query(sql, params)]
+
+    def delete_all_activities(self):
+        self._write([
+            ("DELETE FROM activities", ()),
+            ("DELETE FROM activity_rollup", ()),
+            ("UPDATE students SET activity_count = 0", ()),
+        ])
+
+    def activities_since(self, since, limit=5000):
+        rows = self._query("""
+            SELECT id, student_id, activity_type, module_name as module,
+                   content_id, content_name, details, timestamp
+            FROM activities
+            WHERE ? IS NULL OR timestamp >= ?
+            ORDER BY timestamp, id
+            LIMIT ?
+        """, (_iso(since) if since else None, _iso(since) if since else None, limit))
+        return [dict(row, timestamp=_parse(row['timestamp'])) for row in rows]
+
+    def activities_before(self, cutoff, limit=5000):
+        rows = self._query("""
+            SELECT a.id, a.student_id, s.name as student_name, a.activity_type, a.module_name as module,
+                   a.content_id, a.content_name, a.details, a.timestamp
+            FROM activities a
+            LEFT JOIN students s ON s.student_id = a.student_id
+            WHERE a.timestamp < ?
+            ORDER BY a.timestamp, a.id
+            LIMIT ?
+        """, (_iso(cutoff), limit))
+        return [dict(row, timestamp=_parse(row['timestamp'])) for row in rows]
+
+    def delete_activities(self, activities):
+        statements = []
+        for activity in activities:
+            statements.append(("DELETE FROM activities WHERE id = ?", (activity['id'],)))
+            statements += self._activity_counters(
+                activity['student_id'], activity['module'], _iso(activity['timestamp']), delta=-1)
+        statements.append(("DELETE FROM activity_rollup WHERE count <= 0", ()))
+        self._write(statements)
+
+    def module_statistics(self):
+        rows = self._query("""
+            SELECT module_name, SUM(count) as total_visits, COUNT(DISTINCT student_id) as unique_students
+            FROM activity_rollup
+            GROUP BY module_name
+        """)
+        return {row['module_name'] or None: (row['total_visits'], row['unique_students']) for row in rows}
+
+    def single_module_statistics(self, module_name):
+        row = self._query("""
+            SELECT COALESCE(SUM(count), 0) as total_visits, COUNT(DISTINCT student_id) as unique_students
+            FROM activity_rollup
+            WHERE module_name = ?
+        """, (module_name or '',))[0]
+        recent = self._query("""
+            SELECT COUNT(*) as count FROM activities
+            WHERE module_name = ? AND timestamp > ?
+        """, (module_name, _iso(_utc_now() - timedelta(days=7))))[0]
+        return row['total_visits'], row['unique_students'], recent['count']
+
+    def activity_summary(self):
+        now = _utc_now()
+        week_ago = _iso(now - timedelta(days=7))
+        row = self._query("""
+            SELECT (SELECT COUNT(*) FROM students) as total_students,
+                   (SELECT COALESCE(SUM(count), 0) FROM activity_rollup) as total_activities,
+                   (SELECT COALESCE(SUM(count), 0) FROM activity_rollup WHERE day = ?) as today_activities,
+                   (SELECT COUNT(DISTINCT student_id) FROM activities WHERE timestamp > ?) as active_students
+        """, (now.date().isoformat(), week_ago))[0]
+        return dict(row)
+
+    def daily_trend(self, days=7):
+        rows = self._query("""
+            SELECT substr(timestamp, 1, 10) as date, COUNT(*) as count
+            FROM activities
+            WHERE timestamp > ?
+            GROUP BY date
+            ORDER BY date
+        """, (_iso(_utc_now() - timedelta(days=int(days))),))
+        return [dict(row) for row in rows]
+
+    def activity_rollup(self, cutoff):
+        # 汇总表按小时聚合，cutoff之前的完整小时从汇总表读取，cutoff所在小时从明细表补齐
+        hour_start = cutoff.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        day, hour = hour_start.date().isoformat(), hour_start.hour
+        rows = self._query("""
+            SELECT r.student_id, s.name, NULLIF(r.module_name, '') as module, r.day, r.count
+            FROM (
+                SELECT student_id, module_name, day, SUM(count) as count
+                FROM (
+                    SELECT student_id, module_name, day, count FROM activity_rollup
+                    WHERE day < ? OR (day = ? AND hour < ?)
+                    UNION ALL
+                    SELECT student_id, COALESCE(module_name, ''), substr(timestamp, 1, 10), 1 FROM activities
+                    WHERE timestamp >= ? AND timestamp < ?
+                )
+                GROUP BY student_id, module_name, day
+            ) r
+            LEFT JOIN students s ON s.student_id = r.student_id
+        """, (day, day, hour, _iso(hour_start), _iso(cutoff)))
+        return [dict(row) for row in rows]
+
+    def content_counts(self):
+        rows = self._query("""
+            SELECT module_name, content_name, COUNT(*) as count FROM activities
+            WHERE content_name IS NOT NULL
+            GROUP BY module_name, content_name
+        """)
+        return [(row['module_name'], row['content_name'], row['count']) for row in rows]
+
+    def activity_watermark(self):
+        row = self._query("""
+            SELECT (SELECT COUNT(*) FROM activities) as activity_count,
+                   (SELECT MAX(timestamp) FROM activities) as last_activity,
+                   (SELECT COUNT(*) FROM replies) as reply_count
+        """)[0]
+        return (row['activity_count'], row['last_activity'], row['reply_count'])
+
+    def activity_count(self):
+        return self._query("SELECT COUNT(*) as count FROM activities")[0]['count']
+
+    def cohort_rows(self):
+        activity_rows = [
+            (row['student_id'], row['module_name'] or None, row['day'], row['hour'], row['count'])
+            for row in self._query("SELECT student_id, module_name, day, hour, count FROM activity_rollup")
+        ]
+        reply_rows = [
+            (row['student_name'], row['count'])
+            for row in self._query("SELECT student_name, COUNT(*) as count FROM replies GROUP BY student_name")
+        ]
+        return activity_rows, reply_rows
+
+    # ==================== 课堂问答 ====================
+
+    def create_question(self, text):
+        question_id = str(uuid.uuid4())
+        self._write([
+            ("UPDATE questions SET status = 'closed' WHERE status = 'active'", ()),
+            ("INSERT INTO questions (id, text, created_at, status) VALUES (?, ?, ?, 'active')",
+             (question_id, text, _iso(_utc_now()))),
+        ])
+        return question_id
+
+    def get_active_question(self):
+        rows = self._query("""
+            SELECT id, text, created_at FROM questions
+            WHERE status = 'active'
+            ORDER BY created_at DESC
+            LIMIT 1
+        """)
+        if not rows:
+            return None
+        question = dict(rows[0])
+        question['created_at'] = _parse(question['created_at'])
+        return question
+
+    def submit_reply(self, question_id, student_name, content):
+        # 与Neo4j实现一致：问题不存在时不写入
+        self._write([("""
+            INSERT INTO replies (id, question_id, student_name, content, timestamp, length)
+            SELECT ?, id, ?, ?, ?, ? FROM questions WHERE id = ?
+        """, (str(uuid.uuid4()), student_name, content, _iso(_utc_now()), len(content), question_id))])
+
+    def list_replies(self, question_id, limit=20):
+        rows = self._query("""
+            SELECT student_name, content, timestamp FROM replies
+            WHERE question_id = ?
+            ORDER BY timestamp DESC
+            LIMIT ?
+        """, (question_id, limit))
+        return [
+            {'student_name': row['student_name'], 'content': row['content'], 'timestamp': _parse(row['timestamp'])}
+            for row in rows
+        ]
+
+    # ==================== 病例与课程 ====================
+
+    def get_case_detail(self, case_id):
+        rows = self._query("SELECT data FROM cases WHERE id = ?", (case_id,))
+        if not rows:
+            return None
+        case_data = json.loads(rows[0]['data'])
+        case_data['knowledge_points'] = [
+            {'id': row['knowledge_id'], 'name': row['name']}
+            for row in self._query("SELECT knowledge_id, name FROM case_knowledge WHERE case_id = ?", (case_id,))
+        ]
+        return case_data
+
+    # ==================== 变更导入（分析副本） ====================
+
+    def sync_watermarks(self):
+        """已导入数据的水位线：最新活动时间、最新回复时间、最新登录时间"""
+        row = self._query("""
+            SELECT (SELECT MAX(timestamp) FROM activities) as activities,
+                   (SELECT MAX(timestamp) FROM replies) as replies,
+                   (SELECT MAX(last_login) FROM students) as students
+        """)[0]
+        return {key: _parse(row[key]) for key in ('activities', 'replies', 'students')}
+
+    def import_changes(self, students=(), activities=(), replies=()):
+        """
+        在一个事务中导入源库的变更，按ID去重（水位线边界上的记录可能重复拉取）
+
+        时间字段为带时区的datetime；返回新写入或有变化的学生行、新写入的活动和回复行
+        （水位线边界上重复拉取且没有变化的学生不返回）
+        """
+        inserted = []
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for row in students:
+                    cursor = conn.execute("""
+                        INSERT INTO students (student_id, name, last_login, login_count) VALUES (?, ?, ?, ?)
+                        ON CONFLICT (student_id) DO UPDATE SET
+                            name = excluded.name,
+                            last_login = excluded.last_login,
+                            login_count = excluded.login_count
+                        WHERE students.name IS NOT excluded.name
+                           OR students.last_login IS NOT excluded.last_login
+                           OR students.login_count IS NOT excluded.login_count
+                    """, (row['student_id'], row['name'],
+                          _iso(row['last_login']) if row['last_login'] else None, row['login_count'] or 0))
+                    if cursor.rowcount:
+                        inserted.append(row)
+
+                for row in activities:
+                    timestamp = _iso(row['timestamp'])
+                    cursor = conn.execute("""
+                        INSERT OR IGNORE INTO activities
+                            (id, student_id, activity_type, module_name, content_id, content_name, details, timestamp)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """, (row['id'], row['student_id'], row['activity_type'], row['module'],
+                          row['content_id'], row['content_name'], row['details'], timestamp))
+                    if cursor.rowcount:
+                        for sql, params in self._activity_counters(row['student_id'], row['module'], timestamp):
+                            conn.execute(sql, params)
+                        inserted.append(row)
+
+                for row in replies:
+                    cursor = conn.execute("""
+                        INSERT OR IGNORE INTO replies (id, question_id, student_name, content, timestamp, length)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    """, (row['id'], row['question_id'], row['student_name'], row['content'],
+                          _iso(row['timestamp']), len(row['content'] or '')))
+                    if cursor.rowcount:
+                        inserted.append(row)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return inserted
+
+    def clear(self):
+        """清空学生、活动和课堂问答数据（重建分析副本时使用）"""
+        self._write([
+            ("DELETE FROM activities", ()),
+            ("DELETE FROM activity_rollup", ()),
+            ("DELETE FROM replies", ()),
+            ("DELETE FROM questions", ()),
+            ("DELETE FROM students", ()),
+        ])
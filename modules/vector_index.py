@@ -0,0 +1,266 @@
+"""
+本地向量检索模块
+把知识图谱初始化脚本中的模块、章节、知识点、能力说明和病例各分区文本切成片段，
+用字符 n-gram TF-IDF + 截断SVD 得到稠密向量，保存为内存映射的NumPy矩阵；
+检索时把查询投影到同一空间做余弦相似度 Top-K，供学习路径推荐注入相关资料
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from modules.case_store import get_all_cases
+from modules.content_repository import DATA_DIR
+
+try:
+    from config.settings import VECTOR_INDEX_DIMENSIONS
+except (ImportError, AttributeError):
+    VECTOR_INDEX_DIMENSIONS = 128
+
+INDEX_DIR = os.path.join(DATA_DIR, "vector_index")
+CYPHER_PATH = os.path.join(DATA_DIR, "neo4j_init.cypher")
+
+# 字符 n-gram 范围和片段长度
+NGRAM_RANGE = (1, 3)
+CHUNK_CHARS = 160
+
+# 病例中参与检索的分区：字段 -> 显示名称
+CASE_SECTIONS = {
+    'chief_complaint': '主诉',
+    'present_illness': '现病史',
+    'medical_history': '既往史',
+    'clinical_manifestation': '临床表现',
+    'auxiliary_examination': '辅助检查',
+    'diagnosis_analysis': '诊断分析',
+    'treatment_plan': '治疗计划',
+    'treatment_notes': '治疗要点',
+    'key_points': '学习要点',
+}
+
+CYPHER_KINDS = {'Module': '模块', 'Chapter': '章节', 'Knowledge': '知识点', 'Ability': '能力'}
+
+# ==================== 文档 ====================
+
+def _cypher_documents():
+    """从初始化脚本读取带说明的节点：[(id, 类型, 标题, 文本)]"""
+    try:
+        with open(CYPHER_PATH, "r", encoding="utf-8") as f:
+            script = f.read()
+    except Exception as e:
+        print(f"[向量检索] 读取 {CYPHER_PATH} 失败: {e}")
+        return []
+    documents = []
+    for label, body in re.findall(r"CREATE \(\w+:yzbx_(\w+) \{(.*?)\}\)", script):
+        if label not in CYPHER_KINDS:
+            continue
+        fields = dict(re.findall(r"(\w+): '([^']*)'", body))
+        if fields.get('description'):
+            documents.append((fields.get('id', fields.get('name')), CYPHER_KINDS[label], fields.get('name', ''),
+                              f"{fields.get('name', '')}：{fields['description']}"))
+    return documents
+
+def _flatten(value):
+    """病例字段（字符串、列表或嵌套结构）转为文本"""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (list, tuple)):
+        return "\n".join(_flatten(item) for item in value)
+    if hasattr(value, 'items'):
+        return "\n".join(f"{key}：{_flatten(item)}" for key, item in value.items())
+    return str(value)
+
+def _chunks(text):
+    """按句子切成不超过 CHUNK_CHARS 的片段"""
+    chunks, current = [], ""
+    for sentence in re.split(r"(?<=[。；！？\n])", text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if current and len(current) + len(sentence) > CHUNK_CHARS:
+            chunks.append(current)
+            current = ""
+        current += sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+def collect_documents():
+    """全部检索片段 [{'id', 'kind', 'title', 'text'}]"""
+    documents = [
+        {'id': doc_id, 'kind': kind, 'title': title, 'text': text}
+        for doc_id, kind, title, text in _cypher_documents()
+    ]
+    for case in get_all_cases():
+        for field, label in CASE_SECTIONS.items():
+            if field not in case:
+                continue
+            for n, chunk in enumerate(_chunks(_flatten(case[field]))):
+                documents.append({
+                    'id': f"{case.id}:{field}:{n}",
+                    'kind': '病例',
+                    'title': f"{case.title}·{label}",
+                    'text': chunk,
+                })
+    return documents
+
+# ==================== 向量化 ====================
+
+def _ngrams(text):
+    text = re.sub(r"\s+", " ", text.lower())
+    for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+        for i in range(len(text) - n + 1):
+            gram = text[i:i + n]
+            if gram.strip():
+                yield gram
+
+def _tfidf_rows(texts, vocabulary, idf):
+    """文本的TF-IDF稀疏表示 [(词下标数组, 权重数组)]（次线性词频，L2归一化）"""
+    rows = []
+    for text in texts:
+        counts = Counter(gram for gram in _ngrams(text) if gram in vocabulary)
+        indices = np.fromiter((vocabulary[gram] for gram in counts), dtype=np.int64, count=len(counts))
+        weights = np.fromiter((1 + math.log(c) for c in counts.values()), dtype=np.float64, count=len(counts)) * idf[indices]
+        norm = np.linalg.norm(weights)
+        rows.append((indices, weights / norm if norm else weights))
+    return rows
+
+def build_index(documents, dimensions=VECTOR_INDEX_DIMENSIONS):
+    """
+    构建索引：返回 (词表, idf, 词项投影矩阵, 文档向量)
+
+    文档数远小于词项数，截断SVD通过 文档×文档 的Gram矩阵特征分解计算：
+    X = U S Vᵀ，文档向量取 U S，词项投影 V = Xᵀ U / S（查询向量 q 投影为 q V）
+    """
+    texts = [doc['text'] for doc in documents]
+    document_frequency = Counter()
+    for text in texts:
+        document_frequency.update(set(_ngrams(text)))
+    vocabulary = {gram: i for i, gram in enumerate(sorted(g for g, df in document_frequency.items() if df < len(texts)))}
+    idf = np.empty(len(vocabulary))
+    for gram, i in vocabulary.items():
+        idf[i] = math.log((1 + len(texts)) / (1 + document_frequency[gram])) + 1
+
+    X = np.zeros((len(texts), len(vocabulary)))
+    for row, (indices, weights) in enumerate(_tfidf_rows(texts, vocabulary, idf)):
+        X[row, indices] = weights
+
+    eigenvalues, U = np.linalg.eigh(X @ X.T)
+    order = np.argsort(eigenvalues)[::-1][:min(dimensions, len(texts))]
+    singular = np.sqrt(np.clip(eigenvalues[order], 1e-12, None))
+    U = U[:, order]
+    components = (X.T @ U) / singular
+    embeddings = U * singular
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True).clip(1e-12)
+    return vocabulary, idf, components.astype(np.float32), embeddings.astype(np.float32)
+
+def content_signature(documents):
+    """文档内容签名（内容或参数变化时重建索引）"""
+    digest = hashlib.sha1(json.dumps([documents, NGRAM_RANGE, VECTOR_INDEX_DIMENSIONS], ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()
+
+# ==================== 索引文件 ====================
+
+_lock = threading.Lock()
+_index = {}
+
+def save_index(documents, vocabulary, idf, components, embeddings, signature):
+    """写入索引目录：矩阵为 .npy（读取时内存映射），词表和文档为 JSON"""
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    for name, array in (('components', components), ('embeddings', embeddings), ('idf', idf)):
+        tmp_path = os.path.join(INDEX_DIR, f"{name}.npy.tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, os.path.join(INDEX_DIR, f"{name}.npy"))
+    tmp_path = os.path.join(INDEX_DIR, "meta.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({'signature': signature, 'documents': documents, 'vocabulary': vocabulary}, f, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(INDEX_DIR, "meta.json"))
+
+def _load_index(signature):
+    """读取索引（签名不一致或文件缺失时返回None）"""
+    try:
+        with open(os.path.join(INDEX_DIR, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta['signature'] != signature:
+            return None
+        return {
+            'documents': meta['documents'],
+            'vocabulary': meta['vocabulary'],
+            'idf': np.load(os.path.join(INDEX_DIR, "idf.npy")),
+            'components': np.load(os.path.join(INDEX_DIR, "components.npy"), mmap_mode='r'),
+            'embeddings': np.load(os.path.join(INDEX_DIR, "embeddings.npy"), mmap_mode='r'),
+        }
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[向量检索] 读取索引失败: {e}")
+        return None
+
+def get_index():
+    """获取索引（首次使用时读取；内容变化或文件缺失时重建并保存）"""
+    with _lock:
+        if _index:
+            return _index
+        documents = collect_documents()
+        signature = content_signature(documents)
+        index = _load_index(signature)
+        if index is None:
+            started = time.perf_counter()
+            vocabulary, idf, components, embeddings = build_index(documents)
+            try:
+                save_index(documents, vocabulary, idf, components, embeddings, signature)
+            except Exception as e:
+                print(f"[向量检索] 保存索引失败: {e}")
+            index = {'documents': documents, 'vocabulary': vocabulary, 'idf': idf,
+                     'components': components, 'embeddings': embeddings}
+            print(f"[向量检索] 构建 {len(documents)} 个片段、{len(vocabulary)} 个词项，"
+                  f"耗时 {time.perf_counter() - started:.2f}s")
+        _index.update(index)
+        return _index
+
+# ==================== 检索 ====================
+
+def embed_query(text, index=None):
+    """查询文本投影到索引空间（L2归一化），没有已知词项时返回None"""
+    index = index or get_index()
+    [(indices, weights)] = _tfidf_rows([text], index['vocabulary'], index['idf'])
+    if not len(indices):
+        return None
+    vector = weights @ index['components'][indices]
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else None
+
+def search(query, k=5, kinds=None):
+    """
+    余弦相似度 Top-K 检索 [{'id', 'kind', 'title', 'text', 'score'}]
+
+    kinds: 只返回这些类型的片段（如 {'知识点', '病例'}）
+    """
+    index = get_index()
+    vector = embed_query(query, index)
+    if vector is None:
+        return []
+    scores = index['embeddings'] @ vector
+    if kinds is not None:
+        allowed = np.array([doc['kind'] in kinds for doc in index['documents']])
+        scores = np.where(allowed, scores, -np.inf)
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [dict(index['documents'][i], score=float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+def get_index_status():
+    """获取索引状态（片段数、词项数、维度）"""
+    index = get_index()
+    return {
+        'documents': len(index['documents']),
+        'terms': len(index['vocabulary']),
+        'dimensions': index['embeddings'].shape[1],
+    }
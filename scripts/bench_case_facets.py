@@ -0,0 +1,81 @@
+"""
+病例分面筛选基准脚本
+把示例病例复制扩充到指定数量，对比每次重跑逐个病例判断属性（Python过滤）
+与预计算位图求交集在筛选和计算各分面计数时的耗时
+
+用法：python scripts/bench_case_facets.py [病例数] [重跑次数]
+"""
+
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import modules.case_facets as facets
+from modules.case_store import get_all_cases
+
+SELECTIONS = {'difficulty': {'中等', '困难'}, 'systemic': {'高血压', '糖尿病'}, 'gender': {'男'}}
+
+def python_filter(attributes, selections):
+    """逐个病例判断：筛选结果和每个分面取值的计数"""
+    def matches(attrs, skip=None):
+        return all(
+            not values or any(v in values for v in attrs[facet])
+            for facet, values in selections.items() if facet != skip
+        )
+    matched = [i for i, attrs in enumerate(attributes) if matches(attrs)]
+    counts = {}
+    for facet in facets.FACETS:
+        counts[facet] = {}
+        for attrs in attributes:
+            if matches(attrs, skip=facet):
+                for value in attrs[facet]:
+                    counts[facet][value] = counts[facet].get(value, 0) + 1
+    return matched, counts
+
+def bitmap_filter(selections):
+    """预计算位图：按位与/或和 popcount"""
+    return facets.filter_cases(selections), facets.facet_counts(selections)
+
+def measure(func, args, reruns):
+    t = time.perf_counter()
+    for _ in range(reruns):
+        func(*args)
+    return (time.perf_counter() - t) / reruns
+
+def bench_case_facets(n_cases=500, reruns=1000):
+    """运行分面筛选基准测试"""
+    samples = get_all_cases()
+    cases = [samples[i % len(samples)] for i in range(n_cases)]
+
+    t = time.perf_counter()
+    bitmaps = facets.build_facet_index(cases)
+    build_time = time.perf_counter() - t
+    facets.CASES, facets.ALL_CASES, facets._bitmaps = cases, (1 << n_cases) - 1, bitmaps
+    attributes = [facets.case_attributes(case) for case in cases]
+
+    print("🔎 病例分面筛选基准测试")
+    print(f"  病例数: {n_cases}，分面取值: {sum(len(v) for v in bitmaps.values())}，"
+          f"构建位图 {build_time * 1000:.1f} ms，重跑 {reruns} 次")
+
+    python_time = measure(python_filter, (attributes, SELECTIONS), reruns)
+    bitmap_time = measure(bitmap_filter, (SELECTIONS,), reruns)
+    print(f"\n  {'方式':<22}{'每次重跑耗时':>14}")
+    print(f"  {'Python逐个过滤':<22}{python_time * 1e6:>11.1f} µs")
+    print(f"  {'位图索引':<22}{bitmap_time * 1e6:>11.1f} µs")
+    print(f"\n  加速: {python_time / bitmap_time:.1f}x")
+
+    # 校验两种方式的结果一致
+    matched, counts = python_filter(attributes, SELECTIONS)
+    bitmap_cases, bitmap_counts = bitmap_filter(SELECTIONS)
+    assert [cases[i] for i in matched] == bitmap_cases
+    assert all(counts[f].get(v, 0) == c for f, by_value in bitmap_counts.items() for v, c in by_value.items())
+    print("\n✅ 基准测试完成")
+
+if __name__ == "__main__":
+    bench_case_facets(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 1000,
+    )
@@ -0,0 +1,73 @@
+"""
+病例存储基准脚本
+对比 st.cache_data 方式（每次读取都反序列化出一份新副本）与不可变病例存储（进程内共享）
+在每次重跑时的耗时和内存分配
+
+用法：python scripts/bench_case_store.py [重跑次数]
+"""
+
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from modules.content_repository import get_sample_cases
+from modules.case_store import get_all_cases, get_case, find_case_by_title
+
+def copy_per_rerun(pickled, title):
+    """st.cache_data 的读取方式：从缓存的pickle字节反序列化副本，再线性查找病例"""
+    cases = pickle.loads(pickled)
+    options = {f"🏥 {c['title']}": c for c in cases}
+    return options.get(f"🏥 {title}")
+
+def shared_store(title):
+    """不可变病例存储：直接按标题索引查找共享记录"""
+    get_all_cases()
+    return find_case_by_title(title)
+
+def measure(func, args, reruns):
+    """返回 (平均耗时秒, 平均分配字节, 峰值字节)"""
+    t = time.perf_counter()
+    for _ in range(reruns):
+        func(*args)
+    elapsed = (time.perf_counter() - t) / reruns
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    kept = [func(*args) for _ in range(reruns)]
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return elapsed, (after - before) / reruns, peak
+
+def bench_case_store(reruns=1000):
+    """运行病例存储基准测试"""
+    cases = get_sample_cases()
+    pickled = pickle.dumps(cases)
+    title = cases[-1]['title']
+
+    print("🗂️ 病例存储基准测试")
+    print(f"  病例数: {len(cases)}，序列化大小: {len(pickled) / 1024:.1f} KB，重跑 {reruns} 次")
+
+    results = [
+        ("st.cache_data（每次复制）", measure(copy_per_rerun, (pickled, title), reruns)),
+        ("不可变存储（共享记录）", measure(shared_store, (title,), reruns)),
+    ]
+    print(f"\n  {'方式':<22}{'每次重跑耗时':>14}{'每次重跑分配':>14}{'峰值内存':>12}")
+    for name, (elapsed, allocated, peak) in results:
+        print(f"  {name:<22}{elapsed * 1e6:>11.1f} µs{allocated / 1024:>11.1f} KB{peak / 1024:>9.1f} KB")
+
+    (copy_time, copy_alloc, _), (store_time, store_alloc, _) = (r for _, r in results)
+    print(f"\n  每次重跑节省: {(copy_time - store_time) * 1e6:.1f} µs, {(copy_alloc - store_alloc) / 1024:.1f} KB")
+
+    # 校验两种方式得到的病例内容一致，按ID查找为同一对象
+    assert find_case_by_title(title).to_dict() == copy_per_rerun(pickled, title)
+    assert get_case(cases[-1]['id']) is find_case_by_title(title)
+    print("\n✅ 基准测试完成")
+
+if __name__ == "__main__":
+    bench_case_store(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
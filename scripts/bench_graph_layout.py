@@ -0,0 +1,66 @@
+"""
+图谱布局基准脚本
+生成与课程图结构相似的随机图（模块 -> 章节 -> 知识点的树，外加知识点间的前置/相关边），
+测量完整力导向布局、增加少量节点后的增量布局的耗时，以及布局质量（边长与最近节点距离）
+
+用法：python scripts/bench_graph_layout.py [最大节点数]
+"""
+
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from modules.graph_layout import IDEAL_DISTANCE, layout_graph
+
+def curriculum_like(n, seed=42):
+    """约 n 个节点的分层图：返回 (节点ID列表, 边列表)"""
+    rng = random.Random(seed)
+    modules = max(n // 60, 2)
+    chapters = max(n // 8, modules)
+    ids = [f"M{i}" for i in range(modules)] + [f"C{i}" for i in range(chapters)]
+    edges = [(f"M{i % modules}", f"C{i}", '包含') for i in range(chapters)]
+    knowledge = [f"K{i}" for i in range(n - modules - chapters)]
+    ids += knowledge
+    edges += [(f"C{rng.randrange(chapters)}", kp, '涵盖') for kp in knowledge]
+    edges += [(rng.choice(knowledge), rng.choice(knowledge), '前置') for _ in range(len(knowledge) // 4)]
+    return ids, [edge for edge in edges if edge[0] != edge[1]]
+
+def quality(positions, edges):
+    """(边长中位数 / 理想边长, 最近节点距离中位数 / 理想边长)"""
+    pos = np.array(list(positions.values()))
+    lengths = [np.hypot(*np.subtract(positions[a], positions[b])) for a, b, _ in edges]
+    nearest = []
+    for i in range(0, len(pos), 512):
+        d = np.linalg.norm(pos[i:i + 512, None] - pos[None], axis=2)
+        d[np.arange(len(d)), np.arange(i, i + len(d))] = np.inf
+        nearest.append(d.min(axis=1))
+    return np.median(lengths) / IDEAL_DISTANCE, np.median(np.concatenate(nearest)) / IDEAL_DISTANCE
+
+def bench_graph_layout(max_nodes=2000):
+    """运行布局基准测试"""
+    print("🕸️ 图谱布局基准测试")
+    print(f"  {'节点数':>8}{'边数':>8}{'完整布局':>10}{'增量(+10)':>11}{'边长':>8}{'最近距离':>10}")
+    n = 50
+    while n <= max_nodes:
+        ids, edges = curriculum_like(n)
+        t = time.perf_counter()
+        positions = layout_graph(ids, edges)
+        full = time.perf_counter() - t
+        # 新增10个知识点，挂在已有章节下
+        extra = [f"N{i}" for i in range(10)]
+        t = time.perf_counter()
+        layout_graph(ids + extra, edges + [(ids[-1 - i], node, '相关') for i, node in enumerate(extra)], positions)
+        incremental = time.perf_counter() - t
+        edge_ratio, nearest_ratio = quality(positions, edges)
+        print(f"  {n:>8}{len(edges):>8}{full * 1000:>8.0f}ms{incremental * 1000:>9.0f}ms"
+              f"{edge_ratio:>8.2f}{nearest_ratio:>10.2f}")
+        n *= 2
+
+if __name__ == "__main__":
+    bench_graph_layout(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
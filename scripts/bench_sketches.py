@@ -0,0 +1,78 @@
+"""
+流式统计基准脚本
+在临时SQLite库中写入不同规模的活动，对比精确统计（分组扫描）与流式统计（Top-K、HyperLogLog）
+的查询耗时和误差
+
+用法：python scripts/bench_sketches.py [最大活动数]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from modules.storage_sqlite import SQLiteStorage
+import modules.sketches as sketches
+
+MODULES = ["病例库", "知识图谱", "能力推荐", "课中互动"]
+
+def seed(storage, start, count, students=3000, contents=500):
+    """写入活动：内容访问服从 Zipf 分布，时间分布在近30天"""
+    now = datetime.now(timezone.utc)
+    weights = [1 / (i + 1) for i in range(contents)]
+    names = [f"内容{i}" for i in range(contents)]
+    for _ in range(start, start + count):
+        storage.log_activity(
+            f"S{random.randint(1, students):05d}", "view", random.choice(MODULES),
+            content_name=random.choices(names, weights)[0],
+            when=now - timedelta(minutes=random.randint(0, 30 * 24 * 60)),
+        )
+
+def timed(func, repeat=20):
+    """返回 (结果, 平均耗时毫秒)"""
+    t = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - t) / repeat * 1000
+
+def bench_sketches(max_rows=40000):
+    """运行流式统计基准测试"""
+    random.seed(42)
+    tmp_dir = tempfile.mkdtemp()
+    storage = SQLiteStorage(os.path.join(tmp_dir, "bench.db"))
+    sketches.SKETCHES_PATH = os.path.join(tmp_dir, "sketches.json")
+    sketches.get_storage = lambda backend=None: storage
+
+    print("📈 流式统计基准测试")
+    print(f"  {'活动数':>8}{'精确Top10':>12}{'Top-K':>10}{'精确人数':>10}{'HLL':>8}{'人数误差':>10}")
+    rows = 0
+    size = 5000
+    while rows < max_rows:
+        size = min(size, max_rows - rows)
+        seed(storage, rows, size)
+        rows += size
+        sketches._store.mark_dirty()   # 按新数据重建
+
+        exact_top, exact_top_ms = timed(lambda: storage._query("""
+            SELECT content_name, COUNT(*) as count FROM activities
+            GROUP BY content_name ORDER BY count DESC LIMIT 10
+        """))
+        exact_reach, exact_reach_ms = timed(lambda: storage._query(
+            "SELECT COUNT(DISTINCT student_id) FROM activities WHERE module_name = ?", ("病例库",))[0][0])
+        sketches.popular_content(limit=10)
+        top, top_ms = timed(lambda: sketches.popular_content(limit=10))
+        reach, reach_ms = timed(lambda: sketches.module_reach("病例库"))
+
+        error = abs(reach[1] - exact_reach) / max(exact_reach, 1) * 100
+        same_top = [row['content_name'] for row in exact_top] == [row['content_name'] for row in top]
+        print(f"  {rows:>8}{exact_top_ms:>10.2f}ms{top_ms:>8.3f}ms{exact_reach_ms:>8.2f}ms{reach_ms:>6.3f}ms"
+              f"{error:>9.1f}%  Top10一致: {same_top}")
+        size *= 2
+
+if __name__ == "__main__":
+    bench_sketches(int(sys.argv[1]) if len(sys.argv) > 1 else 40000)
@@ -0,0 +1,136 @@
+"""
+启动性能基准脚本
+测量登录页/首页的真实冷启动耗时、各页面模块的导入耗时和每次重跑（rerun）的开销
+
+用法：python scripts/bench_startup.py [重跑次数]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+# 登录页/首页启动路径需要导入的模块
+STARTUP_IMPORTS = ["streamlit", "modules.auth"]
+
+# 不应出现在登录页/首页路径上的重依赖和后台线程模块
+HEAVY_MODULES = [
+    "numpy", "pandas", "plotly", "pyarrow", "openai", "pyvis",
+    "modules.replica", "modules.archive", "modules.sketches",
+    "modules.search_index", "modules.recommender", "modules.mastery",
+]
+
+# 实际启动场景：(名称, 会话状态)
+SCENARIOS = [
+    ("登录页", {}),
+    ("学生首页", {
+        'logged_in': True, 'user_role': 'student',
+        'student_id': 'bench', 'student_name': '基准测试',
+    }),
+]
+
+# 各页面模块（按需导入）
+PAGE_IMPORTS = [
+    "modules.case_library",
+    "modules.knowledge_graph",
+    "modules.ability_recommender",
+    "modules.classroom_interaction",
+    "modules.analytics",
+]
+
+def measure_cold_import(modules):
+    """在新的Python进程中导入模块，返回耗时（秒）"""
+    code = (
+        "import time, sys\n"
+        f"sys.path.insert(0, {ROOT_DIR!r})\n"
+        "t = time.perf_counter()\n"
+        + "".join(f"import {m}\n" for m in modules)
+        + "print(time.perf_counter() - t)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return float(result.stdout.strip().splitlines()[-1])
+
+def measure_cold_run(session_state):
+    """在新的Python进程中通过AppTest运行一次app.py（真实登录/首页路径）
+
+    返回 (耗时秒数, 本次运行加载的重依赖模块列表)
+    """
+    code = (
+        "import time, sys, json\n"
+        f"sys.path.insert(0, {ROOT_DIR!r})\n"
+        "from streamlit.testing.v1 import AppTest\n"
+        f"at = AppTest.from_file({os.path.join(ROOT_DIR, 'app.py')!r}, default_timeout=60)\n"
+        f"for k, v in {session_state!r}.items():\n"
+        "    at.session_state[k] = v\n"
+        "t = time.perf_counter()\n"
+        "at.run()\n"
+        "elapsed = time.perf_counter() - t\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps([elapsed, heavy]))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    elapsed, heavy = json.loads(result.stdout.strip().splitlines()[-1])
+    return elapsed, heavy
+
+def measure_reruns(at, session_state, reruns):
+    """设置会话状态后运行app.py，返回 (首次运行耗时, 平均重跑耗时)"""
+    for key, value in session_state.items():
+        at.session_state[key] = value
+
+    t = time.perf_counter()
+    at.run()
+    first = time.perf_counter() - t
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+    t = time.perf_counter()
+    for _ in range(reruns):
+        at.run()
+    return first, (time.perf_counter() - t) / max(reruns, 1)
+
+def bench_startup(reruns=10):
+    """运行启动基准测试"""
+    print("🚀 启动性能基准测试")
+
+    print("\n📌 冷启动真实路径（新进程运行app.py，含所有导入）")
+    for name, session_state in SCENARIOS:
+        elapsed, heavy = measure_cold_run(session_state)
+        print(f"  {name}: {elapsed * 1000:.0f} ms")
+        if heavy:
+            print(f"    ⚠️ 加载了重依赖: {', '.join(heavy)}")
+
+    print("\n📌 冷启动导入耗时（新进程）")
+    startup = measure_cold_import(STARTUP_IMPORTS)
+    eager = measure_cold_import(STARTUP_IMPORTS + PAGE_IMPORTS)
+    print(f"  启动路径（登录页/首页）: {startup * 1000:.0f} ms")
+    print(f"  全部页面模块（一次性导入）: {eager * 1000:.0f} ms")
+    for module in PAGE_IMPORTS:
+        cost = measure_cold_import(STARTUP_IMPORTS + [module]) - startup
+        print(f"    + {module}: {cost * 1000:.0f} ms")
+
+    print(f"\n📌 页面运行耗时（AppTest，重跑{reruns}次取平均）")
+    # 同一进程中只创建一个AppTest，依次切换会话状态
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(ROOT_DIR, "app.py"), default_timeout=60)
+    for name, session_state in SCENARIOS:
+        first, per_rerun = measure_reruns(at, session_state, reruns)
+        print(f"  {name}: 首次 {first * 1000:.0f} ms, 每次重跑 {per_rerun * 1000:.1f} ms")
+
+    print("\n✅ 基准测试完成")
+
+if __name__ == "__main__":
+    bench_startup(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,105 @@
+"""
+存储后端基准脚本
+在教师端数据概览的查询负载上对比 Neo4j 与 SQLite 后端（直接调用存储接口，不经过查询缓存）
+
+SQLite 使用临时数据库并写入模拟数据；Neo4j 只读取现有数据，不写入（不可用时跳过）
+
+用法：python scripts/bench_storage.py [学生数] [每个学生的活动数]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from modules.cohort_analytics import COHORT_MODULES
+from modules.storage_sqlite import SQLiteStorage
+
+def dashboard_workload(storage):
+    """教师端数据概览及排行榜、班级对比所需的全部查询"""
+    now = datetime.now(timezone.utc)
+    return [
+        ("活动概况", lambda: storage.activity_summary()),
+        ("学生列表", lambda: storage.list_students()),
+        ("各模块统计", lambda: storage.module_statistics()),
+        ("单模块统计×4", lambda: [storage.single_module_statistics(m) for m in COHORT_MODULES]),
+        ("近7天趋势", lambda: storage.daily_trend(7)),
+        ("排行榜初始化", lambda: storage.activity_rollup(now)),
+        ("班级对比数据", lambda: storage.cohort_rows()),
+    ]
+
+def seed_sqlite(storage, n_students, per_student, days=60, seed=42):
+    """写入模拟学生和活动（时间均匀分布在最近N天）"""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    for i in range(n_students):
+        student_id = f"bench{i:04d}"
+        storage.register_student(student_id, f"学生{i}")
+        for _ in range(per_student):
+            when = now - timedelta(seconds=rng.uniform(0, days * 86400))
+            storage.log_activity(student_id, "查看", rng.choice(COHORT_MODULES), when=when)
+
+def run_workload(storage, repeats):
+    """返回 [(查询名称, 平均耗时秒)]"""
+    results = []
+    for name, query in dashboard_workload(storage):
+        query()  # 预热
+        t = time.perf_counter()
+        for _ in range(repeats):
+            query()
+        results.append((name, (time.perf_counter() - t) / repeats))
+    return results
+
+def get_neo4j_storage():
+    """Neo4j可用时返回存储后端，否则返回None"""
+    try:
+        from modules.storage_neo4j import Neo4jStorage
+        from modules.auth import get_neo4j_driver
+        driver = get_neo4j_driver()
+        if driver is None:
+            return None
+        with driver.session() as session:
+            session.run("RETURN 1").single()
+        return Neo4jStorage()
+    except Exception as e:
+        print(f"  Neo4j不可用，跳过: {e}")
+        return None
+
+def bench_storage(n_students=200, per_student=100, repeats=5):
+    """运行存储后端基准测试"""
+    print("🗄️ 存储后端基准测试（教师端数据概览负载）")
+
+    backends = []
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite = SQLiteStorage(os.path.join(tmp, "bench.db"))
+        t = time.perf_counter()
+        seed_sqlite(sqlite, n_students, per_student)
+        print(f"  SQLite写入 {n_students} 名学生 × {per_student} 条活动: "
+              f"{(time.perf_counter() - t) * 1000:.0f} ms")
+        backends.append(("SQLite", sqlite, run_workload(sqlite, repeats)))
+
+        neo4j = get_neo4j_storage()
+        if neo4j is not None:
+            count = neo4j.activity_watermark()[0]
+            print(f"  Neo4j现有活动数: {count}")
+            backends.append(("Neo4j", neo4j, run_workload(neo4j, repeats)))
+
+        print(f"\n  {'查询':<14}" + "".join(f"{name:>14}" for name, _, _ in backends))
+        for i, (query_name, _) in enumerate(backends[0][2]):
+            row = "".join(f"{results[i][1] * 1000:>11.2f} ms" for _, _, results in backends)
+            print(f"  {query_name:<14}{row}")
+        totals = "".join(f"{sum(r[1] for r in results) * 1000:>11.2f} ms" for _, _, results in backends)
+        print(f"  {'合计':<14}{totals}")
+
+        sqlite._conn.close()
+
+    print("\n✅ 基准测试完成")
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    bench_storage(*args)
@@ -0,0 +1,39 @@
+"""
+本地向量索引构建脚本
+收集知识图谱初始化脚本和病例文本，构建 TF-IDF + SVD 向量索引并写入 data/vector_index/，
+随后用几条示例查询测试检索耗时
+
+用法：python scripts/build_vector_index.py [查询 ...]
+"""
+
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from modules.vector_index import INDEX_DIR, build_index, collect_documents, save_index, search, content_signature
+
+SAMPLE_QUERIES = ["龈下刮治 根面平整", "牙周探诊技术 探诊深度测量", "侵袭性牙周炎 年轻患者", "牙周维护 复查周期"]
+
+def main(queries):
+    started = time.perf_counter()
+    documents = collect_documents()
+    vocabulary, idf, components, embeddings = build_index(documents)
+    save_index(documents, vocabulary, idf, components, embeddings, content_signature(documents))
+    print(f"✅ 索引已写入 {INDEX_DIR}")
+    print(f"  片段 {len(documents)} 个，词项 {len(vocabulary)} 个，维度 {embeddings.shape[1]}，"
+          f"耗时 {time.perf_counter() - started:.2f}s")
+
+    search(queries[0])   # 首次检索加载索引
+    for query in queries:
+        started = time.perf_counter()
+        results = search(query, k=3)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"\n🔍 {query}（{elapsed:.2f} ms）")
+        for result in results:
+            print(f"  {result['score']:.2f} [{result['kind']}] {result['title']}：{result['text'][:40]}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or SAMPLE_QUERIES)
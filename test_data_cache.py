@@ -0,0 +1,126 @@
+"""
+测试按标签缓存（modules/data_cache.py）
+标签失效、查询期间的失效序号、兜底过期时间和按天分条目
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+from modules import data_cache
+from modules.data_cache import tagged_cache, invalidate, skip_cache, student_tag, module_tag
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    """每个测试使用空缓存"""
+    with data_cache._lock:
+        data_cache._entries.clear()
+        data_cache._tag_index.clear()
+        data_cache._tag_sequence.clear()
+        data_cache._prefix_sequence.clear()
+        data_cache._running[0] = 0
+    yield
+
+
+def make_counter(tags, daily=False, during=None):
+    """被缓存的函数：返回调用次数；during 在函数执行期间调用（模拟查询期间的写入）"""
+    calls = []
+
+    @tagged_cache(tags, daily=daily)
+    def query(student_id):
+        calls.append(student_id)
+        if during is not None:
+            during()
+        return len(calls)
+
+    return query, calls
+
+
+def test_hit_until_tag_invalidated():
+    query, calls = make_counter(lambda a: {student_tag(a['student_id']), module_tag('病例库')})
+    assert query('s1') == 1
+    assert query('s1') == 1
+    invalidate({student_tag('s2')})   # 不相关的标签
+    assert query('s1') == 1
+    invalidate({student_tag('s1')})
+    assert query('s1') == 2
+    assert calls == ['s1', 's1']
+
+
+def test_prefix_invalidation():
+    query, _ = make_counter(lambda a: {module_tag('病例库')})
+    query('s1')
+    assert invalidate({"module:*"}) == 1
+    assert query('s1') == 2
+
+
+def test_invalidated_during_query_not_written_back():
+    """查询开始后其标签被失效过，结果返回但不写入缓存"""
+    query, calls = make_counter(lambda a: {student_tag(a['student_id'])},
+                                during=lambda: invalidate({student_tag('s1')}))
+    query('s1')
+    query('s1')
+    assert len(calls) == 2
+    assert not data_cache._entries
+
+
+def test_unrelated_invalidation_during_query_still_cached():
+    query, calls = make_counter(lambda a: {student_tag(a['student_id'])},
+                                during=lambda: invalidate({student_tag('s2')}))
+    query('s1')
+    query('s1')
+    assert len(calls) == 1
+
+
+def test_sequence_tables_cleared_after_queries():
+    query, _ = make_counter(lambda a: {student_tag(a['student_id'])},
+                            during=lambda: invalidate({student_tag('s1')}))
+    query('s1')
+    assert data_cache._running[0] == 0
+    assert not data_cache._tag_sequence
+
+
+def test_ttl_expiry(monkeypatch):
+    query, _ = make_counter(lambda a: {student_tag(a['student_id'])})
+    now = [1000.0]
+    monkeypatch.setattr(data_cache.time, 'monotonic', lambda: now[0])
+    query('s1')
+    now[0] += data_cache.DATA_CACHE_TTL - 1
+    assert query('s1') == 1
+    now[0] += 2
+    assert query('s1') == 2
+
+
+def test_skip_cache():
+    calls = []
+
+    @tagged_cache(lambda a: {'students'})
+    def query():
+        calls.append(1)
+        skip_cache()
+        return len(calls)
+
+    query()
+    query()
+    assert len(calls) == 2
+
+
+def test_daily_entries(monkeypatch):
+    query, _ = make_counter(lambda a: {student_tag(a['student_id'])}, daily=True)
+    monkeypatch.setattr(data_cache, 'today', lambda: '2026-01-01')
+    query('s1')
+    assert query('s1') == 1
+    monkeypatch.setattr(data_cache, 'today', lambda: '2026-01-02')
+    assert query('s1') == 2
+
+
+def test_publish_invalidates_event_tags():
+    query, _ = make_counter(lambda a: {student_tag(a['student_id'])})
+    query('s1')
+    query('s2')
+    data_cache.publish('activity_logged', student_id='s1', module_name='病例库')
+    assert query('s1') == 3
+    assert query('s2') == 2
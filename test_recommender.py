@@ -0,0 +1,70 @@
+"""
+测试协同推荐（modules/recommender.py）
+共现矩阵的秩1增量修正与由交互次数整体计算（_build）一致
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+from conftest import as_payload
+from modules import recommender
+from modules.recommender import ITEMS
+
+
+def fresh_state(monkeypatch):
+    """空的推荐状态（测试结束后恢复）"""
+    n = len(ITEMS)
+    monkeypatch.setattr(recommender, '_counts', {})
+    monkeypatch.setattr(recommender, '_gram', np.zeros((n, n)))
+    monkeypatch.setattr(recommender, '_similarity', np.zeros((n, n)))
+    monkeypatch.setattr(recommender, '_top', {})
+    monkeypatch.setattr(recommender, '_totals', np.zeros(n))
+    monkeypatch.setattr(recommender, '_state', dict(recommender._state))
+
+
+def test_rank1_update_matches_build(monkeypatch):
+    fresh_state(monkeypatch)
+    rng = np.random.default_rng(11)
+    for _ in range(1500):
+        items = rng.choice(len(ITEMS), size=rng.integers(1, 4), replace=False).astype(np.int32)
+        recommender._update_student(f"S{rng.integers(8)}", items)
+
+    gram, totals, similarity, top = recommender._build(recommender._counts)
+    np.testing.assert_allclose(recommender._gram, gram, rtol=1e-9, atol=1e-9)
+    np.testing.assert_array_equal(recommender._totals, totals)
+
+    # 刷新相似度之后的推荐与整体计算一致
+    recommender._refresh()
+    np.testing.assert_allclose(recommender._similarity, similarity, atol=1e-12)
+    assert recommender._top.keys() == top.keys()
+    for student_id, items in top.items():
+        np.testing.assert_array_equal(recommender._top[student_id], items)
+
+
+def test_incremental_matches_rebuild(monkeypatch, activities):
+    """逐条应用 activity_logged 事件得到的交互次数与批量重建一致"""
+    monkeypatch.setattr(recommender, 'iter_all_activities', lambda storage: iter(activities))
+    counts, recent = recommender._rebuild(None, activities[0]['timestamp'])
+    assert recent == {activity['id'] for activity in activities}
+
+    fresh_state(monkeypatch)
+    recommender._install(recommender._prepare({}))
+    for activity in activities:
+        recommender._apply(as_payload(activity))
+
+    assert counts and recommender._counts.keys() == counts.keys()
+    for student_id, row in counts.items():
+        np.testing.assert_array_equal(recommender._counts[student_id], row)
+    np.testing.assert_allclose(recommender._gram, recommender._build(counts)[0], rtol=1e-9, atol=1e-9)
+
+
+def test_recommendations_exclude_seen(monkeypatch):
+    fresh_state(monkeypatch)
+    recommender._update_student('S1', np.array([0, 1], dtype=np.int32))
+    recommender._update_student('S2', np.array([0, 1, 2], dtype=np.int32))
+    recommender._refresh()
+    assert recommender._top['S1'].tolist() == [2]
+    assert recommender._top['S2'].tolist() == []
@@ -0,0 +1,73 @@
+"""
+测试间隔复习（modules/review.py）
+按轮向量化的 replay 与逐条 review_cards 一致，事件增量更新与从数据库重算一致
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+from conftest import as_payload
+from modules import review
+from modules.review import replay, review_cards, sm2_step, ITEMS, INITIAL_EASE, MIN_EASE
+
+
+def test_sm2_step():
+    reps, ease, interval = sm2_step(np.array([0, 1, 2]), np.full(3, INITIAL_EASE), np.array([0.0, 1.0, 6.0]), 4)
+    assert reps.tolist() == [1, 2, 3]
+    assert interval.tolist() == [1.0, 6.0, 15.0]
+    np.testing.assert_allclose(ease, INITIAL_EASE)   # 4分易度不变
+
+    reps, ease, interval = sm2_step(np.array([3]), np.array([MIN_EASE]), np.array([15.0]), 2)
+    assert reps.tolist() == [0] and interval.tolist() == [1.0]
+    assert ease[0] == MIN_EASE
+
+
+def test_replay_matches_review_cards():
+    rng = np.random.default_rng(5)
+    n_students, n = 4, 3000
+    days = np.sort(rng.integers(740000, 740120, n)).astype(np.int32)
+    events = (
+        rng.integers(0, n_students, n).astype(np.int32),
+        rng.integers(0, len(ITEMS), n).astype(np.int32),
+        rng.choice([2.0, 4.0], n).astype(np.float32),
+        days,
+    )
+    expected = [review._new_cards() for _ in range(n_students)]
+    for student, item, quality, day in zip(*events):
+        review_cards(expected[student], np.array([item]), quality, day)
+
+    cards = replay(events, n_students)
+    for field in ('reps', 'interval', 'due'):
+        np.testing.assert_array_equal(cards[field], np.stack([c[field] for c in expected]))
+    np.testing.assert_allclose(cards['ease'], np.stack([c['ease'] for c in expected]), rtol=1e-6)
+
+
+def test_incremental_matches_rebuild(monkeypatch, activities):
+    """逐条应用 activity_logged 事件得到的卡片和到期堆与批量重算一致"""
+    monkeypatch.setattr(review, 'iter_all_activities', lambda storage: iter(activities))
+    rebuilt, _ = review._rebuild(None, activities[-1]['timestamp'])
+
+    monkeypatch.setattr(review, '_cards', {})
+    monkeypatch.setattr(review, '_queues', {})
+    for activity in activities:
+        day = activity['timestamp'].date().toordinal()
+        monkeypatch.setattr(review, '_today', lambda: day)
+        review._apply_activity(as_payload(activity))
+
+    assert rebuilt and set(review._cards) == set(rebuilt)
+    for student_id, cards in rebuilt.items():
+        np.testing.assert_array_equal(review._cards[student_id], cards)
+        # 堆中有效条目（与卡片到期日一致）正好是所有已安排的内容
+        queue = review._queues[student_id]
+        live = {(due, i) for due, i in queue if cards['due'][i] == due}
+        assert live == set(review._build_queue(cards))
+
+
+def test_passive_views_are_not_reviews(monkeypatch):
+    monkeypatch.setattr(review, '_cards', {})
+    monkeypatch.setattr(review, '_queues', {})
+    review._apply_activity({'student_id': 'S1', 'module_name': '病例库', 'activity_type': '查看病例', 'content_id': 'case1'})
+    assert not review._cards
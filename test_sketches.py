@@ -0,0 +1,93 @@
+"""
+测试流式统计的数据结构（modules/sketches.py）
+HyperLogLog、Count-Min、Space-Saving 的估计落在各自的误差界内，合并与整体统计一致
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import math
+import random
+from collections import Counter
+
+from modules.sketches import HyperLogLog, CountMinSketch, SpaceSaving
+
+
+def zipf_stream(n=20000, items=2000, seed=1):
+    """长尾分布的内容访问序列"""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(items)]
+    return rng.choices([f"内容{i}" for i in range(items)], weights=weights, k=n)
+
+
+def test_hll_error_bound():
+    for n in (50, 1000, 50000):
+        hll = HyperLogLog(12)
+        for i in range(n):
+            hll.add(f"S{i}")
+        hll.add("S0")   # 重复值不改变估计
+        assert abs(hll.count() - n) <= 4 * hll.error() * n + 2
+
+
+def test_hll_merge_equals_union():
+    a, b, union = HyperLogLog(10), HyperLogLog(10), HyperLogLog(10)
+    for i in range(3000):
+        (a if i % 3 else b).add(i)
+        union.add(i)
+    for i in range(1000):   # 两边都有的学生
+        a.add(i)
+        b.add(i)
+    assert (a.merge(b).registers == union.registers).all()
+    assert HyperLogLog.from_dict(union.to_dict()).count() == union.count()
+
+
+def test_count_min_error_bound():
+    stream = zipf_stream()
+    truth = Counter(stream)
+    cms = CountMinSketch(width=512, depth=4)
+    for item in stream:
+        cms.add(item)
+    bound = math.e / cms.width * cms.total
+    over = [cms.estimate(item) - count for item, count in truth.items()]
+    assert min(over) >= 0   # 只会高估
+    # 超出误差界的概率不超过 e^-depth
+    assert sum(o > bound for o in over) <= math.exp(-cms.depth) * len(truth) * 2 + 1
+
+
+def test_count_min_merge_equals_union():
+    stream = zipf_stream()
+    a, b, union = CountMinSketch(), CountMinSketch(), CountMinSketch()
+    for i, item in enumerate(stream):
+        (a if i % 2 else b).add(item)
+        union.add(item)
+    merged = CountMinSketch.from_dict(a.merge(b).to_dict())
+    assert (merged.table == union.table).all() and merged.total == union.total
+
+
+def check_space_saving(sketch, truth, total):
+    """每个计数最多高估 error；真实次数超过 总次数/容量 的内容一定被跟踪"""
+    for item, count, error in sketch.top(sketch.capacity):
+        assert count - error <= truth[item] <= count
+    for item, count in truth.items():
+        if count > total / sketch.capacity:
+            assert item in sketch.counters
+
+
+def test_space_saving_error_bound():
+    stream = zipf_stream()
+    sketch = SpaceSaving(capacity=100)
+    for item in stream:
+        sketch.add(item)
+    check_space_saving(sketch, Counter(stream), len(stream))
+    top = [item for item, _, _ in sketch.top(5)]
+    assert top == [item for item, _ in Counter(stream).most_common(5)]
+
+
+def test_space_saving_merge_error_bound():
+    stream = zipf_stream()
+    a, b = SpaceSaving(capacity=100), SpaceSaving(capacity=100)
+    for i, item in enumerate(stream):
+        (a if i < len(stream) // 2 else b).add(item)
+    merged = SpaceSaving.from_dict(a.merge(b).to_dict())
+    check_space_saving(merged, Counter(stream), len(stream))